@@ -32,7 +32,7 @@ from PySide6.QtWidgets import (
 )
 
 from ..services import accounts as account_service
-from ..services.accounts import test_proxy, get_cookies_status, autologin_account
+from ..services.accounts import get_cookies_status, autologin_account
 from ..services.chrome_launcher import ChromeLauncher
 from ..services.chrome_launcher_directparser import ChromeLauncherDirectParser
 from ..services.cdp_connector import CDPConnector
@@ -87,6 +87,23 @@ class ProfileComboDelegate(QStyledItemDelegate):
         editor.setGeometry(option.rect)
 
 
+class ProxyCheckThread(QThread):
+    """Поток проверки прокси аккаунта через общий сканер"""
+    finished_signal = Signal(dict)  # результат services.proxy_scanner.scan
+    
+    def __init__(self, proxy, parent=None):
+        super().__init__(parent)
+        self.proxy = proxy
+    
+    def run(self):
+        from ..services.proxy_scanner import run_scan
+        try:
+            result = run_scan([self.proxy], timeout=10)[self.proxy]
+        except Exception as exc:
+            result = {"ok": False, "error": str(exc), "latency_ms": None, "ip": None}
+        self.finished_signal.emit(result)
+
+
 class AutoLoginThread(QThread):
     """Поток для автоматической авторизации аккаунта"""
     status_signal = Signal(str)  # Статус операции
@@ -1159,10 +1176,6 @@ class AccountsTabExtended(QWidget):
             QMessageBox.warning(self, "Внимание", f"У аккаунта {account.name} не указан прокси")
             return
         
-        # Импортируем сервис проверки прокси
-        from ..services.proxy_check import test_proxy
-        import asyncio
-        
         # Создаем диалог прогресса
         progress_dialog = QMessageBox(self)
         progress_dialog.setWindowTitle("Проверка прокси")
@@ -1171,33 +1184,19 @@ class AccountsTabExtended(QWidget):
         progress_dialog.setModal(True)
         progress_dialog.show()
         
-        # Запускаем проверку в отдельном потоке
-        def run_test():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(test_proxy(account.proxy))
-            loop.close()
-            return result
-        
-        from threading import Thread
-        result_container = {}
-        
-        def test_thread():
-            result_container['result'] = run_test()
-        
-        thread = Thread(target=test_thread)
-        thread.start()
-        thread.join(timeout=15)
-        
-        progress_dialog.close()
+        # Общий сканер прокси в отдельном потоке — UI и диалог прогресса не замирают
+        self._proxy_check_account = account
+        self._proxy_check_dialog = progress_dialog
+        self._proxy_check_thread = ProxyCheckThread(account.proxy, self)
+        self._proxy_check_thread.finished_signal.connect(self._on_proxy_check_finished)
+        self._proxy_check_thread.start()
+    
+    def _on_proxy_check_finished(self, result):
+        """Показать результат проверки прокси (слот, UI-поток)"""
+        self._proxy_check_dialog.close()
+        account = self._proxy_check_account
         
         # Показываем результат
-        if 'result' not in result_container:
-            QMessageBox.warning(self, "Ошибка", "Проверка прокси заняла слишком много времени (>15 сек)")
-            return
-        
-        result = result_container['result']
-        
         if result['ok']:
             msg = f"✅ Прокси работает!\n\n"
             msg += f"Аккаунт: {account.name}\n"
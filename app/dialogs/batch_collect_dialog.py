@@ -486,8 +486,12 @@ class BatchCollectDialog(QDialog):
             return
 
         # Собираем настройки
+        geo_ids = self.region_selector.get_selected_geo_ids() or [225]
+        region_names = {region.id: region.name for region in self.region_selector.flat_regions}
         settings = {
-            "geo_ids": self.region_selector.get_selected_geo_ids(),
+            "geo_ids": geo_ids,
+            # Названия регионов — для колонок таблицы результатов
+            "regions_map": {rid: region_names.get(rid, str(rid)) for rid in geo_ids},
             "threshold": self.threshold_spin.value(),
             "mode": {
                 "to_active_group": self.chk_to_active_group.isChecked(),
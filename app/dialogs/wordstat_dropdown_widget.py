@@ -150,6 +150,10 @@ class WordstatDropdownWidget(QWidget):
         modes_row.addStretch()
         main_layout.addLayout(modes_row)
 
+        self.cb_force_refresh = QCheckBox("Обновить всё (не брать из кеша)")
+        self.cb_force_refresh.setToolTip("Собрать частотности заново, даже если они недавно уже собирались")
+        main_layout.addWidget(self.cb_force_refresh)
+
         main_layout.addSpacing(6)
 
         # Гео-блок
@@ -226,6 +230,8 @@ class WordstatDropdownWidget(QWidget):
         if not any(cb.isChecked() for cb in (self.cb_ws, self.cb_qws, self.cb_bws)):
             self.cb_ws.setChecked(True)
 
+        self.cb_force_refresh.setChecked(bool(settings.get("force_refresh", False)))
+
         # Регионы
         if isinstance(settings.get("regions_map"), dict) and settings["regions_map"]:
             region_ids = [int(rid) for rid in settings["regions_map"].keys()]
@@ -253,6 +259,7 @@ class WordstatDropdownWidget(QWidget):
             "region_names": list(region_map.values()),
             "profiles": [],
             "profile_emails": [],
+            "force_refresh": self.cb_force_refresh.isChecked(),
         }
         # Флаги для обратной совместимости
         settings["ws"] = "ws" in settings["modes"]
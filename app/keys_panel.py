@@ -20,6 +20,9 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, Signal, QPoint
 from PySide6.QtGui import QAction, QColor, QFont, QIcon
 
+EXPAND_ALL_LIMIT = 2000  # Больше фраз — группы раскрываются по требованию
+GROUP_CHILDREN_LIMIT = 5000  # Фраз, показываемых в одной раскрытой группе
+
 
 class KeysPanel(QWidget):
     """Правая панель с ключами во всю высоту (как в Key Collector - файл 45)"""
@@ -97,6 +100,7 @@ class KeysPanel(QWidget):
         self.groups_tree.setIndentation(15)
         self.groups_tree.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.groups_tree.setHorizontalScrollMode(QTreeWidget.ScrollPerPixel)
+        self.groups_tree.itemExpanded.connect(self._fill_group_item)
         
         layout.addWidget(self.groups_tree, 1)
     
@@ -142,6 +146,7 @@ class KeysPanel(QWidget):
         trash.setForeground(0, QColor("#999"))
         self.groups_tree.addTopLevelItem(trash)
         
+        total = 0
         for group_name, data in self._groups.items():
             # Поддержка двух форматов
             if isinstance(data, dict):
@@ -170,20 +175,49 @@ class KeysPanel(QWidget):
             if count == 0:
                 group_item.setForeground(0, QColor("#999"))
             
-            # Добавляем фразы как дочерние элементы
-            for phrase_data in phrases:
-                phrase_text = phrase_data.get("phrase", phrase_data) if isinstance(phrase_data, dict) else phrase_data
-                
-                # Создаем элемент фразы
-                phrase_item = QTreeWidgetItem([phrase_text, ""])
-                phrase_item.setForeground(0, QColor("#ddd"))
-                
-                group_item.addChild(phrase_item)
+            # Фразы добавляются при раскрытии группы (_fill_group_item)
+            group_item.setData(0, Qt.UserRole, group_name)
+            if count:
+                group_item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            total += count
             
             self.groups_tree.addTopLevelItem(group_item)
         
-        # Раскрываем все группы по умолчанию
-        self.groups_tree.expandAll()
+        # Раскрываем все группы по умолчанию, если фраз немного
+        if total <= EXPAND_ALL_LIMIT:
+            self.groups_tree.expandAll()
+
+    def _group_phrases(self, group_name) -> list:
+        data = self._groups.get(group_name, [])
+        if isinstance(data, dict):
+            return data.get('phrases', [])
+        return data if isinstance(data, list) else []
+
+    def _fill_group_item(self, group_item: QTreeWidgetItem):
+        """Создать элементы фраз группы при первом раскрытии"""
+        if group_item.parent() or group_item.childCount():
+            return
+        group_name = group_item.data(0, Qt.UserRole)
+        if group_name is None:
+            return
+        phrases = self._group_phrases(group_name)
+        
+        children = []
+        for phrase_data in phrases[:GROUP_CHILDREN_LIMIT]:
+            phrase_text = phrase_data.get("phrase", phrase_data) if isinstance(phrase_data, dict) else phrase_data
+            
+            # Создаем элемент фразы
+            phrase_item = QTreeWidgetItem([str(phrase_text), ""])
+            phrase_item.setForeground(0, QColor("#ddd"))
+            children.append(phrase_item)
+        
+        hidden = len(phrases) - len(children)
+        if hidden > 0:
+            more_item = QTreeWidgetItem([f"… ещё {hidden} фраз", ""])
+            more_item.setForeground(0, QColor("#999"))
+            children.append(more_item)
+        
+        group_item.addChildren(children)
     
     def _groups_context_menu(self, pos: QPoint):
         """Контекстное меню на дереве групп"""
@@ -304,7 +338,7 @@ class KeysPanel(QWidget):
             return
         
         group_name = item.text(0).split(" (")[0]
-        phrases_count = item.childCount()
+        phrases_count = len(self._group_phrases(item.data(0, Qt.UserRole) or group_name))
         
         from PySide6.QtWidgets import QMessageBox
         reply = QMessageBox.question(
@@ -9,6 +9,26 @@ from PySide6 import QtCore, QtWidgets
 from ..services.proxy_manager import Proxy, ProxyManager
 
 
+class ProxyTestThread(QtCore.QThread):
+    """Проверка прокси в фоне: диалог остаётся отзывчивым на время скана."""
+
+    finished_signal = QtCore.Signal(dict)  # {proxy.id: result}
+    failed_signal = QtCore.Signal(str)
+
+    def __init__(self, manager: ProxyManager, proxies: list[Proxy], parent: Optional[QtCore.QObject] = None):
+        super().__init__(parent)
+        self.manager = manager
+        self.proxies = proxies
+
+    def run(self) -> None:
+        try:
+            results = self.manager.test_many(self.proxies)
+        except Exception as exc:
+            self.failed_signal.emit(str(exc))
+            return
+        self.finished_signal.emit(results)
+
+
 class ProxyEditorDialog(QtWidgets.QDialog):
     """Диалог для добавления или редактирования прокси."""
 
@@ -132,6 +152,7 @@ class ProxyManagerDialog(QtWidgets.QDialog):
         self.button_edit = QtWidgets.QPushButton("Изменить")
         self.button_delete = QtWidgets.QPushButton("Удалить")
         self.button_test = QtWidgets.QPushButton("Проверить IP")
+        self.button_test_all = QtWidgets.QPushButton("Проверить все")
         self.button_refresh = QtWidgets.QPushButton("Обновить")
         self.button_close = QtWidgets.QPushButton("Закрыть")
 
@@ -139,17 +160,30 @@ class ProxyManagerDialog(QtWidgets.QDialog):
         self.button_edit.clicked.connect(self.edit_selected)
         self.button_delete.clicked.connect(self.delete_selected)
         self.button_test.clicked.connect(self.test_selected)
+        self.button_test_all.clicked.connect(self.test_all)
         self.button_refresh.clicked.connect(self.reload)
         self.button_close.clicked.connect(self.close)
 
         buttons_layout = QtWidgets.QHBoxLayout()
-        for widget in (self.button_add, self.button_edit, self.button_delete, self.button_test, self.button_refresh):
+        for widget in (
+            self.button_add,
+            self.button_edit,
+            self.button_delete,
+            self.button_test,
+            self.button_test_all,
+            self.button_refresh,
+        ):
             buttons_layout.addWidget(widget)
         buttons_layout.addStretch(1)
         buttons_layout.addWidget(self.button_close)
 
+        self.label_status = QtWidgets.QLabel()
+        self._test_thread: Optional[ProxyTestThread] = None
+        self._test_done = None
+
         layout = QtWidgets.QVBoxLayout(self)
         layout.addWidget(self.table)
+        layout.addWidget(self.label_status)
         layout.addLayout(buttons_layout)
 
         self.reload()
@@ -250,12 +284,10 @@ class ProxyManagerDialog(QtWidgets.QDialog):
         if not proxy:
             QtWidgets.QMessageBox.information(self, "Proxy Manager", "Выберите прокси для проверки.")
             return
-        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.CursorShape.WaitCursor)
-        try:
-            result = self.manager.test_proxy(proxy)
-        finally:
-            QtWidgets.QApplication.restoreOverrideCursor()
+        self._start_test([proxy], self._show_single_result)
 
+    def _show_single_result(self, results: dict) -> None:
+        result = next(iter(results.values()), {})
         if result.get("ok"):
             QtWidgets.QMessageBox.information(
                 self,
@@ -268,7 +300,46 @@ class ProxyManagerDialog(QtWidgets.QDialog):
                 "Результат проверки",
                 f"❌ Прокси не ответил.\n\nПричина: {result.get('error', '')}",
             )
+
+    def test_all(self) -> None:
+        proxies = self.manager.list(include_disabled=True)
+        if not proxies:
+            QtWidgets.QMessageBox.information(self, "Proxy Manager", "Список прокси пуст.")
+            return
+        self._start_test(proxies, self._show_summary)
+
+    def _show_summary(self, results: dict) -> None:
+        alive = sum(1 for result in results.values() if result.get("ok"))
+        QtWidgets.QMessageBox.information(
+            self,
+            "Результат проверки",
+            f"Проверено прокси: {len(results)}\nРаботают: {alive}\nНе ответили: {len(results) - alive}",
+        )
+
+    def _start_test(self, proxies: list[Proxy], on_done) -> None:
+        if self._test_thread is not None and self._test_thread.isRunning():
+            return
+        self._set_testing(True, len(proxies))
+        self._test_done = on_done
+        self._test_thread = ProxyTestThread(self.manager, proxies, self)
+        # Слоты диалога выполняются в UI-потоке (сигналы из потока ставятся в очередь)
+        self._test_thread.finished_signal.connect(self._on_test_finished)
+        self._test_thread.failed_signal.connect(self._on_test_failed)
+        self._test_thread.start()
+
+    def _on_test_finished(self, results: dict) -> None:
+        self._set_testing(False)
         self.reload()
+        self._test_done(results)
+
+    def _on_test_failed(self, error: str) -> None:
+        self._set_testing(False)
+        QtWidgets.QMessageBox.warning(self, "Результат проверки", f"❌ Проверка не выполнена: {error}")
+
+    def _set_testing(self, running: bool, count: int = 0) -> None:
+        self.button_test.setEnabled(not running)
+        self.button_test_all.setEnabled(not running)
+        self.label_status.setText(f"Проверка прокси: {count}…" if running else "")
 
     # ------------------------------------------------------------------ #
     # Internal helpers
@@ -11,7 +11,7 @@ from PySide6.QtWidgets import (
     QSplitter, QGraphicsView, QGraphicsScene, QGraphicsEllipseItem,
     QGraphicsTextItem, QGraphicsLineItem, QApplication
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QThread, Signal
 from PySide6.QtGui import QBrush, QColor, QPen
 from pathlib import Path
 import json
@@ -65,6 +65,29 @@ except Exception:
                         seen.add(k)
                 return uniq[:max_kw]
 
+MASKS_BATCH = 1000  # Масок в одной порции при передаче в Парсинг
+
+
+class MasksStreamThread(QThread):
+    """Поток передачи масок: порции уходят в UI по мере готовности"""
+    batch_signal = Signal(list)  # Порция масок (строки)
+    finished_signal = Signal(int)  # всего передано масок
+
+    def __init__(self, results: list, batch_size: int = MASKS_BATCH, parent=None):
+        super().__init__(parent)
+        self.results = results
+        self.batch_size = batch_size
+
+    def run(self):
+        total = 0
+        for start in range(0, len(self.results), self.batch_size):
+            if self.isInterruptionRequested():
+                break
+            batch = [r['keyword'] for r in self.results[start:start + self.batch_size]]
+            self.batch_signal.emit(batch)
+            total += len(batch)
+        self.finished_signal.emit(total)
+
 
 class MasksTab(QWidget):
     """Главная вкладка для работы с масками ключевых слов"""
@@ -76,6 +99,7 @@ class MasksTab(QWidget):
 
         self.xmind_data = None
         self.multiplier_results = None
+        self._stream_thread = None
 
         self.masks_table = None
         self.groups_list = None
@@ -469,14 +493,26 @@ class MasksTab(QWidget):
         if not self.multiplier_results:
             QMessageBox.warning(self, "⚠️", "Нет результатов для передачи")
             return
-        
-        masks = [r['keyword'] for r in self.multiplier_results]
-        
-        if callable(self._send_cb):
-            self._send_cb(masks)
-            QMessageBox.information(self, "✅", f"Передано {len(masks)} масок в Парсинг")
-        else:
+        if not callable(self._send_cb):
             QMessageBox.warning(self, "⚠️", "Функция передачи не настроена")
+            return
+        if self._stream_thread is not None and self._stream_thread.isRunning():
+            QMessageBox.information(self, "ℹ️", "Передача масок уже идёт")
+            return
+        
+        # Передаются те же лучшие маски, что показаны в таблице, — порциями
+        # из отдельного потока, между порциями UI успевает обработать события
+        self._stream_thread = MasksStreamThread(list(self.multiplier_results), parent=self)
+        self._stream_thread.batch_signal.connect(self._on_masks_batch)
+        self._stream_thread.finished_signal.connect(self._on_masks_stream_finished)
+        self._stream_thread.start()
+    
+    def _on_masks_batch(self, masks: list):
+        # Слот вкладки: порция добавляется в Парсинг в UI-потоке
+        self._send_cb(masks)
+    
+    def _on_masks_stream_finished(self, total: int):
+        QMessageBox.information(self, "✅", f"Передано {total} масок в Парсинг")
 
     # Вспомогательная интеграция
     def log_message(self, message: str):
@@ -6,11 +6,12 @@ import json
 import sys
 import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Dict, Any, Tuple, Iterable, Sequence
 
-from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtCore import Qt, QThread, QTimer, Signal
 from PySide6.QtGui import QGuiApplication, QTextCursor
 from PySide6.QtWidgets import (
     QWidget,
@@ -22,8 +23,7 @@ from PySide6.QtWidgets import (
     QTextEdit,
     QLabel,
     QCheckBox,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QProgressBar,
     QFileDialog,
     QAbstractItemView,
@@ -42,6 +42,7 @@ from ..dialogs.wordstat_settings_dialog import WordstatSettingsDialog
 from ..dialogs.wordstat_dropdown_widget import WordstatDropdownWidget
 from ..keys_panel import KeysPanel
 from ..widgets.activity_log import ActivityLogWidget
+from ..widgets.results_model import ResultsTableModel
 from ...core.icons import icon
 
 try:
@@ -49,6 +50,13 @@ try:
 except ImportError:
     from services.accounts import list_accounts
 
+try:
+    from ...services.phrase_coordinator import PhraseCoordinator
+    from ...services import browser_pool, frequency_cache, parse_jobs, result_store
+except ImportError:
+    from services.phrase_coordinator import PhraseCoordinator
+    from services import browser_pool, frequency_cache, parse_jobs, result_store
+
 try:
     from ...services import multiparser_manager
 except ImportError:  # pragma: no cover - fallback for scripts
@@ -65,6 +73,8 @@ if str(PACKAGE_ROOT) not in sys.path:
 
 BASE_DIR = PROJECT_ROOT
 SESSION_FILE = BASE_DIR / "keyset/logs/parsing_session.json"
+RESULTS_PROJECT = "parsing"  # Каталог колоночных хранилищ вкладки: по проекту на сессию парсинга
+COOKIE_PROBE_WORKERS = 8  # Профилей, чьи файлы куки читаются одновременно перед запуском
 
 
 def _probe_profile_cookies(profile_record: Dict[str, Any]) -> Tuple[int, Optional[str]]:
@@ -91,20 +101,26 @@ def _probe_profile_cookies(profile_record: Dict[str, Any]) -> Tuple[int, Optiona
         return -1, "Логгер multiparser_manager не доступен"
 
     try:
-        if hasattr(multiparser_manager, '_extract_profile_cookies'):
-            cookies = multiparser_manager._extract_profile_cookies(  # type: ignore[attr-defined]
-                path_obj,
-                log_obj,
-            )
+        if hasattr(multiparser_manager, 'count_profile_cookies'):
+            # Расшифрованные при подсчёте куки запоминаются и переиспользуются при загрузке
+            cookie_count = multiparser_manager.count_profile_cookies(path_obj, log_obj)
         else:
-            return -1, "Метод _extract_profile_cookies не найден"
+            return -1, "Метод count_profile_cookies не найден"
     except Exception as exc:  # pragma: no cover - диагностический путь
         return -1, str(exc)
 
-    if cookies is None:
+    if cookie_count is None:
         return -1, "Не удалось извлечь куки"
 
-    return len(cookies), None
+    return cookie_count, None
+
+
+def _probe_profiles_cookies(profile_records: Sequence[Dict[str, Any]]) -> List[Tuple[int, Optional[str]]]:
+    """То же для нескольких профилей: файлы куки читаются параллельно."""
+    if len(profile_records) <= 1:
+        return [_probe_profile_cookies(record) for record in profile_records]
+    with ThreadPoolExecutor(max_workers=min(COOKIE_PROBE_WORKERS, len(profile_records))) as pool:
+        return list(pool.map(_probe_profile_cookies, profile_records))
 
 try:
     from turbo_parser_improved import turbo_parser_10tabs  # type: ignore
@@ -132,6 +148,7 @@ class SingleParsingTask:
         region_plan: Sequence[Tuple[int, str]],
         modes: Sequence[str],
         cookie_count: Optional[int] = None,
+        coordinator: Optional[PhraseCoordinator] = None,
     ):
         self.profile_email = profile_email
         self.profile_path = Path(profile_path)
@@ -150,6 +167,8 @@ class SingleParsingTask:
         self.region_plan = normalized_plan
         self.modes = tuple(str(mode) for mode in modes if str(mode))
         self.cookie_count = cookie_count
+        # Общая очередь пар (фраза, регион): профили делят их между собой
+        self.coordinator = coordinator
         self.results: List[Dict[str, Any]] = []
         self.status = "waiting"
         self.progress = 0
@@ -189,30 +208,46 @@ class SingleParsingTask:
                     "WARNING",
                 )
 
-            processed_regions = 0
             ws_enabled = "ws" in active_modes
-            for region_id, region_name in self.region_plan:
-                self.log(f"🌍 Регион: {region_name} ({region_id})", "INFO")
-                region_records: List[Dict[str, Any]] = []
-                if ws_enabled and total_phrases:
-                    try:
-                        ws_results = await turbo_parser_10tabs(
-                            account_name=self.profile_email,
-                            profile_path=self.profile_path,
-                            phrases=self.phrases,
-                            headless=False,
-                            proxy_uri=self.proxy,
-                            region_id=region_id,
-                        )
-                    except Exception as exc:  # pragma: no cover - диагностический путь
-                        self.log(f"❌ Ошибка парсинга региона {region_id}: {exc}", "ERROR")
-                        continue
-
-                    status_map: Dict[str, str] = {}
-                    if hasattr(ws_results, "meta"):
-                        status_map = ws_results.meta.get("statuses") or {}
+            region_ids = [region_id for region_id, _ in self.region_plan]
+            region_names = dict(self.region_plan)
+            if len(region_ids) > 1:
+                self.log(
+                    f"🌍 Регионы: {', '.join(region_names.values())} — один запуск браузера на все",
+                    "INFO",
+                )
+            else:
+                self.log(f"🌍 Регион: {self.region_plan[0][1]} ({region_ids[0]})", "INFO")
 
-                    for phrase, freq in ws_results.items():
+            if not ws_enabled:
+                self.log("⚠️ Режим WS отключён — парсинг пропущен.", "WARNING")
+            elif self.coordinator is not None and self.coordinator.total == 0:
+                self.log("✓ Все фразы уже есть в кеше — браузер не нужен", "INFO")
+            elif total_phrases:
+                try:
+                    # Все регионы разом: вкладки разбирают пары (фраза, регион)
+                    ws_results = await turbo_parser_10tabs(
+                        account_name=self.profile_email,
+                        profile_path=self.profile_path,
+                        phrases=self.phrases,
+                        headless=False,
+                        proxy_uri=self.proxy,
+                        region_id=region_ids[0],
+                        regions=region_ids,
+                        coordinator=self.coordinator,
+                        # Следующий запуск берёт тот же Chrome с вкладками
+                        pool=browser_pool.get_pool(),
+                    )
+                except Exception as exc:  # pragma: no cover - диагностический путь
+                    self.log(f"❌ Ошибка парсинга: {exc}", "ERROR")
+                    ws_results = None
+
+                meta = getattr(ws_results, "meta", {}) if ws_results is not None else {}
+                by_region = meta.get("regions") or {}
+                region_statuses = meta.get("region_statuses") or {}
+                for region_id in region_ids:
+                    status_map: Dict[str, str] = region_statuses.get(region_id) or {}
+                    for phrase, freq in (by_region.get(region_id) or {}).items():
                         raw_status = status_map.get(phrase, "OK")
                         status_key = str(raw_status).strip().upper().replace(" ", "_")
                         status_code = "OK" if status_key == "OK" else "NO_DATA"
@@ -221,7 +256,7 @@ class SingleParsingTask:
                             freq_value = int(freq)
                         except (TypeError, ValueError):
                             freq_value = 0
-                        region_records.append(
+                        self.results.append(
                             {
                                 "phrase": phrase,
                                 "ws": freq_value,
@@ -230,17 +265,9 @@ class SingleParsingTask:
                                 "status": status_display,
                                 "profile": self.profile_email,
                                 "region_id": region_id,
-                                "region_name": region_name,
+                                "region_name": region_names[region_id],
                             }
                         )
-                else:
-                    self.log("⚠️ Режим WS отключён — парсинг пропущен.", "WARNING")
-
-                self.results.extend(region_records)
-                processed_regions += 1
-                if processed_regions:
-                    completion = int((processed_regions / len(self.region_plan)) * 100)
-                    self.progress = min(100, completion)
 
             self.log(
                 f"✓ Парсинг завершён. Получено записей: {len(self.results)}",
@@ -272,8 +299,15 @@ class MultiParsingWorker(QThread):
         regions_map: Dict[int, str] | None,
         geo_ids: List[int],
         selected_profiles: List[dict],  # Список выбранных профилей
+        force_refresh: bool = False,
         parent: QWidget | None = None,
+        job_id: Optional[int] = None,
     ):
+        """
+        Args:
+            job_id: продолжить сохранённое задание (services.parse_jobs) —
+                собираются только его несобранные пары фраза × регион
+        """
         super().__init__(parent)
         self.phrases = list(phrases)
         normalized_modes = []
@@ -312,36 +346,105 @@ class MultiParsingWorker(QThread):
         self._pause_event.set()
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        # Распределяем фразы поровну между профилями
         num_profiles = len(selected_profiles)
         if num_profiles == 0:
             raise ValueError("Нет выбранных профилей для запуска парсинга")
 
-        phrases_per_profile = len(self.phrases) // num_profiles
-        remainder = len(self.phrases) % num_profiles
+        self.force_refresh = force_refresh
+        self.cached_results: List[Dict[str, Any]] = []
+        region_names = dict(self.region_plan)
 
-        batches = []
-        start_idx = 0
+        # Задание в БД: прогресс пишется по ходу работы, после падения
+        # собираются только несобранные пары
+        self.job_id: Optional[int] = job_id
+        self.checkpoint: Optional[parse_jobs.JobCheckpoint] = None
+        region_phrases: Dict[int, List[str]] = {region_id: self.phrases for region_id, _ in self.region_plan}
+        try:
+            if job_id is None:
+                self.job_id = parse_jobs.create_job(
+                    self.phrases,
+                    region_names,
+                    modes=self.modes,
+                    session_id=self.session_id,
+                    params={"force_refresh": force_refresh},
+                )
+            else:
+                region_phrases = {region_id: [] for region_id, _ in self.region_plan}
+                for phrase, region_id in parse_jobs.pending_items(job_id):
+                    region_phrases.setdefault(region_id, []).append(phrase)
+                for row in parse_jobs.job_items(job_id):
+                    region_id = int(row["region"])
+                    self.cached_results.append(
+                        {
+                            "phrase": row["phrase"],
+                            "ws": row["freq"] or 0,
+                            "qws": 0,
+                            "bws": 0,
+                            "status": "OK" if row["status"] == "ok" else "No data",
+                            "profile": row["profile"] or "задание",
+                            "region_id": region_id,
+                            "region_name": region_names.get(region_id, str(region_id)),
+                        }
+                    )
+            self.checkpoint = parse_jobs.JobCheckpoint(self.job_id, default_region=self.geo_ids[0])
+        except Exception as exc:
+            print(f"[WARNING] parse job journal unavailable: {exc}")
+
+        # Уже собранные фразы берём из кеша частотностей, в работу идут только остальные
+        region_queues: Dict[int, List[str]] = {}
+        cached_pairs: Dict[Tuple[str, int], int] = {}
+        for region_id, region_name in self.region_plan:
+            cached: Dict[str, int] = {}
+            pending = region_phrases.get(region_id, [])
+            if "ws" in self.modes and pending:
+                try:
+                    cached, pending = frequency_cache.split_cached(
+                        pending, mode="ws", region=region_id, force_refresh=force_refresh
+                    )
+                except Exception as exc:
+                    print(f"[WARNING] frequency cache unavailable: {exc}")
+            region_queues[region_id] = pending
+            for phrase, freq in cached.items():
+                cached_pairs[(phrase, region_id)] = freq
+                self.cached_results.append(
+                    {
+                        "phrase": phrase,
+                        "ws": freq,
+                        "qws": 0,
+                        "bws": 0,
+                        "status": "OK",
+                        "profile": "кеш",
+                        "region_id": region_id,
+                        "region_name": region_name,
+                    }
+                )
 
-        for i in range(num_profiles):
-            # Добавляем по одной фразе к последним профилям если есть остаток
-            end_idx = start_idx + phrases_per_profile + (1 if i >= num_profiles - remainder else 0)
-            batch = self.phrases[start_idx:end_idx]
-            batches.append(batch)
-            start_idx = end_idx
+        # Пары (фраза, регион) не делятся заранее: профили берут их порциями
+        # из общего координатора, хвосты упавших/медленных профилей достаются живым.
+        # Каждый профиль собирает все регионы за один запуск браузера.
+        self.coordinator = PhraseCoordinator(
+            (
+                (phrase, region_id)
+                for region_id, pending in region_queues.items()
+                for phrase in pending
+            ),
+            checkpoint=self.checkpoint,
+        )
+        if self.checkpoint is not None and cached_pairs:
+            self.checkpoint.record_cached(cached_pairs)
 
-        # Создаем задачи для каждого профиля с распределёнными фразами
         self.tasks = []
-        for profile, batch in zip(selected_profiles, batches):
+        for profile in selected_profiles:
             task = SingleParsingTask(
                 profile_email=profile['email'],
                 profile_path=profile['profile_path'],
                 proxy=profile.get('proxy'),
-                phrases=batch,  # ✅ Каждый профиль получает ТОЛЬКО свой батч фраз
+                phrases=self.phrases,
                 session_id=self.session_id,
                 region_plan=self.region_plan,
                 modes=self.modes,
                 cookie_count=profile.get("cookie_count"),
+                coordinator=self.coordinator,
             )
             self.tasks.append(task)
             
@@ -392,20 +495,25 @@ class MultiParsingWorker(QThread):
         self._write_log(f"📝 Фраз: {len(self.phrases)}")
         self._write_log(f"🌍 Регионов: {len(self.region_plan)}")
         self._write_log(f"⚙️ Режимы: {', '.join(self.modes)}")
+        if self.job_id is not None:
+            self._write_log(f"🗂 Задание #{self.job_id}: к сбору {self.coordinator.total} пар фраза × регион")
+        if self.cached_results:
+            self._write_log(f"💾 Уже собрано (кеш/задание): {len(self.cached_results)} записей")
         self._write_log("=" * 70)
         
-        # Создаем новый event loop для этого потока
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            # Запускаем все задачи параллельно
-            loop.run_until_complete(self._run_all_parsers())
-        finally:
-            loop.close()
-            
+        # Задачи выполняются в общем loop пула браузеров: контексты профилей
+        # и прогретые вкладки переживают этот запуск и достаются следующему
+        browser_pool.run_shared(self._run_all_parsers())
+
+        if self.checkpoint is not None:
+            self.checkpoint.flush()
+            try:
+                parse_jobs.finish_job(self.job_id, "stopped" if self._stop_requested else "done")
+            except Exception as exc:
+                self._write_log(f"⚠️ Не удалось закрыть задание #{self.job_id}: {exc}")
+
         # Собираем все результаты
-        all_results: List[Dict[str, Any]] = []
+        all_results: List[Dict[str, Any]] = list(self.cached_results)
         for task in self.tasks:
             if task.results:
                 all_results.extend(task.results)
@@ -489,6 +597,8 @@ class ParsingTab(QWidget):
         self._region_labels: Dict[int, str] = {}
         self._manual_phrases_cache: str = ""
         self._manual_ignore_duplicates: bool = False
+        self._active_job_id: Optional[int] = None
+        self._results_project: Optional[str] = None  # Хранилище последнего завершённого запуска
         
         # Выпадающий виджет для кнопки "Частотка"
         self._wordstat_dropdown = None
@@ -560,6 +670,7 @@ class ParsingTab(QWidget):
             "bws": bool_modes["bws"],
             "profiles": list(settings.get("profiles") or []) if settings else [],
             "profile_emails": list(settings.get("profile_emails") or []) if settings else [],
+            "force_refresh": bool(settings.get("force_refresh", False)) if settings else False,
         }
         return normalized
 
@@ -576,48 +687,6 @@ class ParsingTab(QWidget):
         short = " / ".join(parts)
         return f"{short} ({region_id})"
 
-    def _ensure_item(self, row: int, column: int) -> QTableWidgetItem:
-        item = self.table.item(row, column)
-        if item is None:
-            item = QTableWidgetItem("")
-            self.table.setItem(row, column, item)
-        return item
-
-    def _set_cell_text(self, row: int, column: int, text: Any) -> None:
-        item = self._ensure_item(row, column)
-        item.setText("" if text is None else str(text))
-
-    def _set_frequency_cell(
-        self,
-        row: int,
-        column: int,
-        value: Any,
-        *,
-        region_id: int | None = None,
-        status: str | None = None,
-    ) -> None:
-        freq = self._coerce_freq(value)
-        item = self._ensure_item(row, column)
-        item.setText(str(freq))
-        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        meta = item.data(Qt.UserRole)
-        if not isinstance(meta, dict):
-            meta = {}
-        if region_id is not None:
-            meta["region_id"] = region_id
-        if status:
-            meta["status"] = status
-        meta["value"] = freq
-        item.setData(Qt.UserRole, meta)
-
-    def _set_status_cell(self, row: int, text: str, *, status_meta: dict | None = None) -> None:
-        column = self._status_column_index()
-        item = self._ensure_item(row, column)
-        item.setText(text)
-        item.setTextAlignment(Qt.AlignCenter)
-        if status_meta is not None:
-            item.setData(Qt.UserRole, status_meta)
-
     def _configure_table_columns(self, region_map: Dict[int, str] | None) -> None:
         if not hasattr(self, "table"):
             return
@@ -640,28 +709,16 @@ class ParsingTab(QWidget):
         self._region_order = [rid for rid, _ in ordered_items]
         self._region_labels = {rid: label for rid, label in ordered_items}
 
-        status_col = self._status_column_index()
-        self.table.setColumnCount(status_col + 1)
-
-        headers = ["✓", "№", "Фраза"]
-        headers.extend(self._short_region_label(label, rid) for rid, label in ordered_items)
-        headers.append("Статус")
-        self.table.setHorizontalHeaderLabels(headers)
+        headers = [self._short_region_label(label, rid) for rid, label in ordered_items]
+        if not self.table_model.set_columns(self._region_order, headers):
+            return
 
         self.table.setColumnWidth(0, 36)
         self.table.setColumnWidth(1, 48)
         self.table.setColumnWidth(2, 420)
         for idx in range(len(self._region_order)):
             self.table.setColumnWidth(3 + idx, 160)
-        self.table.setColumnWidth(status_col, 100)
-
-        for row in range(self.table.rowCount()):
-            self._ensure_checkbox(row)
-            self._ensure_item(row, 1)
-            self._ensure_item(row, 2)
-            for idx in range(len(self._region_order)):
-                self._ensure_item(row, 3 + idx)
-            self._ensure_item(row, status_col)
+        self.table.setColumnWidth(self._status_column_index(), 100)
 
     def setup_ui(self) -> None:
         """Создание интерфейса вкладки парсинга в стиле Key Collector"""
@@ -705,8 +762,10 @@ class ParsingTab(QWidget):
 
         left_layout.addLayout(control_buttons)
         
-        # Таблица фраз
-        self.table = QTableWidget()
+        # Таблица фраз: модель отдаёт строки порциями, отметки хранит как данные
+        self.table_model = ResultsTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
         self._configure_table_columns(self._active_regions)
         self.table.verticalHeader().setVisible(False)
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
@@ -1055,90 +1114,27 @@ class ParsingTab(QWidget):
 
         return selected
 
-    def _insert_phrase_row(self, phrase: str, ws: str = "", status: str = "—", checked: bool = True) -> None:
-        self._configure_table_columns(self._active_regions)
-        row_idx = self.table.rowCount()
-        self.table.insertRow(row_idx)
-
-        checkbox = QCheckBox()
-        checkbox.setChecked(checked)
-        checkbox_container = QWidget()
-        checkbox_layout = QHBoxLayout(checkbox_container)
-        checkbox_layout.setContentsMargins(0, 0, 0, 0)
-        checkbox_layout.setAlignment(Qt.AlignCenter)
-        checkbox_layout.addWidget(checkbox)
-        self.table.setCellWidget(row_idx, 0, checkbox_container)
-
-        self._set_cell_text(row_idx, 1, row_idx + 1)
-        self._set_cell_text(row_idx, 2, phrase)
-        for idx in range(len(self._region_order)):
-            self._set_cell_text(row_idx, 3 + idx, ws if idx == 0 else "")
-        self._set_cell_text(row_idx, self._status_column_index(), status)
-
-    def _renumber_rows(self) -> None:
-        for row in range(self.table.rowCount()):
-            self._set_cell_text(row, 1, row + 1)
-
-    def _get_checkbox(self, row: int) -> QCheckBox | None:
-        widget = self.table.cellWidget(row, 0)
-        if isinstance(widget, QCheckBox):
-            return widget
-        if widget:
-            checkbox = widget.findChild(QCheckBox)
-            if isinstance(checkbox, QCheckBox):
-                return checkbox
-        return None
-
-    def _ensure_checkbox(self, row: int, checked: bool | None = None) -> QCheckBox | None:
-        checkbox = self._get_checkbox(row)
-        if checkbox is None:
-            checkbox = QCheckBox()
-            container = QWidget()
-            layout = QHBoxLayout(container)
-            layout.setContentsMargins(0, 0, 0, 0)
-            layout.setAlignment(Qt.AlignCenter)
-            layout.addWidget(checkbox)
-            self.table.setCellWidget(row, 0, container)
-        if checked is not None and checkbox is not None:
-            checkbox.setChecked(checked)
-        return checkbox
-
     def _get_all_phrases(self) -> List[str]:
-        phrases: List[str] = []
-        for row in range(self.table.rowCount()):
-            phrase_item = self.table.item(row, 2)
-            if phrase_item:
-                phrase = phrase_item.text().strip()
-                if phrase:
-                    phrases.append(phrase)
-        return phrases
+        return self.table_model.phrases()
 
     def _get_selected_phrases(self) -> List[str]:
-        selected: List[str] = []
-        for row in range(self.table.rowCount()):
-            checkbox = self._get_checkbox(row)
-            if not checkbox or not checkbox.isChecked():
-                continue
-            phrase_item = self.table.item(row, 2)
-            if phrase_item:
-                phrase = phrase_item.text().strip()
-                if phrase:
-                    selected.append(phrase)
-        return selected
+        return self.table_model.checked_phrases()
 
     def _mark_phrases_pending(self, phrases: List[str]) -> None:
-        pending = set(phrases)
-        for row in range(self.table.rowCount()):
-            phrase_item = self.table.item(row, 2)
-            if not phrase_item:
-                continue
-            if phrase_item.text().strip() in pending:
-                for idx in range(len(self._region_order)):
-                    self._set_cell_text(row, 3 + idx, "")
-                self._set_cell_text(row, self._status_column_index(), "⏳")
+        self.table_model.mark_pending(phrases)
+
+    def save_session_state(
+        self,
+        partial_results: List[Dict[str, Any]] | None = None,
+        *,
+        results_project: str | None = None,
+    ) -> None:
+        """
+        Сохранить состояние парсинга, чтобы восстановить его при следующем запуске.
 
-    def save_session_state(self, partial_results: List[Dict[str, Any]] | None = None) -> None:
-        """Сохранить состояние парсинга, чтобы восстановить его при следующем запуске."""
+        Если результаты уже лежат в колоночном хранилище (``results_project``),
+        в JSON попадает только имя проекта, а не сами строки.
+        """
         try:
             SESSION_FILE.parent.mkdir(parents=True, exist_ok=True)
         except Exception as exc:  # pragma: no cover - best effort
@@ -1151,8 +1147,12 @@ class ParsingTab(QWidget):
             "phrases": phrases,
             "settings": self._last_settings,
             "manual_buffer": self._manual_phrases_cache,
+            # Сами результаты и прогресс — в задании parse_jobs
+            "job_id": self._active_job_id,
         }
-        if partial_results is not None:
+        if results_project is not None:
+            state["results_project"] = results_project
+        elif partial_results is not None:
             state["partial_results"] = partial_results
 
         try:
@@ -1180,10 +1180,8 @@ class ParsingTab(QWidget):
 
         phrases = state.get("phrases") or []
         if phrases:
-            self.table.setRowCount(0)
-            for phrase in phrases:
-                self._insert_phrase_row(phrase, checked=False)
-            self._renumber_rows()
+            self.table_model.clear()
+            self.table_model.append_phrases(phrases, checked=False)
             self._manual_phrases_cache = "\n".join(phrases)
         else:
             self._manual_phrases_cache = ""
@@ -1193,6 +1191,14 @@ class ParsingTab(QWidget):
             self._manual_phrases_cache = buffer_text
 
         partial_results = state.get("partial_results") or []
+        results_project = state.get("results_project")
+        if isinstance(results_project, str):
+            try:
+                with result_store.open_store(results_project).snapshot() as snapshot:
+                    partial_results = snapshot.records()
+                self._results_project = results_project
+            except Exception as exc:
+                print(f"[ERROR] Failed to load results store {results_project}: {exc}")
         if isinstance(partial_results, list):
             self._populate_results(partial_results)
 
@@ -1200,6 +1206,77 @@ class ParsingTab(QWidget):
         if isinstance(settings, dict):
             self._last_settings = self._normalize_wordstat_settings(settings)
 
+        self._restore_unfinished_job()
+
+    def _restore_unfinished_job(self) -> None:
+        """Показать прогресс прерванного задания и предложить продолжить его."""
+        try:
+            job = parse_jobs.latest_unfinished_job()
+            done_rows = parse_jobs.job_items(job["id"]) if job else []
+        except Exception as exc:
+            print(f"[WARNING] Failed to read parse jobs: {exc}")
+            return
+        if not job:
+            return
+
+        self.table_model.append_phrases(parse_jobs.job_phrases(job["id"]), checked=False)
+        self._active_regions = dict(job["regions"]) or self._active_regions
+        self._populate_results(
+            [
+                {
+                    "phrase": row["phrase"],
+                    "ws": row["freq"],
+                    "status": "OK" if row["status"] == "ok" else "No data",
+                    "region_id": row["region"],
+                    "region_name": job["regions"].get(int(row["region"])),
+                }
+                for row in done_rows
+            ]
+        )
+        self._append_log(
+            f"🗂 Незавершённое задание #{job['id']}: собрано {job['done']} из {job['total']} пар фраза × регион"
+        )
+        # Диалог — после показа окна
+        QTimer.singleShot(0, lambda: self._offer_resume_job(job))
+
+    def _offer_resume_job(self, job: Dict[str, Any]) -> None:
+        answer = QMessageBox.question(
+            self,
+            "Незавершённый парсинг",
+            f"Задание #{job['id']} прервано: собрано {job['done']} из {job['total']}.\n\n"
+            "Продолжить сбор оставшихся фраз?",
+        )
+        if answer != QMessageBox.Yes:
+            try:
+                parse_jobs.finish_job(job["id"], "cancelled")
+            except Exception as exc:
+                print(f"[WARNING] Failed to cancel parse job: {exc}")
+            self._append_log(f"🗂 Задание #{job['id']} закрыто без продолжения")
+            return
+        self._resume_job(job)
+
+    def _resume_job(self, job: Dict[str, Any]) -> None:
+        """Продолжить задание: в работу идут только его несобранные пары."""
+        selected_profiles = self._get_selected_profiles()
+        if not selected_profiles:
+            QMessageBox.warning(self, "Ошибка", "Нет активных аккаунтов в БД!\n\nДобавьте аккаунты на вкладке 'Аккаунты'.")
+            return
+        normalized = self._normalize_wordstat_settings(
+            {
+                "modes": job.get("modes") or ["ws"],
+                "regions_map": job["regions"],
+                "force_refresh": bool(job.get("params", {}).get("force_refresh", False)),
+            }
+        )
+        self._last_settings = normalized
+        self._append_log(f"▶️ Продолжаю задание #{job['id']}")
+        self._run_parsing_with_settings(
+            parse_jobs.job_phrases(job["id"]),
+            selected_profiles,
+            normalized,
+            job_id=job["id"],
+        )
+
     @staticmethod
     def _coerce_freq(value: Any) -> int:
         if value is None:
@@ -1230,10 +1307,12 @@ class ParsingTab(QWidget):
             entry["bws"] = max(entry["bws"], self._coerce_freq(record.get("bws")))
         return aggregated
 
-    def _populate_results(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Обновить результаты в таблице (заполнить частотность и статус)."""
-        normalized_rows: List[Dict[str, Any]] = []
-        combined_regions = dict(self._active_regions)
+    def _results_by_phrase(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        combined_regions: Dict[int, str],
+    ) -> Tuple[Dict[str, Dict[int, int]], Dict[str, Dict[int, str]]]:
+        """Разложить записи результатов по фразам и регионам (``combined_regions`` дополняется)."""
         phrase_region_values: Dict[str, Dict[int, int]] = {}
         phrase_statuses: Dict[str, Dict[int, str]] = {}
 
@@ -1260,42 +1339,24 @@ class ParsingTab(QWidget):
             if status_raw != "NO_DATA" and status_raw != "OK":
                 status_raw = "NO_DATA"
 
+            # Пару, которую профиль не собрал, а другой собрал, показываем собранной
+            if status_raw == "NO_DATA" and phrase_statuses.get(phrase, {}).get(region_id) == "OK":
+                continue
             phrase_region_values.setdefault(phrase, {})[region_id] = freq_value
             phrase_statuses.setdefault(phrase, {})[region_id] = status_raw
 
-        self._configure_table_columns(combined_regions)
-        self._active_regions = dict(combined_regions)
+        return phrase_region_values, phrase_statuses
 
-        for row in range(self.table.rowCount()):
-            self._ensure_checkbox(row)
-            phrase_item = self.table.item(row, 2)
-            if not phrase_item:
-                continue
-            phrase = phrase_item.text()
-            region_values = phrase_region_values.get(phrase, {})
-            region_status_map = phrase_statuses.get(phrase, {})
+    def _populate_results(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Обновить результаты в таблице (заполнить частотность и статус)."""
+        normalized_rows: List[Dict[str, Any]] = []
+        combined_regions = dict(self._active_regions)
+        phrase_region_values, phrase_statuses = self._results_by_phrase(rows, combined_regions)
 
-            if not region_values and not region_status_map:
-                self._set_status_cell(row, "⏱")
-                continue
+        self._configure_table_columns(combined_regions)
+        self._active_regions = dict(combined_regions)
 
-            has_alert = False
-            status_meta: Dict[int, str] = {}
-            for idx, region_id in enumerate(self._region_order):
-                status = region_status_map.get(region_id)
-                if status is None:
-                    status = "NO_DATA" if phrase in phrase_region_values else "OK"
-                status = str(status).strip().upper().replace(" ", "_")
-                if status in {"FAILED", "ERROR"}:
-                    status = "NO_DATA"
-                freq_value = region_values.get(region_id, 0)
-                if status == "NO_DATA":
-                    has_alert = True
-                self._set_frequency_cell(row, 3 + idx, freq_value, region_id=region_id, status=status)
-                status_meta[region_id] = status
-
-            status_text = "⚠️" if has_alert else "✓"
-            self._set_status_cell(row, status_text, status_meta=status_meta)
+        self.table_model.apply_results(phrase_region_values, phrase_statuses)
 
         for phrase, regions in phrase_region_values.items():
             status_map = phrase_statuses.get(phrase) or {}
@@ -1341,9 +1402,8 @@ class ParsingTab(QWidget):
 
     def _select_all_rows(self):
         """Выбрать все строки в таблице"""
-        for row in range(self.table.rowCount()):
-            self._ensure_checkbox(row, True)
-        self._append_log(f"✓ Отмечено фраз: {self.table.rowCount()}")
+        self.table_model.set_all_checked(True)
+        self._append_log(f"✓ Отмечено фраз: {len(self.table_model)}")
 
     def select_all(self):
         """Выбрать все строки в таблице (публичный метод)"""
@@ -1351,8 +1411,7 @@ class ParsingTab(QWidget):
 
     def _deselect_all_rows(self):
         """Снять выбор со всех строк"""
-        for row in range(self.table.rowCount()):
-            self._ensure_checkbox(row, False)
+        self.table_model.set_all_checked(False)
         self._append_log("✗ Все отметки сняты")
 
     def deselect_all(self):
@@ -1361,11 +1420,7 @@ class ParsingTab(QWidget):
 
     def _invert_selection(self):
         """Инвертировать выбор строк"""
-        for row in range(self.table.rowCount()):
-            checkbox = self._get_checkbox(row)
-            if checkbox:
-                checkbox.setChecked(not checkbox.isChecked())
-        selected = len(self._get_selected_phrases())
+        selected = self.table_model.invert_checked()
         self._append_log(f"🔄 Отметки инвертированы ({selected} строк)")
 
     def invert_selection(self):
@@ -1386,15 +1441,7 @@ class ParsingTab(QWidget):
             return
         
         filter_text = filter_text.strip().lower()
-        count = 0
-        
-        for row in range(self.table.rowCount()):
-            phrase_item = self.table.item(row, 2)
-            if phrase_item and filter_text in phrase_item.text().lower():
-                checkbox = self._get_checkbox(row)
-                if checkbox:
-                    checkbox.setChecked(True)
-                    count += 1
+        count = self.table_model.check_containing(filter_text)
         
         self._append_log(f"🔍 Найдено и выбрано {count} фраз по фильтру '{filter_text}'")
 
@@ -1638,14 +1685,7 @@ class ParsingTab(QWidget):
         group_name = group_item.text(0)
         group_id = group_item.data(0, Qt.UserRole)
         
-        selected_rows = []
-        for row in range(self.table.rowCount()):
-            checkbox = self._get_checkbox(row)
-            if checkbox and checkbox.isChecked():
-                phrase_item = self.table.item(row, 2)
-                if phrase_item:
-                    phrase = phrase_item.text()
-                    selected_rows.append((row, phrase))
+        selected_rows = self.table_model.checked_phrases()
         
         if not selected_rows:
             QMessageBox.warning(self, "Ошибка", "Выберите фразы для перемещения!")
@@ -1813,15 +1853,17 @@ class ParsingTab(QWidget):
         if not normalized:
             return 0
 
-        for phrase in normalized:
-            self._insert_phrase_row(phrase, checked=checked)
-
-        self._renumber_rows()
+        self._configure_table_columns(self._active_regions)
+        added = self.table_model.append_phrases(normalized, checked=checked)
         source_label = source or "фраз"
         self._append_log(
-            f"➕ Добавлено {source_label}: {len(normalized)} (всего: {self.table.rowCount()})"
+            f"➕ Добавлено {source_label}: {added} (всего: {len(self.table_model)})"
         )
-        return len(normalized)
+        return added
+
+    def append_phrases(self, phrases: Iterable[str]) -> int:
+        """Добавить фразы из других вкладок (маски генератора и т.п.)."""
+        return self._add_phrases_to_table(phrases, source="масок", checked=True)
 
     def _on_add_from_clipboard(self) -> None:
         """Добавить фразы из буфера обмена."""
@@ -1880,10 +1922,7 @@ class ParsingTab(QWidget):
 
     def _on_delete_phrases(self):
         """Удалить выбранные фразы из таблицы"""
-        rows_to_remove = [
-            row for row in range(self.table.rowCount())
-            if (checkbox := self._get_checkbox(row)) and checkbox.isChecked()
-        ]
+        rows_to_remove = self.table_model.checked_rows()
         if not rows_to_remove:
             rows_to_remove = [idx.row() for idx in self.table.selectionModel().selectedRows()]
 
@@ -1891,18 +1930,14 @@ class ParsingTab(QWidget):
             self._append_log("❌ Нет отмеченных строк для удаления")
             return
 
-        unique_rows = sorted(set(rows_to_remove), reverse=True)
-        for row in unique_rows:
-            self.table.removeRow(row)
-
-        self._renumber_rows()
+        removed = self.table_model.remove_rows(rows_to_remove)
 
-        self._append_log(f"🗑️ Удалено строк: {len(unique_rows)} (осталось: {self.table.rowCount()})")
+        self._append_log(f"🗑️ Удалено строк: {removed} (осталось: {len(self.table_model)})")
 
     def _on_clear_results(self):
         """Очистить все результаты из таблицы"""
-        row_count = self.table.rowCount()
-        self.table.setRowCount(0)
+        row_count = self.table_model.clear()
+        self._results_project = None
         self._append_log(f"🗑️ Таблица очищена ({row_count} строк удалено)")
 
     def _on_batch_parsing(self):
@@ -1930,12 +1965,26 @@ class ParsingTab(QWidget):
         self._append_log("=" * 70)
 
         # Добавляем фразы в таблицу
-        for phrase in phrases:
-            self._insert_phrase_row(phrase, status="⏱", checked=True)
-        self._renumber_rows()
+        self._configure_table_columns(self._active_regions)
+        self.table_model.append_phrases(phrases, checked=True, status="⏱")
 
         self._append_log(f"✅ Фразы добавлены в таблицу: {len(phrases)}")
-        self._append_log("💡 Используйте кнопку '🚀 Запустить парсинг' для начала сбора")
+
+        selected_profiles = self._get_selected_profiles()
+        if not selected_profiles:
+            self._append_log("💡 Нет активных аккаунтов — запустите парсинг кнопкой '🚀 Запустить парсинг' позже")
+            return
+
+        # Все регионы собираются одним запуском браузера на профиль,
+        # значения попадают в колонки своих регионов
+        normalized = self._normalize_wordstat_settings(
+            {
+                "modes": ["ws"],
+                "regions_map": settings.get("regions_map") or {rid: str(rid) for rid in geo_ids},
+            }
+        )
+        self._last_settings = normalized
+        self._run_parsing_with_settings(phrases, selected_profiles, normalized)
 
     def _on_forecast(self):
         """Прогноз бюджета - заглушка"""
@@ -2062,8 +2111,13 @@ class ParsingTab(QWidget):
         phrases: List[str],
         selected_profiles: List[dict],
         settings: dict,
+        job_id: Optional[int] = None,
     ) -> None:
-        """Подготовить окружение и запустить воркер с выбранными настройками."""
+        """
+        Подготовить окружение и запустить воркер с выбранными настройками.
+
+        ``job_id`` — продолжить сохранённое задание вместо создания нового.
+        """
         if not TURBO_PARSER_AVAILABLE:
             self._append_log("❌ turbo_parser_10tabs недоступен — запустить парсинг невозможно.")
             return
@@ -2072,8 +2126,8 @@ class ParsingTab(QWidget):
         self._append_log(f"⏰ Время запуска: {timestamp}")
         self._append_log("🔄 Подготовка профилей и кук...")
 
-        for profile_info in selected_profiles:
-            cookie_count, cookie_error = _probe_profile_cookies(profile_info)
+        cookie_probes = _probe_profiles_cookies(selected_profiles)
+        for profile_info, (cookie_count, cookie_error) in zip(selected_profiles, cookie_probes):
             proxy_value = profile_info.get("proxy") or "без прокси"
             if cookie_count >= 0:
                 profile_info["cookie_count"] = cookie_count
@@ -2136,9 +2190,12 @@ class ParsingTab(QWidget):
             regions_map=normalized_region_map,
             geo_ids=geo_ids,
             selected_profiles=selected_profiles,
-            parent=self
+            force_refresh=bool(settings.get("force_refresh", False)),
+            parent=self,
+            job_id=job_id,
         )
-        self._append_log("✓ MultiParsingWorker создан")
+        self._active_job_id = self._worker.job_id
+        self._append_log(f"✓ MultiParsingWorker создан (задание #{self._active_job_id})")
 
         self._append_log("🔌 Подключаю сигналы worker...")
         self._worker.log_signal.connect(self._append_log)
@@ -2148,6 +2205,7 @@ class ParsingTab(QWidget):
         self._worker.all_finished.connect(self._on_all_finished)
         self._append_log("✓ Сигналы подключены")
 
+        self._results_project = None
         self.save_session_state()
         self._append_log("▶️ Запускаю worker.start()...")
         self._worker.start()
@@ -2206,9 +2264,14 @@ class ParsingTab(QWidget):
         """Обработка завершения задачи одного профиля"""
         total = len(results) if results else 0
         self._append_log(f"✅ Профиль {profile_email} завершил парсинг. Результатов: {total}")
+        if results:
+            # Частичные результаты сразу в таблицу: обновятся только строки этого профиля
+            values, statuses = self._results_by_phrase(results, dict(self._active_regions))
+            self.table_model.apply_results(values, statuses, mark_missing=False)
         
     def _on_all_finished(self, all_results: List[dict]):
         """Все задачи завершены"""
+        worker = self._worker
         self._worker = None
         self.btn_run.setEnabled(True)
         self.btn_stop.setEnabled(False)
@@ -2218,21 +2281,44 @@ class ParsingTab(QWidget):
         self.status_label.setText("🟢 Готово")
 
         normalized_rows = self._populate_results(all_results)
-        self._renumber_rows()
 
         self._append_log("=" * 70)
         self._append_log(f"✅ ПАРСИНГ ЗАВЕРШЕН")
         self._append_log(f"📊 Всего результатов: {len(normalized_rows)}")
         self._append_log("=" * 70)
 
-        self.save_session_state(partial_results=normalized_rows)
+        # Своё хранилище на сессию: при восстановлении показывается только её результат
+        session_id = getattr(worker, "session_id", None) or datetime.now().strftime("%Y%m%d_%H%M%S")
+        results_project = f"{RESULTS_PROJECT}/{session_id}"
+        try:
+            result_store.open_store(results_project).append(normalized_rows)
+        except Exception as exc:
+            print(f"[ERROR] Failed to append results store: {exc}")
+            self.save_session_state(partial_results=normalized_rows)
+        else:
+            self._results_project = results_project
+            self.save_session_state(results_project=results_project)
+            self._prune_result_stores(keep=results_project)
+
+    def _prune_result_stores(self, keep: str) -> None:
+        """Удалить хранилища прежних сессий: файл сессии ссылается только на ``keep``."""
+        try:
+            stale = [project for project in result_store.list_projects(RESULTS_PROJECT) if project != keep]
+            for project in stale:
+                result_store.remove_store(project)
+        except Exception as exc:
+            print(f"[WARNING] Failed to prune result stores: {exc}")
         
     def _on_export_clicked(self):
-        """Экспорт результатов в CSV с 2 колонками: Фраза и Частотность"""
-        if self.table.rowCount() == 0:
+        """Экспорт результатов: из хранилища запуска (CSV/XLSX) или из таблицы (Фраза и Частотность)"""
+        if not len(self.table_model):
             self._append_log("❌ Нет результатов для экспорта")
             return
 
+        if self._results_project and self._worker is None:
+            self._export_from_store(self._results_project)
+            return
+
         file_path, _ = QFileDialog.getSaveFileName(
             self,
             "Экспорт результатов",
@@ -2245,25 +2331,14 @@ class ParsingTab(QWidget):
                 import csv
 
                 # Собираем данные: фраза + WS (колонки 2 и 3)
-                export_data = []
-                for row in range(self.table.rowCount()):
-                    phrase_item = self.table.item(row, 2)  # Колонка "Фраза"
-                    ws_item = self.table.item(row, 3)      # Колонка "WS"
-
-                    if phrase_item and ws_item:
-                        phrase = phrase_item.text()
-                        ws_text = ws_item.text()
-
-                        # Конвертируем частотность в число
-                        try:
-                            ws_value = int(float(ws_text)) if ws_text else 0
-                        except (ValueError, TypeError):
-                            ws_value = 0
-
-                        export_data.append({
-                            'phrase': phrase,
-                            'frequency': ws_value
-                        })
+                first_region = self._region_order[0] if self._region_order else 225
+                export_data = [
+                    {'phrase': phrase, 'frequency': ws_value}
+                    for phrase, ws_value in zip(
+                        self.table_model.phrases(),
+                        self.table_model.region_values(first_region),
+                    )
+                ]
 
                 # Сортируем по частотности (по убыванию - самые популярные сверху)
                 export_data.sort(key=lambda x: x['frequency'], reverse=True)
@@ -2285,3 +2360,30 @@ class ParsingTab(QWidget):
 
             except Exception as e:
                 self._append_log(f"❌ Ошибка экспорта: {str(e)}")
+
+    def _export_from_store(self, project: str) -> None:
+        """Выгрузить все колонки запуска (фраза, регион, ws/qws/bws, группа, cpc, статус) потоково из хранилища."""
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "Экспорт результатов",
+            f"parsing_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            "CSV Files (*.csv);;Excel Files (*.xlsx)"
+        )
+        if not file_path:
+            return
+        as_xlsx = file_path.lower().endswith(".xlsx") or (
+            "xlsx" in selected_filter and not file_path.lower().endswith(".csv")
+        )
+        if as_xlsx and not file_path.lower().endswith(".xlsx"):
+            file_path += ".xlsx"
+        try:
+            with result_store.open_store(project).snapshot() as snapshot:
+                if as_xlsx:
+                    count = snapshot.to_xlsx(Path(file_path))
+                else:
+                    count = snapshot.to_csv(Path(file_path))
+        except Exception as e:
+            self._append_log(f"❌ Ошибка экспорта: {str(e)}")
+            return
+        self._append_log(f"✅ Результаты экспортированы: {file_path}")
+        self._append_log(f"📊 Экспортировано {count} записей")
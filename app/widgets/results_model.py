@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""Модель таблицы фраз и результатов парсинга для QTableView.
+
+Данные хранятся колонками (список фраз, массивы частотностей по регионам,
+байтовая маска отметок), а не виджетами на каждую ячейку: отметка — это
+``Qt.CheckStateRole``, строки отдаются представлению порциями через
+``canFetchMore``/``fetchMore``, результаты обновляют только изменённый
+диапазон строк сигналом ``dataChanged``.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+__all__ = ["ResultsTableModel", "FETCH_BATCH"]
+
+FETCH_BATCH = 2000  # Строк, отдаваемых представлению за один fetchMore
+NO_VALUE = -1  # Частотность ещё не получена (ячейка пустая)
+
+COL_CHECK = 0
+COL_NUMBER = 1
+COL_PHRASE = 2
+FIRST_REGION_COLUMN = 3
+
+STATUS_NEW = "—"
+STATUS_PENDING = "⏳"
+STATUS_WAITING = "⏱"
+STATUS_OK = "✓"
+STATUS_ALERT = "⚠️"
+
+_STATUS_CODES = {"OK": 1, "NO_DATA": 2}
+_STATUS_NAMES = {1: "OK", 2: "NO_DATA"}
+
+
+class ResultsTableModel(QAbstractTableModel):
+    """Фразы × регионы: частотность, статус и отметка строки."""
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self._phrases: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._checked = bytearray()
+        self._status: List[str] = []
+        self._regions: List[int] = []
+        self._headers: List[str] = ["✓", "№", "Фраза", "Статус"]
+        self._values: Dict[int, array] = {}
+        self._region_status: Dict[int, bytearray] = {}
+        self._fetched = 0
+
+    # ------------------------------------------------------------ Qt model
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._fetched
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else FIRST_REGION_COLUMN + len(self._regions) + 1
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self._fetched < len(self._phrases)
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        if parent.isValid():
+            return
+        count = min(FETCH_BATCH, len(self._phrases) - self._fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> Any:
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < len(self._headers):
+            return self._headers[section]
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == COL_CHECK:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if row >= len(self._phrases):
+            return None
+        status_column = self._status_column()
+
+        if role == Qt.CheckStateRole and column == COL_CHECK:
+            return Qt.Checked if self._checked[row] else Qt.Unchecked
+        if role == Qt.DisplayRole:
+            if column == COL_NUMBER:
+                return row + 1
+            if column == COL_PHRASE:
+                return self._phrases[row]
+            if column == status_column:
+                return self._status[row]
+            if FIRST_REGION_COLUMN <= column < status_column:
+                value = self._values[self._regions[column - FIRST_REGION_COLUMN]][row]
+                return "" if value == NO_VALUE else str(value)
+            return None
+        if role == Qt.TextAlignmentRole:
+            if column in (COL_CHECK, status_column):
+                return int(Qt.AlignCenter)
+            if FIRST_REGION_COLUMN <= column < status_column:
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+            return None
+        if role == Qt.UserRole and FIRST_REGION_COLUMN <= column < status_column:
+            region_id = self._regions[column - FIRST_REGION_COLUMN]
+            value = self._values[region_id][row]
+            return {
+                "region_id": region_id,
+                "status": _STATUS_NAMES.get(self._region_status[region_id][row]),
+                "value": None if value == NO_VALUE else value,
+            }
+        return None
+
+    def setData(self, index: QModelIndex, value: Any, role: int = Qt.EditRole) -> bool:
+        if not index.isValid() or index.column() != COL_CHECK or role != Qt.CheckStateRole:
+            return False
+        self._checked[index.row()] = 1 if Qt.CheckState(value) == Qt.Checked else 0
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    # ------------------------------------------------------------- columns
+
+    def _status_column(self) -> int:
+        return FIRST_REGION_COLUMN + len(self._regions)
+
+    def regions(self) -> List[int]:
+        return list(self._regions)
+
+    def set_columns(self, regions: Sequence[int], region_headers: Sequence[str]) -> bool:
+        """Задать регионы-колонки. Возвращает True, если набор колонок изменился."""
+        headers = ["✓", "№", "Фраза", *region_headers, "Статус"]
+        regions = list(regions)
+        if regions == self._regions and headers == self._headers:
+            return False
+        self.beginResetModel()
+        self._regions = regions
+        self._headers = headers
+        size = len(self._phrases)
+        for region_id in regions:
+            if region_id not in self._values:
+                self._values[region_id] = array("q", [NO_VALUE]) * size
+                self._region_status[region_id] = bytearray(size)
+        self.endResetModel()
+        return True
+
+    # ---------------------------------------------------------------- rows
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    def phrase(self, row: int) -> str:
+        return self._phrases[row]
+
+    def phrases(self) -> List[str]:
+        return list(self._phrases)
+
+    def checked_phrases(self) -> List[str]:
+        return [phrase for phrase, flag in zip(self._phrases, self._checked) if flag]
+
+    def checked_rows(self) -> List[int]:
+        return [row for row, flag in enumerate(self._checked) if flag]
+
+    def region_values(self, region_id: int) -> List[int]:
+        """Частотности строк по региону (0 там, где значения нет)."""
+        values = self._values.get(region_id)
+        if values is None:
+            return [0] * len(self._phrases)
+        return [0 if value == NO_VALUE else value for value in values]
+
+    def append_phrases(self, phrases: Iterable[str], *, checked: bool = True, status: str = STATUS_NEW) -> int:
+        """Дописать новые фразы (уже имеющиеся пропускаются). Возвращает число добавленных."""
+        added: List[str] = []
+        for phrase in phrases:
+            phrase = str(phrase).strip()
+            if phrase and phrase not in self._row_of:
+                self._row_of[phrase] = len(self._phrases) + len(added)
+                added.append(phrase)
+        if not added:
+            return 0
+        self._phrases.extend(added)
+        self._checked.extend(b"\x01" * len(added) if checked else bytes(len(added)))
+        self._status.extend([status] * len(added))
+        for region_id, values in self._values.items():
+            values.extend(array("q", [NO_VALUE]) * len(added))
+            self._region_status[region_id].extend(bytes(len(added)))
+        if self._fetched < FETCH_BATCH:
+            self.fetchMore(QModelIndex())
+        return len(added)
+
+    def remove_rows(self, rows: Iterable[int]) -> int:
+        """Удалить строки по номерам."""
+        drop = set(rows)
+        if not drop:
+            return 0
+        before = len(self._phrases)
+        keep = [row for row in range(before) if row not in drop]
+        self.beginResetModel()
+        self._phrases = [self._phrases[row] for row in keep]
+        self._row_of = {phrase: row for row, phrase in enumerate(self._phrases)}
+        self._checked = bytearray(self._checked[row] for row in keep)
+        self._status = [self._status[row] for row in keep]
+        for region_id, values in self._values.items():
+            self._values[region_id] = array("q", (values[row] for row in keep))
+            statuses = self._region_status[region_id]
+            self._region_status[region_id] = bytearray(statuses[row] for row in keep)
+        self._fetched = min(self._fetched, len(self._phrases))
+        self.endResetModel()
+        return before - len(keep)
+
+    def clear(self) -> int:
+        """Удалить все строки. Возвращает число удалённых."""
+        count = len(self._phrases)
+        self.beginResetModel()
+        self._phrases = []
+        self._row_of = {}
+        self._checked = bytearray()
+        self._status = []
+        self._values = {region_id: array("q") for region_id in self._regions}
+        self._region_status = {region_id: bytearray() for region_id in self._regions}
+        self._fetched = 0
+        self.endResetModel()
+        return count
+
+    # -------------------------------------------------------------- checks
+
+    def is_checked(self, row: int) -> bool:
+        return bool(self._checked[row])
+
+    def set_all_checked(self, checked: bool) -> None:
+        self._checked[:] = (b"\x01" if checked else b"\x00") * len(self._checked)
+        self._emit_column_changed(COL_CHECK, Qt.CheckStateRole)
+
+    def invert_checked(self) -> int:
+        self._checked[:] = bytes(1 - flag for flag in self._checked)
+        self._emit_column_changed(COL_CHECK, Qt.CheckStateRole)
+        return sum(self._checked)
+
+    def check_containing(self, text: str) -> int:
+        """Отметить фразы, содержащие подстроку (без учёта регистра)."""
+        needle = text.lower()
+        count = 0
+        for row, phrase in enumerate(self._phrases):
+            if needle in phrase.lower():
+                self._checked[row] = 1
+                count += 1
+        if count:
+            self._emit_column_changed(COL_CHECK, Qt.CheckStateRole)
+        return count
+
+    # ------------------------------------------------------------- results
+
+    def mark_pending(self, phrases: Iterable[str]) -> None:
+        """Сбросить значения и поставить статус ожидания у переданных фраз."""
+        rows = [self._row_of[phrase] for phrase in phrases if phrase in self._row_of]
+        for row in rows:
+            self._status[row] = STATUS_PENDING
+            for region_id, values in self._values.items():
+                values[row] = NO_VALUE
+                self._region_status[region_id][row] = 0
+        self._emit_rows_changed(rows)
+
+    def apply_results(
+        self,
+        values: Mapping[str, Mapping[int, int]],
+        statuses: Mapping[str, Mapping[int, str]],
+        *,
+        mark_missing: bool = True,
+    ) -> None:
+        """
+        Записать частотности и статусы по фразам.
+
+        Полный набор (``mark_missing``) перезаписывает все регионы фразы —
+        регион без результата считается NO_DATA, а строкам без результатов
+        ставится статус ожидания. Частичный набор (результаты одного профиля)
+        меняет только пришедшие ячейки фраза × регион. Представлению
+        сообщается только диапазон изменённых строк.
+        """
+        touched: List[int] = []
+        for phrase in values.keys() | statuses.keys():
+            row = self._row_of.get(phrase)
+            if row is None:
+                continue
+            touched.append(row)
+            region_values = values.get(phrase) or {}
+            region_statuses = statuses.get(phrase) or {}
+            for region_id in self._regions:
+                if not mark_missing and region_id not in region_values and region_id not in region_statuses:
+                    continue
+                status = str(region_statuses.get(region_id) or "NO_DATA").strip().upper().replace(" ", "_")
+                if status in {"FAILED", "ERROR"}:
+                    status = "NO_DATA"
+                self._values[region_id][row] = int(region_values.get(region_id, 0) or 0)
+                self._region_status[region_id][row] = _STATUS_CODES.get(status, 2)
+            codes = [self._region_status[region_id][row] for region_id in self._regions]
+            if 2 in codes:
+                self._status[row] = STATUS_ALERT
+            elif all(codes):
+                self._status[row] = STATUS_OK
+
+        if mark_missing:
+            done = set(touched)
+            missing = [row for row in range(len(self._phrases)) if row not in done]
+            for row in missing:
+                self._status[row] = STATUS_WAITING
+            touched.extend(missing)
+        self._emit_rows_changed(touched)
+
+    # ------------------------------------------------------------- signals
+
+    def _emit_rows_changed(self, rows: Sequence[int]) -> None:
+        visible = [row for row in rows if row < self._fetched]
+        if not visible:
+            return
+        top = self.index(min(visible), 0)
+        bottom = self.index(max(visible), self.columnCount() - 1)
+        self.dataChanged.emit(top, bottom, [Qt.DisplayRole, Qt.UserRole])
+
+    def _emit_column_changed(self, column: int, role: int) -> None:
+        if self._fetched:
+            self.dataChanged.emit(self.index(0, column), self.index(self._fetched - 1, column), [role])
+
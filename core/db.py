@@ -2,7 +2,13 @@
 
 from pathlib import Path
 from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Iterable, Mapping
+import hashlib
+import re
 import sqlite3
+import threading
+import time
 
 from sqlalchemy import create_engine, inspect, text, event
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
@@ -20,8 +26,24 @@ class Base(DeclarativeBase):
 
 
 def ensure_schema() -> None:
-    """Perform lightweight SQLite migrations for the tasks table."""
+    """Create missing tables and run lightweight SQLite migrations.
+
+    Covers the parser tables (frequencies, forecasts, clusters, freq_results), the phrase
+    dictionary, freq_cache, rate_state, parse_jobs, wordstat_related, the deep_*
+    tables and the tasks table. Safe to call repeatedly.
+    """
     engine = ensure_schema.engine  # type: ignore[attr-defined]
+    _ensure_tables(engine)
+    raw = engine.raw_connection()
+    try:
+        dbapi_conn = getattr(raw, 'driver_connection', None) or raw.connection
+        migrate_phrase_dictionary(dbapi_conn)
+        dbapi_conn.commit()
+    finally:
+        raw.close()
+
+
+def _ensure_tables(engine) -> None:
     inspector = inspect(engine)
     
     # Create new tables for turbo parser pipeline
@@ -67,7 +89,118 @@ def ensure_schema() -> None:
                 )
             '''))
             conn.execute(text("CREATE INDEX IF NOT EXISTS idx_cluster_stem ON clusters(stem)"))
-    
+
+        # Frequency cache (normalized phrase × mode × region, see services.frequency_cache)
+        if not inspector.has_table('freq_cache'):
+            conn.execute(text('''
+                CREATE TABLE freq_cache (
+                    phrase_norm TEXT NOT NULL,
+                    mode TEXT NOT NULL DEFAULT 'ws',
+                    region INTEGER NOT NULL DEFAULT 225,
+                    freq INTEGER NOT NULL DEFAULT 0,
+                    fetched_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (phrase_norm, mode, region)
+                )
+            '''))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_freq_cache_fetched ON freq_cache(fetched_at)"))
+
+        # Pacing state per account/proxy (see services.rate_control)
+        if not inspector.has_table('rate_state'):
+            conn.execute(text('''
+                CREATE TABLE rate_state (
+                    key TEXT PRIMARY KEY,
+                    delay REAL NOT NULL,
+                    successes INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    last_event TEXT,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            '''))
+
+        # Resumable parsing jobs with per phrase × region progress (see services.parse_jobs)
+        if not inspector.has_table('parse_jobs'):
+            conn.execute(text('''
+                CREATE TABLE parse_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT,
+                    status TEXT NOT NULL DEFAULT 'running',
+                    modes TEXT,
+                    regions TEXT,
+                    params TEXT,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    finished_at DATETIME
+                )
+            '''))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_parse_jobs_status ON parse_jobs(status)"))
+        if not inspector.has_table('parse_job_items'):
+            conn.execute(text('''
+                CREATE TABLE parse_job_items (
+                    job_id INTEGER NOT NULL REFERENCES parse_jobs(id) ON DELETE CASCADE,
+                    phrase TEXT NOT NULL,
+                    region INTEGER NOT NULL DEFAULT 225,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    freq INTEGER,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    profile TEXT,
+                    error TEXT,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (job_id, phrase, region)
+                )
+            '''))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_parse_job_items_status ON parse_job_items(job_id, status)"))
+
+        # Left/right column phrases from Wordstat responses (see services.related_phrases)
+        if not inspector.has_table('wordstat_related'):
+            conn.execute(text('''
+                CREATE TABLE wordstat_related (
+                    parent TEXT NOT NULL,
+                    region INTEGER NOT NULL DEFAULT 225,
+                    kind TEXT NOT NULL,
+                    phrase TEXT NOT NULL,
+                    freq INTEGER NOT NULL DEFAULT 0,
+                    rank INTEGER NOT NULL DEFAULT 0,
+                    fetched_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (parent, region, kind, phrase)
+                )
+            '''))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_related_phrase ON wordstat_related(phrase, region)"))
+
+        # Deep collection runs and their deduplicated frontier (see workers.deep_runner)
+        if not inspector.has_table('deep_runs'):
+            conn.execute(text('''
+                CREATE TABLE deep_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    seeds_file TEXT,
+                    region INTEGER NOT NULL DEFAULT 225,
+                    status TEXT NOT NULL DEFAULT 'running',
+                    rules TEXT,
+                    current_depth INTEGER NOT NULL DEFAULT 0,
+                    budget_used TEXT,
+                    output_path TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            '''))
+        if not inspector.has_table('deep_frontier'):
+            conn.execute(text('''
+                CREATE TABLE deep_frontier (
+                    run_id INTEGER NOT NULL REFERENCES deep_runs(id) ON DELETE CASCADE,
+                    phrase_norm TEXT NOT NULL,
+                    phrase TEXT NOT NULL,
+                    depth INTEGER NOT NULL DEFAULT 0,
+                    parent TEXT,
+                    root TEXT,
+                    source TEXT NOT NULL DEFAULT 'seed',
+                    freq INTEGER,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (run_id, phrase_norm)
+                )
+            '''))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_deep_frontier_level ON deep_frontier(run_id, depth, status)"))
+
     if inspector.has_table('accounts'):
         with engine.begin() as conn:
             columns = {row[1] for row in conn.execute(text('PRAGMA table_info(accounts)'))}
@@ -158,6 +291,121 @@ def ensure_schema() -> None:
             conn.execute(text('ALTER TABLE tasks ADD COLUMN params TEXT'))
 
 
+# ---------------------------------------------------------------------------
+# Phrase dictionary
+# ---------------------------------------------------------------------------
+
+# Metric tables that reference phrases: table -> column with the phrase text
+_PHRASE_TABLES = {'frequencies': 'phrase', 'forecasts': 'phrase', 'freq_results': 'mask'}
+
+# Columns added to older databases before the phrase ids are backfilled
+_LEGACY_COLUMNS = {
+    'forecasts': {'region': 'INTEGER DEFAULT 225', 'processed': 'BOOLEAN DEFAULT 0'},
+    'freq_results': {'freq_quotes': 'INTEGER NOT NULL DEFAULT 0', '"group"': 'VARCHAR(100)'},
+}
+
+_PHRASE_INDEXES = {
+    'frequencies': [
+        'CREATE INDEX IF NOT EXISTS idx_frequencies_phrase_region ON frequencies(phrase_id, region)',
+        'CREATE INDEX IF NOT EXISTS idx_frequencies_region_freq ON frequencies(region, freq)',
+    ],
+    'forecasts': [
+        'CREATE INDEX IF NOT EXISTS idx_forecasts_phrase_region ON forecasts(phrase_id, region)',
+    ],
+    'freq_results': [
+        'CREATE INDEX IF NOT EXISTS idx_freq_results_phrase_region ON freq_results(phrase_id, region)',
+        'CREATE INDEX IF NOT EXISTS idx_freq_results_group_freq ON freq_results("group", freq_total)',
+    ],
+}
+
+_NORM_STRIP_RE = re.compile(r'[!+"\[\]()|]')
+
+
+def phrase_norm_hash(phrase: str) -> int:
+    """Signed 64-bit hash of the normalized phrase form.
+
+    The form is lower-cased, with 'ё' folded to 'е', Wordstat operators
+    removed and words sorted, so reordered duplicates share one hash.
+    """
+    norm = _NORM_STRIP_RE.sub(' ', (phrase or '').lower().replace('ё', 'е'))
+    digest = hashlib.blake2b(' '.join(sorted(norm.split())).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def migrate_phrase_dictionary(conn: sqlite3.Connection) -> None:
+    """Create the phrases table and link the metric tables to it.
+
+    Existing rows get their phrase_id backfilled, and triggers fill it for
+    writers that only insert the text (ORM models, ad-hoc INSERTs). The
+    statements are idempotent and only touch rows without an id or hash.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS phrases (
+            id INTEGER PRIMARY KEY,
+            phrase TEXT NOT NULL UNIQUE,
+            norm_hash INTEGER
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_phrases_norm_hash ON phrases(norm_hash)')
+
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table, column in _PHRASE_TABLES.items():
+        if table not in existing:
+            continue
+        columns = _table_columns(conn, table)
+        for name, definition in _LEGACY_COLUMNS.get(table, {}).items():
+            if name.strip('"') not in columns:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+        if 'phrase_id' not in columns:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN phrase_id INTEGER REFERENCES phrases(id)')
+        for statement in _PHRASE_INDEXES[table]:
+            conn.execute(statement)
+        conn.execute(f'''
+            INSERT OR IGNORE INTO phrases (phrase)
+            SELECT DISTINCT {column} FROM {table} WHERE phrase_id IS NULL AND {column} IS NOT NULL
+        ''')
+        conn.execute(f'''
+            UPDATE {table} SET phrase_id = (SELECT id FROM phrases WHERE phrases.phrase = {table}.{column})
+            WHERE phrase_id IS NULL
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_phrase_id AFTER INSERT ON {table}
+            WHEN NEW.phrase_id IS NULL AND NEW.{column} IS NOT NULL
+            BEGIN
+                INSERT OR IGNORE INTO phrases (phrase) VALUES (NEW.{column});
+                UPDATE {table} SET phrase_id = (SELECT id FROM phrases WHERE phrase = NEW.{column})
+                WHERE rowid = NEW.rowid;
+            END
+        ''')
+
+    missing = conn.execute('SELECT id, phrase FROM phrases WHERE norm_hash IS NULL').fetchall()
+    if missing:
+        conn.executemany(
+            'UPDATE phrases SET norm_hash = ? WHERE id = ?',
+            [(phrase_norm_hash(phrase), phrase_id) for phrase_id, phrase in missing],
+        )
+
+
+def ensure_phrase_ids(conn: sqlite3.Connection, phrases: Iterable[str]) -> dict[str, int]:
+    """Return {phrase: id}, adding unknown phrases (with their hash) to the dictionary."""
+    unique = [phrase for phrase in dict.fromkeys((raw or '').strip() for raw in phrases) if phrase]
+    if not unique:
+        return {}
+    conn.executemany(
+        'INSERT OR IGNORE INTO phrases (phrase, norm_hash) VALUES (?, ?)',
+        [(phrase, phrase_norm_hash(phrase)) for phrase in unique],
+    )
+    ids: dict[str, int] = {}
+    for start in range(0, len(unique), 500):
+        chunk = unique[start:start + 500]
+        rows = conn.execute(
+            f"SELECT phrase, id FROM phrases WHERE phrase IN ({', '.join('?' * len(chunk))})",
+            chunk,
+        )
+        ids.update((row[0], row[1]) for row in rows)
+    return ids
+
+
 engine = create_engine(
     DATABASE_URL, 
     echo=False, 
@@ -205,4 +453,209 @@ def get_db_connection():
         conn.close()
 
 
-__all__ = ['Base', 'engine', 'SessionLocal', 'DB_PATH', 'ensure_schema', 'get_db_connection']
+# ---------------------------------------------------------------------------
+# Bulk write path for frequency results
+# ---------------------------------------------------------------------------
+
+# Insert defaults for freq_results: tables created from the ORM model have
+# NOT NULL columns without server-side defaults.
+_FREQ_RESULT_DEFAULTS: dict[str, Any] = {
+    'status': 'queued',
+    'freq_total': 0,
+    'freq_quotes': 0,
+    'freq_exact': 0,
+    'attempts': 0,
+    'error': None,
+}
+
+
+def _utc_now() -> str:
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def enqueue_freq_masks(masks: Iterable[str], region: int) -> int:
+    """Queue masks in freq_results with one executemany upsert.
+
+    New masks are inserted as 'queued'; existing rows that are not 'ok' are
+    reset to 'queued'. Returns the number of newly inserted masks.
+    """
+    unique = [mask for mask in dict.fromkeys((raw or '').strip() for raw in masks) if mask]
+    if not unique:
+        return 0
+    with get_db_connection() as conn:
+        before = conn.execute('SELECT COUNT(*) FROM freq_results WHERE region = ?', (int(region),)).fetchone()[0]
+        upsert_freq_results(
+            ({'mask': mask, 'region': region, **_FREQ_RESULT_DEFAULTS} for mask in unique),
+            conn,
+            only_if_not_ok=True,
+        )
+        after = conn.execute('SELECT COUNT(*) FROM freq_results WHERE region = ?', (int(region),)).fetchone()[0]
+    return after - before
+
+
+def upsert_freq_results(
+    rows: Iterable[Mapping[str, Any]],
+    conn: sqlite3.Connection | None = None,
+    *,
+    only_if_not_ok: bool = False,
+) -> int:
+    """Insert or update freq_results rows keyed by (mask, region).
+
+    Each row is a mapping with 'mask' and optional 'region', 'status',
+    'freq_total', 'freq_quotes', 'freq_exact', 'attempts', 'error'. On
+    conflict only the columns present in the row are updated. With
+    ``only_if_not_ok`` rows already in status 'ok' are left untouched.
+    """
+    if conn is None:
+        with get_db_connection() as own_conn:
+            return upsert_freq_results(rows, own_conn, only_if_not_ok=only_if_not_ok)
+
+    rows = list(rows)
+    available = _table_columns(conn, 'freq_results')
+    now = _utc_now()
+    insert_fields = ['mask', 'region', 'created_at', 'updated_at']
+    insert_fields += [name for name in _FREQ_RESULT_DEFAULTS if name in available]
+    phrase_ids = None
+    if 'phrase_id' in available:
+        phrase_ids = ensure_phrase_ids(conn, (row.get('mask') for row in rows))
+        insert_fields.append('phrase_id')
+    grouped: dict[tuple[str, ...], list[tuple[Any, ...]]] = {}
+    for row in rows:
+        mask = (row.get('mask') or '').strip()
+        if not mask:
+            continue
+        values = {**_FREQ_RESULT_DEFAULTS, **row}
+        values.update(mask=mask, region=int(row.get('region') or 225), created_at=now)
+        values['updated_at'] = row.get('updated_at') or now
+        if phrase_ids is not None:
+            values['phrase_id'] = phrase_ids.get(mask)
+        changed = tuple(name for name in _FREQ_RESULT_DEFAULTS if name in row and name in available)
+        grouped.setdefault(changed, []).append(tuple(values[name] for name in insert_fields))
+
+    where = " WHERE freq_results.status != 'ok'" if only_if_not_ok else ''
+    written = 0
+    for changed, params in grouped.items():
+        updates = ', '.join(f'{name} = excluded.{name}' for name in (*changed, 'updated_at'))
+        conn.executemany(
+            f'''
+            INSERT INTO freq_results ({', '.join(insert_fields)})
+            VALUES ({', '.join('?' * len(insert_fields))})
+            ON CONFLICT(mask, region) DO UPDATE SET {updates}{where}
+            ''',
+            params,
+        )
+        written += len(params)
+    return written
+
+
+def upsert_frequencies(rows: Iterable[Mapping[str, Any]], conn: sqlite3.Connection | None = None) -> int:
+    """Insert or update rows of the frequencies table (keyed by phrase)."""
+    if conn is None:
+        with get_db_connection() as own_conn:
+            return upsert_frequencies(rows, own_conn)
+
+    params = [
+        (
+            (row.get('phrase') or '').strip(),
+            int(row.get('freq') or 0),
+            int(row.get('region') or 225),
+            int(bool(row.get('processed', False))),
+        )
+        for row in rows
+        if (row.get('phrase') or '').strip()
+    ]
+    if not params:
+        return 0
+    fields = ['phrase', 'freq', 'region', 'processed']
+    if 'phrase_id' in _table_columns(conn, 'frequencies'):
+        phrase_ids = ensure_phrase_ids(conn, (param[0] for param in params))
+        params = [(*param, phrase_ids.get(param[0])) for param in params]
+        fields.append('phrase_id')
+    conn.executemany(
+        f'''
+        INSERT INTO frequencies ({', '.join(fields)})
+        VALUES ({', '.join('?' * len(fields))})
+        ON CONFLICT(phrase) DO UPDATE SET
+            freq = excluded.freq,
+            region = excluded.region,
+            processed = excluded.processed
+        ''',
+        params,
+    )
+    return len(params)
+
+
+class FrequencyWriter:
+    """Buffered writer that flushes frequency rows in one transaction.
+
+    Rows are collected in memory and written with a single executemany when
+    ``max_rows`` rows are buffered or ``max_delay`` seconds passed since the
+    last flush. Use as a context manager (or call ``close``) so the tail of
+    the buffer is written too. Safe to share between threads.
+    """
+
+    _WRITERS = {'freq_results': upsert_freq_results, 'frequencies': upsert_frequencies}
+
+    def __init__(self, table: str = 'freq_results', *, max_rows: int = 500, max_delay: float = 2.0) -> None:
+        if table not in self._WRITERS:
+            raise ValueError(f'Unsupported table: {table}')
+        self.table = table
+        self.max_rows = max(1, int(max_rows))
+        self.max_delay = max(0.0, float(max_delay))
+        self.written = 0
+        self._buffer: list[Mapping[str, Any]] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, row: Mapping[str, Any]) -> None:
+        self.extend((row,))
+
+    def extend(self, rows: Iterable[Mapping[str, Any]]) -> None:
+        with self._lock:
+            self._buffer.extend(rows)
+            due = (
+                len(self._buffer) >= self.max_rows
+                or time.monotonic() - self._last_flush >= self.max_delay
+            )
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            if not rows:
+                return 0
+            count = self._WRITERS[self.table](rows)
+            self.written += count
+            return count
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> 'FrequencyWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+__all__ = [
+    'Base',
+    'engine',
+    'SessionLocal',
+    'DB_PATH',
+    'ensure_schema',
+    'get_db_connection',
+    'enqueue_freq_masks',
+    'upsert_freq_results',
+    'upsert_frequencies',
+    'FrequencyWriter',
+    'phrase_norm_hash',
+    'migrate_phrase_dictionary',
+    'ensure_phrase_ids',
+]
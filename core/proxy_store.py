@@ -6,7 +6,7 @@
 from sqlalchemy import Column, Integer, String, DateTime, Text
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Mapping, Optional
 from .db import Base, SessionLocal, DB_PATH
 import sqlite3
 from ..services import accounts as account_service
@@ -162,6 +162,92 @@ def update_proxy_status(proxy_id: int, status: str, latency_ms: Optional[int], e
         conn.close()
 
 
+HISTORY_SIZE = 20  # Сколько последних проверок хранить на прокси
+
+
+def _ensure_history_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS proxy_checks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            proxy_id INTEGER NOT NULL REFERENCES proxies(id) ON DELETE CASCADE,
+            status TEXT NOT NULL,
+            latency_ms INTEGER,
+            checked_at DATETIME NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_proxy_checks_proxy ON proxy_checks(proxy_id, id)")
+
+
+def record_checks(results: Iterable[Mapping], history_size: int = HISTORY_SIZE) -> int:
+    """
+    Записать пачку результатов проверки одной транзакцией
+
+    Каждый элемент: {"id", "status" (OK/FAIL/TIMEOUT), "latency_ms", "error"}.
+    Обновляет last_status/latency_ms/last_error/last_check в proxies и дописывает
+    историю задержек, оставляя по history_size последних проверок на прокси.
+    """
+    now = datetime.utcnow()
+    rows = [
+        (
+            int(item["id"]),
+            str(item.get("status") or "FAIL"),
+            item.get("latency_ms"),
+            item.get("error") or "",
+        )
+        for item in results
+    ]
+    if not rows:
+        return 0
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        _ensure_history_table(conn)
+        conn.executemany("""
+            UPDATE proxies
+            SET last_status = ?, latency_ms = ?, last_error = ?, last_check = ?, updated_at = ?
+            WHERE id = ?
+        """, [
+            (status, latency if status == "OK" else None, error, now, now, proxy_id)
+            for proxy_id, status, latency, error in rows
+        ])
+        conn.executemany(
+            "INSERT INTO proxy_checks (proxy_id, status, latency_ms, checked_at) VALUES (?, ?, ?, ?)",
+            [(proxy_id, status, latency, now) for proxy_id, status, latency, _ in rows],
+        )
+        conn.execute("""
+            DELETE FROM proxy_checks WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (PARTITION BY proxy_id ORDER BY id DESC) AS rn
+                    FROM proxy_checks
+                ) WHERE rn > ?
+            )
+        """, (max(1, int(history_size)),))
+        conn.commit()
+        return len(rows)
+    finally:
+        conn.close()
+
+
+def latency_history(proxy_id: int, limit: int = HISTORY_SIZE) -> List[Dict]:
+    """История проверок прокси, новые первыми"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        _ensure_history_table(conn)
+        cursor = conn.execute("""
+            SELECT status, latency_ms, checked_at
+            FROM proxy_checks
+            WHERE proxy_id = ?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (proxy_id, limit))
+        return [
+            {'status': row[0], 'latency_ms': row[1], 'checked_at': row[2]}
+            for row in cursor.fetchall()
+        ]
+    finally:
+        conn.close()
+
+
 def sync_from_accounts() -> int:
     """Синхронизировать прокси из аккаунтов"""
     accounts = account_service.list_accounts()
@@ -181,6 +267,8 @@ def clear_all():
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     try:
+        _ensure_history_table(conn)
+        cursor.execute("DELETE FROM proxy_checks")
         cursor.execute("DELETE FROM proxies")
         conn.commit()
     finally:
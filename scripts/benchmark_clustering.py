@@ -0,0 +1,86 @@
+"""
+Бенчмарк кластеризации фраз: попарный перебор против инвертированного индекса
+Сравнивает services.phrase_tools.cluster_phrases (method="naive" / "index" /
+"minhash") на синтетических фразах и проверяет, что индекс даёт те же кластеры.
+Запустить: python scripts/benchmark_clustering.py [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.phrase_tools import cluster_phrases  # noqa: E402
+
+CORES = [
+    "окна", "двери", "кухни", "шкафы", "диваны", "кровати", "ламинат", "плитка",
+    "обои", "краска", "смеситель", "ванна", "душевая", "радиатор", "котел", "кондиционер",
+]
+MODIFIERS = [
+    "купить", "цена", "недорого", "отзывы", "москва", "спб", "интернет магазин", "доставка",
+    "своими руками", "фото", "размеры", "пластиковые", "деревянные", "белые", "угловые", "2024",
+]
+
+
+def synthetic_phrases(count: int, seed: int = 42) -> list:
+    """Фразы вида «ядро + 1–4 модификатора» с хвостом редких слов, как в реальных ядрах."""
+    rng = random.Random(seed)
+    # Редких слов (бренды, модели) примерно столько же, сколько фраз / 20
+    rare = [f"модель{i}" for i in range(max(50, count // 20))]
+    phrases = []
+    for _ in range(count):
+        words = [rng.choice(CORES)]
+        words += rng.sample(MODIFIERS, rng.randint(1, 3))
+        if rng.random() < 0.6:
+            words.append(rng.choice(rare))
+        rng.shuffle(words)
+        phrases.append(" ".join(words))
+    return phrases
+
+
+def signature(clusters) -> list:
+    return [tuple(cluster.keys) for cluster in clusters]
+
+
+def measure(phrases, method, similarity):
+    started = time.perf_counter()
+    clusters = cluster_phrases(phrases, similarity=similarity, method=method)
+    return time.perf_counter() - started, clusters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--similarity", type=float, default=0.5)
+    parser.add_argument(
+        "--naive-limit",
+        type=int,
+        default=10_000,
+        help="попарный перебор квадратичен: на больших объёмах он не запускается",
+    )
+    args = parser.parse_args()
+
+    print(f"[INFO] similarity={args.similarity}")
+    print(f"{'фраз':>10} {'метод':>8} {'время, с':>10} {'кластеров':>10}  совпадает с naive")
+    for size in args.sizes:
+        phrases = synthetic_phrases(size)
+        reference = None
+        if size <= args.naive_limit:
+            elapsed, clusters = measure(phrases, "naive", args.similarity)
+            reference = signature(clusters)
+            print(f"{size:>10} {'naive':>8} {elapsed:>10.2f} {len(clusters):>10}")
+        for method in ("index", "minhash"):
+            elapsed, clusters = measure(phrases, method, args.similarity)
+            if reference is None:
+                same = "-"
+            else:
+                same = "да" if signature(clusters) == reference else "нет"
+            print(f"{size:>10} {method:>8} {elapsed:>10.2f} {len(clusters):>10}  {same}")
+
+
+if __name__ == "__main__":
+    main()
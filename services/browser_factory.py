@@ -22,6 +22,9 @@ try:
     from ..utils.text_fix import WORDSTAT_FETCH_NORMALIZER_SCRIPT
     from .proxy_manager import Proxy, ProxyManager
     from .chrome_launcher import ChromeLauncher
+    from .network_policy import block_urls_sync
+    from .proxy_bridge import ProxyBridge
+    from .proxy_gateway import Upstream
 except ImportError:
     from core.db import SessionLocal
     from core.models import Account
@@ -29,6 +32,9 @@ except ImportError:
     from utils.text_fix import WORDSTAT_FETCH_NORMALIZER_SCRIPT
     from .proxy_manager import Proxy, ProxyManager
     from .chrome_launcher import ChromeLauncher
+    from .network_policy import block_urls_sync
+    from .proxy_bridge import ProxyBridge
+    from .proxy_gateway import Upstream
 
 BASE_DIR = ChromeLauncher.BASE_DIR
 RUNTIME_DIR = BASE_DIR / "runtime"
@@ -172,6 +178,7 @@ def for_account(
     geo: Optional[str] = None,
     profile_override: Optional[str] = None,
     target_url: Optional[str] = None,
+    block_resources: bool = False,
 ) -> BrowserContextHandle:
     _clear_system_proxy_env()
 
@@ -245,14 +252,22 @@ def for_account(
         raise RuntimeError(f"Proxy preflight failed: {preflight['error']}")
 
     proxy_extension_dir: Optional[Path] = None
+    bridge_key: Optional[str] = None
+    bridge_port: Optional[int] = None
     if use_cdp and proxy_requires_auth:
-        try:
-            proxy_extension_dir = _ensure_proxy_extension(proxy_obj, proxy_kwargs)
-        except Exception as exc:
-            print(f"[BF] Proxy extension error: {exc}")
-            proxy_extension_dir = None
-        if proxy_extension_dir is None:
-            use_cdp = False
+        # HTTP(S)-прокси с логином идёт через общий локальный шлюз,
+        # расширение авторизации остаётся только для SOCKS
+        bridge_key = f"bf-{account.name}"
+        bridge_port = _start_proxy_bridge(bridge_key, resolved_proxy_uri)
+        if bridge_port is None:
+            bridge_key = None
+            try:
+                proxy_extension_dir = _ensure_proxy_extension(proxy_obj, proxy_kwargs)
+            except Exception as exc:
+                print(f"[BF] Proxy extension error: {exc}")
+                proxy_extension_dir = None
+            if proxy_extension_dir is None:
+                use_cdp = False
 
     if not use_cdp:
         playwright = sync_playwright().start()
@@ -289,6 +304,7 @@ def for_account(
                 pass
         page = browser.pages[0] if browser.pages else browser.new_page()
         _wire_logging(page)
+        blocked_patterns = _apply_network_policy(page, account.name) if block_resources else 0
         try:
             page.evaluate(WORDSTAT_FETCH_NORMALIZER_SCRIPT)
         except Exception:
@@ -326,6 +342,7 @@ def for_account(
             metadata={
                 "profile_dir": str(profile_dir),
                 "preflight": preflight,
+                "blocked_url_patterns": blocked_patterns,
             },
         )
 
@@ -362,7 +379,9 @@ def for_account(
         cmd.append("--disable-extensions")
 
     proxy_flag = None
-    if resolved_proxy_uri:
+    if bridge_port is not None:
+        proxy_flag = f"http://127.0.0.1:{bridge_port}"
+    elif resolved_proxy_uri:
         proxy_flag = _strip_proxy_credentials(resolved_proxy_uri)
     elif proxy_obj:
         scheme, _, host_port = proxy_obj.server.partition("://")
@@ -405,6 +424,8 @@ def for_account(
     if browser is None:
         process.terminate()
         playwright.stop()
+        if bridge_key:
+            ProxyBridge.stop(bridge_key)
         manager.release(proxy_obj)
         raise RuntimeError(f"Unable to connect to Chrome on port {cdp_port}: {last_error}")
 
@@ -418,6 +439,7 @@ def for_account(
             pass
     page = context.pages[0] if context.pages else context.new_page()
     _wire_logging(page)
+    blocked_patterns = _apply_network_policy(page, account.name) if block_resources else 0
     try:
         page.evaluate(WORDSTAT_FETCH_NORMALIZER_SCRIPT)
     except Exception:
@@ -457,17 +479,22 @@ def for_account(
                 finally:
                     if proxy_extension_dir and proxy_extension_dir.exists():
                         shutil.rmtree(proxy_extension_dir, ignore_errors=True)
+                    if bridge_key:
+                        ProxyBridge.stop(bridge_key)
                     manager.release(proxy_obj)
 
     metadata: Dict[str, Any] = {
         "profile_dir": str(profile_dir),
         "cdp_port": resolved_port,
         "preflight": preflight,
+        "blocked_url_patterns": blocked_patterns,
     }
     if resolved_proxy_uri:
         metadata["proxy_uri"] = resolved_proxy_uri
     if proxy_extension_dir:
         metadata["proxy_extension_dir"] = str(proxy_extension_dir)
+    if bridge_port is not None:
+        metadata["proxy_bridge_port"] = bridge_port
     if target_url:
         metadata["target_url"] = target_url
 
@@ -492,6 +519,7 @@ def start_for_account(
     geo: Optional[str] = None,
     profile_override: Optional[str] = None,
     target_url: Optional[str] = None,
+    block_resources: bool = False,
 ) -> BrowserContextHandle:
     """Convenience alias that mirrors the signature from older code paths."""
     return for_account(
@@ -503,9 +531,22 @@ def start_for_account(
         geo=geo,
         profile_override=profile_override,
         target_url=target_url,
+        block_resources=block_resources,
     )
 
 
+def _apply_network_policy(page: Any, account_name: str) -> int:
+    """Включить сетевую политику парсера на вкладке (картинки, шрифты, счётчики)."""
+    try:
+        patterns = block_urls_sync(page)
+    except Exception as exc:
+        print(f"[BF] Network policy error for {account_name}: {exc}")
+        return 0
+    if patterns:
+        print(f"[BF] Network policy for {account_name}: {patterns} blocked URL patterns")
+    return patterns
+
+
 __all__ = ["BrowserContextHandle", "for_account", "start_for_account"]
 
 
@@ -571,6 +612,29 @@ def _wire_logging(page: Any) -> None:
         pass
 
 
+def _start_proxy_bridge(key: str, proxy_uri: Optional[str]) -> Optional[int]:
+    """Register an HTTP(S) upstream in the shared proxy gateway; None for SOCKS or on error."""
+    if not proxy_uri:
+        return None
+    try:
+        upstream = Upstream.from_uri(proxy_uri)
+        port = ProxyBridge.start(
+            key,
+            upstream_scheme=upstream.scheme,
+            upstream_host=upstream.host,
+            upstream_port=upstream.port,
+            username=upstream.username,
+            password=upstream.password,
+        )
+    except ValueError:
+        return None
+    except Exception as exc:
+        print(f"[BF] Proxy gateway error: {exc}")
+        return None
+    print(f"[BF] Proxy gateway route {key} -> 127.0.0.1:{port}")
+    return port
+
+
 def _ensure_proxy_extension(
     proxy: Optional[Proxy] = None,
     proxy_kwargs: Optional[Dict[str, str]] = None,
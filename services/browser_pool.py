@@ -0,0 +1,262 @@
+"""Пул долгоживущих браузерных контекстов с прогретыми вкладками Wordstat.
+
+Запуск persistent Chrome, открытие десятка вкладок и загрузка Wordstat
+занимают 20–40 секунд. Пул держит авторизованные контексты между задачами:
+задача берёт контекст аккаунта (lease), работает и возвращает его (release)
+вместе с открытыми вкладками. Следующий регион или повторный запуск
+начинается сразу с парсинга.
+
+Объекты Playwright привязаны к event loop, в котором созданы, поэтому пул
+тоже живёт в одном loop. Чтобы контексты переживали отдельные запуски из
+GUI, используйте общий фоновый loop: ``run_shared(coro)`` выполняет корутину
+в нём и возвращает результат, а ``get_pool()`` внутри неё отдаёт общий пул.
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import logging
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from playwright.async_api import BrowserContext, Playwright, async_playwright
+
+__all__ = [
+    "BrowserPool",
+    "PooledContext",
+    "get_pool",
+    "run_shared",
+    "shutdown_shared",
+]
+
+IDLE_TTL_SECONDS = 600.0  # Через сколько закрывать неиспользуемый контекст
+MAX_CONTEXTS = 20  # Сколько контекстов держать открытыми одновременно
+
+logger = logging.getLogger(__name__)
+
+Launcher = Callable[[Playwright], Awaitable[BrowserContext]]
+
+
+@dataclass
+class PooledContext:
+    """Контекст аккаунта в пуле и его прогретые вкладки."""
+
+    account: str
+    signature: Hashable
+    context: BrowserContext
+    pages: List[Any] = field(default_factory=list)
+    warm: bool = False  # авторизация проверена, Wordstat открыт
+    leased: bool = False
+    uses: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+
+    def live_pages(self) -> List[Any]:
+        return [page for page in self.pages if not page.is_closed()]
+
+
+class BrowserPool:
+    """Контексты по аккаунтам: один контекст на профиль, выдаётся эксклюзивно."""
+
+    def __init__(self, *, idle_ttl: float = IDLE_TTL_SECONDS, max_contexts: int = MAX_CONTEXTS) -> None:
+        self.idle_ttl = idle_ttl
+        self.max_contexts = max(1, int(max_contexts))
+        self._entries: Dict[str, PooledContext] = {}
+        self._launching: set[str] = set()
+        self._playwright: Optional[Playwright] = None
+        self._playwright_cm = None
+        self._changed = asyncio.Condition()
+
+    async def _get_playwright(self) -> Playwright:
+        if self._playwright is None:
+            self._playwright_cm = async_playwright()
+            self._playwright = await self._playwright_cm.start()
+        return self._playwright
+
+    async def _is_alive(self, entry: PooledContext) -> bool:
+        try:
+            await entry.context.cookies()
+            return True
+        except Exception:
+            return False
+
+    async def lease(
+        self,
+        account: str,
+        signature: Hashable,
+        launch: Launcher,
+        *,
+        timeout: Optional[float] = None,
+    ) -> PooledContext:
+        """
+        Взять контекст аккаунта; если его нет — запустить через ``launch``.
+
+        Args:
+            signature: параметры запуска (профиль, прокси, headless); контекст
+                с другой сигнатурой закрывается и запускается заново
+            launch: корутина ``launch(playwright) -> BrowserContext``
+            timeout: сколько ждать, пока контекст аккаунта занят другой задачей
+        """
+        async with self._changed:
+            await asyncio.wait_for(
+                self._changed.wait_for(lambda: not self._is_busy(account)),
+                timeout=timeout,
+            )
+            entry = self._entries.get(account)
+            if entry is not None:
+                entry.leased = True
+            else:
+                self._launching.add(account)
+
+        await self._evict_idle()
+        if entry is not None:
+            if entry.signature == signature and await self._is_alive(entry):
+                entry.uses += 1
+                entry.last_used = time.monotonic()
+                entry.pages = entry.live_pages()
+                logger.info(f"[POOL] {account}: контекст из пула (вкладок: {len(entry.pages)})")
+                return entry
+            # Профиль нельзя открыть дважды — держим аккаунт занятым до перезапуска
+            self._launching.add(account)
+            await self._drop(entry)
+
+        try:
+            await self._evict_for_space()
+            playwright = await self._get_playwright()
+            context = await launch(playwright)
+            entry = PooledContext(account=account, signature=signature, context=context, leased=True, uses=1)
+            entry.pages = list(context.pages)
+            self._entries[account] = entry
+        finally:
+            async with self._changed:
+                self._launching.discard(account)
+                self._changed.notify_all()
+        logger.info(f"[POOL] {account}: новый контекст (в пуле: {len(self._entries)})")
+        return entry
+
+    def _is_busy(self, account: str) -> bool:
+        if account in self._launching:
+            return True
+        entry = self._entries.get(account)
+        return entry is not None and entry.leased
+
+    async def release(self, entry: PooledContext) -> None:
+        """Вернуть исправный контекст в пул вместе с вкладками."""
+        if not entry.leased:
+            return
+        entry.pages = entry.live_pages()
+        entry.last_used = time.monotonic()
+        async with self._changed:
+            entry.leased = False
+            self._changed.notify_all()
+
+    async def discard(self, entry: PooledContext) -> None:
+        """Закрыть контекст (ошибка, разлогин) — в следующий раз запустится заново."""
+        await self._drop(entry)
+
+    async def _drop(self, entry: PooledContext) -> None:
+        async with self._changed:
+            if self._entries.get(entry.account) is entry:
+                del self._entries[entry.account]
+            entry.leased = False
+            self._changed.notify_all()
+        try:
+            await entry.context.close()
+        except Exception as exc:
+            logger.debug(f"[POOL] {entry.account}: ошибка закрытия контекста: {exc}")
+
+    async def _evict_idle(self) -> None:
+        now = time.monotonic()
+        stale = [
+            entry for entry in list(self._entries.values())
+            if not entry.leased and now - entry.last_used > self.idle_ttl
+        ]
+        for entry in stale:
+            logger.info(f"[POOL] {entry.account}: закрываю простаивающий контекст")
+            await self._drop(entry)
+
+    async def _evict_for_space(self) -> None:
+        while len(self._entries) >= self.max_contexts:
+            idle = [entry for entry in self._entries.values() if not entry.leased]
+            if not idle:
+                return
+            await self._drop(min(idle, key=lambda entry: entry.last_used))
+
+    async def close_all(self) -> None:
+        for entry in list(self._entries.values()):
+            await self._drop(entry)
+        if self._playwright_cm is not None:
+            try:
+                await self._playwright_cm.__aexit__(None, None, None)
+            except Exception:
+                pass
+        self._playwright = None
+        self._playwright_cm = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "contexts": len(self._entries),
+            "leased": sum(1 for entry in self._entries.values() if entry.leased),
+            "accounts": {
+                account: {"uses": entry.uses, "tabs": len(entry.pages), "warm": entry.warm}
+                for account, entry in self._entries.items()
+            },
+        }
+
+
+# ---------------------------------------------------------------------------
+# Пулы по event loop и общий фоновый loop
+# ---------------------------------------------------------------------------
+
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, BrowserPool]" = weakref.WeakKeyDictionary()
+_shared_loop: Optional[asyncio.AbstractEventLoop] = None
+_shared_lock = threading.Lock()
+
+
+def get_pool() -> BrowserPool:
+    """Пул текущего event loop (создаётся при первом обращении)."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = BrowserPool()
+        _pools[loop] = pool
+    return pool
+
+
+def _shared() -> asyncio.AbstractEventLoop:
+    global _shared_loop
+    with _shared_lock:
+        if _shared_loop is None or _shared_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True)
+            thread.start()
+            _shared_loop = loop
+        return _shared_loop
+
+
+def run_shared(coro: Awaitable[Any]) -> Any:
+    """Выполнить корутину в общем loop пула (блокирует вызывающий поток)."""
+    return asyncio.run_coroutine_threadsafe(coro, _shared()).result()
+
+
+def shutdown_shared(timeout: float = 30.0) -> None:
+    """Закрыть все контексты общего пула и остановить его loop."""
+    global _shared_loop
+    with _shared_lock:
+        loop = _shared_loop
+        _shared_loop = None
+    if loop is None or loop.is_closed():
+        return
+    pool = _pools.get(loop)
+    if pool is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(pool.close_all(), loop).result(timeout)
+        except Exception as exc:
+            logger.warning(f"[POOL] Ошибка закрытия пула: {exc}")
+    loop.call_soon_threadsafe(loop.stop)
+
+
+atexit.register(shutdown_shared)
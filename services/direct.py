@@ -9,9 +9,18 @@ import json
 from typing import Any
 
 try:
-    from ..core.db import get_db_connection
+    from ..core.db import ensure_phrase_ids, ensure_schema, get_db_connection
 except ImportError:
-    from core.db import get_db_connection
+    from core.db import ensure_phrase_ids, ensure_schema, get_db_connection
+
+_schema_ready = False
+
+
+def _ensure_ready() -> None:
+    global _schema_ready
+    if not _schema_ready:
+        ensure_schema()
+        _schema_ready = True
 
 
 async def forecast_batch_direct(
@@ -97,11 +106,12 @@ async def forecast_batch_direct(
                     
                     # Save to database immediately
                     with get_db_connection() as conn:
+                        phrase_id = ensure_phrase_ids(conn, [phrase]).get(phrase.strip())
                         conn.execute(
                             """INSERT OR REPLACE INTO forecasts 
-                            (phrase, cpc, impressions, budget, region, processed) 
-                            VALUES (?, ?, ?, ?, ?, 0)""",
-                            (phrase, cpc, impressions, budget, region)
+                            (phrase, cpc, impressions, budget, region, processed, phrase_id) 
+                            VALUES (?, ?, ?, ?, ?, 0, ?)""",
+                            (phrase, cpc, impressions, budget, region, phrase_id)
                         )
                     
                     # Rate limiting: ~1 req/sec = 60/min
@@ -156,20 +166,25 @@ def merge_freq_and_forecast(region: int = 225) -> list[dict]:
     """
     Merge frequency and forecast data for export.
     
+    Both tables are joined through the phrases dictionary on integer ids
+    (indexes on (phrase_id, region) and (region, freq)), not on phrase text.
+    
     Returns:
         List of dicts with: phrase, freq, cpc, impressions, budget
     """
+    _ensure_ready()
     with get_db_connection() as conn:
         cursor = conn.execute(
             """
             SELECT 
-                f.phrase,
+                p.phrase,
                 f.freq,
                 fc.cpc,
                 fc.impressions,
                 fc.budget
             FROM frequencies f
-            LEFT JOIN forecasts fc ON f.phrase = fc.phrase AND f.region = fc.region
+            JOIN phrases p ON p.id = f.phrase_id
+            LEFT JOIN forecasts fc ON fc.phrase_id = f.phrase_id AND fc.region = f.region
             WHERE f.region = ?
             ORDER BY f.freq DESC
             """,
@@ -1,52 +1,27 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from datetime import datetime
 from typing import Iterable
 
 from sqlalchemy import select, func
 
 try:
-    from ..core.db import SessionLocal, get_db_connection
+    from ..core.db import FrequencyWriter, SessionLocal, enqueue_freq_masks, get_db_connection
     from ..core.models import FrequencyResult
+    from . import frequency_cache, rate_control
 except ImportError:
-    from core.db import SessionLocal, get_db_connection
+    from core.db import FrequencyWriter, SessionLocal, enqueue_freq_masks, get_db_connection
     from core.models import FrequencyResult
+    from services import frequency_cache, rate_control
 
 QUEUE_STATUSES = ("queued", "running", "ok", "error")
 
 
 def enqueue_masks(masks: Iterable[str], region: int) -> int:
     """Add masks into freq_results, resetting non-ok rows to queued."""
-    inserted = 0
-    normalized = []
-    for raw in masks:
-        mask = (raw or "").strip()
-        if mask:
-            normalized.append(mask)
-    if not normalized:
-        return 0
-    with SessionLocal() as session:
-        for mask in normalized:
-            stmt = select(FrequencyResult).where(
-                FrequencyResult.mask == mask,
-                FrequencyResult.region == region,
-            )
-            existing = session.scalars(stmt).first()
-            if existing:
-                if existing.status != 'ok':
-                    existing.status = 'queued'
-                    existing.freq_total = 0
-                    existing.freq_quotes = 0
-                    existing.freq_exact = 0
-                    existing.error = None
-                    existing.attempts = 0
-                    existing.updated_at = datetime.utcnow()
-            else:
-                session.add(FrequencyResult(mask=mask, region=region))
-                inserted += 1
-        session.commit()
-    return inserted
+    return enqueue_freq_masks(masks, region)
 
 
 def list_results(status: str | None = None, limit: int = 500) -> list[dict]:
@@ -120,7 +95,10 @@ async def parse_batch_wordstat(
     masks: list[str], 
     session_page=None, 
     chunk_size: int = 80, 
-    region: int = 225
+    region: int = 225,
+    force_refresh: bool = False,
+    account: str | None = None,
+    proxy: str | None = None,
 ) -> list[dict]:
     """
     Parse frequency from Wordstat using Playwright in batch mode.
@@ -130,17 +108,34 @@ async def parse_batch_wordstat(
         session_page: Playwright page with active session (from autologin)
         chunk_size: Number of masks per batch (Yandex limit: ~80/min)
         region: Yandex region ID (default 225 = Russia)
+        force_refresh: Ignore the frequency cache and fetch every mask again
+        account: Account name, keys the shared rate controller
+        proxy: Proxy the page goes through, keys the shared rate controller
     
     Returns:
         List of dicts: [{'phrase': str, 'freq': int, 'region': int}, ...]
     """
     results = []
+
+    # Masks answered recently are served from the cache without navigating
+    cached, masks = frequency_cache.split_cached(masks, region=region, force_refresh=force_refresh)
+    results.extend({'phrase': mask, 'freq': freq, 'region': region} for mask, freq in cached.items())
+    if not masks:
+        return results
     
     # Import playwright only when needed
-    from playwright.async_api import async_playwright
+    from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+    # Pace navigations per account/proxy; starts at ~1 req/sec for a new pair
+    rate = rate_control.get_controller(account, proxy, initial_delay=1.0)
     
     # If no session provided, create temporary browser
     own_browser = session_page is None
+    # Results are buffered and written in one transaction per flush
+    writer = FrequencyWriter('frequencies', max_rows=chunk_size, max_delay=5.0)
+    # Fresh values go to the frequency cache once per batch, not once per mask
+    cache_buffer: dict[str, int] = {}
+
     if own_browser:
         playwright = await async_playwright().start()
         browser = await playwright.chromium.launch(headless=True)
@@ -158,6 +153,8 @@ async def parse_batch_wordstat(
                 try:
                     # Navigate to Wordstat with phrase
                     url = f"https://wordstat.yandex.ru/#!/?words={mask}&regions={region}"
+                    await rate.wait()
+                    started = time.monotonic()
                     await session_page.goto(url, timeout=15000)
                     
                     # КРИТИЧНО: Ждем загрузку URL и ответ от сервера
@@ -220,28 +217,36 @@ async def parse_batch_wordstat(
                     
                     result = {'phrase': mask, 'freq': freq, 'region': region}
                     results.append(result)
+                    cache_buffer[mask] = freq
                     
-                    # Save to DB immediately (for progress tracking)
-                    with get_db_connection() as conn:
-                        conn.execute(
-                            "INSERT OR REPLACE INTO frequencies (phrase, freq, region, processed) VALUES (?, ?, ?, 0)",
-                            (mask, freq, region)
-                        )
-                    
-                    # Rate limiting: ~1 req/sec = 60/min
-                    await asyncio.sleep(1.0)
+                    # Save to DB (buffered, flushed by count or time for progress tracking)
+                    writer.add({'phrase': mask, 'freq': freq, 'region': region, 'processed': False})
+                    rate.on_success(latency_ms=(time.monotonic() - started) * 1000)
                     
                     print(f"[Wordstat] {mask}: {freq:,}")
                     
                 except Exception as e:
                     print(f"[Wordstat ERROR] {mask}: {e}")
                     results.append({'phrase': mask, 'freq': 0, 'region': region})
+                    if 'captcha' in (session_page.url or ''):
+                        rate.on_captcha()
+                    elif isinstance(e, PlaywrightTimeoutError):
+                        rate.on_timeout()
+                    else:
+                        rate.on_error()
+
+            await asyncio.to_thread(frequency_cache.store, cache_buffer, region=region)
+            cache_buffer.clear()
             
             # Longer pause between batches
             if i + chunk_size < len(masks):
                 await asyncio.sleep(3)
     
     finally:
+        writer.close()
+        if cache_buffer:
+            await asyncio.to_thread(frequency_cache.store, cache_buffer, region=region)
+        await asyncio.to_thread(rate.save)
         if own_browser:
             await context.close()
             await browser.close()
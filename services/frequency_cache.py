@@ -0,0 +1,235 @@
+"""Persistent Wordstat frequency cache.
+
+Every parser entry point asks this module first and only navigates for the
+phrases that are missing or stale. Entries are keyed by the normalized phrase,
+the frequency mode (``ws`` / ``qws`` / ``bws``) and the region, and expire after
+a configurable age. Older results already stored in ``freq_results`` and
+``frequencies`` are used as a fallback so existing databases benefit right away.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Iterable, Mapping
+
+try:
+    from ..core.db import ensure_schema, get_db_connection
+    from .phrase_tools import NormalizationOptions
+except ImportError:
+    from core.db import ensure_schema, get_db_connection
+    from services.phrase_tools import NormalizationOptions
+
+__all__ = [
+    "CACHE_MODES",
+    "DEFAULT_TTL",
+    "cache_key",
+    "lookup",
+    "split_cached",
+    "store",
+    "invalidate",
+]
+
+CACHE_MODES = ("ws", "qws", "bws")
+DEFAULT_TTL = timedelta(days=30)
+
+# Column of freq_results that holds the value for every mode
+_FREQ_RESULTS_COLUMNS = {"ws": "freq_total", "qws": "freq_quotes", "bws": "freq_exact"}
+_SQL_CHUNK = 500  # keep below SQLite's bound-parameter limit
+_NORMALIZER = NormalizationOptions()
+_schema_ready = False
+
+
+def _ensure_ready() -> None:
+    global _schema_ready
+    if not _schema_ready:
+        ensure_schema()
+        _schema_ready = True
+
+
+def _check_mode(mode: str) -> str:
+    mode = (mode or "ws").lower()
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown frequency mode: {mode!r}")
+    return mode
+
+
+def _cutoff(ttl: timedelta | None) -> str:
+    age = DEFAULT_TTL if ttl is None else ttl
+    return (datetime.utcnow() - age).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _chunks(items: list[str]) -> Iterable[list[str]]:
+    for start in range(0, len(items), _SQL_CHUNK):
+        yield items[start:start + _SQL_CHUNK]
+
+
+def _table_columns(conn, name: str) -> set[str]:
+    """Column names of a table; empty when the table does not exist."""
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({name})")}
+
+
+def cache_key(phrase: str) -> str:
+    """Return the normalized form used as the cache key."""
+    return _NORMALIZER.apply(phrase or "")
+
+
+def lookup(
+    phrases: Iterable[str],
+    *,
+    mode: str = "ws",
+    region: int = 225,
+    ttl: timedelta | None = None,
+) -> dict[str, int]:
+    """Return ``{phrase: freq}`` for every phrase with a fresh cached value.
+
+    Keys of the result are the phrases exactly as passed in.
+    """
+    mode = _check_mode(mode)
+    by_key: dict[str, list[str]] = {}
+    for phrase in phrases:
+        key = cache_key(phrase)
+        if key:
+            by_key.setdefault(key, []).append(phrase)
+    if not by_key:
+        return {}
+
+    _ensure_ready()
+    cutoff = _cutoff(ttl)
+    found: dict[str, int] = {}
+    with get_db_connection() as conn:
+        for chunk in _chunks(list(by_key)):
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT phrase_norm, freq FROM freq_cache "
+                f"WHERE mode = ? AND region = ? AND datetime(fetched_at) >= datetime(?) "
+                f"AND phrase_norm IN ({marks})",
+                (mode, int(region), cutoff, *chunk),
+            )
+            for key, freq in rows:
+                found[key] = int(freq or 0)
+
+        # Fallback: results saved by the parsers before the cache existed.
+        # Older or minimal databases may lack a table or a column (freq_quotes
+        # is not in the raw DDL) - that is a cache miss, not an error.
+        missing = [p for key, group in by_key.items() if key not in found for p in group]
+        raw_hits: dict[str, int] = {}
+        column = _FREQ_RESULTS_COLUMNS[mode]
+        use_freq_results = {"mask", "region", "status", "updated_at", column} <= _table_columns(
+            conn, "freq_results"
+        )
+        use_frequencies = mode == "ws" and {"phrase", "freq", "region", "created_at"} <= _table_columns(
+            conn, "frequencies"
+        )
+        for chunk in _chunks(list(dict.fromkeys(missing))):
+            marks = ",".join("?" * len(chunk))
+            if use_freq_results:
+                rows = conn.execute(
+                    f"SELECT mask, {column} FROM freq_results "
+                    f"WHERE status = 'ok' AND region = ? AND datetime(updated_at) >= datetime(?) "
+                    f"AND mask IN ({marks})",
+                    (int(region), cutoff, *chunk),
+                )
+                for mask, freq in rows:
+                    raw_hits[mask] = int(freq or 0)
+            if use_frequencies:
+                rows = conn.execute(
+                    f"SELECT phrase, freq FROM frequencies "
+                    f"WHERE region = ? AND datetime(created_at) >= datetime(?) "
+                    f"AND phrase IN ({marks})",
+                    (int(region), cutoff, *chunk),
+                )
+                for phrase, freq in rows:
+                    raw_hits.setdefault(phrase, int(freq or 0))
+
+    result: dict[str, int] = {}
+    for key, group in by_key.items():
+        for phrase in group:
+            if key in found:
+                result[phrase] = found[key]
+            elif phrase in raw_hits:
+                result[phrase] = raw_hits[phrase]
+    return result
+
+
+def split_cached(
+    phrases: Iterable[str],
+    *,
+    mode: str = "ws",
+    region: int = 225,
+    ttl: timedelta | None = None,
+    force_refresh: bool = False,
+) -> tuple[dict[str, int], list[str]]:
+    """Split phrases into cached hits and phrases that still need fetching.
+
+    With ``force_refresh`` the cache is bypassed and every phrase is a miss.
+    Order of the returned misses follows the input, duplicates removed.
+    """
+    ordered = list(dict.fromkeys(p for p in phrases if p and p.strip()))
+    if force_refresh:
+        return {}, ordered
+    hits = lookup(ordered, mode=mode, region=region, ttl=ttl)
+    return hits, [p for p in ordered if p not in hits]
+
+
+def store(
+    results: Mapping[str, int] | Iterable[tuple[str, int]],
+    *,
+    mode: str = "ws",
+    region: int = 225,
+) -> int:
+    """Insert or refresh cache entries. Returns the number of rows written."""
+    mode = _check_mode(mode)
+    items = results.items() if isinstance(results, Mapping) else results
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    rows = []
+    for phrase, freq in items:
+        key = cache_key(phrase)
+        if not key:
+            continue
+        try:
+            value = int(freq)
+        except (TypeError, ValueError):
+            continue
+        rows.append((key, mode, int(region), value, now))
+    if not rows:
+        return 0
+
+    _ensure_ready()
+    with get_db_connection() as conn:
+        conn.executemany(
+            "INSERT INTO freq_cache (phrase_norm, mode, region, freq, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(phrase_norm, mode, region) DO UPDATE SET "
+            "freq = excluded.freq, fetched_at = excluded.fetched_at",
+            rows,
+        )
+    return len(rows)
+
+
+def invalidate(
+    phrases: Iterable[str] | None = None,
+    *,
+    mode: str | None = None,
+    region: int | None = None,
+) -> int:
+    """Drop cache entries (all of them when no filter is given)."""
+    _ensure_ready()
+    clauses: list[str] = []
+    params: list[object] = []
+    if mode is not None:
+        clauses.append("mode = ?")
+        params.append(_check_mode(mode))
+    if region is not None:
+        clauses.append("region = ?")
+        params.append(int(region))
+
+    with get_db_connection() as conn:
+        if phrases is None:
+            where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+            return conn.execute(f"DELETE FROM freq_cache{where}", params).rowcount
+        deleted = 0
+        keys = list(dict.fromkeys(k for k in (cache_key(p) for p in phrases) if k))
+        for chunk in _chunks(keys):
+            marks = ",".join("?" * len(chunk))
+            where = " AND ".join([*clauses, f"phrase_norm IN ({marks})"])
+            deleted += conn.execute(f"DELETE FROM freq_cache WHERE {where}", [*params, *chunk]).rowcount
+        return deleted
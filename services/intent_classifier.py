@@ -5,7 +5,12 @@ IntentClassifier - классификация намерений пользов
 """
 from __future__ import annotations
 from enum import Enum
-from typing import Tuple
+from typing import Set, Tuple
+
+try:
+    from .phrase_tools import MultiMatcher
+except ImportError:
+    from services.phrase_tools import MultiMatcher
 
 
 class Intent(Enum):
@@ -16,6 +21,30 @@ class Intent(Enum):
     GENERAL = "GENERAL"
 
 
+# Маркеры намерений (поиск подстрок), в порядке приоритета
+INTENT_MARKERS = {
+    "TRANSACTIONAL": ("купить", "заказать", "цена", "стоимость", "в наличии", "доставка", "оплата", "скидка"),
+    "INFORMATIONAL": ("отзывы", "обзор", "как", "инструкция", "что это", "сравнение", "рейтинг"),
+}
+
+CLASSIFIER_MARKERS = {
+    Intent.TRANSACTIONAL: (("купить", "заказать", "цена", "стоимость", "в наличии", "доставка"), 0.9),
+    Intent.COMMERCIAL: (("лучший", "топ", "рейтинги", "сравнить"), 0.75),
+    Intent.INFORMATIONAL: (("как", "что", "почему", "инструкция", "обзор"), 0.7),
+}
+
+# Все маркеры собраны в один автомат: фраза просматривается один раз
+_INTENT_MATCHER = MultiMatcher(keywords=INTENT_MARKERS)
+_CLASSIFIER_MATCHER = MultiMatcher(
+    keywords={intent.value: words for intent, (words, _) in CLASSIFIER_MARKERS.items()}
+)
+
+
+def intent_categories(phrase: str) -> Set[str]:
+    """Все намерения, маркеры которых встречаются во фразе"""
+    return _INTENT_MATCHER.categories(phrase)
+
+
 def classify_intent(phrase: str) -> str:
     """
     Классифицировать намерение пользователя по фразе
@@ -23,13 +52,11 @@ def classify_intent(phrase: str) -> str:
     Returns:
         str: Тип намерения (TRANSACTIONAL, INFORMATIONAL, GENERAL)
     """
-    p = phrase.lower()
+    hits = _INTENT_MATCHER.categories(phrase)
     
-    if any(w in p for w in ["купить", "заказать", "цена", "стоимость", "в наличии", "доставка", "оплата", "скидка"]):
-        return "TRANSACTIONAL"
-    
-    if any(w in p for w in ["отзывы", "обзор", "как", "инструкция", "что это", "сравнение", "рейтинг"]):
-        return "INFORMATIONAL"
+    for intent in INTENT_MARKERS:
+        if intent in hits:
+            return intent
     
     return "GENERAL"
 
@@ -47,19 +74,26 @@ class IntentClassifier:
         Returns:
             Tuple[Intent, float]: Тип намерения и уверенность (0-1)
         """
-        p = (phrase or '').lower()
-        
-        if any(w in p for w in ("купить", "заказать", "цена", "стоимость", "в наличии", "доставка")):
-            return Intent.TRANSACTIONAL, 0.9
+        hits = self.categories(phrase)
         
-        if any(w in p for w in ("лучший", "топ", "рейтинги", "сравнить")):
-            return Intent.COMMERCIAL, 0.75
-        
-        if any(w in p for w in ("как", "что", "почему", "инструкция", "обзор")):
-            return Intent.INFORMATIONAL, 0.7
+        for intent, (_, confidence) in CLASSIFIER_MARKERS.items():
+            if intent in hits:
+                return intent, confidence
         
         return Intent.GENERAL, 0.5
     
+    def categories(self, phrase: str) -> Set[Intent]:
+        """
+        Все намерения, маркеры которых встречаются во фразе (один проход)
+        
+        Args:
+            phrase: Фраза для классификации
+            
+        Returns:
+            Set[Intent]: Найденные намерения (пустое множество — общее)
+        """
+        return {Intent(value) for value in _CLASSIFIER_MATCHER.categories(phrase or '')}
+    
     def classify_simple(self, phrase: str) -> str:
         """
         Простая классификация, возвращает только строку
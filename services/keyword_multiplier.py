@@ -4,17 +4,148 @@ KeywordMultiplier - умное перемножение масок с морфо
 Версия: 2.0 - полная реализация с фильтрами
 """
 from __future__ import annotations
-from itertools import product
-from typing import Dict, List
+import heapq
+from itertools import islice
+from typing import Dict, Iterator, List
 
 try:
-    from .morphology_filter import normalize_phrase, is_good_phrase
+    from .morphology_filter import STOP_WORDS, is_good_phrase, normalize_tokens, order_phrase, save_lemma_cache
     from .intent_classifier import classify_intent
 except ImportError:
-    from services.morphology_filter import normalize_phrase, is_good_phrase
+    from services.morphology_filter import STOP_WORDS, is_good_phrase, normalize_tokens, order_phrase, save_lemma_cache
     from services.intent_classifier import classify_intent
 
 
+GROUP_ORDER = ("core", "products", "mods", "attrs", "geo", "brands")
+MAX_DIRECT_WORDS = 7  # Лимит слов Яндекс.Директа (is_good_phrase)
+
+
+def _score_mask(phrase: str) -> dict:
+    intent = classify_intent(phrase)
+    
+    score = 0.4
+    if intent == "TRANSACTIONAL":
+        score = 1.0
+    elif intent == "INFORMATIONAL":
+        score = 0.6
+    
+    length_bonus = min(0.2, 0.04 * max(0, len(phrase.split()) - 2))
+    score += length_bonus
+    
+    return {
+        "mask": phrase,
+        "intent": intent,
+        "score": round(score, 3)
+    }
+
+
+def iter_masks(
+    groups: Dict[str, List[str]],
+    max_len_words: int = 7,
+    *,
+    dedupe: bool = True,
+) -> Iterator[dict]:
+    """
+    Ленивое перемножение масок: комбинации порождаются обходом в глубину
+    
+    Ветка отсекается целиком, как только префикс комбинации уже длиннее
+    max_len_words (или лимита Директа) либо содержит больше одного повтора
+    слова — дальнейшие слова это только ухудшают, так что ни одна маска
+    ветки не прошла бы is_good_phrase.
+    
+    Args:
+        groups: Словарь с группами слов (как в multiply)
+        max_len_words: Максимальное количество слов в маске
+        dedupe: Пропускать повторы масок (хранит множество выданных масок)
+    
+    Yields:
+        dict: маска с полями mask, intent, score — в порядке перебора
+    """
+    buckets = [groups.get(name, [""]) for name in GROUP_ORDER]
+    
+    # Словарь групп лемматизируется один раз, комбинации собираются из готовых лемм
+    lemmas = normalize_tokens(
+        w for bucket in buckets for w in bucket if w and w.lower() not in STOP_WORDS
+    )
+    save_lemma_cache()
+    # Слово группы → (есть ли слово, лемма или None для стоп-слова, её токены)
+    options = [
+        [
+            (bool(w), lemma, lemma.split() if lemma is not None else [])
+            for w in bucket
+            for lemma in [lemmas[w] if w and w.lower() not in STOP_WORDS else None]
+        ]
+        for bucket in buckets
+    ]
+    limit = min(max_len_words, MAX_DIRECT_WORDS)
+    seen = set()
+    
+    def walk(level: int, present: bool, chosen: List[str], tokens: List[str]):
+        if level == len(options):
+            if not present:
+                return
+            phrase = order_phrase(chosen)
+            if dedupe:
+                if phrase in seen:
+                    return
+                seen.add(phrase)
+            if phrase and len(phrase.split()) <= max_len_words and is_good_phrase(phrase):
+                yield _score_mask(phrase)
+            return
+        for has_word, lemma, lemma_tokens in options[level]:
+            if lemma is None:
+                yield from walk(level + 1, present or has_word, chosen, tokens)
+                continue
+            next_tokens = tokens + lemma_tokens
+            if len(next_tokens) > limit or len(next_tokens) - len(set(next_tokens)) > 1:
+                continue
+            yield from walk(level + 1, present or has_word, chosen + [lemma], next_tokens)
+    
+    yield from walk(0, False, [], [])
+
+
+class _Ranked:
+    """Элемент кучи top-N: наверху худшая маска (ниже score, дальше по алфавиту)"""
+    
+    __slots__ = ("score", "mask", "item")
+    
+    def __init__(self, item: dict) -> None:
+        self.score = item["score"]
+        self.mask = item["mask"]
+        self.item = item
+    
+    def __lt__(self, other: "_Ranked") -> bool:
+        if self.score != other.score:
+            return self.score < other.score
+        return self.mask > other.mask
+
+
+def top_masks(groups: Dict[str, List[str]], max_kw: int, max_len_words: int = 7) -> List[dict]:
+    """
+    Лучшие max_kw масок без построения полного произведения
+    
+    Держит только кучу из max_kw элементов; результат совпадает с
+    multiply(groups)[:max_kw].
+    """
+    if max_kw <= 0:
+        return []
+    heap: List[_Ranked] = []
+    kept = set()
+    # Оценка зависит только от маски, а порог кучи только растёт: вытесненная
+    # маска при повторе снова не пройдёт, поэтому хватает множества масок в куче
+    for item in iter_masks(groups, max_len_words, dedupe=False):
+        if item["mask"] in kept:
+            continue
+        ranked = _Ranked(item)
+        if len(heap) < max_kw:
+            heapq.heappush(heap, ranked)
+            kept.add(item["mask"])
+        elif heap[0] < ranked:
+            kept.discard(heapq.heapreplace(heap, ranked).mask)
+            kept.add(item["mask"])
+    return sorted((r.item for r in heap), key=lambda x: (-x["score"], x["mask"]))
+
+
 def multiply(groups: Dict[str, List[str]], max_len_words: int = 7) -> List[dict]:
     """
     Умное перемножение масок из групп
@@ -26,55 +157,7 @@ def multiply(groups: Dict[str, List[str]], max_len_words: int = 7) -> List[dict]
     Returns:
         List[dict]: Список масок с информацией о намерении и оценке
     """
-    buckets = [
-        groups.get("core", [""]),
-        groups.get("products", [""]),
-        groups.get("mods", [""]),
-        groups.get("attrs", [""]),
-        groups.get("geo", [""]),
-        groups.get("brands", [""]),
-    ]
-    
-    raw = []
-    for combo in product(*buckets):
-        words = [w for w in combo if w]
-        if not words:
-            continue
-        
-        phrase = normalize_phrase(words)
-        
-        if not phrase or len(phrase.split()) > max_len_words:
-            continue
-        
-        if not is_good_phrase(phrase):
-            continue
-        
-        intent = classify_intent(phrase)
-        
-        score = 0.4
-        if intent == "TRANSACTIONAL":
-            score = 1.0
-        elif intent == "INFORMATIONAL":
-            score = 0.6
-        
-        length_bonus = min(0.2, 0.04 * max(0, len(phrase.split()) - 2))
-        score += length_bonus
-        
-        raw.append({
-            "mask": phrase,
-            "intent": intent,
-            "score": round(score, 3)
-        })
-    
-    uniq = {}
-    for r in raw:
-        mask_key = r["mask"]
-        if mask_key not in uniq or r["score"] > uniq[mask_key]["score"]:
-            uniq[mask_key] = r
-    
-    out = sorted(uniq.values(), key=lambda x: (-x["score"], x["mask"]))
-    
-    return out
+    return sorted(iter_masks(groups, max_len_words), key=lambda x: (-x["score"], x["mask"]))
 
 
 class KeywordMultiplier:
@@ -93,18 +176,40 @@ class KeywordMultiplier:
         """
         groups = self._extract_groups_from_tree(tree_data)
         
-        results = multiply(groups, max_len_words=7)
+        results = top_masks(groups, max_kw, max_len_words=7)
         
-        formatted = []
-        for r in results[:max_kw]:
-            formatted.append({
-                'keyword': r['mask'],
-                'intent': r['intent'],
-                'score': r['score'],
-                'original': r['mask']
-            })
+        return [self._format(r) for r in results]
+    
+    def iter_batches(self, tree_data: Dict, batch_size: int = 1000, max_kw: int = 0) -> Iterator[List[Dict]]:
+        """
+        Потоковая генерация масок порциями — без сортировки и без хранения всех масок
         
-        return formatted
+        Args:
+            tree_data: Данные из XMind парсера
+            batch_size: Размер порции (например, для передачи в очередь парсинга)
+            max_kw: Ограничение общего числа масок (0 — без ограничения)
+        
+        Yields:
+            List[Dict]: порция масок в формате multiply()
+        """
+        groups = self._extract_groups_from_tree(tree_data)
+        stream = (self._format(r) for r in iter_masks(groups, max_len_words=7))
+        if max_kw > 0:
+            stream = islice(stream, max_kw)
+        while True:
+            batch = list(islice(stream, max(1, batch_size)))
+            if not batch:
+                return
+            yield batch
+    
+    @staticmethod
+    def _format(r: dict) -> Dict:
+        return {
+            'keyword': r['mask'],
+            'intent': r['intent'],
+            'score': r['score'],
+            'original': r['mask']
+        }
     
     def _extract_groups_from_tree(self, tree_data: Dict) -> Dict[str, List[str]]:
         """
@@ -4,9 +4,53 @@
 """
 
 from collections import Counter
-from typing import List, Dict, Set
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
 import re
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+_WORD_RE = re.compile(r'\b[а-яёa-z]+\b')
+
+# Слова-"паразиты": минусуются, если фраза с ними теряет частотность в точном вхождении
+SUSPICIOUS_WORDS = frozenset({
+    'цена', 'стоимость', 'купить', 'заказать', 'доставка',
+    'бесплатно', 'дешево', 'скидка', 'акция', 'распродажа',
+    'интернет', 'магазин', 'москва', 'спб', 'отзывы'
+})
+
+
+@dataclass
+class TermMatrix:
+    """
+    Разреженная матрица фраза×слово в формате CSR
+    
+    Слова фразы i — vocab[indices[indptr[i]:indptr[i + 1]]] (с повторами,
+    в порядке появления). Словарь отсортирован, поэтому порядок id совпадает
+    с алфавитным.
+    """
+    vocab: List[str]
+    indptr: Any
+    indices: Any
+    
+    @property
+    def n_rows(self) -> int:
+        return len(self.indptr) - 1
+    
+    def row_ids(self):
+        """Номер строки для каждого элемента indices"""
+        return np.repeat(np.arange(self.n_rows), np.diff(self.indptr))
+    
+    def term_counts(self):
+        """Сколько раз встречается каждое слово (с повторами внутри фраз)"""
+        return np.bincount(self.indices, minlength=len(self.vocab))
+
 
 class MinusWordsExtractor:
     """Класс для извлечения минус-слов из фраз"""
@@ -18,6 +62,24 @@ class MinusWordsExtractor:
             'или', 'от', 'до', 'за', 'под', 'над', 'при', 'через', 'у'
         }
     
+    def build_matrix(self, phrases: Sequence[str]) -> TermMatrix:
+        """Токенизировать фразы один раз и собрать матрицу фраза×слово"""
+        tokenized = [self._tokenize(phrase) for phrase in phrases]
+        vocab = sorted({word for words in tokenized for word in words})
+        term_id = {word: i for i, word in enumerate(vocab)}
+        lengths = np.fromiter((len(words) for words in tokenized), dtype=np.int64, count=len(tokenized))
+        indptr = np.zeros(len(tokenized) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.fromiter(
+            (term_id[word] for words in tokenized for word in words),
+            dtype=np.int32,
+            count=int(indptr[-1]),
+        )
+        return TermMatrix(vocab, indptr, indices)
+    
+    def _vocab_mask(self, vocab: List[str], words) -> Any:
+        return np.fromiter((word in words for word in vocab), dtype=bool, count=len(vocab))
+    
     def extract_from_group(
         self,
         phrases: List[Dict],
@@ -28,6 +90,9 @@ class MinusWordsExtractor:
         """
         Извлечь минус-слова из группы фраз
         
+        Фразы токенизируются один раз в матрицу фраза×слово, все три анализа
+        считаются операциями над массивами NumPy.
+        
         Args:
             phrases: Список словарей с ключами 'phrase', 'freq_total', 'freq_quotes', 'freq_exact'
             min_frequency: Минимальная частотность для анализа
@@ -37,63 +102,67 @@ class MinusWordsExtractor:
         Returns:
             Список минус-слов
         """
-        minus_words = set()
+        if not phrases:
+            return []
+        if not NUMPY_AVAILABLE:
+            return self._extract_from_group_python(phrases, min_frequency, rare_threshold, freq_drop_threshold)
         
-        # Анализ 1: Слова которые встречаются редко
-        word_counter = Counter()
         total_phrases = len(phrases)
+        matrix = self.build_matrix([p['phrase'] for p in phrases])
+        if not matrix.vocab:
+            return []
+        stop = self._vocab_mask(matrix.vocab, self.stop_words)
+        rows = matrix.row_ids()
         
-        for phrase_data in phrases:
-            phrase = phrase_data['phrase'].lower()
-            words = self._tokenize(phrase)
-            for word in words:
-                if word not in self.stop_words:
-                    word_counter[word] += 1
+        # Доля фраз со словом (стоп-слова не считаются)
+        share = np.where(stop, 0, matrix.term_counts()) / total_phrases
+        freq_total = np.array([p.get('freq_total') or 0 for p in phrases], dtype=np.float64)
+        freq_exact = np.array([p.get('freq_exact') or 0 for p in phrases], dtype=np.float64)
+        exact_share = np.divide(freq_exact, freq_total, out=np.ones_like(freq_total), where=freq_total > 0)
         
-        # Слова которые встречаются меньше rare_threshold
-        for word, count in word_counter.items():
-            if count / total_phrases < rare_threshold:
-                minus_words.add(word)
+        # Анализ 1: Слова которые встречаются редко
+        minus = (share < rare_threshold) & ~stop
         
         # Анализ 2: Слова которые сильно снижают частотность
-        for phrase_data in phrases:
-            phrase = phrase_data['phrase']
-            freq_total = phrase_data.get('freq_total', 0)
-            freq_exact = phrase_data.get('freq_exact', 0)
-            
-            # Если точная частотность намного меньше широкой
-            if freq_total > min_frequency and freq_exact > 0:
-                drop_ratio = (freq_total - freq_exact) / freq_total
-                
-                if drop_ratio > freq_drop_threshold:
-                    # Находим слова которые могут быть причиной падения
-                    words = self._tokenize(phrase.lower())
-                    rare_words = [w for w in words if word_counter[w] / total_phrases < 0.3]
-                    minus_words.update(rare_words)
-        
-        # Анализ 3: Слова-"паразиты" (купить, цена, стоимость и т.д.)
-        suspicious_words = {
-            'цена', 'стоимость', 'купить', 'заказать', 'доставка',
-            'бесплатно', 'дешево', 'скидка', 'акция', 'распродажа',
-            'интернет', 'магазин', 'москва', 'спб', 'отзывы'
-        }
+        drop_ratio = np.divide(freq_total - freq_exact, freq_total, out=np.zeros_like(freq_total), where=freq_total > 0)
+        dropped = (freq_total > min_frequency) & (freq_exact > 0) & (drop_ratio > freq_drop_threshold)
+        picked = dropped[rows] & (share[matrix.indices] < 0.3)
+        minus[matrix.indices[picked]] = True
         
-        for phrase_data in phrases:
-            phrase = phrase_data['phrase'].lower()
-            words = set(self._tokenize(phrase))
-            
-            # Если содержит подозрительное слово и низкая точная частотность
-            if words & suspicious_words:
-                freq_exact = phrase_data.get('freq_exact', 0)
-                freq_total = phrase_data.get('freq_total', 0)
-                
-                if freq_total > 0 and freq_exact / freq_total < 0.3:
-                    minus_words.update(words & suspicious_words)
+        # Анализ 3: Подозрительные слова во фразах с низкой точной частотностью
+        suspicious = self._vocab_mask(matrix.vocab, SUSPICIOUS_WORDS)
+        weak = (freq_total > 0) & (exact_share < 0.3)
+        picked = weak[rows] & suspicious[matrix.indices]
+        minus[matrix.indices[picked]] = True
         
         # Убираем стоп-слова из минус-слов
-        minus_words -= self.stop_words
+        minus &= ~stop
+        return [matrix.vocab[i] for i in np.flatnonzero(minus)]
+    
+    def _extract_from_group_python(
+        self,
+        phrases: List[Dict],
+        min_frequency: int,
+        rare_threshold: float,
+        freq_drop_threshold: float
+    ) -> List[str]:
+        """Тот же анализ без NumPy (один проход токенизации)"""
+        tokenized = [self._tokenize(p['phrase']) for p in phrases]
+        total_phrases = len(phrases)
+        word_counter = Counter(w for words in tokenized for w in words if w not in self.stop_words)
+        
+        minus_words = {w for w, count in word_counter.items() if count / total_phrases < rare_threshold}
+        for phrase_data, words in zip(phrases, tokenized):
+            freq_total = phrase_data.get('freq_total') or 0
+            freq_exact = phrase_data.get('freq_exact') or 0
+            if freq_total > min_frequency and freq_exact > 0:
+                if (freq_total - freq_exact) / freq_total > freq_drop_threshold:
+                    minus_words.update(w for w in words if word_counter[w] / total_phrases < 0.3)
+            if freq_total > 0 and freq_exact / freq_total < 0.3:
+                minus_words.update(SUSPICIOUS_WORDS.intersection(words))
         
-        return sorted(list(minus_words))
+        minus_words -= self.stop_words
+        return sorted(minus_words)
     
     def cross_minus(
         self,
@@ -113,32 +182,77 @@ class MinusWordsExtractor:
                 'group_b_minus': [...]   # Минус-слова для группы B
             }
         """
-        # Собираем уникальные слова из каждой группы
-        words_a = set()
-        for phrase in group_a_phrases:
-            words_a.update(self._tokenize(phrase.lower()))
+        minus_a, minus_b = self.cross_minus_groups([group_a_phrases, group_b_phrases])
+        return {
+            'group_a_minus': minus_a,  # Для A минусуем слова из B
+            'group_b_minus': minus_b   # Для B минусуем слова из A
+        }
+    
+    def cross_minus_groups(
+        self,
+        groups: Union[Mapping[Any, Sequence[str]], Sequence[Sequence[str]]],
+        max_groups: Optional[int] = None
+    ) -> Union[Dict[Any, List[str]], List[List[str]]]:
+        """
+        Кросс-минусовка сразу для N групп
         
-        words_b = set()
-        for phrase in group_b_phrases:
-            words_b.update(self._tokenize(phrase.lower()))
+        Каждой группе достаются слова других групп, которых нет в ней самой.
+        Все группы токенизируются одним проходом в матрицу группа×слово,
+        поэтому 2000 групп считаются за один раз, а не по парам.
         
-        # Убираем стоп-слова
-        words_a -= self.stop_words
-        words_b -= self.stop_words
+        Args:
+            groups: Фразы групп — словарь {группа: фразы} или список списков
+            max_groups: Брать в минус только слова, встречающиеся не более чем
+                в стольких группах (общие для многих групп слова не разделяют их)
         
-        # Находим уникальные слова каждой группы
-        unique_a = words_a - words_b
-        unique_b = words_b - words_a
+        Returns:
+            Минус-слова каждой группы (по алфавиту) — словарь с теми же ключами
+            или список в порядке групп
+        """
+        keys = list(groups) if isinstance(groups, Mapping) else None
+        group_phrases = [groups[k] for k in keys] if keys is not None else list(groups)
+        if not NUMPY_AVAILABLE:
+            result = self._cross_minus_python(group_phrases, max_groups)
+            return dict(zip(keys, result)) if keys is not None else result
         
-        return {
-            'group_a_minus': sorted(list(unique_b)),  # Для A минусуем слова из B
-            'group_b_minus': sorted(list(unique_a))   # Для B минусуем слова из A
-        }
+        # Строка матрицы — вся группа целиком
+        matrix = self.build_matrix([' '.join(phrases) for phrases in group_phrases])
+        n_terms = len(matrix.vocab)
+        # Уникальные пары группа×слово; в каждой строке id идут по возрастанию
+        pairs = np.unique(matrix.row_ids().astype(np.int64) * n_terms + matrix.indices)
+        pair_rows, pair_terms = np.divmod(pairs, n_terms)
+        bounds = np.searchsorted(pair_rows, np.arange(len(group_phrases) + 1))
+        
+        df = np.bincount(pair_terms, minlength=n_terms)
+        eligible = (df > 0) & ~self._vocab_mask(matrix.vocab, self.stop_words)
+        if max_groups is not None:
+            eligible &= df <= max_groups
+        candidates = np.flatnonzero(eligible)
+        vocab = np.array(matrix.vocab, dtype=object)
+        
+        result = [
+            vocab[np.setdiff1d(candidates, pair_terms[bounds[g]:bounds[g + 1]], assume_unique=True)].tolist()
+            for g in range(len(group_phrases))
+        ]
+        return dict(zip(keys, result)) if keys is not None else result
+    
+    def _cross_minus_python(
+        self,
+        group_phrases: List[Sequence[str]],
+        max_groups: Optional[int]
+    ) -> List[List[str]]:
+        group_words = [
+            {w for phrase in phrases for w in self._tokenize(phrase)} - self.stop_words
+            for phrases in group_phrases
+        ]
+        df = Counter(w for words in group_words for w in words)
+        candidates = {w for w, count in df.items() if max_groups is None or count <= max_groups}
+        return [sorted(candidates - words) for words in group_words]
     
     def _tokenize(self, phrase: str) -> List[str]:
         """Разбить фразу на слова"""
         # Удаляем спецсимволы и разбиваем на слова
-        words = re.findall(r'\b[а-яёa-z]+\b', phrase.lower())
+        words = _WORD_RE.findall(phrase.lower())
         return [w for w in words if len(w) > 2]  # Слова длиннее 2 символов
     
     def export_for_direct(
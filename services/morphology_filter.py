@@ -4,15 +4,23 @@ MorphologyFilter - нормализация и фильтрация фраз с
 Версия: 2.0 - полная реализация с морфологией
 """
 from __future__ import annotations
+import atexit
+import json
 import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Union
 
 try:
     import pymorphy2
     _morph = pymorphy2.MorphAnalyzer()
     PYMORPHY_AVAILABLE = True
+    PYMORPHY_VERSION = getattr(pymorphy2, "__version__", "")
 except (ImportError, AttributeError) as e:
     _morph = None
     PYMORPHY_AVAILABLE = False
+    PYMORPHY_VERSION = ""
     import warnings
     warnings.warn(f"pymorphy2 недоступен: {e}. Морфология будет работать в упрощенном режиме.")
 
@@ -27,20 +35,121 @@ STOP_WORDS = {
 }
 
 
+LEMMA_CACHE_SIZE = 200_000  # Сколько лемм держать в памяти (LRU)
+LEMMA_CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "lemma_cache.json"
+
+_SPACES_RE = re.compile(r"\s+")
+_QUOTES_RE = re.compile(r"[\"''""„]")
+
+# Кеш лемм: очищенный токен → нормальная форма. pymorphy2 разбирает слово
+# десятки микросекунд, а мультипликатор гоняет одни и те же сотни слов
+# миллионы раз, поэтому разбор каждого слова делается один раз и
+# сохраняется между сессиями.
+_lemma_cache: "OrderedDict[str, str]" = OrderedDict()
+_lemma_lock = threading.Lock()
+_lemma_loaded = False
+_lemma_dirty = False
+
+
+def _clean_token(tok: str) -> str:
+    return _QUOTES_RE.sub("", tok.strip().lower())
+
+
+def load_lemma_cache(path: Path = LEMMA_CACHE_PATH) -> int:
+    """Загрузить сохранённые леммы. Возвращает число загруженных записей."""
+    global _lemma_loaded
+    with _lemma_lock:
+        _lemma_loaded = True
+        if not PYMORPHY_AVAILABLE or not path.exists():
+            return 0
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            print(f"[MORPH] Кеш лемм не прочитан: {exc}")
+            return 0
+        # Леммы другой версии словарей pymorphy2 могут отличаться
+        if data.get("version") != PYMORPHY_VERSION:
+            return 0
+        lemmas = data.get("lemmas") or {}
+        for tok, lemma in list(lemmas.items())[-LEMMA_CACHE_SIZE:]:
+            _lemma_cache.setdefault(tok, lemma)
+        return len(lemmas)
+
+
+def save_lemma_cache(path: Path = LEMMA_CACHE_PATH) -> bool:
+    """Сохранить кеш лемм на диск (только если появились новые)."""
+    global _lemma_dirty
+    with _lemma_lock:
+        if not _lemma_dirty or not PYMORPHY_AVAILABLE:
+            return False
+        payload = {"version": PYMORPHY_VERSION, "lemmas": dict(_lemma_cache)}
+        _lemma_dirty = False
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+    except OSError as exc:
+        with _lemma_lock:
+            _lemma_dirty = True
+        print(f"[MORPH] Кеш лемм не сохранён: {exc}")
+        return False
+    return True
+
+
+atexit.register(save_lemma_cache)
+
+
+def _lemma(tok: str) -> str:
+    """Нормальная форма очищенного токена (через кеш)."""
+    global _lemma_dirty
+    if not tok or not (PYMORPHY_AVAILABLE and _morph):
+        return tok
+    if not _lemma_loaded:
+        load_lemma_cache()
+    with _lemma_lock:
+        lemma = _lemma_cache.get(tok)
+        if lemma is not None:
+            _lemma_cache.move_to_end(tok)
+            return lemma
+    parsed = _morph.parse(tok)
+    lemma = parsed[0].normal_form if parsed else tok
+    with _lemma_lock:
+        _lemma_cache[tok] = lemma
+        _lemma_dirty = True
+        if len(_lemma_cache) > LEMMA_CACHE_SIZE:
+            _lemma_cache.popitem(last=False)
+    return lemma
+
+
 def normalize_token(tok: str) -> str:
     """Нормализовать токен (приведение к нормальной форме)"""
-    tok = tok.strip().lower()
-    tok = re.sub(r"[\"''""„]", "", tok)
+    return _lemma(_clean_token(tok))
+
+
+def normalize_tokens(tokens: Iterable[str]) -> Dict[str, str]:
+    """
+    Пакетная нормализация: каждый уникальный токен разбирается один раз
     
-    if not tok:
-        return tok
+    Returns:
+        Dict[str, str]: исходный токен → нормальная форма
+    """
+    return {tok: normalize_token(tok) for tok in dict.fromkeys(tokens)}
+
+
+def order_phrase(norm: Sequence[str]) -> str:
+    """Собрать фразу из нормализованных слов: коммерческие глаголы вперёд"""
+    order = []
+    comm_words = [w for w in norm if w in COMM_VERBS]
+    other_words = [w for w in norm if w not in comm_words]
+    
+    order.extend(comm_words)
+    order.extend(other_words)
     
-    if PYMORPHY_AVAILABLE and _morph:
-        parsed = _morph.parse(tok)
-        if parsed:
-            return parsed[0].normal_form
+    phrase = " ".join(order)
+    phrase = _SPACES_RE.sub(" ", phrase).strip()
     
-    return tok
+    return phrase
 
 
 def normalize_phrase(words) -> str:
@@ -53,18 +162,24 @@ def normalize_phrase(words) -> str:
         words = words.split()
     
     norm = [normalize_token(w) for w in words if w and w.lower() not in STOP_WORDS]
+    return order_phrase(norm)
+
+
+def normalize_phrases(phrases: Iterable[Union[str, Sequence[str]]]) -> List[str]:
+    """
+    Пакетная версия normalize_phrase
     
-    order = []
-    comm_words = [w for w in norm if w in COMM_VERBS]
-    other_words = [w for w in norm if w not in comm_words]
-    
-    order.extend(comm_words)
-    order.extend(other_words)
-    
-    phrase = " ".join(order)
-    phrase = re.sub(r"\s+", " ", phrase).strip()
-    
-    return phrase
+    Сначала лемматизируется уникальный словарь всех фраз, затем фразы
+    собираются из готовых лемм — pymorphy2 не вызывается повторно.
+    """
+    prepared = [phrase.split() if isinstance(phrase, str) else list(phrase) for phrase in phrases]
+    lemmas = normalize_tokens(
+        w for words in prepared for w in words if w and w.lower() not in STOP_WORDS
+    )
+    return [
+        order_phrase([lemmas[w] for w in words if w and w.lower() not in STOP_WORDS])
+        for words in prepared
+    ]
 
 
 def is_good_phrase(phrase: str) -> bool:
@@ -9,15 +9,14 @@ import asyncio
 import base64
 import json
 import logging
-import shutil
 import sqlite3
-import tempfile
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
+from urllib.parse import quote
 import threading
 from queue import Queue
 
@@ -34,9 +33,13 @@ except ImportError:  # pragma: no cover - safety fallback
 try:
     from ..core.db import SessionLocal
     from ..core.models import Account
+    from .phrase_coordinator import PhraseCoordinator
+    from . import frequency_cache
 except ImportError:  # pragma: no cover - fallback for scripts
     from core.db import SessionLocal  # type: ignore
     from core.models import Account  # type: ignore
+    from services.phrase_coordinator import PhraseCoordinator  # type: ignore
+    from services import frequency_cache  # type: ignore
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 KEYSET_ROOT = Path(__file__).resolve().parents[1]
@@ -121,95 +124,191 @@ def _decrypt_chrome_value(
         return ""
 
 
-def _extract_profile_cookies(profile_path: Path, logger_obj: logging.Logger) -> List[Dict[str, Any]]:
-    """Вытащить куки из Chrome-профиля на диске и привести в формат Playwright."""
-    candidates = [
-        profile_path / "Default" / "Network" / "Cookies",
-        profile_path / "Default" / "Cookies",
-        profile_path / "Cookies",
-        profile_path / "Network" / "Cookies",
-    ]
-    source_path: Optional[Path] = None
-    for candidate in candidates:
-        if candidate.exists():
-            source_path = candidate
+# Где Chrome хранит базу куки относительно папки профиля
+COOKIE_FILE_CANDIDATES = (
+    Path("Default") / "Network" / "Cookies",
+    Path("Default") / "Cookies",
+    Path("Network") / "Cookies",
+    Path("Cookies"),
+)
+
+# Куки Яндекса — те же, что отбирались всегда: хост содержит "yandex" или ".ya"
+# (id.yandex.ru, oauth.yandex.ru, sso.ya.ru и прочие поддомены авторизации).
+# Отбор идёт в SQL, поэтому строки других сайтов не читаются и не расшифровываются.
+YANDEX_HOST_MARKERS = ("yandex", ".ya")
+
+_COOKIE_COLUMNS = (
+    "host_key, name, value, encrypted_value, path, expires_utc, is_secure, is_httponly, samesite"
+)
+_SAME_SITE_MAP = {0: "None", 1: "Lax", 2: "Strict"}
+_COOKIE_CACHE: Dict[Path, "CookieSnapshot"] = {}
+_COOKIE_FILE_CACHE: Dict[Path, Path] = {}
+_COOKIE_CACHE_LOCK = threading.Lock()
+
+
+def _find_cookie_file(profile_path: Path) -> Optional[Path]:
+    """Файл Cookies профиля; найденное расположение запоминается."""
+    resolved = profile_path.resolve()
+    cached = _COOKIE_FILE_CACHE.get(resolved)
+    if cached is not None and cached.is_file():
+        return cached
+
+    found: Optional[Path] = None
+    for relative in COOKIE_FILE_CANDIDATES:
+        candidate = resolved / relative
+        if candidate.is_file():
+            found = candidate
             break
+    if found is None:
+        # Нестандартные профили Chrome ("Profile 1", ...) лежат на один уровень глубже;
+        # остальное дерево (кэши, расширения) не обходим
+        for pattern in ("*/Network/Cookies", "*/Cookies"):
+            found = next((candidate for candidate in resolved.glob(pattern) if candidate.is_file()), None)
+            if found is not None:
+                break
+    if found is not None:
+        _COOKIE_FILE_CACHE[resolved] = found
+    return found
 
-    if not source_path:
-        # fallback: ищем любой файл Cookies в структуре профиля
+
+def _cookie_file_key(source_path: Path) -> Tuple[Any, ...]:
+    """Ключ снимка: путь, mtime и размер базы и её WAL."""
+    stat = source_path.stat()
+    key: Tuple[Any, ...] = (str(source_path), stat.st_mtime_ns, stat.st_size)
+    wal_path = source_path.with_name(source_path.name + "-wal")
+    try:
+        wal_stat = wal_path.stat()
+    except OSError:
+        return key
+    return key + (wal_stat.st_mtime_ns, wal_stat.st_size)
+
+
+def _yandex_cookie_query() -> Tuple[str, List[str]]:
+    clauses = ["instr(host_key, ?) > 0" for _ in YANDEX_HOST_MARKERS]
+    params = list(YANDEX_HOST_MARKERS)
+    sql = (
+        f"SELECT {_COOKIE_COLUMNS} FROM cookies "
+        f"WHERE ({' OR '.join(clauses)}) AND name != '' "
+        "AND (length(value) > 0 OR length(encrypted_value) > 0)"
+    )
+    return sql, params
+
+
+def _read_cookie_rows(source_path: Path, logger_obj: logging.Logger, profile_name: str) -> Optional[List[tuple]]:
+    """Прочитать строки Яндекса прямо из профиля, без копирования файла."""
+    sql, params = _yandex_cookie_query()
+    base_uri = f"file:{quote(source_path.as_posix(), safe='/:')}"
+    last_error: Optional[Exception] = None
+    # Запущенный Chrome держит блокировку базы — тогда читаем её как неизменяемую
+    for uri in (f"{base_uri}?mode=ro", f"{base_uri}?mode=ro&immutable=1"):
+        try:
+            conn = sqlite3.connect(uri, uri=True, timeout=1.0)
+        except sqlite3.Error as exc:
+            last_error = exc
+            continue
         try:
-            for candidate in profile_path.rglob("Cookies"):
-                if candidate.is_file():
-                    source_path = candidate
-                    break
-        except Exception as exc:  # pragma: no cover - защитный путь
-            logger_obj.debug(f"[{profile_path.name}] Ошибка при поиске Cookies: {exc}")
+            return conn.execute(sql, params).fetchall()
+        except sqlite3.Error as exc:
+            last_error = exc
+        finally:
+            conn.close()
+    logger_obj.error(f"[{profile_name}] Ошибка чтения Cookies: {last_error}")
+    return None
+
+
+class CookieSnapshot:
+    """Строки куки Яндекса одного профиля для версии файла Cookies; значения расшифровываются при первом обращении."""
+
+    def __init__(self, profile_path: Path, source_path: Path, key: Tuple[Any, ...], rows: List[tuple]) -> None:
+        self.profile_path = profile_path
+        self.source_path = source_path
+        self.key = key
+        self.rows = rows
+        self._cookies: Optional[List[Dict[str, Any]]] = None
+        self._lock = threading.Lock()
 
+    def cookies(self, logger_obj: logging.Logger) -> List[Dict[str, Any]]:
+        """Куки в формате Playwright (расшифровываются один раз на снимок)."""
+        with self._lock:
+            if self._cookies is None:
+                self._cookies = self._decrypt(logger_obj)
+            return list(self._cookies)
+
+    def _decrypt(self, logger_obj: logging.Logger) -> List[Dict[str, Any]]:
+        profile_path = self.profile_path
+        master_key: Optional[bytes] = None
+        cookies: List[Dict[str, Any]] = []
+        for host_key, name, value, encrypted_value, path_value, expires_utc, is_secure, is_httponly, same_site in self.rows:
+            if not value and encrypted_value:
+                if master_key is None and (encrypted_value.startswith(b'v10') or encrypted_value.startswith(b'v11')):
+                    master_key = _get_chrome_master_key(profile_path, logger_obj)
+                value = _decrypt_chrome_value(encrypted_value, profile_path, logger_obj, master_key)
+            if not value:
+                continue
+
+            cookie_entry: Dict[str, Any] = {
+                "name": name,
+                "value": value,
+                "domain": host_key if host_key.startswith(".") else f".{host_key}",
+                "path": path_value or "/",
+                "secure": bool(is_secure),
+                "httpOnly": bool(is_httponly),
+            }
+            if expires_utc and expires_utc != 0:
+                # Преобразуем Windows epoch (микросекунды с 1601 г.)
+                expires = int(expires_utc / 1_000_000 - 11644473600)
+                if expires > 0:
+                    cookie_entry["expires"] = expires
+            if same_site in _SAME_SITE_MAP:
+                cookie_entry["sameSite"] = _SAME_SITE_MAP[same_site]
+            cookies.append(cookie_entry)
+        return cookies
+
+
+def _profile_cookie_snapshot(profile_path: Path, logger_obj: logging.Logger) -> Optional[CookieSnapshot]:
+    """Снимок куки профиля; файл перечитывается, только если он изменился."""
+    source_path = _find_cookie_file(profile_path)
     if not source_path:
         logger_obj.info(f"[{profile_path.name}] Файл Cookies не найден в профиле")
-        return []
-
-    tmp_dir = Path(tempfile.gettempdir())
-    tmp_copy = tmp_dir / f"cookies_{profile_path.name}_{int(time.time())}.db"
+        return None
     try:
-        shutil.copy2(source_path, tmp_copy)
-    except Exception as exc:
-        logger_obj.error(f"[{profile_path.name}] Не удалось скопировать Cookies: {exc}")
-        return []
+        key = _cookie_file_key(source_path)
+    except OSError as exc:
+        logger_obj.error(f"[{profile_path.name}] Не удалось прочитать Cookies: {exc}")
+        return None
 
-    cookies: List[Dict[str, Any]] = []
-    try:
-        conn = sqlite3.connect(tmp_copy)
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT host_key, name, value, encrypted_value, path, expires_utc,
-                   is_secure, is_httponly, samesite
-            FROM cookies
-            """
-        )
-        rows = cursor.fetchall()
-        conn.close()
-    except Exception as exc:
-        logger_obj.error(f"[{profile_path.name}] Ошибка чтения Cookies: {exc}")
-        tmp_copy.unlink(missing_ok=True)
+    with _COOKIE_CACHE_LOCK:
+        snapshot = _COOKIE_CACHE.get(source_path)
+    if snapshot is not None and snapshot.key == key:
+        return snapshot
+
+    rows = _read_cookie_rows(source_path, logger_obj, profile_path.name)
+    if rows is None:
+        return None
+    snapshot = CookieSnapshot(profile_path, source_path, key, rows)
+    with _COOKIE_CACHE_LOCK:
+        _COOKIE_CACHE[source_path] = snapshot
+    return snapshot
+
+
+def _extract_profile_cookies(profile_path: Path, logger_obj: logging.Logger) -> List[Dict[str, Any]]:
+    """Вытащить куки из Chrome-профиля на диске и привести в формат Playwright."""
+    snapshot = _profile_cookie_snapshot(profile_path, logger_obj)
+    if snapshot is None:
         return []
+    return snapshot.cookies(logger_obj)
 
-    master_key = _get_chrome_master_key(profile_path, logger_obj)
 
-    for host_key, name, value, encrypted_value, path_value, expires_utc, is_secure, is_httponly, same_site in rows:
-        if not name:
-            continue
-        if not value and encrypted_value:
-            if master_key is None and (encrypted_value.startswith(b'v10') or encrypted_value.startswith(b'v11')):
-                master_key = _get_chrome_master_key(profile_path, logger_obj)
-            value = _decrypt_chrome_value(encrypted_value, profile_path, logger_obj, master_key)
-        if not value:
-            continue
-        host = host_key or ""
-        if "yandex" not in host and ".ya" not in host:
-            continue
+def count_profile_cookies(profile_path: Path, logger_obj: logging.Logger) -> Optional[int]:
+    """
+    Сколько куки Яндекса профиля удаётся расшифровать. None, если прочитать не удалось.
+
+    Расшифровка запоминается в снимке, поэтому загрузка этих куки в браузер
+    после подсчёта файл уже не читает.
+    """
+    snapshot = _profile_cookie_snapshot(profile_path, logger_obj)
+    return len(snapshot.cookies(logger_obj)) if snapshot is not None else None
 
-        cookie_entry: Dict[str, Any] = {
-            "name": name,
-            "value": value,
-            "domain": host_key if host_key.startswith(".") else f".{host_key}",
-            "path": path_value or "/",
-            "secure": bool(is_secure),
-            "httpOnly": bool(is_httponly),
-        }
-        if expires_utc and expires_utc != 0:
-            # Преобразуем Windows epoch (микросекунды с 1601 г.)
-            expires = int(expires_utc / 1_000_000 - 11644473600)
-            if expires > 0:
-                cookie_entry["expires"] = expires
-        same_site_map = {0: "None", 1: "Lax", 2: "Strict"}
-        if same_site in same_site_map:
-            cookie_entry["sameSite"] = same_site_map[same_site]
-        cookies.append(cookie_entry)
-
-    tmp_copy.unlink(missing_ok=True)
-    return cookies
 
 async def load_cookies_from_db_to_context(
     context: BrowserContext,
@@ -330,6 +429,7 @@ class ParsingTask:
     results: Dict[str, Any] = field(default_factory=dict)
     error_message: Optional[str] = None
     progress: int = 0
+    coordinator: Optional[PhraseCoordinator] = field(default=None, repr=False)
     
     def to_dict(self) -> dict:
         """Конвертация в словарь для сериализации"""
@@ -359,6 +459,7 @@ class MultiParserManager:
         """
         self.max_workers = max_workers
         self.tasks: Dict[str, ParsingTask] = {}
+        self.cached_results: Dict[str, int] = {}
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
         self.results_queue = Queue()
         self.log_queue = Queue()
@@ -377,7 +478,8 @@ class MultiParserManager:
         profile_email: str,
         profile_path: str,
         proxy_uri: Optional[str],
-        phrases: List[str]
+        phrases: List[str],
+        coordinator: Optional[PhraseCoordinator] = None,
     ) -> ParsingTask:
         """Создать новую задачу парсинга"""
         task_id = f"{profile_email}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -387,7 +489,8 @@ class MultiParserManager:
             profile_email=profile_email,
             profile_path=Path(profile_path),
             proxy_uri=proxy_uri,
-            phrases=phrases
+            phrases=phrases,
+            coordinator=coordinator,
         )
         
         with self._lock:
@@ -396,19 +499,47 @@ class MultiParserManager:
         logger.info(f"Created task {task_id} for {profile_email} with {len(phrases)} phrases")
         return task
         
-    def submit_tasks(self, profiles: List[Dict], phrases: List[str]) -> List[str]:
+    def submit_tasks(
+        self,
+        profiles: List[Dict],
+        phrases: List[str],
+        force_refresh: bool = False,
+    ) -> List[str]:
         """
-        Отправить задачи на выполнение
-        
+        Отправить задачи на выполнение.
+
+        Фразы не копируются в каждый профиль: все задачи берут их порциями
+        из одного PhraseCoordinator, а хвосты упавших или отстающих
+        профилей перераспределяются между живыми.
+
+        Фразы, уже собранные ранее (кеш частотностей), в работу не попадают
+        и возвращаются через merge_results.
+
         Args:
             profiles: Список профилей с данными
             phrases: Список фраз для парсинга
+            force_refresh: игнорировать кеш частотностей
             
         Returns:
             Список task_id созданных задач
         """
         task_ids = []
         futures = {}
+
+        pending = list(phrases)
+        try:
+            cached, pending = frequency_cache.split_cached(phrases, force_refresh=force_refresh)
+        except Exception as exc:
+            cached = {}
+            self._log(f"Frequency cache unavailable: {exc}", level="ERROR")
+        if cached:
+            with self._lock:
+                self.cached_results.update(cached)
+            self._log(f"Taken from frequency cache: {len(cached)}, to parse: {len(pending)}")
+        if not pending:
+            return task_ids
+
+        coordinator = PhraseCoordinator(pending)
         
         for profile in profiles:
             # Создаем задачу
@@ -416,7 +547,8 @@ class MultiParserManager:
                 profile_email=profile['email'],
                 profile_path=profile['profile_path'],
                 proxy_uri=profile.get('proxy'),
-                phrases=phrases
+                phrases=pending,
+                coordinator=coordinator,
             )
             task_ids.append(task.task_id)
             
@@ -458,7 +590,10 @@ class MultiParserManager:
                 if str(turbo_path) not in sys.path:
                     sys.path.insert(0, str(turbo_path))
                     
-                from turbo_parser_10tabs import turbo_parser_10tabs
+                try:
+                    from turbo_parser_improved import turbo_parser_10tabs
+                except ImportError:
+                    from turbo_parser_10tabs import turbo_parser_10tabs
                 
                 # Запускаем парсинг
                 results = loop.run_until_complete(
@@ -468,6 +603,7 @@ class MultiParserManager:
                         phrases=task.phrases,
                         headless=False,
                         proxy_uri=task.proxy_uri,
+                        coordinator=task.coordinator,
                     )
                 )
                 
@@ -688,6 +824,11 @@ class MultiParserManager:
         merged = {}
         
         with self._lock:
+            for phrase, freq in self.cached_results.items():
+                merged[phrase] = {
+                    'profiles': {'cache': freq},
+                    'total': {'ws': int(freq), 'qws': 0, 'bws': 0},
+                }
             for task_id in task_ids:
                 if task_id in self.tasks:
                     task = self.tasks[task_id]
@@ -0,0 +1,310 @@
+"""Сетевая политика контекстов браузера парсеров.
+
+Парсерам Wordstat нужны документ, скрипты и ответы ``/wordstat/api``; картинки,
+шрифты, видео, счётчики Метрики и реклама только расходуют трафик платного
+прокси и задерживают готовность страницы. Политика вешается одним
+``context.route("**/*", ...)`` и обрывает такие запросы, остальные передаёт
+дальше через ``route.fallback()`` — собственные обработчики парсеров
+(например, подстановка региона в ``/wordstat/api``) продолжают работать.
+
+Настройки берутся из ключа ``network_policy`` в ``config/browser_settings.json``::
+
+    "network_policy": {
+        "enabled": true,
+        "block_resource_types": ["image", "media", "font"],
+        "block_hosts": ["mc.yandex.ru"],
+        "allow_patterns": ["captcha"]
+    }
+
+Пока в контексте есть хоть один ``route``, Playwright отключает HTTP-кэш, и
+скрипты со стилями качаются через прокси на каждой навигации. Поэтому
+``install_policy`` — для контекстов, где ``route`` и так стоит (подстановка
+региона в TurboParser). Остальным браузерам блокировку по шаблонам адресов
+делает сам Chrome через CDP ``Network.setBlockedURLs``, кэш при этом работает:
+``install_blocklist`` (асинхронный API, со счётчиками по ``requestfailed``) и
+``block_urls_sync`` (браузеры services.browser_factory).
+
+Сэкономленный трафик оценивается по типичному размеру запроса каждого вида:
+оборванный запрос не скачивается, и его настоящий размер неизвестен.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+__all__ = [
+    "NetworkPolicy",
+    "PolicyStats",
+    "block_urls",
+    "block_urls_sync",
+    "install_blocklist",
+    "install_policy",
+    "load_policy",
+]
+
+SETTINGS_PATH = Path(__file__).resolve().parents[1] / "config" / "browser_settings.json"
+
+DEFAULT_BLOCK_RESOURCE_TYPES = ("image", "media", "font")
+
+# Счётчики, реклама и вебвизор (блокируются вместе с поддоменами)
+DEFAULT_BLOCK_HOSTS = (
+    "mc.yandex.ru",
+    "mc.yandex.com",
+    "mc.webvisor.org",
+    "mc.webvisor.com",
+    "an.yandex.ru",
+    "yabs.yandex.ru",
+    "adfox.ru",
+    "adfox.yandex.ru",
+    "awaps.yandex.net",
+    "googletagmanager.com",
+    "google-analytics.com",
+    "doubleclick.net",
+    "top-fwz1.mail.ru",
+    "counter.yadro.ru",
+)
+
+# Никогда не блокируются: API Wordstat, капча (её картинку решают в окне) и авторизация
+DEFAULT_ALLOW_PATTERNS = ("/wordstat/api", "captcha", "passport.yandex")
+
+# Типичный размер запроса, по которому оценивается сэкономленный трафик (байт)
+ESTIMATED_BYTES = {
+    "image": 25_000,
+    "media": 250_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "script": 60_000,
+    "tracker": 8_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+# Расширения адресов по типам ресурсов — для блокировки на стороне браузера, где типа запроса не видно
+URL_SUFFIXES = {
+    "image": (".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico"),
+    "font": (".woff", ".woff2", ".ttf", ".otf", ".eot"),
+    "media": (".mp4", ".webm", ".mp3", ".ogg", ".m3u8"),
+}
+
+_INSTALLED_ATTR = "_keyset_network_policy"
+_BLOCKED_ERROR = "ERR_BLOCKED_BY_CLIENT"
+
+
+@dataclass(frozen=True)
+class NetworkPolicy:
+    """Какие запросы контекста обрывать."""
+
+    enabled: bool = True
+    block_resource_types: FrozenSet[str] = frozenset(DEFAULT_BLOCK_RESOURCE_TYPES)
+    block_hosts: Tuple[str, ...] = DEFAULT_BLOCK_HOSTS
+    allow_patterns: Tuple[str, ...] = DEFAULT_ALLOW_PATTERNS
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NetworkPolicy":
+        def _strings(key: str, default: Iterable[str]) -> Tuple[str, ...]:
+            value = data.get(key)
+            if not isinstance(value, list):
+                return tuple(default)
+            return tuple(str(item).strip().lower() for item in value if str(item).strip())
+
+        return cls(
+            enabled=bool(data.get("enabled", True)),
+            block_resource_types=frozenset(_strings("block_resource_types", DEFAULT_BLOCK_RESOURCE_TYPES)),
+            block_hosts=_strings("block_hosts", DEFAULT_BLOCK_HOSTS),
+            allow_patterns=_strings("allow_patterns", DEFAULT_ALLOW_PATTERNS),
+        )
+
+    def _blocked_host(self, host: str) -> bool:
+        for blocked in self.block_hosts:
+            if host == blocked or host.endswith("." + blocked):
+                return True
+        return False
+
+    def decide(self, url: str, resource_type: str) -> Optional[str]:
+        """Вид блокировки запроса (тип ресурса или ``tracker``) либо None — пропустить."""
+        lowered = url.lower()
+        if not lowered.startswith(("http://", "https://")):
+            return None
+        if any(pattern in lowered for pattern in self.allow_patterns):
+            return None
+        if self.block_hosts and self._blocked_host(urlsplit(lowered).hostname or ""):
+            return "tracker"
+        if resource_type in self.block_resource_types:
+            return resource_type
+        return None
+
+    def blocked_url_patterns(self) -> List[str]:
+        """Шаблоны для ``Network.setBlockedURLs``: хосты счётчиков и расширения файлов."""
+        patterns: List[str] = []
+        for host in self.block_hosts:
+            patterns += [f"*://{host}/*", f"*://*.{host}/*"]
+        for resource_type in sorted(self.block_resource_types):
+            for suffix in URL_SUFFIXES.get(resource_type, ()):
+                patterns += [f"*{suffix}", f"*{suffix}?*"]
+        return patterns
+
+
+@dataclass
+class PolicyStats:
+    """Счётчики политики за один запуск парсера."""
+
+    allowed: int = 0
+    blocked: Dict[str, int] = field(default_factory=dict)
+
+    def count(self, kind: Optional[str]) -> None:
+        if kind is None:
+            self.allowed += 1
+        else:
+            self.blocked[kind] = self.blocked.get(kind, 0) + 1
+
+    def reset(self) -> None:
+        self.allowed = 0
+        self.blocked = {}
+
+    @property
+    def blocked_total(self) -> int:
+        return sum(self.blocked.values())
+
+    @property
+    def bytes_saved(self) -> int:
+        """Оценка сэкономленного трафика (байт)."""
+        return sum(ESTIMATED_BYTES.get(kind, DEFAULT_ESTIMATED_BYTES) * count for kind, count in self.blocked.items())
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "allowed": self.allowed,
+            "blocked": dict(self.blocked),
+            "blocked_total": self.blocked_total,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def summary(self) -> str:
+        details = ", ".join(f"{kind} {count}" for kind, count in sorted(self.blocked.items(), key=lambda kv: -kv[1]))
+        megabytes = self.bytes_saved / (1024 * 1024)
+        text = f"заблокировано {self.blocked_total} из {self.blocked_total + self.allowed} запросов"
+        if details:
+            text += f" ({details})"
+        return f"{text}, сэкономлено ≈{megabytes:.1f} МБ"
+
+
+def load_policy(path: Path = SETTINGS_PATH) -> NetworkPolicy:
+    """Политика из настроек браузера (по умолчанию — встроенная)."""
+    try:
+        settings = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return NetworkPolicy()
+    data = settings.get("network_policy") if isinstance(settings, dict) else None
+    return NetworkPolicy.from_dict(data) if isinstance(data, dict) else NetworkPolicy()
+
+
+def _installed(context: Any) -> Optional[PolicyStats]:
+    stats = getattr(context, _INSTALLED_ATTR, None)
+    if stats is not None:
+        # Контекст из пула: обработчик уже стоит, счётчики начинаются заново
+        stats.reset()
+    return stats
+
+
+async def install_policy(context: Any, policy: Optional[NetworkPolicy] = None) -> Optional[PolicyStats]:
+    """
+    Повесить политику на асинхронный BrowserContext обработчиком ``route``
+
+    Отключает HTTP-кэш контекста (см. описание модуля) — только для контекстов,
+    где ``route`` уже нужен по другой причине.
+
+    Returns:
+        счётчики запуска; None, если политика выключена
+    """
+    policy = policy or load_policy()
+    if not policy.enabled:
+        return None
+    stats = _installed(context)
+    if stats is not None:
+        return stats
+    stats = PolicyStats()
+
+    async def handler(route, request) -> None:
+        kind = policy.decide(request.url, request.resource_type)
+        stats.count(kind)
+        if kind is None:
+            await route.fallback()
+        else:
+            await route.abort("blockedbyclient")
+
+    await context.route("**/*", handler)
+    setattr(context, _INSTALLED_ATTR, stats)
+    return stats
+
+
+async def block_urls(page: Any, policy: NetworkPolicy, stats: Optional[PolicyStats] = None) -> int:
+    """
+    Запретить запросы вкладки через CDP ``Network.setBlockedURLs`` (асинхронный API)
+
+    Returns:
+        число установленных шаблонов (0 — вкладка уже настроена)
+    """
+    if getattr(page, _INSTALLED_ATTR, False):
+        return 0
+    setattr(page, _INSTALLED_ATTR, True)
+    if stats is not None:
+        def on_failed(request) -> None:
+            if _BLOCKED_ERROR in (request.failure or ""):
+                stats.count(policy.decide(request.url, request.resource_type) or request.resource_type)
+
+        page.on("requestfailed", on_failed)
+        page.on("requestfinished", lambda request: stats.count(None))
+    patterns = policy.blocked_url_patterns()
+    session = await page.context.new_cdp_session(page)
+    await session.send("Network.enable")
+    await session.send("Network.setBlockedURLs", {"urls": patterns})
+    return len(patterns)
+
+
+async def install_blocklist(context: Any, policy: Optional[NetworkPolicy] = None) -> Optional[PolicyStats]:
+    """
+    Блокировка по шаблонам адресов на всех вкладках контекста, включая новые
+
+    В отличие от install_policy не отключает HTTP-кэш. Ресурсы узнаются только
+    по расширению адреса, исключений ``allow_patterns`` нет (капча и API
+    Wordstat под шаблоны и так не попадают).
+
+    Returns:
+        счётчики запуска; None, если политика выключена
+    """
+    policy = policy or load_policy()
+    if not policy.enabled:
+        return None
+    stats = _installed(context)
+    if stats is not None:
+        return stats
+    stats = PolicyStats()
+    setattr(context, _INSTALLED_ATTR, stats)
+    for page in list(context.pages):
+        await block_urls(page, policy, stats)
+    context.on("page", lambda page: asyncio.ensure_future(block_urls(page, policy, stats)))
+    return stats
+
+
+def block_urls_sync(page: Any, policy: Optional[NetworkPolicy] = None) -> int:
+    """
+    Запретить запросы самому Chrome через CDP ``Network.setBlockedURLs`` (синхронный API)
+
+    Обработчик ``route`` синхронного Playwright выполняется только пока поток
+    вызывает Playwright, а браузеры services.browser_factory живут сами по себе
+    (CDP, ручной вход), поэтому здесь блокирует браузер по шаблонам адресов.
+    Счётчиков и исключений ``allow_patterns`` в этом режиме нет.
+
+    Returns:
+        число установленных шаблонов (0 — политика выключена)
+    """
+    policy = policy or load_policy()
+    if not policy.enabled:
+        return 0
+    patterns = policy.blocked_url_patterns()
+    session = page.context.new_cdp_session(page)
+    session.send("Network.enable")
+    session.send("Network.setBlockedURLs", {"urls": patterns})
+    return len(patterns)
@@ -0,0 +1,325 @@
+"""Долговечные задания парсинга с контрольными точками в SQLite.
+
+Задание — строка в ``parse_jobs`` и по строке в ``parse_job_items`` на каждую
+пару фраза × регион со статусом (queued/running/ok/no_data/error), числом
+попыток и частотностью. Прогресс пишется порциями по ходу работы
+(``JobCheckpoint``), поэтому после падения Chrome или перезагрузки задание
+продолжается с несобранных пар, а не с начала.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    from ..core.db import ensure_schema, get_db_connection
+except ImportError:
+    from core.db import ensure_schema, get_db_connection
+
+__all__ = [
+    "JobCheckpoint",
+    "create_job",
+    "finish_job",
+    "get_job",
+    "job_items",
+    "job_phrases",
+    "latest_unfinished_job",
+    "pending_items",
+]
+
+ITEM_STATUSES = ("queued", "running", "ok", "no_data", "error")
+DONE_STATUSES = ("ok", "no_data")
+FLUSH_EVERY = 50  # Записывать прогресс не реже чем раз в столько событий
+FLUSH_INTERVAL = 5.0  # ... и не реже чем раз в столько секунд
+
+_schema_ready = False
+
+Pair = Tuple[str, int]
+
+
+def _ensure_ready() -> None:
+    global _schema_ready
+    if not _schema_ready:
+        ensure_schema()
+        _schema_ready = True
+
+
+def _now() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _pair(item: Hashable, default_region: int = 225) -> Pair:
+    if isinstance(item, tuple):
+        return str(item[0]), int(item[1])
+    return str(item), int(default_region)
+
+
+def create_job(
+    phrases: Iterable[str],
+    regions: Mapping[int, str],
+    *,
+    modes: Sequence[str] = ("ws",),
+    session_id: Optional[str] = None,
+    params: Optional[Mapping[str, Any]] = None,
+) -> int:
+    """
+    Создать задание: по строке на каждую пару фраза × регион в статусе queued.
+
+    Returns:
+        id задания
+    """
+    _ensure_ready()
+    unique = [phrase for phrase in dict.fromkeys((p or "").strip() for p in phrases) if phrase]
+    region_map = {int(rid): str(name) for rid, name in regions.items()}
+    now = _now()
+    with get_db_connection() as conn:
+        cursor = conn.execute(
+            "INSERT INTO parse_jobs (session_id, status, modes, regions, params, total, created_at, updated_at) "
+            "VALUES (?, 'running', ?, ?, ?, ?, ?, ?)",
+            (
+                session_id,
+                json.dumps(list(modes)),
+                json.dumps(region_map, ensure_ascii=False),
+                json.dumps(dict(params or {}), ensure_ascii=False),
+                len(unique) * len(region_map),
+                now,
+                now,
+            ),
+        )
+        job_id = int(cursor.lastrowid)
+        conn.executemany(
+            "INSERT INTO parse_job_items (job_id, phrase, region, updated_at) VALUES (?, ?, ?, ?)",
+            ((job_id, phrase, region, now) for region in region_map for phrase in unique),
+        )
+    return job_id
+
+
+def _job_row(row) -> Dict[str, Any]:
+    job = dict(row)
+    job["modes"] = json.loads(job.get("modes") or "[]")
+    job["regions"] = {int(rid): name for rid, name in json.loads(job.get("regions") or "{}").items()}
+    job["params"] = json.loads(job.get("params") or "{}")
+    return job
+
+
+def get_job(job_id: int) -> Optional[Dict[str, Any]]:
+    """Задание с разобранными modes/regions/params и счётчиками по статусам."""
+    _ensure_ready()
+    with get_db_connection() as conn:
+        row = conn.execute("SELECT * FROM parse_jobs WHERE id = ?", (int(job_id),)).fetchone()
+        if row is None:
+            return None
+        counts = conn.execute(
+            "SELECT status, COUNT(*) FROM parse_job_items WHERE job_id = ? GROUP BY status",
+            (int(job_id),),
+        ).fetchall()
+    job = _job_row(row)
+    job["counts"] = {status: int(count) for status, count in counts}
+    job["done"] = sum(job["counts"].get(status, 0) for status in DONE_STATUSES)
+    return job
+
+
+def latest_unfinished_job() -> Optional[Dict[str, Any]]:
+    """Последнее задание, которое не дошло до конца (упало, остановлено)."""
+    _ensure_ready()
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT id FROM parse_jobs WHERE status NOT IN ('done', 'cancelled') ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+    return get_job(row[0]) if row is not None else None
+
+
+def pending_items(job_id: int) -> List[Pair]:
+    """
+    Несобранные пары задания (queued, running, error).
+
+    ``running`` остаётся после падения: такие пары тоже собираются заново.
+    """
+    _ensure_ready()
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            "SELECT phrase, region FROM parse_job_items "
+            "WHERE job_id = ? AND status NOT IN ('ok', 'no_data') ORDER BY rowid",
+            (int(job_id),),
+        ).fetchall()
+    return [(row["phrase"], int(row["region"])) for row in rows]
+
+
+def job_phrases(job_id: int) -> List[str]:
+    """Все фразы задания в исходном порядке."""
+    _ensure_ready()
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            "SELECT phrase FROM parse_job_items WHERE job_id = ? GROUP BY phrase ORDER BY MIN(rowid)",
+            (int(job_id),),
+        ).fetchall()
+    return [row["phrase"] for row in rows]
+
+
+def job_items(job_id: int, statuses: Sequence[str] = DONE_STATUSES) -> List[Dict[str, Any]]:
+    """Строки задания в заданных статусах (по умолчанию — собранные)."""
+    _ensure_ready()
+    placeholders = ", ".join("?" * len(statuses))
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            "SELECT phrase, region, status, freq, attempts, profile, error FROM parse_job_items "
+            f"WHERE job_id = ? AND status IN ({placeholders}) ORDER BY rowid",
+            (int(job_id), *statuses),
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def finish_job(job_id: int, status: str = "done") -> None:
+    """
+    Закрыть задание; ``done`` ставится, только если несобранных пар не осталось.
+
+    ``cancelled`` — пользователь отказался продолжать, задание больше не предлагается.
+    """
+    _ensure_ready()
+    with get_db_connection() as conn:
+        left = conn.execute(
+            "SELECT COUNT(*) FROM parse_job_items WHERE job_id = ? AND status NOT IN ('ok', 'no_data')",
+            (int(job_id),),
+        ).fetchone()[0]
+        if status == "done" and left:
+            status = "interrupted"
+        now = _now()
+        conn.execute(
+            "UPDATE parse_jobs SET status = ?, updated_at = ?, finished_at = ? WHERE id = ?",
+            (status, now, now if status == "done" else None, int(job_id)),
+        )
+
+
+class JobCheckpoint:
+    """
+    Журнал прогресса задания для PhraseCoordinator.
+
+    Координатор сообщает о каждом claim/report, журнал копит изменения
+    и записывает их одной транзакцией раз в ``flush_every`` событий
+    или ``flush_interval`` секунд.
+    """
+
+    def __init__(
+        self,
+        job_id: int,
+        *,
+        default_region: int = 225,
+        flush_every: int = FLUSH_EVERY,
+        flush_interval: float = FLUSH_INTERVAL,
+    ) -> None:
+        self.job_id = int(job_id)
+        self.default_region = default_region
+        self.flush_every = max(1, int(flush_every))
+        self.flush_interval = flush_interval
+        self._running: Dict[Pair, str] = {}
+        self._done: Dict[Pair, Tuple[str, Optional[int], str]] = {}
+        self._released: Dict[Pair, Tuple[str, Optional[str]]] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def claimed(self, worker_id: str, item: Hashable) -> None:
+        pair = _pair(item, self.default_region)
+        with self._lock:
+            self._running[pair] = worker_id
+        self._maybe_flush()
+
+    def reported(self, worker_id: str, item: Hashable, value: Any, status: str) -> None:
+        pair = _pair(item, self.default_region)
+        db_status = "ok" if str(status).upper() == "OK" else "no_data"
+        try:
+            freq = int(value) if value is not None else None
+        except (TypeError, ValueError):
+            freq = None
+        with self._lock:
+            self._released.pop(pair, None)
+            self._done[pair] = (db_status, freq, worker_id)
+        self._maybe_flush()
+
+    def released(self, worker_id: str, items: Iterable[Hashable], reason: str) -> None:
+        """
+        Пары выбывшего профиля вернулись в пул: error при сбое, иначе queued.
+
+        Среди них может быть серия no_data деградировавшего профиля — такие
+        пары тоже снова ждут сбора.
+        """
+        failed = str(reason).startswith("error")
+        with self._lock:
+            for item in items:
+                pair = _pair(item, self.default_region)
+                self._running.pop(pair, None)
+                self._done.pop(pair, None)
+                self._released[pair] = ("error", str(reason)) if failed else ("queued", None)
+        self.flush()
+
+    def record_cached(self, values: Mapping[Pair, int]) -> None:
+        """Пары, взятые из кеша частотностей, сразу отмечаются собранными."""
+        with self._lock:
+            for pair, value in values.items():
+                self._done[_pair(pair, self.default_region)] = ("ok", int(value), "кеш")
+        self.flush()
+
+    def _maybe_flush(self) -> None:
+        with self._lock:
+            pending = len(self._running) + len(self._done) + len(self._released)
+            due = pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Записать накопленный прогресс одной транзакцией."""
+        with self._flush_lock:
+            with self._lock:
+                running, self._running = self._running, {}
+                done, self._done = self._done, {}
+                released, self._released = self._released, {}
+                self._last_flush = time.monotonic()
+            if not running and not done and not released:
+                return
+            now = _now()
+            try:
+                _ensure_ready()
+                with get_db_connection() as conn:
+                    conn.executemany(
+                        "UPDATE parse_job_items SET status = 'running', attempts = attempts + 1, "
+                        "profile = ?, updated_at = ? "
+                        "WHERE job_id = ? AND phrase = ? AND region = ? AND status NOT IN ('ok', 'no_data')",
+                        (
+                            (worker_id, now, self.job_id, phrase, region)
+                            for (phrase, region), worker_id in running.items()
+                        ),
+                    )
+                    conn.executemany(
+                        "UPDATE parse_job_items SET status = ?, freq = ?, profile = ?, error = NULL, "
+                        "attempts = MAX(attempts, 1), updated_at = ? "
+                        "WHERE job_id = ? AND phrase = ? AND region = ?",
+                        (
+                            (status, freq, worker_id, now, self.job_id, phrase, region)
+                            for (phrase, region), (status, freq, worker_id) in done.items()
+                        ),
+                    )
+                    conn.executemany(
+                        "UPDATE parse_job_items SET status = ?, error = ?, updated_at = ? "
+                        "WHERE job_id = ? AND phrase = ? AND region = ? AND status != 'ok'",
+                        (
+                            (status, error, now, self.job_id, phrase, region)
+                            for (phrase, region), (status, error) in released.items()
+                        ),
+                    )
+                    conn.execute(
+                        "UPDATE parse_jobs SET updated_at = ? WHERE id = ?",
+                        (now, self.job_id),
+                    )
+            except Exception as exc:
+                # Не теряем прогресс: вернём его в буфер до следующей попытки
+                with self._lock:
+                    for pair, worker_id in running.items():
+                        self._running.setdefault(pair, worker_id)
+                    for pair, entry in done.items():
+                        self._done.setdefault(pair, entry)
+                    for pair, entry in released.items():
+                        self._released.setdefault(pair, entry)
+                print(f"[JOBS] Не удалось сохранить прогресс задания {self.job_id}: {exc}")
@@ -0,0 +1,284 @@
+"""Общий координатор фраз для нескольких профилей.
+
+Один набор фраз делится между всеми живыми профилями небольшими порциями.
+Профиль берёт порцию (lease), отмечает фразу перед запросом (claim) и
+сообщает результат (report). Если профиль упал, ловит капчу или отстаёт,
+его незавершённые фразы возвращаются в общий пул и достаются остальным.
+
+Координатор потокобезопасен: им пользуются и корутины одного event loop
+(MultiParsingWorker), и отдельные потоки (MultiParserManager).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Hashable, Iterable, List, Optional, Set
+
+__all__ = ["PhraseCoordinator", "WorkerState"]
+
+STATUS_OK = "OK"
+STATUS_NO_DATA = "NO_DATA"
+
+
+def _clean_item(item: Hashable) -> Optional[Hashable]:
+    """Фраза без пробелов по краям; пустая фраза (или пара с пустой фразой) — None."""
+    if isinstance(item, str):
+        return item.strip() or None
+    if isinstance(item, tuple) and item and isinstance(item[0], str):
+        phrase = item[0].strip()
+        return (phrase, *item[1:]) if phrase else None
+    return item
+
+
+@dataclass
+class WorkerState:
+    """Состояние одного профиля внутри координатора."""
+
+    worker_id: str
+    leased: Set[Hashable] = field(default_factory=set)
+    running: Set[Hashable] = field(default_factory=set)
+    done: int = 0
+    failures_in_row: int = 0
+    # Фразы текущей серии NO_DATA: при выводе профиля они собираются заново
+    failed_in_row: List[Hashable] = field(default_factory=list)
+    alive: bool = True
+    reason: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        return {
+            "worker_id": self.worker_id,
+            "alive": self.alive,
+            "reason": self.reason,
+            "done": self.done,
+            "leased": len(self.leased),
+            "running": len(self.running),
+            "speed": self.done / elapsed,
+        }
+
+
+class PhraseCoordinator:
+    """Раздаёт фразы живым профилям и перераспределяет хвосты."""
+
+    def __init__(
+        self,
+        items: Iterable[Hashable],
+        *,
+        shard_size: int = 10,
+        max_failures_in_row: int = 5,
+        checkpoint: Optional[Any] = None,
+    ) -> None:
+        """
+        Args:
+            items: фразы (или любые хешируемые задания, например пары фраза×регион);
+                пустые фразы пропускаются, у остальных обрезаются пробелы
+            shard_size: размер порции по умолчанию
+            max_failures_in_row: после стольких NO_DATA подряд профиль
+                считается деградировавшим (капча/бан) и выводится из работы
+            checkpoint: журнал прогресса (services.parse_jobs.JobCheckpoint):
+                получает claim/report/возвраты фраз, чтобы задание можно было
+                продолжить после падения
+        """
+        self._lock = threading.Lock()
+        cleaned = (_clean_item(item) for item in items)
+        self._pending: Deque[Hashable] = deque(dict.fromkeys(item for item in cleaned if item is not None))
+        self._total = len(self._pending)
+        self._owner: Dict[Hashable, str] = {}
+        self._workers: Dict[str, WorkerState] = {}
+        self.results: Dict[Hashable, Any] = {}
+        self.statuses: Dict[Hashable, str] = {}
+        self.shard_size = max(1, int(shard_size))
+        self.max_failures_in_row = max(1, int(max_failures_in_row))
+        self.checkpoint = checkpoint
+
+    # ------------------------------------------------------------------ workers
+
+    def register(self, worker_id: str) -> None:
+        """Подключить профиль (повторный вызов оживляет выбывший профиль)."""
+        with self._lock:
+            state = self._workers.get(worker_id)
+            if state is None:
+                self._workers[worker_id] = WorkerState(worker_id)
+            else:
+                state.alive = True
+                state.reason = None
+                state.failures_in_row = 0
+                state.failed_in_row.clear()
+
+    def release(self, worker_id: str, reason: str = "finished") -> int:
+        """
+        Вывести профиль из работы и вернуть его незавершённые фразы в пул.
+
+        Returns:
+            количество возвращённых фраз
+        """
+        with self._lock:
+            returned = self._retire_locked(worker_id, reason)
+        if returned and self.checkpoint is not None:
+            self.checkpoint.released(worker_id, returned, reason)
+        return len(returned)
+
+    def _retire_locked(self, worker_id: str, reason: str, retract_failed: bool = False) -> List[Hashable]:
+        """
+        Args:
+            retract_failed: профиль деградировал — его серия NO_DATA не считается
+                результатом, эти фразы тоже возвращаются в пул
+        """
+        state = self._workers.get(worker_id)
+        if state is None:
+            return []
+        state.alive = False
+        state.reason = reason
+        returned = [item for item in (*state.running, *state.leased) if item not in self.results]
+        if retract_failed:
+            for item in state.failed_in_row:
+                if self.statuses.get(item) == STATUS_NO_DATA:
+                    del self.results[item]
+                    del self.statuses[item]
+                    returned.append(item)
+        state.failed_in_row.clear()
+        for item in returned:
+            self._owner.pop(item, None)
+        # Возвращённые фразы идут в начало пула, чтобы хвост закрылся быстрее
+        self._pending.extendleft(reversed(returned))
+        state.running.clear()
+        state.leased.clear()
+        return returned
+
+    def _alive_count_locked(self) -> int:
+        return sum(1 for state in self._workers.values() if state.alive)
+
+    # -------------------------------------------------------------------- lease
+
+    def lease(self, worker_id: str, limit: Optional[int] = None) -> Optional[List[Hashable]]:
+        """
+        Выдать профилю следующую порцию фраз.
+
+        Returns:
+            список фраз; пустой список — сейчас выдать нечего, но работа
+            у других профилей ещё идёт (стоит подождать); None — всё собрано
+            или профиль выведен из работы.
+        """
+        size = max(1, int(limit or self.shard_size))
+        with self._lock:
+            state = self._workers.get(worker_id)
+            if state is None or not state.alive or self._finished_locked():
+                return None
+
+            batch: List[Hashable] = []
+            while self._pending and len(batch) < size:
+                item = self._pending.popleft()
+                if item in self.results:
+                    continue
+                batch.append(item)
+
+            if not batch:
+                batch = self._steal_locked(worker_id, size)
+
+            for item in batch:
+                self._owner[item] = worker_id
+                state.leased.add(item)
+            return batch
+
+    def _steal_locked(self, thief_id: str, size: int) -> List[Hashable]:
+        """Забрать половину ещё не начатых фраз у самого загруженного профиля."""
+        victim: Optional[WorkerState] = None
+        for state in self._workers.values():
+            if state.worker_id == thief_id or not state.leased:
+                continue
+            if victim is None or len(state.leased) > len(victim.leased):
+                victim = state
+        if victim is None or len(victim.leased) < 2:
+            return []
+        take = min(size, len(victim.leased) // 2)
+        stolen = [victim.leased.pop() for _ in range(take)]
+        return stolen
+
+    def claim(self, worker_id: str, item: Hashable) -> bool:
+        """
+        Отметить, что профиль начинает запрос по фразе.
+
+        False — фраза уже собрана или передана другому профилю, её нужно пропустить.
+        """
+        with self._lock:
+            state = self._workers.get(worker_id)
+            if state is None or not state.alive or item in self.results:
+                return False
+            if self._owner.get(item) != worker_id or item not in state.leased:
+                return False
+            state.leased.discard(item)
+            state.running.add(item)
+        if self.checkpoint is not None:
+            self.checkpoint.claimed(worker_id, item)
+        return True
+
+    def report(self, worker_id: str, item: Hashable, value: Any, status: str = STATUS_OK) -> bool:
+        """
+        Сохранить результат фразы.
+
+        Returns:
+            False, если профиль выведен из работы (слишком много NO_DATA подряд)
+            и должен остановиться.
+        """
+        returned: List[Hashable] = []
+        with self._lock:
+            state = self._workers.get(worker_id)
+            recorded = item not in self.results
+            if recorded:
+                self.results[item] = value
+                self.statuses[item] = status
+            self._owner.pop(item, None)
+            if state is None:
+                alive = False
+            else:
+                state.running.discard(item)
+                state.leased.discard(item)
+                state.done += 1
+
+                if status == STATUS_OK:
+                    state.failures_in_row = 0
+                    state.failed_in_row.clear()
+                else:
+                    state.failures_in_row += 1
+                    if recorded:
+                        state.failed_in_row.append(item)
+                    # Последний живой профиль не выводим — иначе фразы некому собирать
+                    if state.failures_in_row >= self.max_failures_in_row and self._alive_count_locked() > 1:
+                        returned = self._retire_locked(
+                            worker_id,
+                            f"{state.failures_in_row} ответов без данных подряд",
+                            retract_failed=True,
+                        )
+                alive = state.alive
+        if self.checkpoint is not None:
+            self.checkpoint.reported(worker_id, item, value, status)
+            if returned:
+                self.checkpoint.released(worker_id, returned, state.reason or "")
+        return alive
+
+    # ------------------------------------------------------------------ status
+
+    def _finished_locked(self) -> bool:
+        return len(self.results) >= self._total
+
+    @property
+    def finished(self) -> bool:
+        with self._lock:
+            return self._finished_locked()
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+    def progress(self) -> Dict[str, Any]:
+        """Сводка для логов и UI."""
+        with self._lock:
+            return {
+                "total": self._total,
+                "done": len(self.results),
+                "pending": len(self._pending),
+                "workers": [state.to_dict() for state in self._workers.values()],
+            }
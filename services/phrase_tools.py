@@ -12,14 +12,20 @@ independently of the GUI or worker processes.
 """
 from __future__ import annotations
 
+from collections import Counter, deque
 from dataclasses import dataclass, field
 from itertools import product
-from typing import Callable, Iterable, Iterator, Sequence
+from typing import Callable, Iterable, Iterator, Mapping, Sequence
+import hashlib
+import math
+import random
 import re
 
 __all__ = [
     "NormalizationOptions",
     "FilterOptions",
+    "AhoCorasick",
+    "MultiMatcher",
     "generate_combinations",
     "normalize_phrases",
     "filter_phrases",
@@ -81,10 +87,18 @@ class FilterOptions:
 @dataclass(slots=True)
 class CompiledFilter:
     options: FilterOptions
+    _matcher: "MultiMatcher" = field(init=False, repr=False)
+    _stop: set[str] = field(init=False, repr=False)
 
     def __post_init__(self) -> None:
-        self._include = [re.compile(p, re.IGNORECASE) for p in self.options.include_patterns]
-        self._exclude = [re.compile(p, re.IGNORECASE) for p in self.options.exclude_patterns]
+        # All include/exclude patterns share one matcher: literal patterns go
+        # into a single automaton, the rest into one regex per side.
+        self._matcher = MultiMatcher(
+            patterns={
+                "include": self.options.include_patterns,
+                "exclude": self.options.exclude_patterns,
+            }
+        )
         self._stop = {w.lower() for w in self.options.stopwords}
 
     def __call__(self, phrase: str) -> bool:
@@ -99,13 +113,174 @@ class CompiledFilter:
             return False
         if self._stop and phrase.lower() in self._stop:
             return False
-        if self._include and not any(p.search(phrase) for p in self._include):
+        if not self._matcher:
+            return True
+        hits = self._matcher.categories(phrase)
+        if opts.include_patterns and "include" not in hits:
             return False
-        if self._exclude and any(p.search(phrase) for p in self._exclude):
+        if "exclude" in hits:
             return False
         return True
 
 
+# ---------------------------------------------------------------------------
+# Multi-pattern matching
+# ---------------------------------------------------------------------------
+
+
+_REGEX_META = frozenset(".^$*+?{}[]\\|()")
+_NUMBERED_BACKREF = re.compile(r"\\(?:[1-9]|g<\d+>)")
+# Below this many keywords an escaped-literal regex (C speed) beats the
+# pure-Python automaton walk; above it the automaton wins by far.
+AUTOMATON_MIN_KEYWORDS = 64
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton over labelled keywords (substring search).
+
+    Finds every label whose keyword occurs in a text in one pass over the
+    text, independent of the number of keywords.
+    """
+
+    __slots__ = ("_goto", "_fail", "_out", "_always")
+
+    def __init__(self, keywords: Iterable[tuple[str, str]]) -> None:
+        goto: list[dict[str, int]] = [{}]
+        out: list[set[str]] = [set()]
+        always: set[str] = set()
+        for word, label in keywords:
+            if not word:
+                always.add(label)
+                continue
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(set())
+                state = nxt
+            out[state].add(label)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                link = fail[state]
+                while link and ch not in goto[link]:
+                    link = fail[link]
+                fail[nxt] = goto[link].get(ch, 0)
+                out[nxt] |= out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [frozenset(labels) for labels in out]
+        self._always = frozenset(always)
+
+    def __bool__(self) -> bool:
+        return len(self._goto) > 1 or bool(self._always)
+
+    def labels(self, text: str) -> set[str]:
+        """Return the labels of all keywords found in *text*."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set(self._always)
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+class MultiMatcher:
+    """Match a phrase against many categories of keywords and patterns at once.
+
+    Parameters
+    ----------
+    keywords:
+        ``{category: substrings}`` -- compiled into one :class:`AhoCorasick`.
+    patterns:
+        ``{category: regexes}``. Patterns without regex metacharacters are
+        plain substrings and join the automaton; the rest are combined into one
+        regex per category. Fewer than
+        ``AUTOMATON_MIN_KEYWORDS`` substrings in total are matched as escaped
+        regexes instead.
+    ignore_case:
+        Case-insensitive matching (text and keywords are lower-cased).
+    """
+
+    def __init__(
+        self,
+        keywords: Mapping[str, Iterable[str]] | None = None,
+        patterns: Mapping[str, Iterable[str]] | None = None,
+        *,
+        ignore_case: bool = True,
+    ) -> None:
+        self.ignore_case = ignore_case
+        fold = str.lower if ignore_case else (lambda text: text)
+        flags = re.IGNORECASE if ignore_case else 0
+
+        literals: list[tuple[str, str]] = []
+        regexes: dict[str, list[str]] = {}
+        for category, words in (keywords or {}).items():
+            literals.extend((fold(word), category) for word in words)
+        for category, items in (patterns or {}).items():
+            for pattern in items:
+                if _REGEX_META.isdisjoint(pattern):
+                    literals.append((fold(pattern), category))
+                else:
+                    regexes.setdefault(category, []).append(pattern)
+
+        # Small keyword sets: one escaped regex per category over folded text
+        self._literal_regexes: dict[str, re.Pattern[str]] = {}
+        if len(literals) < AUTOMATON_MIN_KEYWORDS:
+            by_category: dict[str, list[str]] = {}
+            for word, category in literals:
+                by_category.setdefault(category, []).append(re.escape(word))
+            self._literal_regexes = {
+                category: re.compile("|".join(words)) for category, words in by_category.items()
+            }
+            literals = []
+        self._automaton = AhoCorasick(literals)
+        # One regex per category answers "does any pattern of this category
+        # match". Numbered backreferences would point at another pattern's
+        # group once joined, so such patterns (and any set with clashing group
+        # names) stay separate.
+        self._category_regexes: dict[str, list[re.Pattern[str]]] = {}
+        for category, items in regexes.items():
+            separate = [p for p in items if _NUMBERED_BACKREF.search(p)]
+            joinable = [p for p in items if not _NUMBERED_BACKREF.search(p)]
+            try:
+                compiled = [re.compile(_join(joinable), flags)] if joinable else []
+            except re.error:
+                compiled = [re.compile(p, flags) for p in joinable]
+            self._category_regexes[category] = compiled + [re.compile(p, flags) for p in separate]
+
+    def __bool__(self) -> bool:
+        return bool(self._automaton) or bool(self._literal_regexes) or bool(self._category_regexes)
+
+    def categories(self, text: str) -> set[str]:
+        """Return every category with a keyword or pattern found in *text*."""
+        folded = text.lower() if self.ignore_case else text
+        found = self._automaton.labels(folded) if self._automaton else set()
+        for category, regex in self._literal_regexes.items():
+            if regex.search(folded):
+                found.add(category)
+        for category, compiled in self._category_regexes.items():
+            if category not in found and any(regex.search(text) for regex in compiled):
+                found.add(category)
+        return found
+
+
+def _join(patterns: Iterable[str]) -> str:
+    return "|".join(f"(?:{p})" for p in patterns)
+
+
 # ---------------------------------------------------------------------------
 # Core helpers
 # ---------------------------------------------------------------------------
@@ -229,9 +404,15 @@ def cluster_phrases(
     *,
     similarity: float = 0.5,
     tokenizer: Callable[[str], Iterable[str]] | None = None,
+    method: str = "index",
+    bands: int = 16,
+    rows: int = 4,
 ) -> list[Cluster]:
     """Group phrases by Jaccard similarity of token sets.
 
+    A phrase joins the first (oldest) cluster that has a member with Jaccard
+    index >= ``similarity``; otherwise it starts a new cluster.
+
     Parameters
     ----------
     phrases:
@@ -240,6 +421,14 @@ def cluster_phrases(
         Minimum Jaccard index (0..1) to join the same cluster.
     tokenizer:
         Optional callable to obtain tokens. Defaults to :func:`tokenize`.
+    method:
+        ``"index"`` (default) looks up candidate members in a token ->
+        member inverted index with prefix filtering; the result is identical
+        to the pairwise scan (``"naive"``). ``"minhash"`` uses MinHash/LSH
+        banding instead: faster for very large, low-threshold inputs but
+        approximate -- a similar member may occasionally be missed.
+    bands, rows:
+        LSH banding parameters for ``method="minhash"``.
     """
 
     if similarity <= 0:
@@ -248,9 +437,31 @@ def cluster_phrases(
         similarity = 1.0
     get_tokens = tokenizer or tokenize
 
+    if method == "naive":
+        return _cluster_naive(phrases, similarity, get_tokens)
+    if method not in ("index", "minhash"):
+        raise ValueError(f"Unknown clustering method: {method!r}")
+
+    items = [(phrase, set(get_tokens(phrase))) for phrase in phrases]
+    if similarity == 0.0:
+        # Every non-empty phrase matches the first cluster (Jaccard >= 0).
+        return _cluster_naive(items, similarity, None)
+    if method == "minhash":
+        return _cluster_minhash(items, similarity, max(1, bands), max(1, rows))
+    return _cluster_indexed(items, similarity)
+
+
+def _cluster_naive(
+    phrases: Iterable[str] | Iterable[tuple[str, set[str]]],
+    similarity: float,
+    get_tokens: Callable[[str], Iterable[str]] | None,
+) -> list[Cluster]:
     clusters: list[Cluster] = []
-    for phrase in phrases:
-        tokens = set(get_tokens(phrase))
+    for entry in phrases:
+        if get_tokens is None:
+            phrase, tokens = entry
+        else:
+            phrase, tokens = entry, set(get_tokens(entry))
         if not tokens:
             clusters.append(Cluster([phrase], [set()]))
             continue
@@ -266,6 +477,132 @@ def cluster_phrases(
     return clusters
 
 
+def _prefix_length(size: int, similarity: float) -> int:
+    # Two sets with Jaccard >= t share a token within the first
+    # |x| - ceil(t * |x|) + 1 tokens of each, under one global token order.
+    return size - math.ceil(similarity * size - 1e-9) + 1
+
+
+def _place(
+    clusters: list[Cluster],
+    owners: list[int],
+    members: list[set[str]],
+    phrase: str,
+    tokens: set[str],
+    candidates: Iterable[int],
+    similarity: float,
+) -> int:
+    """Add the phrase to the oldest matching candidate cluster or a new one.
+
+    Returns the member id assigned to the phrase.
+    """
+    best = len(clusters)
+    for member in candidates:
+        cluster_id = owners[member]
+        if cluster_id < best and _jaccard(tokens, members[member]) >= similarity:
+            best = cluster_id
+    if best == len(clusters):
+        clusters.append(Cluster([phrase], [tokens]))
+    else:
+        clusters[best].add(phrase, tokens)
+    owners.append(best)
+    members.append(tokens)
+    return len(members) - 1
+
+
+def _cluster_indexed(items: list[tuple[str, set[str]]], similarity: float) -> list[Cluster]:
+    # Rare tokens first: prefixes then avoid the huge posting lists of
+    # tokens such as "купить" that appear in most phrases.
+    frequency: Counter[str] = Counter()
+    for _, tokens in items:
+        frequency.update(tokens)
+
+    clusters: list[Cluster] = []
+    # token -> cluster id -> distinct member token sets indexed under it
+    index: dict[str, dict[int, list[frozenset[str]]]] = {}
+    # exact token set -> oldest cluster holding it (a guaranteed match)
+    exact: dict[frozenset[str], int] = {}
+    for phrase, tokens in items:
+        if not tokens:
+            clusters.append(Cluster([phrase], [set()]))
+            continue
+        key = frozenset(tokens)
+        size = len(tokens)
+        prefix = sorted(tokens, key=lambda token: (frequency[token], token))[:_prefix_length(size, similarity)]
+        low, high = similarity * size, size / similarity
+        limit = exact.get(key, len(clusters))
+
+        # Only the oldest matching cluster matters: walk candidate clusters in
+        # creation order and stop at the first member that is similar enough.
+        postings = [index[token] for token in prefix if token in index]
+        best = limit
+        for cluster_id in sorted({cid for posting in postings for cid in posting if cid < limit}):
+            if any(
+                low <= len(member) <= high and _jaccard(tokens, member) >= similarity
+                for posting in postings
+                for member in posting.get(cluster_id, ())
+            ):
+                best = cluster_id
+                break
+
+        if best == len(clusters):
+            clusters.append(Cluster([phrase], [tokens]))
+        else:
+            clusters[best].add(phrase, tokens)
+        if best < exact.get(key, len(clusters)):
+            # The same token set in a younger cluster can never be the oldest
+            # match, so a set is indexed again only when it lands in an older one.
+            exact[key] = best
+            for token in prefix:
+                index.setdefault(token, {}).setdefault(best, []).append(key)
+    return clusters
+
+
+_MINHASH_PRIME = (1 << 61) - 1
+
+
+def _cluster_minhash(
+    items: list[tuple[str, set[str]]],
+    similarity: float,
+    bands: int,
+    rows: int,
+) -> list[Cluster]:
+    rng = random.Random(0x5E7)
+    size = bands * rows
+    coefficients = [
+        (rng.randrange(1, _MINHASH_PRIME), rng.randrange(0, _MINHASH_PRIME)) for _ in range(size)
+    ]
+    token_signatures: dict[str, tuple[int, ...]] = {}
+
+    def token_signature(token: str) -> tuple[int, ...]:
+        signature = token_signatures.get(token)
+        if signature is None:
+            # blake2b instead of hash(): str hashes are salted per process
+            value = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+            signature = tuple((a * value + b) % _MINHASH_PRIME for a, b in coefficients)
+            token_signatures[token] = signature
+        return signature
+
+    clusters: list[Cluster] = []
+    owners: list[int] = []
+    members: list[set[str]] = []
+    buckets: dict[tuple[int, tuple[int, ...]], list[int]] = {}
+    for phrase, tokens in items:
+        if not tokens:
+            clusters.append(Cluster([phrase], [set()]))
+            continue
+        signatures = [token_signature(token) for token in tokens]
+        signature = tuple(map(min, *signatures)) if len(signatures) > 1 else signatures[0]
+        keys = [(band, signature[band * rows:(band + 1) * rows]) for band in range(bands)]
+        candidates: set[int] = set()
+        for key in keys:
+            candidates.update(buckets.get(key, ()))
+        member = _place(clusters, owners, members, phrase, tokens, candidates, similarity)
+        for key in keys:
+            buckets.setdefault(key, []).append(member)
+    return clusters
+
+
 def _jaccard(a: set[str], b: set[str]) -> float:
     if not a and not b:
         return 1.0
@@ -5,11 +5,78 @@
 
 import aiohttp
 import asyncio
+import re
 import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 
-async def test_proxy(proxy_url: Optional[str], timeout: int = 10) -> Dict[str, Any]:
+CHECK_URL = "http://httpbin.org/ip"  # HTTP вместо HTTPS - избегаем ssl:default ошибок
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+
+def parse_proxy_url(proxy_url: str) -> Tuple[str, Optional[aiohttp.BasicAuth], bool]:
+    """
+    Разобрать строку прокси для aiohttp.
+
+    Returns:
+        (url без учётных данных для HTTP / исходный url для SOCKS, BasicAuth или None, is_socks)
+    """
+    # Формат: ip:port@user:pass (из KeySet)
+    if '@' in proxy_url and not proxy_url.startswith('http') and not proxy_url.startswith('socks'):
+        parts = proxy_url.split('@')
+        if len(parts) == 2:
+            host_port, user_pass = parts
+            user, password = user_pass.split(':', 1)
+            return f"http://{host_port}", aiohttp.BasicAuth(user, password), False
+        return f"http://{proxy_url}", None, False
+    if proxy_url.startswith('socks'):
+        # SOCKS прокси - через ProxyConnector из aiohttp_socks
+        return proxy_url, None, True
+    # Формат: http://user:pass@ip:port
+    if '@' in proxy_url and '://' in proxy_url:
+        match = re.match(r'(https?://)([^:]+):([^@]+)@(.+)', proxy_url)
+        if match:
+            protocol, user, password, host_port = match.groups()
+            return f"{protocol}{host_port}", aiohttp.BasicAuth(user, password), False
+        return proxy_url, None, False
+    # Без авторизации
+    if not proxy_url.startswith('http'):
+        return f"http://{proxy_url}", None, False
+    return proxy_url, None, False
+
+
+def socks_connector(proxy_url: str, **kwargs: Any):
+    """ProxyConnector aiohttp_socks для SOCKS прокси (ImportError, если пакет не установлен)."""
+    from aiohttp_socks import ProxyConnector
+
+    match = re.match(r'socks[45]?://(?:([^:]+):([^@]+)@)?(.+)', proxy_url)
+    user, password = (match.group(1), match.group(2)) if match else (None, None)
+    return ProxyConnector.from_url(
+        proxy_url,
+        rdns=True,
+        username=user or None,
+        password=password or None,
+        **kwargs,
+    )
+
+
+def _result(ok: bool, status: str, start_time: float, *, ip: Any = None, error: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "ok": ok,
+        "status": status,
+        "ip": ip,
+        "latency_ms": int((time.perf_counter() - start_time) * 1000),
+        "error": error,
+    }
+
+
+async def test_proxy(
+    proxy_url: Optional[str],
+    timeout: int = 10,
+    *,
+    session: Optional[aiohttp.ClientSession] = None,
+    check_url: str = CHECK_URL,
+) -> Dict[str, Any]:
     """
     Проверка прокси через http://httpbin.org/ip (правильный метод без ssl:default ошибок)
     
@@ -19,10 +86,14 @@ async def test_proxy(proxy_url: Optional[str], timeout: int = 10) -> Dict[str, A
             - http://user:pass@ip:port (стандартный URL)
             - socks5://user:pass@ip:port (SOCKS прокси)
         timeout: Таймаут в секундах
+        session: общая сессия для HTTP прокси (см. services.proxy_scanner);
+            без неё создаётся временная. SOCKS всегда идёт через свой коннектор.
+        check_url: адрес, который запрашивается через прокси
     
     Returns:
         {
             "ok": bool,
+            "status": "OK" / "FAIL" / "TIMEOUT",
             "ip": str,  # Внешний IP
             "latency_ms": int,  # Задержка в миллисекундах
             "error": str  # Текст ошибки если ok=False
@@ -31,144 +102,66 @@ async def test_proxy(proxy_url: Optional[str], timeout: int = 10) -> Dict[str, A
     if not proxy_url:
         return {
             "ok": False,
+            "status": "FAIL",
             "ip": None,
             "latency_ms": 0,
             "error": "Прокси не указан"
         }
     
-    start_time = time.time()
+    start_time = time.perf_counter()
+    timeout_obj = aiohttp.ClientTimeout(total=timeout)
     
     try:
-        # Парсим прокси в правильный формат для aiohttp
-        proxy_auth = None
-        is_socks = False
-        
-        # Формат: ip:port@user:pass (из KeySet)
-        if '@' in proxy_url and not proxy_url.startswith('http') and not proxy_url.startswith('socks'):
-            parts = proxy_url.split('@')
-            if len(parts) == 2:
-                host_port = parts[0]
-                user_pass = parts[1]
-                user, password = user_pass.split(':', 1)
-                proxy_url_clean = f"http://{host_port}"
-                proxy_auth = aiohttp.BasicAuth(user, password)
-            else:
-                proxy_url_clean = f"http://{proxy_url}"
-        # Формат: http://user:pass@ip:port
-        elif '@' in proxy_url and '://' in proxy_url:
-            import re
-            if proxy_url.startswith('socks'):
-                # SOCKS прокси - нужен ProxyConnector (пока возвращаем ошибку)
-                is_socks = True
-                proxy_url_clean = proxy_url
-            else:
-                match = re.match(r'(https?://)([^:]+):([^@]+)@(.+)', proxy_url)
-                if match:
-                    protocol, user, password, host_port = match.groups()
-                    proxy_url_clean = f"{protocol}{host_port}"
-                    proxy_auth = aiohttp.BasicAuth(user, password)
-                else:
-                    proxy_url_clean = proxy_url
-        else:
-            # Без авторизации
-            if proxy_url.startswith('socks'):
-                is_socks = True
-                proxy_url_clean = proxy_url
-            elif not proxy_url.startswith('http'):
-                proxy_url_clean = f"http://{proxy_url}"
-            else:
-                proxy_url_clean = proxy_url
+        proxy_url_clean, proxy_auth, is_socks = parse_proxy_url(proxy_url)
         
-        # SOCKS прокси требуют aiohttp_socks
         if is_socks:
             try:
-                from aiohttp_socks import ProxyConnector
-                # Парсим SOCKS URL
-                import re
-                match = re.match(r'socks[45]?://(?:([^:]+):([^@]+)@)?(.+)', proxy_url)
-                if match:
-                    user, password, host_port = match.groups()
-                    conn = ProxyConnector.from_url(
-                        proxy_url,
-                        rdns=True,
-                        username=user or None,
-                        password=password or None
-                    )
-                    
-                    timeout_obj = aiohttp.ClientTimeout(total=timeout)
-                    async with aiohttp.ClientSession(connector=conn, timeout=timeout_obj) as session:
-                        async with session.get("http://httpbin.org/ip") as response:
-                            data = await response.json()
-                            latency_ms = int((time.time() - start_time) * 1000)
-                            return {
-                                "ok": True,
-                                "ip": data.get("origin", "ok"),
-                                "latency_ms": latency_ms,
-                                "error": None
-                            }
+                connector = socks_connector(proxy_url)
             except ImportError:
                 return {
                     "ok": False,
+                    "status": "FAIL",
                     "ip": None,
                     "latency_ms": 0,
                     "error": "aiohttp_socks не установлен для SOCKS прокси"
                 }
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout_obj) as socks_session:
+                async with socks_session.get(check_url) as response:
+                    data = await response.json(content_type=None)
+                    return _result(True, "OK", start_time, ip=data.get("origin", "ok"))
         
         # HTTP/HTTPS прокси - используем httpbin.org/ip с ssl=False
-        timeout_obj = aiohttp.ClientTimeout(total=timeout)
-        async with aiohttp.ClientSession(
-            timeout=timeout_obj,
-            headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-        ) as session:
+        own_session = session is None
+        if own_session:
+            session = aiohttp.ClientSession(timeout=timeout_obj, headers={"User-Agent": USER_AGENT})
+        try:
             async with session.get(
-                "http://httpbin.org/ip",  # HTTP вместо HTTPS - избегаем ssl:default ошибок
+                check_url,
                 proxy=proxy_url_clean,
                 proxy_auth=proxy_auth,
-                ssl=False  # Важно для HTTP прокси
+                ssl=False,  # Важно для HTTP прокси
+                timeout=timeout_obj,
             ) as response:
                 response.raise_for_status()
-                data = await response.json()
-                
-                latency_ms = int((time.time() - start_time) * 1000)
-                
-                return {
-                    "ok": True,
-                    "ip": data.get("origin", "ok"),
-                    "latency_ms": latency_ms,
-                    "error": None
-                }
+                data = await response.json(content_type=None)
+                return _result(True, "OK", start_time, ip=data.get("origin", "ok"))
+        finally:
+            if own_session:
+                await session.close()
     
     except asyncio.TimeoutError:
-        latency_ms = int((time.time() - start_time) * 1000)
-        return {
-            "ok": False,
-            "ip": None,
-            "latency_ms": latency_ms,
-            "error": f"Timeout {timeout}s"
-        }
+        return _result(False, "TIMEOUT", start_time, error=f"Timeout {timeout}s")
     
     except aiohttp.ClientProxyConnectionError as e:
-        latency_ms = int((time.time() - start_time) * 1000)
-        return {
-            "ok": False,
-            "ip": None,
-            "latency_ms": latency_ms,
-            "error": f"Proxy error: {str(e)}"
-        }
+        return _result(False, "FAIL", start_time, error=f"Proxy error: {str(e)}")
     
     except Exception as e:
-        latency_ms = int((time.time() - start_time) * 1000)
-        return {
-            "ok": False,
-            "ip": None,
-            "latency_ms": latency_ms,
-            "error": str(e)
-        }
+        return _result(False, "FAIL", start_time, error=str(e))
 
 
 async def test_multiple_proxies(proxies: list[str], timeout: int = 10) -> Dict[str, Dict[str, Any]]:
     """
-    Проверка нескольких прокси параллельно
+    Проверка нескольких прокси параллельно (через общий сканер с ограничением одновременных проверок)
     
     Args:
         proxies: Список прокси URL
@@ -177,10 +170,12 @@ async def test_multiple_proxies(proxies: list[str], timeout: int = 10) -> Dict[s
     Returns:
         {proxy_url: result_dict}
     """
-    tasks = [test_proxy(proxy, timeout) for proxy in proxies]
-    results = await asyncio.gather(*tasks)
-    
-    return {proxy: result for proxy, result in zip(proxies, results)}
+    try:
+        from .proxy_scanner import scan
+    except ImportError:
+        from services.proxy_scanner import scan
+
+    return await scan(proxies, timeout=timeout)
 
 
 def format_proxy_url(host: str, port: int, user: str, password: str, protocol: str = "http") -> str:
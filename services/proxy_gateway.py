@@ -0,0 +1,459 @@
+"""
+Общий локальный шлюз к прокси с авторизацией
+
+Chrome не умеет передавать логин и пароль прокси флагом, поэтому ему отдаётся
+адрес на 127.0.0.1 без авторизации, а шлюз подставляет Proxy-Authorization и
+ходит в удалённый прокси. Все аккаунты обслуживает одна asyncio-петля в одном
+фоновом потоке (раньше — поток на каждый LocalAuthProxy и процесс mitmdump на
+каждый ProxyBridge):
+
+- у каждого аккаунта свой локальный порт; кроме того, есть общий порт, где
+  аккаунт выбирается логином Proxy-Authorization (для Playwright);
+- к каждому upstream держится небольшой пул заранее открытых соединений,
+  так туннель CONNECT не ждёт TCP/TLS-рукопожатия;
+- перекачка идёт крупными блоками с ограниченным буфером отправки: медленная
+  сторона притормаживает чтение быстрой, а не копит данные в памяти;
+- байты и соединения считаются по аккаунтам (stats()).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, Optional, Set, Tuple, Union
+
+try:
+    from ..utils.proxy import parse_proxy
+except ImportError:
+    from utils.proxy import parse_proxy
+
+READ_CHUNK = 256 * 1024
+WRITE_HIGH_WATER = 512 * 1024  # Выше этого буфера отправки чтение встречной стороны ждёт
+HEADER_LIMIT = 64 * 1024
+POOL_SIZE = 2  # Заранее открытых соединений на upstream
+POOL_IDLE_SECONDS = 20.0  # Дольше простоявшие соединения не используются (upstream мог их закрыть)
+CONNECT_TIMEOUT = 15.0
+MAX_CONNECTIONS = 256  # Одновременных соединений на аккаунт, остальные ждут очереди
+CALL_TIMEOUT = 10.0  # Ожидание ответа петли шлюза из других потоков
+
+_HOP_HEADERS = {"proxy-authorization", "proxy-connection", "connection", "keep-alive"}
+UPSTREAM_SCHEMES = ("http", "https")
+
+
+@dataclass(frozen=True)
+class Upstream:
+    """Удалённый HTTP(S)-прокси."""
+
+    scheme: str
+    host: str
+    port: int
+    username: str = ""
+    password: str = ""
+
+    @classmethod
+    def from_uri(cls, uri: str) -> "Upstream":
+        config = parse_proxy(uri)
+        if not config:
+            raise ValueError(f"Некорректный адрес прокси: {uri}")
+        scheme, _, host_port = config["server"].partition("://")
+        if scheme not in UPSTREAM_SCHEMES:
+            raise ValueError(f"Шлюз поддерживает только HTTP(S)-прокси, получен {scheme}")
+        host, _, port = host_port.rpartition(":")
+        return cls(scheme, host, int(port), config.get("username") or "", config.get("password") or "")
+
+    @property
+    def auth_header(self) -> Optional[str]:
+        if not self.username:
+            return None
+        userpass = f"{self.username}:{self.password}".encode("utf-8")
+        return f"Proxy-Authorization: Basic {base64.b64encode(userpass).decode('ascii')}"
+
+
+@dataclass
+class AccountStats:
+    bytes_up: int = 0
+    bytes_down: int = 0
+    connections: int = 0
+    active: int = 0
+    failed: int = 0
+
+
+class _UpstreamPool:
+    """Пул заранее открытых соединений к одному upstream."""
+
+    def __init__(self, upstream: Upstream) -> None:
+        self.upstream = upstream
+        self._idle: Deque[Tuple[asyncio.StreamReader, asyncio.StreamWriter, float]] = deque()
+        self._filling = False
+        self._closed = False
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        upstream = self.upstream
+        tls = {"ssl": True, "server_hostname": upstream.host} if upstream.scheme == "https" else {}
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(upstream.host, upstream.port, limit=HEADER_LIMIT, **tls),
+            timeout=CONNECT_TIMEOUT,
+        )
+        writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+        return reader, writer
+
+    async def acquire(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        now = time.monotonic()
+        try:
+            while self._idle:
+                reader, writer, opened_at = self._idle.popleft()
+                if now - opened_at < POOL_IDLE_SECONDS and not reader.at_eof() and not writer.is_closing():
+                    return reader, writer
+                writer.close()
+            return await self._open()
+        finally:
+            self.refill()
+
+    def refill(self) -> None:
+        """Дооткрыть соединения до POOL_SIZE в фоне."""
+        if not self._filling and not self._closed and len(self._idle) < POOL_SIZE:
+            self._filling = True
+            asyncio.get_running_loop().create_task(self._fill())
+
+    async def _fill(self) -> None:
+        try:
+            while not self._closed and len(self._idle) < POOL_SIZE:
+                reader, writer = await self._open()
+                if self._closed:
+                    writer.close()
+                    return
+                self._idle.append((reader, writer, time.monotonic()))
+        except (OSError, asyncio.TimeoutError):
+            # upstream недоступен — следующий запрос откроет соединение сам и получит ошибку
+            pass
+        finally:
+            self._filling = False
+
+    def close(self) -> None:
+        self._closed = True
+        while self._idle:
+            self._idle.popleft()[1].close()
+
+
+class _Route:
+    """Аккаунт в шлюзе: upstream, его пул, слушающий порт и счётчики."""
+
+    def __init__(self, key: str, upstream: Upstream) -> None:
+        self.key = key
+        self.upstream = upstream
+        self.pool = _UpstreamPool(upstream)
+        self.token = secrets.token_hex(8)
+        self.stats = AccountStats()
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.port: Optional[int] = None
+        self.slots = asyncio.Semaphore(MAX_CONNECTIONS)
+        self.writers: Set[asyncio.StreamWriter] = set()
+
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+        self.pool.close()
+        for writer in list(self.writers):
+            writer.close()
+
+
+class ProxyGateway:
+    """Один шлюз на процесс: ProxyGateway.instance()."""
+
+    _instance: Optional["ProxyGateway"] = None
+    _singleton_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._routes: Dict[str, _Route] = {}
+        self._shared_server: Optional[asyncio.AbstractServer] = None
+        self._shared_port: Optional[int] = None
+
+    @classmethod
+    def instance(cls) -> "ProxyGateway":
+        with cls._singleton_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    # ------------------------------------------------------------------ #
+    # Event loop
+    # ------------------------------------------------------------------ #
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+            started = threading.Event()
+
+            def runner() -> None:
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                self._loop = loop
+                started.set()
+                try:
+                    loop.run_forever()
+                finally:
+                    loop.close()
+
+            self._thread = threading.Thread(target=runner, name="proxy-gateway", daemon=True)
+            self._thread.start()
+            started.wait()
+            return self._loop
+
+    def _call(self, coro):
+        # Вызывается из потоков приложения; из петли шлюза это привело бы к взаимной блокировке
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout=CALL_TIMEOUT)
+
+    # ------------------------------------------------------------------ #
+    # Routes
+    # ------------------------------------------------------------------ #
+    def register(self, key: str, upstream: Union[str, Upstream], *, port: int = 0) -> int:
+        """
+        Открыть (или переиспользовать) локальный порт аккаунта
+
+        Args:
+            key: имя аккаунта или другой ключ
+            upstream: URI прокси или Upstream
+            port: желаемый локальный порт (0 — любой свободный)
+
+        Returns:
+            порт на 127.0.0.1, который нужно передать Chrome
+        """
+        if isinstance(upstream, str):
+            upstream = Upstream.from_uri(upstream)
+        return self._call(self._register(key, upstream, port))
+
+    async def _register(self, key: str, upstream: Upstream, port: int) -> int:
+        route = self._routes.get(key)
+        if route is not None:
+            if route.upstream == upstream and route.port is not None:
+                return route.port
+            route.close()
+        route = _Route(key, upstream)
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            await self._handle_client(reader, writer, route)
+
+        route.server = await asyncio.start_server(handle, "127.0.0.1", port, limit=HEADER_LIMIT)
+        route.port = route.server.sockets[0].getsockname()[1]
+        self._routes[key] = route
+        route.pool.refill()
+        return route.port
+
+    def unregister(self, key: str) -> None:
+        if self._loop is None:
+            return
+        self._call(self._unregister(key))
+
+    async def _unregister(self, key: str) -> None:
+        route = self._routes.pop(key, None)
+        if route is not None:
+            route.close()
+
+    def port_of(self, key: str) -> Optional[int]:
+        route = self._routes.get(key)
+        return route.port if route else None
+
+    def shared_port(self) -> int:
+        """Общий порт: аккаунт выбирается по Proxy-Authorization (логин — ключ, пароль — credentials())."""
+        return self._call(self._open_shared())
+
+    async def _open_shared(self) -> int:
+        if self._shared_server is None:
+            self._shared_server = await asyncio.start_server(
+                lambda reader, writer: self._handle_client(reader, writer, None),
+                "127.0.0.1",
+                0,
+                limit=HEADER_LIMIT,
+            )
+            self._shared_port = self._shared_server.sockets[0].getsockname()[1]
+        return self._shared_port
+
+    def credentials(self, key: str) -> Tuple[str, str]:
+        """Логин и пароль аккаунта для общего порта."""
+        route = self._routes.get(key)
+        if route is None:
+            raise KeyError(key)
+        return route.key, route.token
+
+    def stats(self, key: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Счётчики {ключ: {bytes_up, bytes_down, connections, active, failed}}."""
+        if key is not None:
+            routes = [self._routes[key]] if key in self._routes else []
+        else:
+            routes = list(self._routes.values())
+        return {route.key: asdict(route.stats) for route in routes}
+
+    def stop(self) -> None:
+        """Закрыть все порты и остановить петлю шлюза."""
+        loop = self._loop
+        if loop is None:
+            return
+
+        async def shutdown() -> None:
+            for key in list(self._routes):
+                await self._unregister(key)
+            if self._shared_server is not None:
+                self._shared_server.close()
+                self._shared_server = None
+                self._shared_port = None
+
+        with suppress(Exception):
+            self._call(shutdown())
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+        with self._lock:
+            self._loop = None
+            self._thread = None
+
+    # ------------------------------------------------------------------ #
+    # Connection handling
+    # ------------------------------------------------------------------ #
+    def _authenticate(self, headers: Dict[str, str]) -> Optional[_Route]:
+        value = headers.get("proxy-authorization", "")
+        scheme, _, encoded = value.partition(" ")
+        if scheme.lower() != "basic":
+            return None
+        try:
+            key, _, token = base64.b64decode(encoded.strip()).decode("utf-8").partition(":")
+        except Exception:
+            return None
+        route = self._routes.get(key)
+        if route is None or not secrets.compare_digest(route.token, token):
+            return None
+        return route
+
+    async def _handle_client(
+        self,
+        client_reader: asyncio.StreamReader,
+        client_writer: asyncio.StreamWriter,
+        route: Optional[_Route],
+    ) -> None:
+        client_writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+        try:
+            head = await client_reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            client_writer.close()
+            return
+
+        request_line, *header_lines = head.decode("latin1").split("\r\n")
+        parts = request_line.split(" ")
+        if len(parts) < 3:
+            client_writer.close()
+            return
+        method, target = parts[0].upper(), parts[1]
+        headers = {}
+        for line in header_lines:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        if route is None:
+            route = self._authenticate(headers)
+            if route is None:
+                client_writer.write(
+                    b"HTTP/1.1 407 Proxy Authentication Required\r\n"
+                    b'Proxy-Authenticate: Basic realm="keyset"\r\n'
+                    b"Content-Length: 0\r\nConnection: close\r\n\r\n"
+                )
+                with suppress(Exception):
+                    await client_writer.drain()
+                client_writer.close()
+                return
+
+        stats = route.stats
+        async with route.slots:
+            stats.connections += 1
+            stats.active += 1
+            route.writers.add(client_writer)
+            remote_writer: Optional[asyncio.StreamWriter] = None
+            try:
+                try:
+                    remote_reader, remote_writer = await route.pool.acquire()
+                except (OSError, asyncio.TimeoutError):
+                    stats.failed += 1
+                    client_writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    with suppress(Exception):
+                        await client_writer.drain()
+                    return
+
+                auth = route.upstream.auth_header
+                if method == "CONNECT":
+                    lines = [f"CONNECT {target} HTTP/1.1", f"Host: {target}"]
+                else:
+                    # Один запрос на соединение: иначе следующие запросы keep-alive ушли бы без авторизации
+                    lines = [request_line]
+                    lines += [line for line in header_lines if line and line.partition(":")[0].strip().lower() not in _HOP_HEADERS]
+                    lines.append("Connection: close")
+                if auth:
+                    lines.insert(1, auth)
+                remote_writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin1"))
+                await remote_writer.drain()
+
+                if method == "CONNECT":
+                    try:
+                        response = await asyncio.wait_for(remote_reader.readuntil(b"\r\n\r\n"), CONNECT_TIMEOUT)
+                    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+                        stats.failed += 1
+                        client_writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n")
+                        return
+                    client_writer.write(response)
+                    await client_writer.drain()
+                    status_line = response.split(b" ", 2)
+                    if len(status_line) < 2 or status_line[1] != b"200":
+                        stats.failed += 1
+                        return
+
+                await asyncio.gather(
+                    self._pipe(client_reader, remote_writer, stats, "bytes_up"),
+                    self._pipe(remote_reader, client_writer, stats, "bytes_down"),
+                )
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                stats.active -= 1
+                route.writers.discard(client_writer)
+                if remote_writer is not None:
+                    remote_writer.close()
+                client_writer.close()
+
+    @staticmethod
+    async def _pipe(
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        stats: AccountStats,
+        counter: str,
+    ) -> None:
+        try:
+            while True:
+                chunk = await reader.read(READ_CHUNK)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                setattr(stats, counter, getattr(stats, counter) + len(chunk))
+                # drain() ждёт, пока буфер отправки не опустится ниже WRITE_HIGH_WATER
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            # Полузакрытие: встречная перекачка завершится сама, когда другая сторона ответит EOF
+            with suppress(Exception):
+                if writer.can_write_eof():
+                    writer.write_eof()
+
+
+def get_gateway() -> ProxyGateway:
+    return ProxyGateway.instance()
+
+
+__all__ = ["AccountStats", "ProxyGateway", "UPSTREAM_SCHEMES", "Upstream", "get_gateway"]
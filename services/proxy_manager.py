@@ -18,6 +18,21 @@ except ImportError:
 
 CONFIG_PATH = Path(__file__).resolve().parents[1] / "config" / "proxies.json"
 
+# Оценка прокси по отзывам парсеров (EWMA: новое значение весит HEALTH_ALPHA)
+HEALTH_ALPHA = 0.2
+LATENCY_REF_MS = 1000.0  # Задержка, при которой множитель скорости равен 0.5
+DEFAULT_LATENCY_MS = LATENCY_REF_MS  # Пока задержка неизвестна
+MIN_SAMPLES = 3  # Столько исходов нужно, прежде чем прокси можно исключить
+MIN_SUCCESS_RATE = 0.5
+MAX_BAN_RATE = 0.3
+RECOVERED_SUCCESS_RATE = 0.8  # После такого успеха сбрасывается счётчик исключений
+COOLDOWN_SECONDS = 60.0  # Первое исключение; каждое следующее подряд — вдвое дольше
+MAX_COOLDOWN_SECONDS = 30 * 60.0
+
+# Исходы запросов, о которых сообщают парсеры, и их вес в доле капч/банов
+OUTCOMES = ("ok", "error", "timeout", "throttled", "captcha", "ban")
+BAN_WEIGHTS = {"ok": 0.0, "throttled": 0.5, "captcha": 1.0, "ban": 1.0}
+
 
 def _normalize_server(proxy_type: str, server: str) -> str:
     value = server.strip()
@@ -89,6 +104,62 @@ class Proxy:
         return " ".join(parts)
 
 
+@dataclass
+class ProxyHealth:
+    """Живая оценка прокси: скользящие средние задержки, успехов и капч/банов."""
+
+    latency_ms: Optional[float] = None
+    success_rate: float = 1.0
+    ban_rate: float = 0.0
+    samples: int = 0
+    strikes: int = 0
+    excluded_until: float = 0.0
+    last_outcome: Optional[str] = None
+
+    def score(self) -> float:
+        latency = self.latency_ms if self.latency_ms is not None else DEFAULT_LATENCY_MS
+        speed = LATENCY_REF_MS / (LATENCY_REF_MS + max(0.0, latency))
+        return self.success_rate * (1.0 - self.ban_rate) * speed
+
+    def is_excluded(self, now: float) -> bool:
+        return now < self.excluded_until
+
+    def update(self, outcome: str, latency_ms: Optional[float], now: float) -> bool:
+        """Учесть исход запроса. Возвращает True, если прокси только что исключён."""
+        self.samples += 1
+        self.last_outcome = outcome
+        self.success_rate += HEALTH_ALPHA * ((1.0 if outcome == "ok" else 0.0) - self.success_rate)
+        if outcome in BAN_WEIGHTS:
+            self.ban_rate += HEALTH_ALPHA * (BAN_WEIGHTS[outcome] - self.ban_rate)
+        if outcome == "ok" and latency_ms is not None:
+            if self.latency_ms is None:
+                self.latency_ms = float(latency_ms)
+            else:
+                self.latency_ms += HEALTH_ALPHA * (latency_ms - self.latency_ms)
+            if self.success_rate >= RECOVERED_SUCCESS_RATE:
+                self.strikes = 0
+
+        degraded = outcome == "ban" or (
+            self.samples >= MIN_SAMPLES
+            and (self.success_rate < MIN_SUCCESS_RATE or self.ban_rate > MAX_BAN_RATE)
+        )
+        if not degraded or self.is_excluded(now):
+            return False
+        self.strikes += 1
+        self.excluded_until = now + min(MAX_COOLDOWN_SECONDS, COOLDOWN_SECONDS * 2 ** (self.strikes - 1))
+        # После паузы прокси снова получает несколько попыток, прежде чем его исключат повторно
+        self.samples = 0
+        return True
+
+
+def _host_port(uri: str) -> str:
+    """host:port прокси без схемы и логина/пароля."""
+    value = uri.strip()
+    if "://" in value:
+        value = value.split("://", 1)[1]
+    return value.rsplit("@", 1)[-1].rstrip("/").lower()
+
+
 class ProxyManager:
     _instance: Optional["ProxyManager"] = None
     _singleton_lock = threading.Lock()
@@ -96,6 +167,7 @@ class ProxyManager:
     def __init__(self, path: Path = CONFIG_PATH):
         self.path = path
         self._items: Dict[str, Proxy] = {}
+        self._health: Dict[str, ProxyHealth] = {}
         self._lock = threading.RLock()
         self._load()
 
@@ -255,6 +327,7 @@ class ProxyManager:
     def delete(self, proxy_id: str) -> None:
         with self._lock:
             self._items.pop(proxy_id, None)
+            self._health.pop(proxy_id, None)
             self._save_unlocked()
 
     def save_many(self, proxies: Iterable[Proxy]) -> None:
@@ -265,6 +338,13 @@ class ProxyManager:
     # Allocation helpers
     # ------------------------------------------------------------------ #
     def acquire(self, proxy_id: Optional[str] = None, *, geo: Optional[str] = None) -> Optional[Proxy]:
+        """
+        Занять прокси.
+
+        Явно указанный ``proxy_id`` (привязка аккаунта) выдаётся как есть. Из пула
+        выбирается прокси с лучшей оценкой с учётом текущей нагрузки; исключённые
+        после серии ошибок и капч пропускаются, пока в пуле есть другие.
+        """
         with self._lock:
             candidates: List[Proxy] = []
             if proxy_id and proxy_id in self._items:
@@ -278,7 +358,11 @@ class ProxyManager:
                     geo_filtered = [p for p in candidates if (p.geo or "").lower() == geo_lower]
                     if geo_filtered:
                         candidates = geo_filtered
-            candidates.sort(key=lambda item: item._in_use)
+                now = time.monotonic()
+                healthy = [p for p in candidates if not self._health_of(p.id).is_excluded(now)]
+                if healthy:
+                    candidates = healthy
+            candidates.sort(key=lambda item: (-self._health_of(item.id).score() / (1 + item._in_use), item._in_use))
 
             for proxy in candidates:
                 limit = proxy.max_concurrent or 0
@@ -296,6 +380,86 @@ class ProxyManager:
             if stored:
                 stored._in_use = max(0, stored._in_use - 1)
 
+    # ------------------------------------------------------------------ #
+    # Health feedback
+    # ------------------------------------------------------------------ #
+    def _health_of(self, proxy_id: str) -> ProxyHealth:
+        health = self._health.get(proxy_id)
+        if health is None:
+            health = self._health[proxy_id] = ProxyHealth()
+        return health
+
+    def _resolve_id(self, proxy: object) -> Optional[str]:
+        if isinstance(proxy, Proxy):
+            return proxy.id
+        if not proxy:
+            return None
+        value = str(proxy)
+        if value in self._items:
+            return value
+        target = _host_port(value)
+        for item in self._items.values():
+            if _host_port(item.server) == target:
+                return item.id
+        return None
+
+    def report(self, proxy: object, outcome: str, *, latency_ms: Optional[float] = None) -> None:
+        """
+        Сообщить исход запроса через прокси.
+
+        Args:
+            proxy: Proxy, его id или URI (логин/пароль не важны)
+            outcome: один из OUTCOMES — ok, error, timeout, throttled (HTTP 429),
+                captcha, ban
+            latency_ms: время ответа успешного запроса
+        """
+        if outcome not in OUTCOMES:
+            raise ValueError(f"Неизвестный исход запроса через прокси: {outcome}")
+        with self._lock:
+            proxy_id = self._resolve_id(proxy)
+            if proxy_id is None:
+                return
+            health = self._health_of(proxy_id)
+            excluded = health.update(outcome, latency_ms, time.monotonic())
+            if excluded:
+                pause = health.excluded_until - time.monotonic()
+                label = self._items[proxy_id].label
+        if excluded:
+            print(
+                f"[PROXY] {label} исключён на {pause:.0f} с "
+                f"(успехи {health.success_rate:.2f}, капчи/баны {health.ban_rate:.2f})"
+            )
+
+    def report_success(self, proxy: object, latency_ms: Optional[float] = None) -> None:
+        self.report(proxy, "ok", latency_ms=latency_ms)
+
+    def report_failure(self, proxy: object, *, timeout: bool = False) -> None:
+        self.report(proxy, "timeout" if timeout else "error")
+
+    def report_captcha(self, proxy: object) -> None:
+        self.report(proxy, "captcha")
+
+    def report_ban(self, proxy: object) -> None:
+        self.report(proxy, "ban")
+
+    def health(self, proxy_id: Optional[str] = None) -> Dict[str, Dict[str, object]]:
+        """Снимок оценок {proxy.id: {...}} для UI и логов."""
+        now = time.monotonic()
+        with self._lock:
+            ids = [proxy_id] if proxy_id else list(self._items)
+            snapshot = {}
+            for item_id in ids:
+                health = self._health_of(item_id)
+                snapshot[item_id] = {
+                    "score": round(health.score(), 3),
+                    "latency_ms": round(health.latency_ms) if health.latency_ms is not None else None,
+                    "success_rate": round(health.success_rate, 3),
+                    "ban_rate": round(health.ban_rate, 3),
+                    "excluded_for": max(0.0, round(health.excluded_until - now, 1)),
+                    "last_outcome": health.last_outcome,
+                }
+        return snapshot
+
     # ------------------------------------------------------------------ #
     # Utilities
     # ------------------------------------------------------------------ #
@@ -312,31 +476,60 @@ class ProxyManager:
             )
         return options
 
-def test_proxy(self, proxy: Proxy, timeout: float = 10.0) -> Dict[str, object]:
-        handler = urllib.request.ProxyHandler(
-            {
-                "http": proxy.uri(include_credentials=True),
-                "https": proxy.uri(include_credentials=True),
-            }
+    def test_proxy(self, proxy: Proxy, timeout: float = 10.0) -> Dict[str, object]:
+        return self.test_many([proxy], timeout=timeout)[proxy.id]
+
+    def test_many(
+        self,
+        proxies: Optional[Iterable[Proxy]] = None,
+        *,
+        timeout: float = 10.0,
+        concurrency: Optional[int] = None,
+    ) -> Dict[str, Dict[str, object]]:
+        """Проверить прокси одним параллельным сканом (по умолчанию все), вернуть {proxy.id: result}."""
+        try:
+            from .proxy_scanner import DEFAULT_CONCURRENCY, run_scan
+        except ImportError:
+            from services.proxy_scanner import DEFAULT_CONCURRENCY, run_scan
+
+        targets = list(proxies) if proxies is not None else self.list(include_disabled=True)
+        urls = {proxy.id: proxy.uri(include_credentials=True) for proxy in targets}
+        results = run_scan(
+            urls.values(),
+            timeout=int(timeout),
+            concurrency=concurrency or DEFAULT_CONCURRENCY,
         )
-        opener = urllib.request.build_opener(handler)
-        if proxy.username:
-            credentials = f"{proxy.username}:{proxy.password or ''}".encode("utf-8")
-            opener.addheaders = [("Proxy-Authorization", f"Basic {base64.b64encode(credentials).decode('ascii')}")]
 
-        start = time.perf_counter()
-        try:
-            with opener.open("https://api.ipify.org", timeout=timeout) as response:
-                ip = response.read().decode("utf-8").strip()
-        except Exception as exc:
-            elapsed = int((time.perf_counter() - start) * 1000)
-            return {"ok": False, "error": str(exc), "latency_ms": elapsed}
-        else:
-            elapsed = int((time.perf_counter() - start) * 1000)
-            proxy.last_ip = ip
-            proxy.last_check = time.time()
-            self.upsert(proxy)
-            return {"ok": True, "ip": ip, "latency_ms": elapsed}
+        checked_at = time.time()
+        for proxy in targets:
+            result = results[urls[proxy.id]]
+            if result.get("ok"):
+                self.report(proxy, "ok", latency_ms=result.get("latency_ms"))
+            else:
+                self.report(proxy, "timeout" if result.get("status") == "TIMEOUT" else "error")
+        with self._lock:
+            for proxy in targets:
+                result = results[urls[proxy.id]]
+                if not result.get("ok"):
+                    continue
+                proxy.last_ip = result.get("ip")
+                proxy.last_check = checked_at
+                stored = self._items.get(proxy.id)
+                if stored:
+                    stored.last_ip = proxy.last_ip
+                    stored.last_check = checked_at
+            self._save_unlocked()
+        return {proxy_id: results[url] for proxy_id, url in urls.items()}
+
+
+def report_proxy(proxy: Optional[str], outcome: str, *, latency_ms: Optional[float] = None) -> None:
+    """Сообщить исход запроса общему ProxyManager; без прокси и при ошибках — ничего не делает."""
+    if not proxy:
+        return
+    try:
+        ProxyManager.instance().report(proxy, outcome, latency_ms=latency_ms)
+    except Exception as exc:
+        print(f"[PROXY] Не удалось учесть исход {outcome}: {exc}")
 
 
 def proxy_preflight(proxy: Optional[Proxy], *, timeout: float = 10.0) -> Dict[str, Optional[str]]:
@@ -370,7 +563,7 @@ def proxy_preflight(proxy: Optional[Proxy], *, timeout: float = 10.0) -> Dict[st
         return {"ok": False, "ip": None, "error": str(exc)}
 
 
-__all__ = ["Proxy", "ProxyManager", "proxy_preflight"]
+__all__ = ["OUTCOMES", "Proxy", "ProxyHealth", "ProxyManager", "proxy_preflight", "report_proxy"]
 
 
 
@@ -0,0 +1,138 @@
+"""
+Массовая проверка прокси
+
+Одна asyncio-петля проверяет сотни прокси одновременно: семафор ограничивает
+число проверок в полёте, HTTP прокси идут через одну ClientSession с общим
+пулом соединений, SOCKS — через ProxyConnector aiohttp_socks (как в
+services.proxy_check). Результаты пишутся в core.proxy_store одной транзакцией
+вместе с историей задержек.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import aiohttp
+
+try:
+    from .proxy_check import CHECK_URL, USER_AGENT, test_proxy
+except ImportError:
+    from services.proxy_check import CHECK_URL, USER_AGENT, test_proxy
+
+DEFAULT_CONCURRENCY = 200
+DEFAULT_TIMEOUT = 10
+
+ResultCallback = Callable[[str, Dict[str, Any]], None]
+
+
+async def scan(
+    proxies: Iterable[str],
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: int = DEFAULT_TIMEOUT,
+    check_url: str = CHECK_URL,
+    on_result: Optional[ResultCallback] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Проверить прокси параллельно
+
+    Args:
+        proxies: строки прокси в любом формате, который понимает proxy_check
+        concurrency: сколько проверок выполняется одновременно
+        timeout: таймаут одной проверки в секундах
+        check_url: адрес, запрашиваемый через прокси
+        on_result: вызывается после каждой проверки (proxy, result)
+
+    Returns:
+        {proxy: result} в порядке входного списка (дубликаты проверяются один раз)
+    """
+    unique = list(dict.fromkeys(proxy for proxy in proxies if proxy))
+    results: Dict[str, Dict[str, Any]] = {}
+    if not unique:
+        return results
+
+    limit = max(1, int(concurrency))
+    semaphore = asyncio.Semaphore(limit)
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=0, ssl=False, ttl_dns_cache=300)
+
+    async with aiohttp.ClientSession(connector=connector, headers={"User-Agent": USER_AGENT}) as session:
+
+        async def check(proxy: str) -> None:
+            async with semaphore:
+                result = await test_proxy(proxy, timeout, session=session, check_url=check_url)
+            results[proxy] = result
+            if on_result is not None:
+                on_result(proxy, result)
+
+        await asyncio.gather(*(check(proxy) for proxy in unique))
+
+    return {proxy: results[proxy] for proxy in unique}
+
+
+def run_scan(proxies: Iterable[str], **kwargs: Any) -> Dict[str, Dict[str, Any]]:
+    """
+    Синхронная обёртка над scan() для скриптов и рабочих потоков
+
+    Вызывать из потока без работающей петли (в UI — из QThread); внутри
+    корутины используйте ``await scan(...)``.
+    """
+    return asyncio.run(scan(proxies, **kwargs))
+
+
+def _store_url(row: Dict[str, Any]) -> str:
+    scheme = row.get("scheme") or "http"
+    if row.get("login"):
+        return f"{scheme}://{row['login']}:{row.get('password') or ''}@{row['host']}:{row['port']}"
+    return f"{scheme}://{row['host']}:{row['port']}"
+
+
+async def scan_store(
+    proxy_ids: Optional[Iterable[int]] = None,
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: int = DEFAULT_TIMEOUT,
+    on_result: Optional[ResultCallback] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Проверить прокси из core.proxy_store и сохранить статусы и историю
+
+    Returns:
+        список {"id", "raw", "status", "latency_ms", "error", "ip"}
+    """
+    try:
+        from ..core import proxy_store
+    except ImportError:
+        from core import proxy_store
+
+    rows = proxy_store.get_all_proxies()
+    if proxy_ids is not None:
+        wanted = {int(proxy_id) for proxy_id in proxy_ids}
+        rows = [row for row in rows if row["id"] in wanted]
+    urls = {row["id"]: _store_url(row) for row in rows}
+
+    results = await scan(urls.values(), concurrency=concurrency, timeout=timeout, on_result=on_result)
+
+    checks = []
+    for row in rows:
+        result = results[urls[row["id"]]]
+        checks.append(
+            {
+                "id": row["id"],
+                "raw": row["raw"],
+                "status": result.get("status") or ("OK" if result.get("ok") else "FAIL"),
+                "latency_ms": result.get("latency_ms"),
+                "error": result.get("error"),
+                "ip": result.get("ip"),
+            }
+        )
+    await asyncio.to_thread(proxy_store.record_checks, checks)
+    return checks
+
+
+def run_scan_store(proxy_ids: Optional[Iterable[int]] = None, **kwargs: Any) -> List[Dict[str, Any]]:
+    """Синхронная обёртка над scan_store() (те же ограничения, что у run_scan)"""
+    return asyncio.run(scan_store(proxy_ids, **kwargs))
+
+
+__all__ = ["DEFAULT_CONCURRENCY", "DEFAULT_TIMEOUT", "scan", "run_scan", "scan_store", "run_scan_store"]
@@ -0,0 +1,272 @@
+"""Адаптивный темп запросов к Wordstat для каждой пары аккаунт × прокси.
+
+Все парсеры перед навигацией ждут ``await controller.wait()`` и сообщают
+исход: серия успехов понемногу повышает темп (аддитивно, в запросах в секунду),
+таймаут, HTTP 429 и капча увеличивают паузу в разы (мультипликативно). Паузу делят все вкладки и потоки,
+работающие под одним аккаунтом и прокси.
+
+Если у контроллера есть прокси, каждый исход передаётся и в оценку прокси
+(``services.proxy_manager``), по которой пул выбирает прокси для следующих запусков.
+
+Состояние хранится в таблице ``rate_state``, поэтому следующий запуск
+начинается с последнего безопасного темпа, а не с нуля. Из event loop запись
+уходит в пул потоков, чтобы SQLite не останавливал вкладки.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+try:
+    from ..core.db import ensure_schema, get_db_connection
+    from ..utils.proxy import parse_proxy
+    from .proxy_manager import report_proxy
+except ImportError:
+    from core.db import ensure_schema, get_db_connection
+    from utils.proxy import parse_proxy
+    from services.proxy_manager import report_proxy
+
+__all__ = [
+    "RateController",
+    "get_controller",
+    "rate_key",
+    "save_all",
+]
+
+DEFAULT_DELAY = 0.3  # Пауза между навигациями для нового аккаунта (сек)
+MIN_DELAY = 0.05
+MAX_DELAY = 30.0
+RATE_STEP = 0.2  # На сколько запросов/сек растёт темп за серию успехов
+SUCCESSES_PER_STEP = 10
+
+# Во сколько раз растёт пауза при неудаче каждого вида
+BACKOFF_FACTORS = {
+    "timeout": 1.5,
+    "error": 1.5,
+    "throttled": 2.0,
+    "captcha": 4.0,
+}
+SAVE_EVERY = 50  # Сохранять состояние не реже чем раз в столько событий
+
+_registry: Dict[str, "RateController"] = {}
+_registry_lock = threading.Lock()
+_schema_ready = False
+
+
+def rate_key(account: Optional[str], proxy: Optional[str] = None) -> str:
+    """Ключ контроллера: имя аккаунта и адрес прокси без логина/пароля."""
+    server = ""
+    if proxy:
+        config = parse_proxy(proxy)
+        server = config["server"] if config else proxy.strip()
+    return f"{account or 'default'}|{server or 'direct'}"
+
+
+class RateController:
+    """AIMD-регулятор паузы между навигациями одного аккаунта."""
+
+    def __init__(
+        self,
+        key: str,
+        *,
+        delay: float = DEFAULT_DELAY,
+        min_delay: float = MIN_DELAY,
+        max_delay: float = MAX_DELAY,
+        proxy: Optional[str] = None,
+    ) -> None:
+        self.key = key
+        self.proxy = proxy
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = min(max(delay, min_delay), max_delay)
+        self.successes = 0
+        self.failures = 0
+        self.last_event: Optional[str] = None
+        self._streak = 0
+        self._next_slot = 0.0
+        self._last_backoff = 0.0
+        self._window_factor = 1.0  # Замедление, уже применённое в текущем окне
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------------- pacing
+
+    def _reserve(self) -> float:
+        """Занять ближайший слот и вернуть, сколько до него ждать."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + self.delay
+            return start - now
+
+    async def wait(self) -> None:
+        """Дождаться своей очереди на навигацию."""
+        pause = self._reserve()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    def wait_sync(self) -> None:
+        """То же для синхронного кода."""
+        pause = self._reserve()
+        if pause > 0:
+            time.sleep(pause)
+
+    # -------------------------------------------------------------- feedback
+
+    def on_success(self, latency_ms: Optional[float] = None) -> None:
+        report_proxy(self.proxy, "ok", latency_ms=latency_ms)
+        with self._lock:
+            self.successes += 1
+            self._streak += 1
+            self.last_event = "ok"
+            if self._streak >= SUCCESSES_PER_STEP:
+                self._streak = 0
+                self.delay = max(self.min_delay, 1.0 / (1.0 / self.delay + RATE_STEP))
+            self._unsaved += 1
+            should_save = self._unsaved >= SAVE_EVERY
+        if should_save:
+            self._persist()
+
+    def _backoff(self, kind: str) -> None:
+        report_proxy(self.proxy, kind)
+        factor = BACKOFF_FACTORS[kind]
+        with self._lock:
+            self.failures += 1
+            self._streak = 0
+            self.last_event = kind
+            now = time.monotonic()
+            if now - self._last_backoff < max(self.delay, 1.0):
+                # Одна волна неудач (капча сразу на нескольких вкладках, запросы,
+                # ушедшие до прошлого замедления) замедляет один раз — по самому
+                # сильному из её событий
+                if factor <= self._window_factor:
+                    return
+                factor, self._window_factor = factor / self._window_factor, factor
+            else:
+                self._window_factor = factor
+            self._last_backoff = now
+            self.delay = min(self.max_delay, self.delay * factor)
+            # Следующая навигация ждёт уже новую паузу
+            self._next_slot = max(self._next_slot, now + self.delay)
+        # Безопасный темп важнее всего сохранить сразу
+        self._persist()
+
+    def on_timeout(self) -> None:
+        self._backoff("timeout")
+
+    def on_error(self) -> None:
+        self._backoff("error")
+
+    def on_throttled(self) -> None:
+        """HTTP 429 от Wordstat."""
+        self._backoff("throttled")
+
+    def on_captcha(self) -> None:
+        self._backoff("captcha")
+
+    # ----------------------------------------------------------- persistence
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "key": self.key,
+                "delay": round(self.delay, 4),
+                "rate_per_min": round(60.0 / self.delay, 1) if self.delay > 0 else None,
+                "successes": self.successes,
+                "failures": self.failures,
+                "last_event": self.last_event,
+            }
+
+    def _persist(self) -> None:
+        """Сохранить состояние, не блокируя event loop вызывающего потока."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+        else:
+            loop.run_in_executor(None, self.save)
+
+    def save(self) -> None:
+        """Записать состояние в rate_state (синхронно; из корутин — через asyncio.to_thread)."""
+        with self._lock:
+            row = (
+                self.key,
+                self.delay,
+                self.successes,
+                self.failures,
+                self.last_event,
+                datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+            )
+            self._unsaved = 0
+        try:
+            _ensure_ready()
+            with get_db_connection() as conn:
+                conn.execute(
+                    "INSERT INTO rate_state (key, delay, successes, failures, last_event, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET delay = excluded.delay, "
+                    "successes = excluded.successes, failures = excluded.failures, "
+                    "last_event = excluded.last_event, updated_at = excluded.updated_at",
+                    row,
+                )
+        except Exception as exc:
+            print(f"[RATE] Не удалось сохранить темп {self.key}: {exc}")
+
+
+def _ensure_ready() -> None:
+    global _schema_ready
+    if not _schema_ready:
+        ensure_schema()
+        _schema_ready = True
+
+
+def _load(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        _ensure_ready()
+        with get_db_connection() as conn:
+            row = conn.execute(
+                "SELECT delay, successes, failures, last_event FROM rate_state WHERE key = ?",
+                (key,),
+            ).fetchone()
+    except Exception as exc:
+        print(f"[RATE] Не удалось прочитать темп {key}: {exc}")
+        return None
+    return dict(row) if row is not None else None
+
+
+def get_controller(
+    account: Optional[str],
+    proxy: Optional[str] = None,
+    *,
+    initial_delay: float = DEFAULT_DELAY,
+) -> RateController:
+    """
+    Общий контроллер для аккаунта и прокси (один на процесс).
+
+    Args:
+        initial_delay: пауза для пары, о которой ещё ничего не известно
+    """
+    key = rate_key(account, proxy)
+    with _registry_lock:
+        controller = _registry.get(key)
+        if controller is not None:
+            return controller
+        state = _load(key)
+        controller = RateController(key, delay=state["delay"] if state else initial_delay, proxy=proxy)
+        if state:
+            controller.successes = int(state.get("successes") or 0)
+            controller.failures = int(state.get("failures") or 0)
+            controller.last_event = state.get("last_event")
+        _registry[key] = controller
+        return controller
+
+
+def save_all() -> None:
+    """Сохранить состояние всех контроллеров (при завершении; из корутин — через asyncio.to_thread)."""
+    with _registry_lock:
+        controllers = list(_registry.values())
+    for controller in controllers:
+        controller.save()
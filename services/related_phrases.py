@@ -0,0 +1,247 @@
+"""Фразы левой и правой колонок Wordstat, сохранённые из уже полученных ответов.
+
+Каждый ответ ``/wordstat/api`` кроме ``totalValue`` несёт таблицы
+«Что ещё ищут с этой фразой» (левая колонка, ``tableData.popular``) и
+«Похожие запросы» (правая, ``tableData.associations``). Парсеры передают ответ
+в ``record()``, модуль оставляет top-N фраз каждой колонки с частотностями и
+копит их в таблице ``wordstat_related`` по родительской фразе и региону.
+Глубокий сбор (workers.deep_runner) берёт следующий уровень отсюда, а не
+новыми загрузками страниц.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from ..core.db import ensure_schema, get_db_connection
+except ImportError:
+    from core.db import ensure_schema, get_db_connection
+
+__all__ = [
+    "COLUMNS",
+    "extract_columns",
+    "flush",
+    "lookup",
+    "normalize_payload",
+    "record",
+]
+
+TOP_N = 50  # Сколько фраз каждой колонки хранить на один ответ
+FLUSH_EVERY = 200  # Записывать накопленное не реже чем раз в столько фраз
+FLUSH_INTERVAL = 10.0  # ... и не реже чем раз в столько секунд
+_SQL_CHUNK = 400  # держимся ниже лимита параметров SQLite
+
+# Колонка → ключ нормализованной таблицы ответа
+COLUMNS = {"left": "items", "right": "related"}
+
+_schema_ready = False
+_buffer: Dict[Tuple[str, int, str, str], Tuple[int, int]] = {}
+_buffer_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _ensure_ready() -> None:
+    global _schema_ready
+    if not _schema_ready:
+        ensure_schema()
+        _schema_ready = True
+
+
+def _norm_entries(entries: Optional[List[Any]]) -> List[Dict[str, Any]]:
+    normalized: List[Dict[str, Any]] = []
+    for item in entries or []:
+        phrase: str = ""
+        count: Any = 0
+        if isinstance(item, dict):
+            phrase = (
+                item.get("text")
+                or item.get("phrase")
+                or item.get("key")
+                or item.get("title")
+                or ""
+            )
+            count = item.get("value", item.get("count", item.get("freq", 0)))
+        elif isinstance(item, (list, tuple)) and item:
+            phrase = str(item[0] or "")
+            count = item[1] if len(item) > 1 else 0
+        elif isinstance(item, str):
+            phrase = item
+            count = 0
+        try:
+            value = int(str(count).replace(" ", ""))
+        except Exception:
+            value = 0
+        phrase = phrase.strip()
+        if phrase:
+            normalized.append({"phrase": phrase, "count": value})
+    return normalized
+
+
+def normalize_payload(data: Dict[str, Any]) -> None:
+    """Преобразует tableData → items/related, чтобы код дальше не ломался."""
+    if not isinstance(data, dict):
+        return
+    table = data.get("table")
+    if not isinstance(table, dict):
+        return
+    table_data = table.get("tableData")
+    if not isinstance(table_data, dict):
+        return
+
+    if not table.get("items"):
+        table["items"] = _norm_entries(table_data.get("popular"))
+    if not table.get("related"):
+        table["related"] = _norm_entries(table_data.get("associations") or table_data.get("similar"))
+
+
+def extract_columns(
+    data: Any,
+    parent: str = "",
+    *,
+    top_n: int = TOP_N,
+) -> Dict[str, List[Tuple[str, int]]]:
+    """
+    Top-N фраз левой и правой колонок ответа.
+
+    Сама родительская фраза (первая строка левой колонки) пропускается.
+    """
+    columns: Dict[str, List[Tuple[str, int]]] = {kind: [] for kind in COLUMNS}
+    if not isinstance(data, dict):
+        return columns
+    if "table" not in data and isinstance(data.get("data"), dict):
+        data = data["data"]
+    normalize_payload(data)
+    table = data.get("table")
+    if not isinstance(table, dict):
+        return columns
+    parent_key = parent.strip().lower()
+    for kind, key in COLUMNS.items():
+        entries = table.get(key)
+        if not isinstance(entries, list):
+            continue
+        seen = set()
+        for entry in _norm_entries(entries):
+            phrase = entry["phrase"]
+            lowered = phrase.lower()
+            if lowered == parent_key or lowered in seen:
+                continue
+            seen.add(lowered)
+            columns[kind].append((phrase, entry["count"]))
+            if len(columns[kind]) >= top_n:
+                break
+    return columns
+
+
+def record(parent: str, region: int, data: Any, *, top_n: int = TOP_N) -> int:
+    """
+    Запомнить колонки ответа для фразы ``parent`` в регионе ``region``.
+
+    Запись буферизуется и уходит в БД порциями (или по ``flush()``); внутри
+    работающего event loop порция пишется в пуле потоков.
+
+    Returns:
+        сколько фраз добавлено в буфер
+    """
+    parent = (parent or "").strip()
+    if not parent:
+        return 0
+    columns = extract_columns(data, parent, top_n=top_n)
+    added = 0
+    with _buffer_lock:
+        for kind, entries in columns.items():
+            for rank, (phrase, count) in enumerate(entries, 1):
+                _buffer[(parent, int(region), kind, phrase)] = (count, rank)
+                added += 1
+        due = len(_buffer) >= FLUSH_EVERY or time.monotonic() - _last_flush >= FLUSH_INTERVAL
+    if added and due:
+        _flush_soon()
+    return added
+
+
+def _flush_soon() -> None:
+    """Сбросить буфер, не блокируя event loop вызывающего потока."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        flush()
+    else:
+        loop.run_in_executor(None, flush)
+
+
+def flush() -> int:
+    """Записать буфер одной транзакцией. Возвращает число записанных строк."""
+    global _buffer, _last_flush
+    with _flush_lock:
+        with _buffer_lock:
+            pending, _buffer = _buffer, {}
+            _last_flush = time.monotonic()
+        if not pending:
+            return 0
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            _ensure_ready()
+            with get_db_connection() as conn:
+                conn.executemany(
+                    "INSERT INTO wordstat_related (parent, region, kind, phrase, freq, rank, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(parent, region, kind, phrase) DO UPDATE SET "
+                    "freq = excluded.freq, rank = excluded.rank, fetched_at = excluded.fetched_at",
+                    (
+                        (parent, region, kind, phrase, count, rank, now)
+                        for (parent, region, kind, phrase), (count, rank) in pending.items()
+                    ),
+                )
+        except Exception as exc:
+            with _buffer_lock:
+                for key, value in pending.items():
+                    _buffer.setdefault(key, value)
+            print(f"[RELATED] Не удалось сохранить фразы колонок: {exc}")
+            return 0
+        return len(pending)
+
+
+def lookup(
+    parents: Iterable[str],
+    region: int = 225,
+    *,
+    kinds: Sequence[str] = tuple(COLUMNS),
+    min_freq: int = 0,
+    top_n: Optional[int] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Сохранённые фразы колонок для родительских фраз.
+
+    Returns:
+        ``{родитель: [{"phrase", "freq", "kind", "rank"}, ...]}`` — только
+        для родителей, по которым ответ уже был получен
+    """
+    flush()
+    unique = [parent for parent in dict.fromkeys((p or "").strip() for p in parents) if parent]
+    found: Dict[str, List[Dict[str, Any]]] = {}
+    if not unique:
+        return found
+    kinds = [kind for kind in kinds if kind in COLUMNS]
+    kind_marks = ", ".join("?" * len(kinds))
+    _ensure_ready()
+    with get_db_connection() as conn:
+        for start in range(0, len(unique), _SQL_CHUNK):
+            chunk = unique[start:start + _SQL_CHUNK]
+            rows = conn.execute(
+                "SELECT parent, kind, phrase, freq, rank FROM wordstat_related "
+                f"WHERE region = ? AND kind IN ({kind_marks}) AND freq >= ? "
+                f"AND parent IN ({', '.join('?' * len(chunk))}) "
+                "ORDER BY parent, kind, rank",
+                (int(region), *kinds, int(min_freq), *chunk),
+            ).fetchall()
+            for row in rows:
+                entries = found.setdefault(row["parent"], [])
+                if top_n is None or sum(1 for e in entries if e["kind"] == row["kind"]) < top_n:
+                    entries.append(
+                        {"phrase": row["phrase"], "freq": row["freq"], "kind": row["kind"], "rank": row["rank"]}
+                    )
+    return found
@@ -0,0 +1,620 @@
+"""Колоночное хранилище результатов проекта (снимок фраз и метрик).
+
+Проект — каталог ``data/projects/<имя>/``:
+
+* ``phrases.bin`` + ``phrase_offsets.i8`` — словарь фраз: UTF-8 байты фраз,
+  каждая с завершающим ``\\n``, и смещения их начал;
+* по файлу на колонку (``ws.i8``, ``region.i4``, ...) — сырые little-endian
+  массивы, одна строка на запись фраза × регион;
+* ``meta.json`` — число строк и фраз, словарь групп и номер поколения данных.
+
+Файлы данных лежат в каталоге поколения: нулевое — сам каталог проекта,
+следующие — ``gen<N>/``. Запись только дописывает в конец файлов;
+``meta.json`` заменяется последним и служит точкой фиксации: хвост,
+дописанный до сбоя, при открытии отрезается. Повторная запись той же пары
+фраза × регион добавляет новую строку — актуальной считается последняя
+(``Snapshot.latest``). ``compact()`` пишет проект без устаревших строк в новое
+поколение и переключается на него заменой ``meta.json``, так что сбой посреди
+сжатия оставляет прежние данные целыми.
+
+Чтение — через ``numpy.memmap``: 2 млн строк открываются без SQL и JSON,
+фильтры считаются по колонкам целиком, экспорт в CSV/XLSX идёт порциями.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import mmap
+import re
+import shutil
+import threading
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+__all__ = [
+    "COLUMNS",
+    "ResultStore",
+    "Snapshot",
+    "list_projects",
+    "open_store",
+    "remove_store",
+]
+
+PROJECTS_DIR = Path(__file__).resolve().parent.parent / "data" / "projects"
+FORMAT_VERSION = 1
+MISSING = -1  # Нет значения в целочисленной колонке (cpc — NaN)
+EXPORT_CHUNK = 100_000  # Строк в одной порции экспорта
+XLSX_MAX_ROWS = 1_048_575  # Лимит строк листа Excel без заголовка
+
+COLUMNS: Dict[str, np.dtype] = {
+    "phrase_id": np.dtype("<i4"),
+    "region": np.dtype("<i4"),
+    "ws": np.dtype("<i8"),
+    "qws": np.dtype("<i8"),
+    "bws": np.dtype("<i8"),
+    "group_id": np.dtype("<i4"),
+    "cpc": np.dtype("<f4"),
+    "status": np.dtype("i1"),
+}
+STATUSES = ("OK", "NO_DATA")
+EXPORT_HEADER = ["phrase", "region", "ws", "qws", "bws", "group", "cpc", "status"]
+
+_stores: Dict[Path, "ResultStore"] = {}
+_stores_lock = threading.Lock()
+
+
+def _column_path(root: Path, name: str) -> Path:
+    return root / f"{name}.{COLUMNS[name].kind}{COLUMNS[name].itemsize}"
+
+
+def _data_dir(root: Path, generation: int) -> Path:
+    return root / f"gen{generation}" if generation else root
+
+
+def _int_value(value: Any) -> int:
+    if value is None or value == "":
+        return MISSING
+    try:
+        return int(float(str(value).replace(" ", "")))
+    except (TypeError, ValueError):
+        return MISSING
+
+
+def _float_value(value: Any) -> float:
+    try:
+        return float(value) if value not in (None, "") else float("nan")
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _status_code(value: Any) -> int:
+    status = str(value or "OK").strip().upper().replace(" ", "_")
+    return 0 if status == "OK" else 1
+
+
+def open_store(project: str) -> "ResultStore":
+    """Хранилище проекта ``data/projects/<project>`` (один объект на процесс)."""
+    root = (PROJECTS_DIR / project).resolve()
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = _stores[root] = ResultStore(root)
+        return store
+
+
+def list_projects(parent: str) -> List[str]:
+    """Проекты внутри ``data/projects/<parent>`` в виде ``"<parent>/<имя>"``."""
+    base = PROJECTS_DIR / parent
+    if not base.is_dir():
+        return []
+    return sorted(f"{parent}/{path.name}" for path in base.iterdir() if (path / "meta.json").exists())
+
+
+def remove_store(project: str) -> None:
+    """Удалить проект с диска и забыть его объект хранилища."""
+    root = (PROJECTS_DIR / project).resolve()
+    with _stores_lock:
+        _stores.pop(root, None)
+    # Открытый снимок может держать файлы (Windows) — тогда каталог уберётся в другой раз
+    shutil.rmtree(root, ignore_errors=True)
+
+
+class ResultStore:
+    """Дописываемое колоночное хранилище одного проекта."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._phrase_ids: Optional[Dict[str, int]] = None
+        self._meta = self._load_meta()
+        self._truncate_tail()
+
+    # ------------------------------------------------------------------ meta
+
+    def _load_meta(self) -> Dict[str, Any]:
+        path = self.root / "meta.json"
+        if path.exists():
+            meta = json.loads(path.read_text(encoding="utf-8"))
+            if meta.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Неподдерживаемая версия хранилища {path}: {meta.get('version')}")
+            return meta
+        return {"version": FORMAT_VERSION, "rows": 0, "phrases": 0, "phrase_bytes": 0, "groups": [], "generation": 0}
+
+    @property
+    def data_dir(self) -> Path:
+        return _data_dir(self.root, int(self._meta.get("generation", 0)))
+
+    def _save_meta(self) -> None:
+        tmp = self.root / "meta.json.tmp"
+        tmp.write_text(json.dumps(self._meta, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.root / "meta.json")
+
+    def _truncate_tail(self) -> None:
+        """
+        Отрезать данные, дописанные после последней фиксации (сбой посреди append),
+        и убрать поколения, на которые meta.json не ссылается (сбой посреди compact).
+        """
+        if not self.root.exists():
+            return
+        data_dir = self.data_dir
+        limits = {_column_path(data_dir, name): self._meta["rows"] * dtype.itemsize for name, dtype in COLUMNS.items()}
+        limits[data_dir / "phrases.bin"] = self._meta["phrase_bytes"]
+        limits[data_dir / "phrase_offsets.i8"] = (self._meta["phrases"] + 1) * 8 if self._meta["phrases"] else 0
+        for path, size in limits.items():
+            if path.exists() and path.stat().st_size > size:
+                with path.open("r+b") as fh:
+                    fh.truncate(size)
+        self._remove_stale_generations()
+
+    def _remove_stale_generations(self) -> None:
+        current = self.data_dir
+        for path in self.root.glob("gen*"):
+            if path.is_dir() and path != current:
+                # Открытый снимок старого поколения может держать файлы (Windows) — уберём в другой раз
+                shutil.rmtree(path, ignore_errors=True)
+        if current != self.root:
+            # Файлы нулевого поколения лежат прямо в каталоге проекта
+            stale = [_column_path(self.root, name) for name in COLUMNS]
+            stale += [self.root / "phrases.bin", self.root / "phrase_offsets.i8"]
+            for path in stale:
+                try:
+                    path.unlink(missing_ok=True)
+                except OSError:
+                    pass
+
+    @property
+    def rows(self) -> int:
+        return int(self._meta["rows"])
+
+    @property
+    def groups(self) -> List[str]:
+        return list(self._meta["groups"])
+
+    # ----------------------------------------------------------------- write
+
+    def _load_phrase_ids(self) -> Dict[str, int]:
+        if self._phrase_ids is None:
+            snapshot = self.snapshot()
+            self._phrase_ids = {phrase: i for i, phrase in enumerate(snapshot.iter_phrases())}
+            snapshot.close()
+        return self._phrase_ids
+
+    def append(self, records: Iterable[Mapping[str, Any]]) -> int:
+        """
+        Дописать записи ``{"phrase", "region"|"region_id", "ws", "qws", "bws",
+        "group", "cpc", "status"}``. Отсутствующие метрики хранятся как пропуски.
+
+        Returns:
+            число добавленных строк
+        """
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            phrase_ids = self._load_phrase_ids()
+            group_ids = {name: i for i, name in enumerate(self._meta["groups"])}
+            columns: Dict[str, List[Any]] = {name: [] for name in COLUMNS}
+            new_phrases: List[bytes] = []
+
+            for record in records:
+                phrase = str(record.get("phrase", "")).strip().replace("\n", " ")
+                if not phrase:
+                    continue
+                phrase_id = phrase_ids.get(phrase)
+                if phrase_id is None:
+                    phrase_id = phrase_ids[phrase] = len(phrase_ids)
+                    new_phrases.append(phrase.encode("utf-8") + b"\n")
+                group = record.get("group")
+                group_id = MISSING
+                if group:
+                    group_id = group_ids.get(group)
+                    if group_id is None:
+                        group_id = group_ids[group] = len(self._meta["groups"])
+                        self._meta["groups"].append(group)
+                region = record.get("region", record.get("region_id"))
+                columns["phrase_id"].append(phrase_id)
+                columns["region"].append(_int_value(region) if region is not None else 225)
+                columns["ws"].append(_int_value(record.get("ws", record.get("freq_total"))))
+                columns["qws"].append(_int_value(record.get("qws", record.get("freq_quotes"))))
+                columns["bws"].append(_int_value(record.get("bws", record.get("freq_exact"))))
+                columns["group_id"].append(group_id)
+                columns["cpc"].append(_float_value(record.get("cpc")))
+                columns["status"].append(_status_code(record.get("status")))
+
+            added = len(columns["phrase_id"])
+            if not added:
+                return 0
+            data_dir = self.data_dir
+            try:
+                if new_phrases:
+                    lengths = np.fromiter(map(len, new_phrases), dtype=np.int64, count=len(new_phrases))
+                    ends = self._meta["phrase_bytes"] + np.cumsum(lengths)
+                    with (data_dir / "phrases.bin").open("ab") as fh:
+                        fh.write(b"".join(new_phrases))
+                    with (data_dir / "phrase_offsets.i8").open("ab") as fh:
+                        if not self._meta["phrases"]:
+                            np.zeros(1, dtype="<i8").tofile(fh)
+                        ends.astype("<i8").tofile(fh)
+                for name, dtype in COLUMNS.items():
+                    with _column_path(data_dir, name).open("ab") as fh:
+                        np.asarray(columns[name], dtype=dtype).tofile(fh)
+
+                self._meta["rows"] += added
+                self._meta["phrases"] += len(new_phrases)
+                self._meta["phrase_bytes"] += sum(map(len, new_phrases))
+                self._save_meta()
+            except Exception:
+                # Без фиксации meta дописанное будет отрезано; словарь — перечитать
+                self._phrase_ids = None
+                self._meta = self._load_meta()
+                self._truncate_tail()
+                raise
+            return added
+
+    def compact(self) -> int:
+        """
+        Переписать проект, оставив по одной (последней) строке на фразу × регион.
+
+        Новые файлы пишутся в следующее поколение; проект переключается на него
+        одной заменой meta.json, до этого момента действуют прежние данные.
+        """
+        with self._lock:
+            with self.snapshot() as snapshot:
+                keep = snapshot.latest()
+                if len(keep) == snapshot.rows:
+                    return 0
+                removed = snapshot.rows - len(keep)
+                source = self.data_dir
+                generation = int(self._meta.get("generation", 0)) + 1
+                target = _data_dir(self.root, generation)
+                shutil.rmtree(target, ignore_errors=True)
+                target.mkdir(parents=True)
+                for name, dtype in COLUMNS.items():
+                    np.asarray(snapshot.columns[name][keep], dtype=dtype).tofile(_column_path(target, name))
+            if self._meta["phrases"]:
+                for name in ("phrases.bin", "phrase_offsets.i8"):
+                    shutil.copyfile(source / name, target / name)
+
+            meta = dict(self._meta, rows=len(keep), generation=generation)
+            previous, self._meta = self._meta, meta
+            try:
+                self._save_meta()
+            except Exception:
+                self._meta = previous
+                shutil.rmtree(target, ignore_errors=True)
+                raise
+            self._remove_stale_generations()
+            return removed
+
+    # ------------------------------------------------------------------ read
+
+    def snapshot(self) -> "Snapshot":
+        """Снимок зафиксированных данных (memory-mapped, только чтение)."""
+        return Snapshot(self.data_dir, dict(self._meta))
+
+
+class Snapshot:
+    """Зафиксированное состояние проекта, открытое через memory-mapping."""
+
+    def __init__(self, root: Path, meta: Mapping[str, Any]) -> None:
+        self.root = root
+        self.rows = int(meta["rows"])
+        self.phrase_count = int(meta["phrases"])
+        self.groups: List[str] = list(meta["groups"])
+        self.columns: Dict[str, np.ndarray] = {}
+        for name, dtype in COLUMNS.items():
+            if self.rows:
+                self.columns[name] = np.memmap(_column_path(root, name), dtype=dtype, mode="r", shape=(self.rows,))
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+        self._fh = None
+        self._buffer: Any = b""
+        self._folded: Optional[bytes] = None
+        self._folded_phrases: Optional[List[str]] = None
+        if self.phrase_count:
+            self.offsets = np.memmap(root / "phrase_offsets.i8", dtype="<i8", mode="r", shape=(self.phrase_count + 1,))
+            self._fh = (root / "phrases.bin").open("rb")
+            self._buffer = mmap.mmap(self._fh.fileno(), int(meta["phrase_bytes"]), access=mmap.ACCESS_READ)
+        else:
+            self.offsets = np.zeros(1, dtype="<i8")
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._buffer.close()
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # --------------------------------------------------------------- phrases
+
+    def phrase(self, phrase_id: int) -> str:
+        start, end = int(self.offsets[phrase_id]), int(self.offsets[phrase_id + 1]) - 1
+        return self._buffer[start:end].decode("utf-8")
+
+    def iter_phrases(self) -> Iterator[str]:
+        if not self.phrase_count:
+            return iter(())
+        data = self._buffer[:int(self.offsets[-1])]
+        return iter(data.decode("utf-8").split("\n")[:-1])
+
+    def phrases(self, phrase_ids: Sequence[int]) -> List[str]:
+        return [self.phrase(int(i)) for i in phrase_ids]
+
+    def _phrases_containing(self, needle: str) -> np.ndarray:
+        """
+        Маска фраз, содержащих подстроку без учёта регистра.
+
+        Поиск идёт по байтам словаря, приведённого к нижнему регистру (один раз
+        на снимок). Если свёртка регистра меняет длину в байтах и смещения фраз
+        не совпадают, фразы проверяются по одной.
+        """
+        found = np.zeros(self.phrase_count, dtype=bool)
+        needle = needle.lower()
+        pattern = needle.encode("utf-8")
+        if not pattern or b"\n" in pattern:
+            found[:] = not pattern
+            return found
+        if self._folded is None and self._folded_phrases is None:
+            folded = self._buffer[:int(self.offsets[-1])].decode("utf-8").lower()
+            encoded = folded.encode("utf-8")
+            if len(encoded) == int(self.offsets[-1]):
+                self._folded = encoded
+            else:
+                self._folded_phrases = folded.split("\n")[:-1]
+        if self._folded is None:
+            return np.fromiter((needle in phrase for phrase in self._folded_phrases), dtype=bool, count=self.phrase_count)
+        position = self._folded.find(pattern)
+        while position != -1:
+            phrase_id = int(np.searchsorted(self.offsets, position, side="right")) - 1
+            found[phrase_id] = True
+            position = self._folded.find(pattern, int(self.offsets[phrase_id + 1]))
+        return found
+
+    # ---------------------------------------------------------------- filter
+
+    def latest(self) -> np.ndarray:
+        """Индексы актуальных строк: последняя запись каждой пары фраза × регион."""
+        if not self.rows:
+            return np.empty(0, dtype=np.int64)
+        keys = (self.columns["phrase_id"].astype(np.int64) << 32) | (
+            self.columns["region"].astype(np.int64) & 0xFFFFFFFF
+        )
+        _, first_from_end = np.unique(keys[::-1], return_index=True)
+        return np.sort(self.rows - 1 - first_from_end)
+
+    def filter(
+        self,
+        rows: Optional[np.ndarray] = None,
+        *,
+        region: Optional[int] = None,
+        min_ws: Optional[int] = None,
+        max_ws: Optional[int] = None,
+        group: Optional[str] = None,
+        status: Optional[str] = None,
+        contains: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        Индексы строк, прошедших фильтры (по умолчанию среди ``latest()``).
+
+        Все условия считаются векторно по колонкам; ``contains`` ищет
+        подстроку в словаре фраз один раз на фразу, а не на строку.
+        """
+        rows = self.latest() if rows is None else np.asarray(rows)
+        mask = np.ones(len(rows), dtype=bool)
+        if region is not None:
+            mask &= self.columns["region"][rows] == int(region)
+        if min_ws is not None:
+            mask &= self.columns["ws"][rows] >= int(min_ws)
+        if max_ws is not None:
+            ws = self.columns["ws"][rows]
+            mask &= (ws <= int(max_ws)) & (ws != MISSING)
+        if group is not None:
+            group_id = self.groups.index(group) if group in self.groups else -2
+            mask &= self.columns["group_id"][rows] == group_id
+        if status is not None:
+            mask &= self.columns["status"][rows] == _status_code(status)
+        if contains:
+            mask &= self._phrases_containing(contains)[self.columns["phrase_id"][rows]]
+        return rows[mask]
+
+    def records(self, rows: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Строки как словари (для UI и старых вызывающих)."""
+        rows = self.latest() if rows is None else np.asarray(rows)
+        out: List[Dict[str, Any]] = []
+        for chunk in self._chunks(rows):
+            out.extend(
+                {
+                    "phrase": phrase,
+                    "region_id": region,
+                    "ws": None if ws == MISSING else ws,
+                    "qws": None if qws == MISSING else qws,
+                    "bws": None if bws == MISSING else bws,
+                    "group": group,
+                    "cpc": None if cpc != cpc else cpc,
+                    "status": status,
+                }
+                for phrase, region, ws, qws, bws, group, cpc, status in chunk
+            )
+        return out
+
+    # ---------------------------------------------------------------- export
+
+    def _chunks(self, rows: np.ndarray) -> Iterator[List[tuple]]:
+        """Порции строк в виде кортежей в порядке EXPORT_HEADER."""
+        cols = self.columns
+        for start in range(0, len(rows), EXPORT_CHUNK):
+            part = rows[start:start + EXPORT_CHUNK]
+            phrase_ids = cols["phrase_id"][part]
+            group_ids = cols["group_id"][part]
+            yield list(
+                zip(
+                    self.phrases(phrase_ids),
+                    cols["region"][part].tolist(),
+                    cols["ws"][part].tolist(),
+                    cols["qws"][part].tolist(),
+                    cols["bws"][part].tolist(),
+                    [self.groups[g] if g != MISSING else "" for g in group_ids.tolist()],
+                    cols["cpc"][part].astype(np.float64).round(2).tolist(),
+                    [STATUSES[s] for s in cols["status"][part].tolist()],
+                )
+            )
+
+    @staticmethod
+    def _cells(row: tuple) -> List[Any]:
+        phrase, region, ws, qws, bws, group, cpc, status = row
+        return [
+            phrase,
+            region,
+            "" if ws == MISSING else ws,
+            "" if qws == MISSING else qws,
+            "" if bws == MISSING else bws,
+            group,
+            "" if cpc != cpc else cpc,
+            status,
+        ]
+
+    def to_csv(self, path: Path, rows: Optional[np.ndarray] = None, *, delimiter: str = ";") -> int:
+        """Выгрузить строки в CSV (UTF-8 с BOM для Excel). Возвращает число строк."""
+        rows = self.latest() if rows is None else np.asarray(rows)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8-sig", newline="") as fh:
+            writer = csv.writer(fh, delimiter=delimiter)
+            writer.writerow(EXPORT_HEADER)
+            for chunk in self._chunks(rows):
+                writer.writerows(self._cells(row) for row in chunk)
+        return len(rows)
+
+    def to_xlsx(self, path: Path, rows: Optional[np.ndarray] = None) -> int:
+        """
+        Выгрузить строки в XLSX потоково (без загрузки таблицы в память).
+
+        Больше миллиона строк раскладываются по нескольким листам.
+        """
+        rows = self.latest() if rows is None else np.asarray(rows)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sheets = max(1, -(-len(rows) // XLSX_MAX_ROWS))
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            _write_xlsx_parts(zf, sheets)
+            for index in range(sheets):
+                part = rows[index * XLSX_MAX_ROWS:(index + 1) * XLSX_MAX_ROWS]
+                with zf.open(f"xl/worksheets/sheet{index + 1}.xml", "w", force_zip64=True) as fh:
+                    fh.write(
+                        b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                        b"<sheetData>"
+                    )
+                    fh.write(_xlsx_row(EXPORT_HEADER))
+                    for chunk in self._chunks(part):
+                        fh.write(b"".join(_xlsx_row(self._cells(row)) for row in chunk))
+                    fh.write(b"</sheetData></worksheet>")
+        return len(rows)
+
+
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _xlsx_row(values: Iterable[Any]) -> bytes:
+    cells = []
+    for value in values:
+        if value == "":
+            cells.append("<c/>")
+        elif isinstance(value, (int, float)):
+            cells.append(f"<c><v>{value}</v></c>")
+        else:
+            text = escape(_XML_INVALID.sub("", str(value)))
+            cells.append(f'<c t="inlineStr"><is><t>{text}</t></is></c>')
+    return f"<row>{''.join(cells)}</row>".encode("utf-8")
+
+
+def _write_xlsx_parts(zf: zipfile.ZipFile, sheets: int) -> None:
+    """Служебные части книги XLSX (типы, связи, список листов, стили)."""
+    sheet_overrides = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, sheets + 1)
+    )
+    zf.writestr(
+        "[Content_Types].xml",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        f"{sheet_overrides}</Types>",
+    )
+    zf.writestr(
+        "_rels/.rels",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/></Relationships>',
+    )
+    sheet_list = "".join(
+        f'<sheet name="{"results" if i == 1 else f"results{i}"}" sheetId="{i}" r:id="rId{i}"/>'
+        for i in range(1, sheets + 1)
+    )
+    zf.writestr(
+        "xl/workbook.xml",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f"<sheets>{sheet_list}</sheets></workbook>",
+    )
+    sheet_rels = "".join(
+        f'<Relationship Id="rId{i}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, sheets + 1)
+    )
+    zf.writestr(
+        "xl/_rels/workbook.xml.rels",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        f'{sheet_rels}<Relationship Id="rId{sheets + 1}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/></Relationships>',
+    )
+    zf.writestr(
+        "xl/styles.xml",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="1"><xf xfId="0"/></cellXfs>'
+        "</styleSheet>",
+    )
@@ -0,0 +1,537 @@
+"""Прямые запросы к API Wordstat поверх сессии браузера.
+
+Браузер нужен только для того, чтобы получить сессию: куки, CSRF-заголовки и
+шаблон POST-запроса к ``/wordstat/api``. Дальше частотности запрашиваются
+напрямую через пул соединений aiohttp, десятками запросов одновременно.
+
+Когда API отвечает капчей или сессия протухает (401/403, HTML вместо JSON),
+все запросы приостанавливаются, браузер снова открывает Wordstat (на капче —
+ждёт, пока её решат в окне), заново снимает сессию, и работа продолжается.
+Если восстановить сессию не удалось, движок останавливается и возвращает
+несобранные фразы — их добирают вкладки браузера.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+import aiohttp
+from yarl import URL
+
+try:
+    from ..utils.proxy import parse_proxy
+    from . import related_phrases
+    from .proxy_manager import report_proxy
+except ImportError:  # pragma: no cover - fallback for scripts
+    from utils.proxy import parse_proxy  # type: ignore
+    from services import related_phrases  # type: ignore
+    from services.proxy_manager import report_proxy  # type: ignore
+
+__all__ = [
+    "WordstatApiSession",
+    "BrowserSessionSource",
+    "WordstatHttpEngine",
+    "SessionUnavailable",
+    "inject_region",
+    "payload_region",
+    "extract_total",
+    "capture_api_session",
+]
+
+WORDSTAT_URL = "https://wordstat.yandex.ru/"
+API_MARKER = "/wordstat/api"
+CAPTCHA_MARKERS = ("showcaptcha", "smartcaptcha", "captcha")
+
+# Заголовки, которые aiohttp выставляет сам или которые нельзя переносить
+_SKIP_HEADERS = {"cookie", "content-length", "host", "accept-encoding", "connection"}
+
+# Исходы одного запроса
+_CAPTCHA = "captcha"
+_AUTH = "auth"
+_RETRY = "retry"
+_THROTTLED = "throttled"
+
+
+class SessionUnavailable(RuntimeError):
+    """Браузер не смог отдать рабочую сессию Wordstat."""
+
+
+@dataclass
+class WordstatApiSession:
+    """Снимок сессии браузера, достаточный для прямых запросов к API."""
+
+    url: str
+    headers: Dict[str, str]
+    payload: Dict[str, Any]
+    cookies: List[Dict[str, Any]] = field(default_factory=list)
+    captured_at: float = field(default_factory=time.time)
+
+    def build_payload(self, phrase: str, region_id: int) -> Dict[str, Any]:
+        payload = json.loads(json.dumps(self.payload))
+        payload["searchValue"] = phrase
+        inject_region(payload, region_id)
+        return payload
+
+
+def inject_region(payload: Any, region_id: int) -> bool:
+    """
+    Подставить регион во входной JSON Wordstat, не ломая структуру.
+
+    Returns:
+        True, если payload изменён
+    """
+    if not isinstance(payload, dict):
+        return False
+
+    region_id = int(region_id)
+    changed = False
+
+    for key in ("lr", "region", "regionId", "geoId"):
+        if key in payload and payload.get(key) != region_id:
+            payload[key] = region_id
+            changed = True
+
+    for key in ("regions", "regionIds", "geoIds"):
+        if key in payload and isinstance(payload[key], list):
+            new_value = [region_id]
+            if payload[key] != new_value:
+                payload[key] = new_value
+                changed = True
+
+    if "lr" not in payload:
+        payload["lr"] = region_id
+        changed = True
+    if "region" not in payload:
+        payload["region"] = region_id
+        changed = True
+
+    return changed
+
+
+def payload_region(payload: Any) -> Optional[int]:
+    """Регион, который запрашивает входной JSON Wordstat (None — не указан)."""
+    if not isinstance(payload, dict):
+        return None
+    for key in ("lr", "region", "regionId", "geoId"):
+        try:
+            return int(payload[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    for key in ("regions", "regionIds", "geoIds"):
+        value = payload.get(key)
+        if isinstance(value, list) and len(value) == 1:
+            try:
+                return int(value[0])
+            except (TypeError, ValueError):
+                continue
+    return None
+
+
+def extract_total(data: Any) -> int:
+    """Достать общую частотность из ответа API (как handle_response в TurboParser)."""
+    if not isinstance(data, dict):
+        return 0
+    nested = data.get("data")
+    freq = data.get("totalValue") or (nested.get("totalValue") if isinstance(nested, dict) else None) or 0
+    return int(freq) if isinstance(freq, (int, float)) else 0
+
+
+def _looks_like_captcha(text: str) -> bool:
+    lowered = (text or "").lower()
+    return any(marker in lowered for marker in CAPTCHA_MARKERS)
+
+
+async def capture_api_session(
+    page,
+    *,
+    probe_phrase: str,
+    region_id: int = 225,
+    timeout: float = 15.0,
+) -> Optional[WordstatApiSession]:
+    """
+    Открыть фразу в вкладке и перехватить запрос страницы к API Wordstat.
+
+    Returns:
+        сессию или None, если страница не сделала запрос к API (капча,
+        разлогин, таймаут)
+    """
+    loop = asyncio.get_running_loop()
+    captured: asyncio.Future = loop.create_future()
+
+    def on_request(request) -> None:
+        if captured.done():
+            return
+        if request.method.upper() == "POST" and API_MARKER in request.url and request.post_data:
+            captured.set_result(request)
+
+    page.on("request", on_request)
+    try:
+        url = f"{WORDSTAT_URL}?words={quote(probe_phrase)}&region={region_id}&lr={region_id}"
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=int(timeout * 1000))
+        except Exception:
+            return None
+        try:
+            request = await asyncio.wait_for(captured, timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+        try:
+            payload = json.loads(request.post_data or "{}")
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(payload, dict):
+            return None
+
+        raw_headers = await request.all_headers()
+        headers = {
+            name: value
+            for name, value in raw_headers.items()
+            if not name.startswith(":") and name.lower() not in _SKIP_HEADERS
+        }
+        cookies = await page.context.cookies(WORDSTAT_URL)
+        return WordstatApiSession(url=request.url, headers=headers, payload=payload, cookies=cookies)
+    finally:
+        page.remove_listener("request", on_request)
+
+
+class BrowserSessionSource:
+    """Выдаёт и обновляет сессию через открытую вкладку браузера."""
+
+    def __init__(
+        self,
+        page,
+        *,
+        region_id: int = 225,
+        probe_phrase: str = "купить",
+        captcha_timeout: float = 300.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """
+        Args:
+            page: вкладка авторизованного профиля
+            probe_phrase: фраза, по которой страница делает запрос к API
+            captcha_timeout: сколько ждать ручного решения капчи в окне браузера
+                (в headless-режиме стоит ставить 0)
+        """
+        self.page = page
+        self.region_id = region_id
+        self.probe_phrase = probe_phrase
+        self.captcha_timeout = captcha_timeout
+        self.logger = logger or logging.getLogger(__name__)
+
+    async def capture(self) -> Optional[WordstatApiSession]:
+        return await capture_api_session(self.page, probe_phrase=self.probe_phrase, region_id=self.region_id)
+
+    async def refresh(self, reason: str) -> Optional[WordstatApiSession]:
+        """Вернуть браузеру управление и снять новую сессию."""
+        if reason == _CAPTCHA:
+            if not await self._wait_captcha_solved():
+                return None
+        return await self.capture()
+
+    async def _wait_captcha_solved(self) -> bool:
+        try:
+            await self.page.goto(WORDSTAT_URL, wait_until="domcontentloaded", timeout=30000)
+        except Exception as exc:
+            self.logger.warning(f"[HTTP] Не удалось открыть Wordstat для проверки капчи: {exc}")
+            return False
+        if not _looks_like_captcha(self.page.url):
+            return True
+        if self.captcha_timeout <= 0:
+            return False
+
+        self.logger.warning(
+            f"[HTTP] Капча в браузере — решите её в окне, ждём до {self.captcha_timeout:.0f}s"
+        )
+        deadline = time.monotonic() + self.captcha_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(1.0)
+            if not _looks_like_captcha(self.page.url):
+                self.logger.info("[HTTP] Капча пройдена, продолжаем прямые запросы")
+                return True
+        return False
+
+
+class WordstatHttpEngine:
+    """Параллельные запросы к API Wordstat с сессией, снятой из браузера."""
+
+    def __init__(
+        self,
+        source: Any,
+        *,
+        concurrency: int = 16,
+        proxy_uri: Optional[str] = None,
+        request_timeout: float = 15.0,
+        max_attempts: int = 3,
+        max_refreshes: int = 3,
+        rate: Optional[Any] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """
+        Args:
+            source: объект с корутинами ``capture()`` и ``refresh(reason)``,
+                обычно BrowserSessionSource
+            concurrency: сколько запросов держать в полёте одновременно
+            proxy_uri: тот же прокси, что и у браузера (куки привязаны к IP)
+            max_attempts: попыток на фразу при сетевых ошибках и 5xx
+            max_refreshes: сколько раз подряд можно восстанавливать сессию
+                через браузер без единого успешного ответа
+            rate: RateController аккаунта (services.rate_control) — узнаёт
+                о 429 и капчах, чтобы вкладки браузера тоже сбавили темп;
+                он же передаёт их в оценку прокси, а успехи и сетевые ошибки
+                движок сообщает оценке прокси сам
+        """
+        self.source = source
+        self.concurrency = max(1, int(concurrency))
+        self.proxy_uri = proxy_uri
+        self.request_timeout = request_timeout
+        self.max_attempts = max(1, int(max_attempts))
+        self.max_refreshes = max(1, int(max_refreshes))
+        self.rate = rate
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.session: Optional[WordstatApiSession] = None
+        self.broken = False
+        self.stats: Dict[str, Any] = {
+            "requests": 0,
+            "ok": 0,
+            "retries": 0,
+            "captcha": 0,
+            "refreshes": 0,
+            "throttled": 0,
+        }
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._proxy: Optional[str] = None
+        self._proxy_auth: Optional[aiohttp.BasicAuth] = None
+        self._ready = asyncio.Event()
+        self._refresh_lock = asyncio.Lock()
+        self._generation = 0
+        self._refreshes_in_row = 0
+
+    # ---------------------------------------------------------------- lifecycle
+
+    async def __aenter__(self) -> "WordstatHttpEngine":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        session = await self.source.capture()
+        if session is None:
+            raise SessionUnavailable("Не удалось перехватить запрос к API Wordstat")
+        self._http = aiohttp.ClientSession(
+            connector=self._make_connector(),
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+        )
+        self._apply_session(session)
+        self._ready.set()
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    def _make_connector(self) -> aiohttp.BaseConnector:
+        limit = self.concurrency * 2
+        config = parse_proxy(self.proxy_uri) if self.proxy_uri else None
+        if config:
+            server = config["server"]
+            if server.startswith("socks"):
+                from aiohttp_socks import ProxyConnector
+
+                return ProxyConnector.from_url(
+                    server,
+                    rdns=True,
+                    username=config.get("username"),
+                    password=config.get("password"),
+                    limit=limit,
+                )
+            self._proxy = server
+            if config.get("username"):
+                self._proxy_auth = aiohttp.BasicAuth(config["username"], config.get("password", ""))
+        return aiohttp.TCPConnector(limit=limit, ttl_dns_cache=300)
+
+    def _apply_session(self, session: WordstatApiSession) -> None:
+        self.session = session
+        self._generation += 1
+        jar = self._http.cookie_jar
+        jar.clear()
+        base = URL(WORDSTAT_URL)
+        for cookie in session.cookies:
+            name = cookie.get("name")
+            if name:
+                jar.update_cookies({name: cookie.get("value", "")}, response_url=base)
+
+    # ----------------------------------------------------------------- requests
+
+    async def _request(self, phrase: str, region_id: int):
+        """Один запрос. Возвращает частотность или код исхода (captcha/auth/retry/throttled)."""
+        session = self.session
+        self.stats["requests"] += 1
+        try:
+            async with self._http.post(
+                session.url,
+                json=session.build_payload(phrase, region_id),
+                headers=session.headers,
+                proxy=self._proxy,
+                proxy_auth=self._proxy_auth,
+                allow_redirects=False,
+            ) as response:
+                status = response.status
+                if 300 <= status < 400:
+                    location = response.headers.get("Location", "")
+                    if _looks_like_captcha(location):
+                        return _CAPTCHA
+                    return _AUTH
+                text = await response.text(errors="replace")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            self.logger.debug(f"[HTTP] '{phrase}': сетевая ошибка {exc!r}")
+            return _RETRY
+
+        if status == 429:
+            return _THROTTLED
+        if status >= 500:
+            return _RETRY
+        if status in (401, 403):
+            return _CAPTCHA if _looks_like_captcha(text) else _AUTH
+        if status != 200:
+            return _RETRY
+
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            # HTML вместо JSON — страница капчи или логина
+            return _CAPTCHA if _looks_like_captcha(text) else _AUTH
+        if isinstance(data, dict) and ("captcha" in data or data.get("type") == "captcha"):
+            return _CAPTCHA
+        related_phrases.record(phrase, region_id, data)
+        return extract_total(data)
+
+    async def _recover(self, reason: str, generation: int) -> bool:
+        """Приостановить запросы и обновить сессию через браузер (один раз на поколение)."""
+        async with self._refresh_lock:
+            if self.broken:
+                return False
+            if generation != self._generation:
+                # Сессию уже обновил другой запрос
+                return True
+            self._ready.clear()
+            try:
+                if self._refreshes_in_row >= self.max_refreshes:
+                    self.logger.error(
+                        f"[HTTP] Сессия не восстанавливается ({self._refreshes_in_row} раз подряд) — "
+                        f"передаю фразы вкладкам браузера"
+                    )
+                    self.broken = True
+                    return False
+                self._refreshes_in_row += 1
+                self.stats["refreshes"] += 1
+                self.logger.warning(f"[HTTP] Обновление сессии через браузер (причина: {reason})")
+                try:
+                    session = await self.source.refresh(reason)
+                except Exception as exc:
+                    self.logger.error(f"[HTTP] Ошибка обновления сессии: {exc}")
+                    session = None
+                if session is None:
+                    self.broken = True
+                    return False
+                self._apply_session(session)
+                return True
+            finally:
+                self._ready.set()
+
+    async def fetch(self, phrase: str, region_id: int = 225) -> Optional[int]:
+        """
+        Получить частотность одной фразы.
+
+        Returns:
+            частотность; None — фразу собрать не удалось (или движок остановлен)
+        """
+        attempt = 1
+        while not self.broken:
+            await self._ready.wait()
+            if self.broken:
+                break
+            generation = self._generation
+            started = time.monotonic()
+            outcome = await self._request(phrase, region_id)
+
+            if isinstance(outcome, int):
+                report_proxy(self.proxy_uri, "ok", latency_ms=(time.monotonic() - started) * 1000)
+                self._refreshes_in_row = 0
+                self.stats["ok"] += 1
+                return outcome
+            if outcome in (_CAPTCHA, _AUTH):
+                if outcome == _CAPTCHA:
+                    self.stats["captcha"] += 1
+                    if self.rate is not None:
+                        self.rate.on_captcha()
+                if not await self._recover(outcome, generation):
+                    break
+                continue
+
+            if outcome == _RETRY:
+                report_proxy(self.proxy_uri, "error")
+            if attempt >= self.max_attempts:
+                break
+            self.stats["retries"] += 1
+            if outcome == _THROTTLED:
+                self.stats["throttled"] += 1
+                if self.rate is not None:
+                    self.rate.on_throttled()
+            await asyncio.sleep(min(0.5 * 2 ** attempt, 8.0))
+            attempt += 1
+        return None
+
+    async def run(
+        self,
+        phrases: Iterable[Union[str, Tuple[str, int]]],
+        region_id: int = 225,
+        on_result: Optional[Callable[[Any, Optional[int]], Awaitable[None] | None]] = None,
+    ) -> Dict[Any, Optional[int]]:
+        """
+        Собрать частотности пачки фраз с ``concurrency`` запросами в полёте.
+
+        Args:
+            phrases: фразы или пары ``(фраза, регион)``; регион пары
+                заменяет ``region_id``, так одна пачка покрывает много регионов
+
+        Returns:
+            ``{элемент: частотность или None}`` — None у фраз, которые не удалось
+            собрать (их стоит отдать вкладкам браузера)
+        """
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+        for item in dict.fromkeys(p for p in phrases if p):
+            queue.put_nowait(item)
+        results: Dict[Any, Optional[int]] = {}
+
+        async def worker() -> None:
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                phrase, region = item if isinstance(item, tuple) else (item, region_id)
+                value = None if self.broken else await self.fetch(phrase, region)
+                results[item] = value
+                if on_result is not None:
+                    maybe = on_result(item, value)
+                    if asyncio.iscoroutine(maybe):
+                        await maybe
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, queue.qsize()))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.to_thread(related_phrases.flush)
+        return results
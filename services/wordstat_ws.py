@@ -14,9 +14,11 @@ from typing import Iterable
 try:
     from ..workers.turbo_parser_integration import TurboWordstatParser
     from . import accounts as account_service
+    from . import frequency_cache
 except ImportError:
     from workers.turbo_parser_integration import TurboWordstatParser
     from . import accounts as account_service
+    from . import frequency_cache
 
 
 @dataclass(slots=True)
@@ -80,6 +82,7 @@ def collect_frequency(
     modes: dict[str, bool],
     regions: list[int],
     profile: str | None,
+    force_refresh: bool = False,
 ) -> list[dict]:
     """
     Вернуть реальные частотности (WS/"WS"/!WS) для списка фраз.
@@ -89,30 +92,52 @@ def collect_frequency(
         modes: какие режимы частотности нужны.
         regions: список регионов Яндекса (используем первый).
         profile: выбранный аккаунт (имя из базы).
+        force_refresh: не брать значения из кеша частотностей.
     """
     requests = _prepare_requests(phrases, modes)
     if not requests:
         return []
 
+    region = regions[0] if regions else 225
+
+    # Свежие значения берём из кеша, в браузер уходят только остальные запросы.
+    freq_by_query: dict[str, int] = {}
+    by_mode: dict[str, list[_Query]] = {}
+    for entry in requests:
+        by_mode.setdefault(entry.mode, []).append(entry)
+    for mode, entries in by_mode.items():
+        cached, _ = frequency_cache.split_cached(
+            [entry.phrase for entry in entries], mode=mode, region=region, force_refresh=force_refresh
+        )
+        for entry in entries:
+            if entry.phrase in cached:
+                freq_by_query[entry.query] = cached[entry.phrase]
+
     # TurboWordstatParser ожидает уникальные запросы — убираем дубли.
     seen: set[str] = set()
     unique_queries: list[str] = []
     for entry in requests:
-        if entry.query not in seen:
+        if entry.query not in seen and entry.query not in freq_by_query:
             seen.add(entry.query)
             unique_queries.append(entry.query)
 
-    account = _resolve_account(profile)
-    region = regions[0] if regions else 225
-
-    try:
-        results = asyncio.run(_run_turbo(unique_queries, account, region))
-    except RuntimeError:
-        raise
-    except Exception as exc:  # pragma: no cover - реальный запуск вне тестов
-        raise RuntimeError(f"TurboWordstatParser error: {exc}") from exc
-
-    freq_by_query = {row.get("query"): int(row.get("frequency", 0) or 0) for row in results}
+    if unique_queries:
+        account = _resolve_account(profile)
+        try:
+            results = asyncio.run(_run_turbo(unique_queries, account, region))
+        except RuntimeError:
+            raise
+        except Exception as exc:  # pragma: no cover - реальный запуск вне тестов
+            raise RuntimeError(f"TurboWordstatParser error: {exc}") from exc
+
+        fetched = {row.get("query"): int(row.get("frequency", 0) or 0) for row in results}
+        freq_by_query.update(fetched)
+        for mode, entries in by_mode.items():
+            frequency_cache.store(
+                [(entry.phrase, fetched[entry.query]) for entry in entries if entry.query in fetched],
+                mode=mode,
+                region=region,
+            )
 
     rows: list[dict] = []
     for phrase in phrases:
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Кластеризация по индексу совпадает с попарным перебором (services.phrase_tools)"""
+import random
+
+import pytest
+
+from services.phrase_tools import cluster_phrases
+
+WORDS = [
+    "купить", "диван", "кровать", "шкаф", "москва", "недорого", "цена",
+    "угловой", "кожаный", "детский", "отзывы", "доставка", "спб", "икеа",
+]
+
+
+def _random_phrases(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    phrases = []
+    for _ in range(count):
+        size = rng.randint(1, 5)
+        phrases.append(" ".join(rng.choice(WORDS) for _ in range(size)))
+    # Пустые фразы и точные повторы тоже должны совпадать
+    phrases.extend(["", "купить диван", "диван купить"])
+    rng.shuffle(phrases)
+    return phrases
+
+
+def _as_lists(clusters) -> list:
+    return [cluster.keys for cluster in clusters]
+
+
+@pytest.mark.parametrize("similarity", [0.0, 0.2, 0.34, 0.5, 0.67, 0.9, 1.0])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_index_matches_naive(similarity, seed):
+    phrases = _random_phrases(400, seed)
+
+    expected = cluster_phrases(phrases, similarity=similarity, method="naive")
+    actual = cluster_phrases(phrases, similarity=similarity)
+
+    assert _as_lists(actual) == _as_lists(expected)
+
+
+def test_index_matches_naive_with_custom_tokenizer():
+    phrases = _random_phrases(300, 7)
+    tokenizer = lambda phrase: phrase.split()[:3]
+
+    expected = cluster_phrases(phrases, similarity=0.5, tokenizer=tokenizer, method="naive")
+    actual = cluster_phrases(phrases, similarity=0.5, tokenizer=tokenizer, method="index")
+
+    assert _as_lists(actual) == _as_lists(expected)
+
+
+def test_minhash_keeps_every_phrase_once():
+    phrases = _random_phrases(300, 11)
+
+    clusters = cluster_phrases(phrases, similarity=0.5, method="minhash")
+
+    assert sorted(p for keys in _as_lists(clusters) for p in keys) == sorted(phrases)
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        cluster_phrases(["купить диван"], method="fast")
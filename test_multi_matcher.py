@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Многошаблонный поиск совпадает с простыми проверками (services.phrase_tools)"""
+import random
+import re
+
+import pytest
+
+from services.phrase_tools import (
+    AUTOMATON_MIN_KEYWORDS,
+    AhoCorasick,
+    FilterOptions,
+    MultiMatcher,
+    filter_phrases,
+)
+
+WORDS = [
+    "купить", "Диван", "кровать", "шкаф", "москва", "недорого", "цена", "отзывы",
+    "доставка", "спб", "икеа", "б/у", "2024", "c++", "угловой", "детский",
+]
+
+
+def _texts(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6))) for _ in range(count)]
+
+
+def _naive_categories(text, keywords, patterns):
+    folded = text.lower()
+    found = {category for category, words in keywords.items() if any(w.lower() in folded for w in words)}
+    for category, items in patterns.items():
+        if any(re.search(p, text, re.IGNORECASE) for p in items):
+            found.add(category)
+    return found
+
+
+def _keywords(count: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    # Все подстроки слов: ключи перекрываются и вложены друг в друга
+    pool = sorted({w[i:j] for w in WORDS for i in range(len(w)) for j in range(i + 1, len(w) + 1)})
+    words = rng.sample(pool, count)
+    return {"a": words[0::3], "b": words[1::3], "c": words[2::3]}
+
+
+@pytest.mark.parametrize("count", [5, AUTOMATON_MIN_KEYWORDS - 1, AUTOMATON_MIN_KEYWORDS, 90])
+def test_keywords_match_substring_checks(count):
+    keywords = _keywords(count, count)
+    matcher = MultiMatcher(keywords=keywords)
+
+    for text in _texts(300, count):
+        assert matcher.categories(text) == _naive_categories(text, keywords, {}), text
+
+
+@pytest.mark.parametrize("extra_literals", [0, AUTOMATON_MIN_KEYWORDS])
+def test_mixed_literals_and_regexes(extra_literals):
+    patterns = {
+        "commercial": ["купить", "цен[аы]", r"\bдоставк"],
+        "info": ["отзыв", r"^(диван|шкаф)\b", r"(\w+) \1"],  # обратная ссылка компилируется отдельно
+        "digits": [r"\d{4}", r"c\+\+"],
+    }
+    keywords = _keywords(extra_literals, 1) if extra_literals else {}
+    matcher = MultiMatcher(keywords=keywords, patterns=patterns)
+
+    for text in _texts(400, 5) + ["Диван диван", "ЦЕНЫ", "c++ 2024"]:
+        assert matcher.categories(text) == _naive_categories(text, keywords, patterns), text
+
+
+def test_case_sensitive_matching():
+    matcher = MultiMatcher(keywords={"brand": ["Икеа"]}, patterns={"city": ["Москва"]}, ignore_case=False)
+
+    assert matcher.categories("шкаф Икеа Москва") == {"brand", "city"}
+    assert matcher.categories("шкаф икеа москва") == set()
+
+
+def test_aho_corasick_overlapping_keywords():
+    automaton = AhoCorasick([("he", "x"), ("she", "y"), ("hers", "z"), ("", "always")])
+
+    assert automaton.labels("ushers") == {"x", "y", "z", "always"}
+    assert automaton.labels("his") == {"always"}
+    assert not AhoCorasick([])
+
+
+def _naive_filter(phrase, options):
+    include = [re.compile(p, re.IGNORECASE) for p in options.include_patterns]
+    exclude = [re.compile(p, re.IGNORECASE) for p in options.exclude_patterns]
+    if phrase.lower() in {w.lower() for w in options.stopwords}:
+        return False
+    if include and not any(p.search(phrase) for p in include):
+        return False
+    return not any(p.search(phrase) for p in exclude)
+
+
+@pytest.mark.parametrize("extra_literals", [0, AUTOMATON_MIN_KEYWORDS])
+def test_filter_with_mixed_include_exclude(extra_literals):
+    exclude = ["б/у", r"\bспб\b", r"^отзывы"] + [f"нет{i}" for i in range(extra_literals)]
+    options = FilterOptions(
+        include_patterns=["купить", "диван", r"цен[аы]?$"],
+        exclude_patterns=exclude,
+        stopwords=["купить"],
+    )
+    texts = _texts(500, 9) + ["купить", "Купить диван б/у", "отзывы купить"]
+
+    assert filter_phrases(texts, options) == [t for t in texts if _naive_filter(t, options)]
+
+
+def test_filter_without_patterns_keeps_everything():
+    texts = _texts(50, 3)
+
+    assert filter_phrases(texts, FilterOptions()) == texts
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Продолжение заданий парсинга после падения (services.parse_jobs)"""
+import pytest
+from sqlalchemy import create_engine
+
+from core import db
+from services import parse_jobs
+from services.parse_jobs import (
+    JobCheckpoint,
+    create_job,
+    finish_job,
+    get_job,
+    job_items,
+    latest_unfinished_job,
+    pending_items,
+)
+from services.phrase_coordinator import PhraseCoordinator
+
+REGIONS = {225: "Россия", 213: "Москва"}
+
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    """Отдельная БД на каждый тест вместо data/keyset.db"""
+    path = tmp_path / "keyset.db"
+    engine = create_engine(f"sqlite:///{path.as_posix()}", future=True)
+    monkeypatch.setattr(db, "DB_PATH", path)
+    monkeypatch.setattr(db.ensure_schema, "engine", engine)
+    monkeypatch.setattr(parse_jobs, "_schema_ready", False)
+    yield path
+    engine.dispose()
+
+
+def test_create_job_queues_every_pair():
+    job_id = create_job([" купить диван ", "диван", "", "диван"], REGIONS)
+
+    job = get_job(job_id)
+    assert job["total"] == 4
+    assert job["regions"] == REGIONS
+    assert job["counts"] == {"queued": 4}
+    assert sorted(pending_items(job_id)) == [
+        ("диван", 213), ("диван", 225), ("купить диван", 213), ("купить диван", 225),
+    ]
+
+
+def test_resume_skips_collected_pairs():
+    job_id = create_job(["a", "b", "c"], {225: "Россия"})
+    checkpoint = JobCheckpoint(job_id, flush_every=1000, flush_interval=3600)
+    checkpoint.claimed("w1", ("a", 225))
+    checkpoint.reported("w1", ("a", 225), 120, "OK")
+    checkpoint.claimed("w1", ("b", 225))
+    checkpoint.reported("w1", ("b", 225), 0, "NO_DATA")
+    checkpoint.claimed("w1", ("c", 225))
+    # Ничего не записано, пока журнал не сброшен
+    assert len(pending_items(job_id)) == 3
+    checkpoint.flush()
+
+    # "Падение": c осталась в running и собирается заново
+    finish_job(job_id)
+    job = latest_unfinished_job()
+    assert job["id"] == job_id
+    assert job["status"] == "interrupted"
+    assert job["done"] == 2
+    assert pending_items(job_id) == [("c", 225)]
+    assert [(row["phrase"], row["status"], row["freq"]) for row in job_items(job_id)] == [
+        ("a", "ok", 120),
+        ("b", "no_data", 0),
+    ]
+
+    checkpoint.claimed("w2", ("c", 225))
+    checkpoint.reported("w2", ("c", 225), 7, "OK")
+    checkpoint.flush()
+    finish_job(job_id)
+    assert pending_items(job_id) == []
+    assert get_job(job_id)["status"] == "done"
+    assert latest_unfinished_job() is None
+
+
+def test_cached_pairs_are_marked_done():
+    job_id = create_job(["a", "b"], {225: "Россия"})
+    JobCheckpoint(job_id).record_cached({("a", 225): 42})
+
+    assert pending_items(job_id) == [("b", 225)]
+    assert job_items(job_id)[0]["freq"] == 42
+
+
+def test_retired_profile_pairs_go_back_to_queue():
+    job_id = create_job(["a", "b", "c", "d"], {225: "Россия"})
+    checkpoint = JobCheckpoint(job_id, flush_every=1000, flush_interval=3600)
+    coordinator = PhraseCoordinator(
+        pending_items(job_id), shard_size=4, max_failures_in_row=2, checkpoint=checkpoint
+    )
+    coordinator.register("bad")
+    coordinator.register("good")
+
+    batch = coordinator.lease("bad")
+    for item in batch[:2]:
+        assert coordinator.claim("bad", item)
+    assert coordinator.report("bad", batch[0], 0, "NO_DATA")
+    # Вторая NO_DATA подряд выводит профиль; его серия не считается результатом
+    assert not coordinator.report("bad", batch[1], 0, "NO_DATA")
+    checkpoint.flush()
+
+    assert sorted(pending_items(job_id)) == sorted(batch)
+    assert job_items(job_id) == []
+    assert get_job(job_id)["counts"] == {"queued": 4}
+
+    while True:
+        items = coordinator.lease("good")
+        if not items:
+            break
+        for item in items:
+            if coordinator.claim("good", item):
+                coordinator.report("good", item, 1, "OK")
+    checkpoint.flush()
+    assert coordinator.finished
+    assert pending_items(job_id) == []
+
+
+def test_failed_profile_marks_pairs_as_error():
+    job_id = create_job(["a", "b"], {225: "Россия"})
+    checkpoint = JobCheckpoint(job_id)
+    coordinator = PhraseCoordinator(pending_items(job_id), checkpoint=checkpoint)
+    coordinator.register("w1")
+    for item in coordinator.lease("w1"):
+        coordinator.claim("w1", item)
+
+    assert coordinator.release("w1", "error: chrome crashed") == 2
+    rows = job_items(job_id, statuses=("error",))
+    assert [row["error"] for row in rows] == ["error: chrome crashed"] * 2
+    assert sorted(pending_items(job_id)) == [("a", 225), ("b", 225)]
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Колоночное хранилище результатов (services.result_store)"""
+import csv
+
+import pytest
+
+from services import result_store
+from services.result_store import COLUMNS, ResultStore, _column_path
+
+
+RECORDS = [
+    {"phrase": "купить диван", "region": 225, "ws": 1500, "qws": 300, "bws": 120, "group": "мебель", "status": "OK"},
+    {"phrase": "Купить ДИВАН москва", "region": 213, "ws": 700, "group": "мебель", "cpc": 12.5},
+    {"phrase": "шкаф купе", "region_id": 225, "ws": 40, "group": "шкафы"},
+    {"phrase": "кровать детская", "region": 225, "status": "NO_DATA"},
+    {"phrase": "   ", "region": 225, "ws": 1},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(tmp_path / "project")
+    assert store.append(RECORDS) == 4
+    return store
+
+
+def _phrases(snapshot, rows):
+    return [record["phrase"] for record in snapshot.records(rows)]
+
+
+def test_append_round_trip(store):
+    with store.snapshot() as snapshot:
+        records = snapshot.records()
+
+    assert [r["phrase"] for r in records] == ["купить диван", "Купить ДИВАН москва", "шкаф купе", "кровать детская"]
+    assert records[0] == {
+        "phrase": "купить диван", "region_id": 225, "ws": 1500, "qws": 300, "bws": 120,
+        "group": "мебель", "cpc": None, "status": "OK",
+    }
+    assert records[1]["qws"] is None
+    assert records[1]["cpc"] == pytest.approx(12.5)
+    assert records[3]["ws"] is None
+    assert records[3]["group"] == ""
+    assert records[3]["status"] == "NO_DATA"
+    assert store.groups == ["мебель", "шкафы"]
+
+
+def test_reappended_pair_uses_latest_row(store):
+    store.append([{"phrase": "купить диван", "region": 225, "ws": 1800}])
+
+    with store.snapshot() as snapshot:
+        assert snapshot.rows == 5
+        latest = snapshot.records()
+    assert len(latest) == 4
+    assert [r["ws"] for r in latest if r["phrase"] == "купить диван"] == [1800]
+
+
+def test_compact_keeps_latest_rows_in_new_generation(store, tmp_path):
+    store.append([
+        {"phrase": "купить диван", "region": 225, "ws": 1800},
+        {"phrase": "шкаф купе", "region": 225, "ws": 55},
+    ])
+    with store.snapshot() as snapshot:
+        before = snapshot.records()
+
+    assert store.compact() == 2
+    assert store.rows == 4
+    assert store.data_dir == tmp_path / "project" / "gen1"
+    # Файлы прежнего поколения убраны
+    assert not _column_path(tmp_path / "project", "ws").exists()
+    assert store.compact() == 0
+
+    reopened = ResultStore(tmp_path / "project")
+    with reopened.snapshot() as snapshot:
+        assert snapshot.records() == before
+    assert reopened.append([{"phrase": "новая фраза", "region": 2, "ws": 3}]) == 1
+    with reopened.snapshot() as snapshot:
+        assert _phrases(snapshot, None)[-1] == "новая фраза"
+
+
+def test_interrupted_compact_keeps_committed_data(store, tmp_path):
+    # Поколение, на которое meta.json не переключился, при открытии удаляется
+    stale = tmp_path / "project" / "gen1"
+    stale.mkdir()
+    (stale / "ws.i8").write_bytes(b"\0" * 8)
+
+    reopened = ResultStore(tmp_path / "project")
+    assert not stale.exists()
+    assert reopened.rows == 4
+
+
+def test_uncommitted_tail_is_truncated(store, tmp_path):
+    root = tmp_path / "project"
+    for name, dtype in COLUMNS.items():
+        with _column_path(root, name).open("ab") as fh:
+            fh.write(b"\1" * dtype.itemsize * 3)
+
+    reopened = ResultStore(root)
+    for name, dtype in COLUMNS.items():
+        assert _column_path(root, name).stat().st_size == 4 * dtype.itemsize
+    with reopened.snapshot() as snapshot:
+        assert len(snapshot.records()) == 4
+
+
+def test_filter(store):
+    store.append([{"phrase": "шкаф купе", "region": 225, "ws": 90, "group": "шкафы"}])
+
+    with store.snapshot() as snapshot:
+        assert _phrases(snapshot, snapshot.filter(region=213)) == ["Купить ДИВАН москва"]
+        assert _phrases(snapshot, snapshot.filter(min_ws=100)) == ["купить диван", "Купить ДИВАН москва"]
+        # Строка без ws не проходит верхнюю границу
+        assert _phrases(snapshot, snapshot.filter(max_ws=100)) == ["шкаф купе"]
+        assert _phrases(snapshot, snapshot.filter(group="шкафы")) == ["шкаф купе"]
+        assert snapshot.filter(group="нет такой").size == 0
+        assert _phrases(snapshot, snapshot.filter(status="no data")) == ["кровать детская"]
+        assert _phrases(snapshot, snapshot.filter(contains="диван")) == ["купить диван", "Купить ДИВАН москва"]
+        assert _phrases(snapshot, snapshot.filter(contains="ДИВАН М")) == ["Купить ДИВАН москва"]
+        assert _phrases(snapshot, snapshot.filter(contains="диван", region=225, min_ws=1000)) == ["купить диван"]
+
+
+def test_to_csv(store, tmp_path):
+    path = tmp_path / "export" / "results.csv"
+    with store.snapshot() as snapshot:
+        assert snapshot.to_csv(path, snapshot.filter(group="мебель")) == 2
+
+    with path.open(encoding="utf-8-sig", newline="") as fh:
+        rows = list(csv.reader(fh, delimiter=";"))
+    assert rows[0] == ["phrase", "region", "ws", "qws", "bws", "group", "cpc", "status"]
+    assert rows[1] == ["купить диван", "225", "1500", "300", "120", "мебель", "", "OK"]
+    assert rows[2] == ["Купить ДИВАН москва", "213", "700", "", "", "мебель", "12.5", "OK"]
+
+
+def test_list_and_remove_projects(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_store, "PROJECTS_DIR", tmp_path)
+    for session in ("20260101_100000", "20260102_100000"):
+        result_store.open_store(f"parsing/{session}").append(RECORDS[:1])
+    (tmp_path / "parsing" / "empty").mkdir()
+
+    assert result_store.list_projects("parsing") == ["parsing/20260101_100000", "parsing/20260102_100000"]
+    result_store.remove_store("parsing/20260101_100000")
+    assert result_store.list_projects("parsing") == ["parsing/20260102_100000"]
+    assert not (tmp_path / "parsing" / "20260101_100000").exists()
+    # Объект удалённого проекта не переиспользуется
+    assert result_store.open_store("parsing/20260101_100000").rows == 0
+    assert result_store.list_projects("нет такого") == []
@@ -8,12 +8,13 @@
 
 import argparse
 import asyncio
+import contextlib
 import json
 import pathlib
 import time
 import sys
 from datetime import datetime
-from typing import Dict, Iterable, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Any, Sequence, Tuple
 from urllib.parse import quote
 import logging
 
@@ -52,6 +53,33 @@ except ImportError:  # pragma: no cover - fallback for scripts
         load_cookies_from_profile_to_context,
     )
 
+try:
+    from keyset.services import frequency_cache
+except ImportError:  # pragma: no cover - fallback for scripts
+    from services import frequency_cache  # type: ignore
+
+try:
+    from keyset.services import rate_control, related_phrases
+    from keyset.services.network_policy import install_policy
+except ImportError:  # pragma: no cover - fallback for scripts
+    from services import rate_control, related_phrases  # type: ignore
+    from services.network_policy import install_policy  # type: ignore
+
+try:
+    from keyset.services.wordstat_http import (
+        BrowserSessionSource,
+        WordstatHttpEngine,
+        inject_region,
+        payload_region,
+    )
+except ImportError:  # pragma: no cover - fallback for scripts
+    from services.wordstat_http import (  # type: ignore
+        BrowserSessionSource,
+        WordstatHttpEngine,
+        inject_region,
+        payload_region,
+    )
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -66,7 +94,6 @@ logging.basicConfig(
 TABS_COUNT = 10  # Количество вкладок
 BATCH_SIZE = 50  # Размер батча фраз
 DELAY_BETWEEN_TABS = 0.3  # Задержка между загрузкой вкладок (сек)
-DELAY_BETWEEN_QUERIES = 0.5  # Задержка между запросами (сек)
 RESPONSE_TIMEOUT = 3000  # Таймаут ожидания ответа API (мс)
 WORDSTAT_LOAD_TIMEOUT_MS = 30000  # Таймаут загрузки Wordstat (мс)
 WORDSTAT_MAX_ATTEMPTS = 3  # Количество попыток загрузки вкладки
@@ -74,7 +101,8 @@ WORDSTAT_RETRY_DELAY_BASE = 1.5  # Базовая задержка между п
 PHRASE_MAX_ATTEMPTS = 3  # Сколько раз пытаемся получить частотность
 API_MAX_WAIT_SECONDS = 5.0  # Максимальное время ожидания ответа API на попытку
 API_POLL_INTERVAL = 0.2  # Интервал проверки ответа API (сек)
-RELOAD_DELAY_SECONDS = 0.5  # Пауза после перезагрузки перед новой попыткой
+HTTP_CONCURRENCY = 16  # Прямых запросов к API в полёте (режим http_replay)
+HTTP_CAPTCHA_WAIT_SECONDS = 300.0  # Сколько ждать ручного решения капчи в окне
 
 
 def log_parsing_debug(entry: Dict[str, Any]) -> None:
@@ -313,48 +341,90 @@ class TurboParser:
         phrases: List[str],
         headless: bool = False,
         proxy_uri: Optional[str] = None,
+        coordinator: Optional[Any] = None,
+        http_replay: bool = False,
+        http_concurrency: int = HTTP_CONCURRENCY,
+        pool: Optional[Any] = None,
+        regions: Optional[Sequence[int]] = None,
     ):
+        """
+        Args:
+            phrases: фразы или пары ``(фраза, регион)``; фраза без региона
+                собирается во всех ``regions``
+            coordinator: общий PhraseCoordinator (services.phrase_coordinator).
+                Если задан, фразы берутся порциями из него, а не из ``phrases``,
+                и делятся со всеми профилями, подключёнными к тому же координатору.
+                Элементы координатора — фразы (регион ``region_id``) или пары
+                ``(фраза, регион)``.
+            http_replay: собирать фразы прямыми запросами к API
+                (services.wordstat_http) с сессией этого профиля; вкладки
+                добирают только то, что не удалось собрать напрямую
+            http_concurrency: сколько прямых запросов держать в полёте
+            pool: BrowserPool (services.browser_pool) текущего event loop.
+                Контекст профиля берётся из пула вместе с прогретыми вкладками
+                и возвращается в него после работы, а не закрывается.
+            regions: регионы, которые собираются за один запуск браузера.
+                Регион задаётся каждому запросу, вкладки разбирают общую
+                очередь пар (фраза, регион). По умолчанию — только ``region_id``.
+        """
         self.account_name = account_name
         self.profile_path = profile_path.expanduser().resolve()
         self.phrases = phrases
         self.headless = headless
         self.proxy_uri = proxy_uri
-        self.waiters: Dict[str, asyncio.Future[int]] = {}
+        self.coordinator = coordinator
+        self.http_replay = http_replay
+        self.http_concurrency = http_concurrency
+        self.pool = pool
+        self.regions: List[int] = [int(region) for region in regions] if regions else []
+        self.waiters: Dict[Tuple[str, int], asyncio.Future[int]] = {}
         self.region_id: int = 225
-        self.results: Dict[str, Any] = {}
-        self.result_status: Dict[str, str] = {}
+        # Результаты и статусы по парам (фраза, регион)
+        self.results: Dict[Tuple[str, int], Any] = {}
+        self.result_status: Dict[Tuple[str, int], str] = {}
+        # Регион, который сейчас запрашивает каждая вкладка
+        self.page_regions: Dict[Page, int] = {}
+        self.rate: Optional[rate_control.RateController] = None
         self.logger = logging.getLogger(f"TurboParser.{account_name}")
 
-    def _inject_region_into_payload(self, payload: Any) -> Dict[str, Any] | None:
+    def _job(self, item: Any) -> Tuple[str, int]:
+        """Фраза или пара из очереди/координатора → пара (фраза, регион)."""
+        if isinstance(item, tuple):
+            return item[0], int(item[1])
+        return item, self.region_id
+
+    def _own_jobs(self) -> List[Tuple[str, int]]:
+        """Пары (фраза, регион) из ``phrases`` для запуска без координатора."""
+        regions = self.regions or [self.region_id]
+        jobs: List[Tuple[str, int]] = []
+        for item in self.phrases:
+            if isinstance(item, tuple):
+                phrase = item[0].strip()
+                if phrase:
+                    jobs.append((phrase, int(item[1])))
+                continue
+            phrase = item.strip()
+            if phrase:
+                jobs.extend((phrase, region) for region in regions)
+        return list(dict.fromkeys(jobs))
+
+    def _label(self, job: Tuple[str, int]) -> str:
+        """Подпись пары для логов: регион показываем, только если их несколько."""
+        phrase, region = job
+        if len(self.regions) > 1 or region != self.region_id:
+            return f"{phrase} [{region}]"
+        return phrase
+
+    def _page_region(self, page: Optional[Page]) -> int:
+        return self.page_regions.get(page, self.region_id)
+
+    def _inject_region_into_payload(self, payload: Any, region_id: Optional[int] = None) -> Dict[str, Any] | None:
         """
         Аккуратно подставляем region_id во входной JSON Wordstat, не ломая структуру.
         Возвращает модифицированный словарь (или None, если изменить нечего).
         """
 
-        if not isinstance(payload, dict):
-            return None
-
-        region_id = int(self.region_id)
-        changed = False
-
-        for key in ("lr", "region", "regionId", "geoId"):
-            if key in payload and payload.get(key) != region_id:
-                payload[key] = region_id
-                changed = True
-
-        for key in ("regions", "regionIds", "geoIds"):
-            if key in payload and isinstance(payload[key], list):
-                new_value = [region_id]
-                if payload[key] != new_value:
-                    payload[key] = new_value
-                    changed = True
-
-        if "lr" not in payload:
-            payload["lr"] = region_id
-            changed = True
-        if "region" not in payload:
-            payload["region"] = region_id
-            changed = True
+        changed = inject_region(payload, self.region_id if region_id is None else region_id)
 
         if changed:
             self.logger.debug(
@@ -362,12 +432,132 @@ class TurboParser:
             )
 
         return payload if changed else None
-        
+
+    async def _run_http_replay(self, page: Page, retired: asyncio.Event) -> tuple[List[Any], Dict[str, Any]]:
+        """
+        Собрать фразы прямыми запросами к API через сессию вкладки ``page``.
+
+        Returns:
+            (элементы, которые нужно добрать вкладками, статистика движка)
+        """
+        coordinator = self.coordinator
+        fallback: List[Any] = []
+        source = BrowserSessionSource(
+            page,
+            region_id=self.region_id,
+            captcha_timeout=0 if self.headless else HTTP_CAPTCHA_WAIT_SECONDS,
+            logger=self.logger,
+        )
+        engine = WordstatHttpEngine(
+            source,
+            concurrency=self.http_concurrency,
+            proxy_uri=self.proxy_uri,
+            max_attempts=PHRASE_MAX_ATTEMPTS,
+            rate=self.rate,
+            logger=self.logger,
+        )
+
+        def on_result(item: Any, value: Optional[int]) -> None:
+            if value is None:
+                fallback.append(item)
+                return
+            job = self._job(item)
+            self.results[job] = value
+            self.result_status[job] = "OK"
+            if coordinator is not None and not coordinator.report(self.account_name, item, value, "OK"):
+                retired.set()
+
+        try:
+            await engine.start()
+        except Exception as exc:
+            self.logger.warning(f"[HTTP] Прямые запросы недоступны ({exc}) — собираем вкладками")
+            pending = [] if coordinator is not None else self._own_jobs()
+            return pending, {"broken": True}
+
+        started = time.time()
+        self.logger.info(f"[HTTP] Сессия перехвачена, прямые запросы: {engine.concurrency} в полёте")
+        try:
+            if coordinator is None:
+                await engine.run(self._own_jobs(), self.region_id, on_result)
+            else:
+                while not engine.broken and not retired.is_set():
+                    batch = coordinator.lease(self.account_name, engine.concurrency * 2)
+                    if batch is None:
+                        break
+                    if not batch:
+                        await asyncio.sleep(API_POLL_INTERVAL * 5)
+                        continue
+                    claimed = [item for item in batch if coordinator.claim(self.account_name, item)]
+                    await engine.run(claimed, self.region_id, on_result)
+        finally:
+            await engine.close()
+
+        elapsed = time.time() - started
+        stats = dict(engine.stats, broken=engine.broken, elapsed=round(elapsed, 3))
+        self.logger.info(
+            f"[HTTP] Собрано напрямую: {engine.stats['ok']} фраз за {elapsed:.1f}s "
+            f"({engine.stats['ok'] / elapsed if elapsed > 0 else 0:.1f} фраз/сек), "
+            f"обновлений сессии: {engine.stats['refreshes']}, вкладкам осталось: {len(fallback)}"
+        )
+        return fallback, stats
+
+    async def _launch_context(self, playwright, proxy_config: Optional[dict]) -> BrowserContext:
+        try:
+            return await playwright.chromium.launch_persistent_context(
+                user_data_dir=str(self.profile_path),
+                headless=self.headless,
+                channel="chrome",
+                proxy=proxy_config,
+                args=[
+                    "--start-maximized",
+                    "--disable-blink-features=AutomationControlled",
+                    "--disable-features=IsolateOrigins,site-per-process",
+                    "--disable-site-isolation-trials",
+                    "--no-first-run",
+                    "--no-default-browser-check",
+                ],
+                viewport=None,
+                locale="ru-RU",
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to launch browser: {e}")
+            raise
+
+    async def _close_context(self, context: BrowserContext, pooled: Optional[Any], *, healthy: bool = True) -> None:
+        """Закрыть контекст или вернуть его в пул (неисправный пул закрывает сам)."""
+        if pooled is None:
+            await context.close()
+        elif healthy:
+            await self.pool.release(pooled)
+        else:
+            await self.pool.discard(pooled)
+
     async def run(self) -> WordstatResult:
         """Запуск парсера"""
+        if self.coordinator is None:
+            return await self._run()
+
+        self.coordinator.register(self.account_name)
+        reason = "finished"
+        try:
+            return await self._run()
+        except BaseException as exc:
+            reason = f"error: {exc}"
+            raise
+        finally:
+            returned = self.coordinator.release(self.account_name, reason)
+            if returned:
+                self.logger.warning(
+                    f"[{self.account_name}] Возвращено в общий пул {returned} несобранных фраз"
+                )
+
+    async def _run(self) -> WordstatResult:
         self.results = {}
         self.result_status = {}
         self.waiters.clear()
+        self.page_regions.clear()
+        # Темп навигаций общий для всех вкладок и запусков этого аккаунта/прокси
+        self.rate = rate_control.get_controller(self.account_name, self.proxy_uri)
         total_phrases = len(self.phrases)
         unique_phrases = len(set(self.phrases))
         duplicates_count = total_phrases - unique_phrases
@@ -375,7 +565,11 @@ class TurboParser:
         self.logger.info("=" * 70)
         self.logger.info(f"ТУРБО-ПАРСЕР: 10 ВКЛАДОК ({self.account_name})")
         self.logger.info(f"Профиль: {self.profile_path}")
-        self.logger.info(f"Регион: {self.region_id}")
+        if len(self.regions) > 1:
+            self.logger.info(f"Регионы: {', '.join(map(str, self.regions))} (один запуск браузера)")
+        else:
+            self.logger.info(f"Регион: {self.region_id}")
+        self.logger.info(f"Темп: пауза {self.rate.delay:.2f}s между навигациями")
         self.logger.info("=" * 70)
         self.logger.info(f"Загружено фраз: {total_phrases}")
         self.logger.info(f"[Parser] НАЧАЛО парсинга. Фраз: {len(self.phrases)}")
@@ -392,30 +586,29 @@ class TurboParser:
             self.logger.info(f"[PROXY] Используется: {proxy_config['server']}")
         
         
-        async with async_playwright() as p:
-            # 1. ЗАПУСК CHROME
-            self.logger.info(f"[1/6] Запуск Chrome с профилем {self.account_name}...")
-            
-            try:
-                context: BrowserContext = await p.chromium.launch_persistent_context(
-                    user_data_dir=str(self.profile_path),
-                    headless=self.headless,
-                    channel="chrome",
-                    proxy=proxy_config,
-                    args=[
-                        "--start-maximized",
-                        "--disable-blink-features=AutomationControlled",
-                        "--disable-features=IsolateOrigins,site-per-process",
-                        "--disable-site-isolation-trials",
-                        "--no-first-run",
-                        "--no-default-browser-check",
-                    ],
-                    viewport=None,
-                    locale="ru-RU",
+        async with contextlib.AsyncExitStack() as stack:
+            # 1. ЗАПУСК CHROME (или контекст из пула)
+            pooled = None
+            if self.pool is not None:
+                self.logger.info(f"[1/6] Контекст профиля {self.account_name} из пула браузеров...")
+                pooled = await self.pool.lease(
+                    self.account_name,
+                    (str(self.profile_path), self.proxy_uri, self.headless),
+                    lambda playwright: self._launch_context(playwright, proxy_config),
                 )
-            except Exception as e:
-                self.logger.error(f"Failed to launch browser: {e}")
-                raise
+                context: BrowserContext = pooled.context
+
+                async def _discard_on_error(exc_type, exc, tb):
+                    # Контекст, не возвращённый явно, считаем сломанным
+                    if pooled.leased:
+                        await self.pool.discard(pooled)
+                    return False
+
+                stack.push_async_exit(_discard_on_error)
+            else:
+                self.logger.info(f"[1/6] Запуск Chrome с профилем {self.account_name}...")
+                p = await stack.enter_async_context(async_playwright())
+                context = await self._launch_context(p, proxy_config)
 
             async def _enforce_region(route, request):
                 if request.method.upper() == "POST" and "/wordstat/api" in request.url:
@@ -423,7 +616,11 @@ class TurboParser:
                     if post_data:
                         try:
                             payload = json.loads(post_data)
-                            mutated = self._inject_region_into_payload(payload)
+                            try:
+                                region = self._page_region(request.frame.page)
+                            except Exception:
+                                region = self.region_id
+                            mutated = self._inject_region_into_payload(payload, region)
                             if mutated is not None:
                                 await route.continue_(post_data=json.dumps(payload, ensure_ascii=False))
                                 return
@@ -431,85 +628,108 @@ class TurboParser:
                             self.logger.debug(f"[Route] region patch skipped: {exc}")
                 await route.continue_()
 
+            # Картинки, шрифты и счётчики не нужны парсеру — не тратим на них трафик прокси.
+            # Ставится до подстановки региона: позже добавленный route срабатывает первым
+            network_stats = await install_policy(context)
             await context.route("**/wordstat/api/**", _enforce_region)
 
             page = context.pages[0] if context.pages else await context.new_page()
-            cookies = await context.cookies()
-            self.logger.info(f"[{self.account_name}] Куки в профиле: {len(cookies)} шт")
-
-            if not has_yandex_cookie(cookies):
-                self.logger.warning(f"[{self.account_name}] Куки Яндекс не найдены — пробую загрузить из БД")
-                loaded_from_db = await load_cookies_from_db_to_context(context, self.account_name, self.logger)
-                if loaded_from_db:
-                    cookies = await context.cookies()
-                    if has_yandex_cookie(cookies):
-                        self.logger.info(f"[{self.account_name}] ✓ Куки загружены из БД")
+            # Прогретый контекст из пула уже авторизован и стоит на Wordstat
+            if pooled is None or not pooled.warm:
+                cookies = await context.cookies()
+                self.logger.info(f"[{self.account_name}] Куки в профиле: {len(cookies)} шт")
 
                 if not has_yandex_cookie(cookies):
-                    self.logger.warning(f"[{self.account_name}] Куки Яндекс не найдены в БД — пробую извлечь из профиля на диске")
-                    loaded_from_profile = await load_cookies_from_profile_to_context(
-                        context=context,
-                        account_name=self.account_name,
-                        profile_path=self.profile_path,
-                        logger_obj=self.logger,
-                        persist=True,
-                    )
-                    if loaded_from_profile:
+                    self.logger.warning(f"[{self.account_name}] Куки Яндекс не найдены — пробую загрузить из БД")
+                    loaded_from_db = await load_cookies_from_db_to_context(context, self.account_name, self.logger)
+                    if loaded_from_db:
                         cookies = await context.cookies()
                         if has_yandex_cookie(cookies):
-                            self.logger.info(f"[{self.account_name}] ✓ Куки восстановлены из локального профиля")
+                            self.logger.info(f"[{self.account_name}] ✓ Куки загружены из БД")
+
+                    if not has_yandex_cookie(cookies):
+                        self.logger.warning(f"[{self.account_name}] Куки Яндекс не найдены в БД — пробую извлечь из профиля на диске")
+                        loaded_from_profile = await load_cookies_from_profile_to_context(
+                            context=context,
+                            account_name=self.account_name,
+                            profile_path=self.profile_path,
+                            logger_obj=self.logger,
+                            persist=True,
+                        )
+                        if loaded_from_profile:
+                            cookies = await context.cookies()
+                            if has_yandex_cookie(cookies):
+                                self.logger.info(f"[{self.account_name}] ✓ Куки восстановлены из локального профиля")
 
-                if not has_yandex_cookie(cookies):
-                    self.logger.error(f"[{self.account_name}] ✗ Куки не найдены — может потребоваться ручная авторизация")
-            else:
-                self.logger.info(f"[{self.account_name}] ✓ Куки найдены, продолжаем")
+                    if not has_yandex_cookie(cookies):
+                        self.logger.error(f"[{self.account_name}] ✗ Куки не найдены — может потребоваться ручная авторизация")
+                else:
+                    self.logger.info(f"[{self.account_name}] ✓ Куки найдены, продолжаем")
 
-            self.logger.info(f"[{self.account_name}] Переход на Wordstat...")
-            try:
-                await page.goto(
-                    "https://wordstat.yandex.ru",
-                    wait_until="domcontentloaded",
-                    timeout=WORDSTAT_LOAD_TIMEOUT_MS,
-                )
-                await page.wait_for_load_state("networkidle", timeout=10000)
-            except Exception as exc:
-                self.logger.error(f"[{self.account_name}] ❌ Ошибка загрузки Wordstat: {exc}")
-                await context.close()
-                return {}
+                self.logger.info(f"[{self.account_name}] Переход на Wordstat...")
+                try:
+                    await page.goto(
+                        "https://wordstat.yandex.ru",
+                        wait_until="domcontentloaded",
+                        timeout=WORDSTAT_LOAD_TIMEOUT_MS,
+                    )
+                    await page.wait_for_load_state("networkidle", timeout=10000)
+                except Exception as exc:
+                    self.logger.error(f"[{self.account_name}] ❌ Ошибка загрузки Wordstat: {exc}")
+                    await self._close_context(context, pooled, healthy=False)
+                    return {}
 
-            # Проверка авторизации - если куки есть, делаем мягкую проверку
-            auth_ok = await verify_authorization(page, self.account_name, self.logger)
+                # Проверка авторизации - если куки есть, делаем мягкую проверку
+                auth_ok = await verify_authorization(page, self.account_name, self.logger)
 
-            # Если проверка не прошла, но у нас есть куки Яндекса - даём второй шанс
-            if not auth_ok and has_yandex_cookie(cookies):
-                self.logger.warning(f"[{self.account_name}] ⚠️ Строгая проверка авторизации не прошла, но куки Яндекса есть")
-                self.logger.info(f"[{self.account_name}] Пытаюсь продолжить парсинг с имеющимися куками...")
-                auth_ok = True  # Даём шанс попробовать с куками
+                # Если проверка не прошла, но у нас есть куки Яндекса - даём второй шанс
+                if not auth_ok and has_yandex_cookie(cookies):
+                    self.logger.warning(f"[{self.account_name}] ⚠️ Строгая проверка авторизации не прошла, но куки Яндекса есть")
+                    self.logger.info(f"[{self.account_name}] Пытаюсь продолжить парсинг с имеющимися куками...")
+                    auth_ok = True  # Даём шанс попробовать с куками
 
-            if not auth_ok:
-                self.logger.error(f"[{self.account_name}] ❌ Профиль не авторизован — ожидаю ручной вход")
-                log_manual_authorization_instructions(self.logger, self.account_name, self.profile_path)
-                try:
-                    await page.wait_for_selector('button:has-text("Выход")', timeout=600_000)
-                    self.logger.info(f"[{self.account_name}] ✓ Ручная авторизация выполнена, продолжаю")
-                    await save_cookies_to_db(self.account_name, context, self.logger)
-                except Exception:
-                    self.logger.error(f"[{self.account_name}] ❌ Ручная авторизация не выполнена за отведённое время")
-                    await context.close()
-                    return {}
+                if not auth_ok:
+                    self.logger.error(f"[{self.account_name}] ❌ Профиль не авторизован — ожидаю ручной вход")
+                    log_manual_authorization_instructions(self.logger, self.account_name, self.profile_path)
+                    try:
+                        await page.wait_for_selector('button:has-text("Выход")', timeout=600_000)
+                        self.logger.info(f"[{self.account_name}] ✓ Ручная авторизация выполнена, продолжаю")
+                        await save_cookies_to_db(self.account_name, context, self.logger)
+                    except Exception:
+                        self.logger.error(f"[{self.account_name}] ❌ Ручная авторизация не выполнена за отведённое время")
+                        await self._close_context(context, pooled, healthy=False)
+                        return {}
+
+            if pooled is not None:
+                pooled.warm = True
+
+            retired = asyncio.Event()
+            http_fallback: List[str] = []
+            http_stats: Dict[str, Any] = {}
+            tabs_count = TABS_COUNT
+            if self.http_replay:
+                http_fallback, http_stats = await self._run_http_replay(page, retired)
+                # Вкладки нужны, только если прямые запросы не справились
+                if not http_fallback and not http_stats.get("broken"):
+                    tabs_count = 1
 
             pages: List[Page] = [page]
+            if pooled is not None:
+                # Вкладки, оставшиеся в контексте с прошлой задачи
+                pages.extend(tab for tab in pooled.live_pages() if tab is not page)
+                del pages[tabs_count:]
+            warm_pages = set(pages[1:]) if pooled is not None else set()
             self.logger.info(f"[2/6] Создание дополнительных вкладок...")
-            self.logger.info("  [OK] Вкладка 1 готова")
+            self.logger.info(f"  [OK] Готово вкладок: {len(pages)}")
 
             async def create_tab(index: int) -> Page:
                 page_new = await context.new_page()
                 self.logger.info(f"  [OK] Вкладка {index} создана")
                 return page_new
 
-            if TABS_COUNT > 1:
+            if tabs_count > len(pages):
                 additional_pages = await asyncio.gather(
-                    *[create_tab(i) for i in range(2, TABS_COUNT + 1)]
+                    *[create_tab(i) for i in range(len(pages) + 1, tabs_count + 1)]
                 )
                 pages.extend(additional_pages)
             self.logger.info(f"[OK] Создано {len(pages)} вкладок\n")
@@ -518,6 +738,9 @@ class TurboParser:
             self.logger.info(f"[3/6] Загрузка Wordstat во всех вкладках...")
             
             async def load_wordstat(page: Page, index: int) -> bool:
+                if page in warm_pages and "wordstat.yandex.ru" in (page.url or ""):
+                    self.logger.info(f"  [OK] Вкладка {index + 1}: Wordstat уже открыт (пул)")
+                    return True
                 url = f"https://wordstat.yandex.ru/?region={self.region_id}"
                 for attempt in range(1, WORDSTAT_MAX_ATTEMPTS + 1):
                     try:
@@ -552,33 +775,42 @@ class TurboParser:
             tasks = []
             for i, page in enumerate(pages):
                 tasks.append(load_wordstat(page, i))
-                await asyncio.sleep(DELAY_BETWEEN_TABS)
+                if page not in warm_pages:
+                    await asyncio.sleep(DELAY_BETWEEN_TABS)
             
             results_load = await asyncio.gather(*tasks)
             working_pages = [p for i, p in enumerate(pages) if results_load[i]]
             
             self.logger.info(
-                f"[OK] Wordstat загружен на {len(working_pages)}/{TABS_COUNT} вкладках\n"
+                f"[OK] Wordstat загружен на {len(working_pages)}/{tabs_count} вкладках\n"
             )
             if not working_pages:
                 self.logger.error("Ни одна вкладка не загрузилась, парсер остановлен.")
-                await context.close()
+                await self._close_context(context, pooled, healthy=False)
                 return {}
             
             # 4. ОБРАБОТЧИК ОТВЕТОВ
             self.logger.info("[4/6] Настройка обработчиков API...")
             
-            async def handle_response(response: Response):
-                if "/wordstat/api" not in response.url or response.status != 200:
+            async def handle_response(response: Response, page: Page):
+                if "/wordstat/api" not in response.url:
+                    return
+                if response.status == 429:
+                    self.rate.on_throttled()
+                    return
+                if response.status != 200:
                     return
                 try:
                     data = await response.json()
                     post_data = response.request.post_data
                     phrase = None
+                    region = None
                     if post_data:
                         try:
                             payload = json.loads(post_data)
                             phrase = payload.get("searchValue")
+                            # post_data учитывает подстановку региона в _enforce_region
+                            region = payload_region(payload)
                         except json.JSONDecodeError:
                             pass
 
@@ -589,11 +821,19 @@ class TurboParser:
                     )
                     if phrase:
                         value = int(freq) if isinstance(freq, (int, float)) else 0
-                        waiter = self.waiters.get(phrase)
+                        # Регион ответа — из его запроса: запоздавший ответ по прежнему
+                        # региону вкладки не должен попасть в пару нового региона
+                        job = (phrase, self._page_region(page) if region is None else region)
+                        waiter = self.waiters.get(job)
                         if waiter and not waiter.done():
                             waiter.set_result(value)
-                        self.results[phrase] = value
-                        self.logger.debug(f"  [API] '{phrase}' = {value}")
+                        elif region is None:
+                            # Регион неизвестен — сохраняем, только если ответ кто-то ждёт
+                            return
+                        self.results[job] = value
+                        self.logger.debug(f"  [API] '{self._label(job)}' = {value}")
+                        # Левая и правая колонки — бесплатный материал для расширения
+                        related_phrases.record(phrase, job[1], data)
 
                         # ЛОГ: API ответ получен
                         api_log_entry = {
@@ -601,6 +841,7 @@ class TurboParser:
                             'account': self.account_name,
                             'tab': 'API',
                             'phrase': phrase,
+                            'region': job[1],
                             'status': 'api_response_received',
                             'message': f'API ответ получен: {freq}',
                             'ws': freq,
@@ -612,8 +853,10 @@ class TurboParser:
                 except Exception as e:
                     self.logger.error(f"Error handling response: {e}")
             
+            response_handlers = {}
             for page in working_pages:
-                page.on("response", handle_response)
+                response_handlers[page] = lambda response, page=page: handle_response(response, page)
+                page.on("response", response_handlers[page])
             
             # 5. ПОДГОТОВКА ВКЛАДОК
             self.logger.info(f"[5/6] Подготовка вкладок к парсингу...")
@@ -629,168 +872,265 @@ class TurboParser:
             await asyncio.sleep(1)
             
             # 6. ПАРСИНГ
-            self.logger.info(f"[6/6] Запуск парсинга {len(self.phrases)} фраз...\n")
+            own_jobs = self._own_jobs() if self.coordinator is None else []
+            self.logger.info(f"[6/6] Запуск парсинга {len(own_jobs) or len(self.phrases)} фраз...\n")
             start_time = time.time()
-            stats = {"processed": 0, "timeouts": 0, "errors": 0}
+            stats = {"processed": 0, "timeouts": 0, "errors": 0, "requeued": 0}
             stats_lock = asyncio.Lock()
-            
-            async def parse_tab(
-                page: Page,
-                tab_phrases: List[str],
-                tab_index: int,
-            ):
+
+            # Общая очередь пар (фраза, регион): свободная вкладка забирает следующую,
+            # а неудачная попытка возвращается в очередь для любой свободной вкладки.
+            # Элементы очереди — как в координаторе (фраза или пара), чтобы отчитываться ими же.
+            queue: asyncio.Queue[tuple[Any, int]] = asyncio.Queue()
+            coordinator = self.coordinator
+            # Фразы, которые прямые запросы уже взяли у координатора, но не собрали
+            preclaimed = set(http_fallback) if coordinator is not None else set()
+            if self.http_replay:
+                for item in http_fallback:
+                    queue.put_nowait((item, 1))
+            else:
+                for item in own_jobs:
+                    queue.put_nowait((item, 1))
+
+            phrase_started: Dict[Tuple[str, int], float] = {}
+            phrase_log_entries: Dict[Tuple[str, int], Dict[str, Any]] = {}
+            tab_stats: List[Dict[str, Any]] = [
+                {"tab": i + 1, "done": 0, "ok": 0, "no_data": 0, "retries": 0, "busy": 0.0}
+                for i in range(len(working_pages))
+            ]
+
+            async def fetch_phrase(page: Page, job: Tuple[str, int], tab_index: int, attempt: int) -> Optional[int]:
+                """Одна попытка получить частотность на вкладке. None — ответа нет."""
                 loop = asyncio.get_running_loop()
+                phrase, region = job
+                label = self._label(job)
 
-                for index, phrase in enumerate(tab_phrases, start=1):
-                    phrase = phrase.strip()
-                    if not phrase:
-                        continue
-                    if phrase in self.results:
-                        continue
+                self.waiters.pop(job, None)
+                self.results.pop(job, None)
+                self.result_status.pop(job, None)
 
-                    phrase_log = {
-                        'timestamp': datetime.now().isoformat(),
-                        'account': self.account_name,
-                        'tab': tab_index + 1,
-                        'phrase': phrase,
-                        'status': 'started',
-                        'message': f'[TAB {tab_index + 1}] Начало парсинга: "{phrase}"',
-                    }
-                    log_parsing_debug(phrase_log)
-
-                    phrase_started = time.time()
-                    success = False
-                    value = 0
-
-                    for attempt in range(1, PHRASE_MAX_ATTEMPTS + 1):
-                        if attempt > 1:
+                url = (
+                    "https://wordstat.yandex.ru/"
+                    f"?words={quote(phrase)}&region={region}&lr={region}"
+                )
+                # Регион вкладки читают перехват запроса и обработчик ответа
+                self.page_regions[page] = region
+                await self.rate.wait()
+                started = time.monotonic()
+                try:
+                    await page.goto(url, wait_until="domcontentloaded", timeout=WORDSTAT_LOAD_TIMEOUT_MS)
+                except Exception as nav_exc:
+                    self.logger.warning(
+                        f"  [TAB {tab_index + 1}] Навигация не удалась для '{label}': {nav_exc}"
+                    )
+                    self.rate.on_error()
+                    return None
+                if "showcaptcha" in (page.url or ""):
+                    self.logger.warning(f"  [TAB {tab_index + 1}] Капча на '{label}' — снижаю темп")
+                    self.rate.on_captcha()
+                    return None
+
+                future: asyncio.Future[int] = loop.create_future()
+                self.waiters[job] = future
+
+                try:
+                    input_field = await page.wait_for_selector(
+                        "input[name='text'], input[placeholder], .b-form-input__input",
+                        timeout=1500,
+                    )
+                    try:
+                        await input_field.fill(phrase)
+                        await input_field.press("Enter")
+                    except Exception:
+                        pass
+                except Exception:
+                    # Если поле не найдено — Wordstat уже обработал words в URL
+                    pass
+
+                try:
+                    value = await asyncio.wait_for(future, timeout=API_MAX_WAIT_SECONDS)
+                    self.rate.on_success(latency_ms=(time.monotonic() - started) * 1000)
+                    return value
+                except asyncio.TimeoutError:
+                    self.logger.warning(
+                        f"  [TAB {tab_index + 1}] ⏱ '{label}' нет ответа за {API_MAX_WAIT_SECONDS:.1f}s (попытка {attempt})"
+                    )
+                    self.rate.on_timeout()
+                except Exception as wait_exc:
+                    self.logger.error(
+                        f"  [TAB {tab_index + 1}] ❌ Ошибка ожидания для '{label}' (попытка {attempt}): {wait_exc}"
+                    )
+                    async with stats_lock:
+                        stats["errors"] += 1
+                finally:
+                    stored_future = self.waiters.get(job)
+                    if stored_future is future:
+                        self.waiters.pop(job, None)
+                    if not future.done():
+                        future.cancel()
+                return None
+
+            async def parse_tab(page: Page, tab_index: int):
+                tab_stat = tab_stats[tab_index]
+
+                while True:
+                    item, attempt = await queue.get()
+                    busy_started = time.time()
+                    try:
+                        if retired.is_set():
+                            continue
+                        if attempt == 1 and coordinator is not None and item not in preclaimed:
+                            # Фразу могли уже собрать или передать другому профилю
+                            if not coordinator.claim(self.account_name, item):
+                                continue
+                        job = self._job(item)
+                        phrase, region = job
+                        label = self._label(job)
+                        if attempt == 1:
+                            phrase_started[job] = busy_started
+                            phrase_log = {
+                                'timestamp': datetime.now().isoformat(),
+                                'account': self.account_name,
+                                'tab': tab_index + 1,
+                                'phrase': phrase,
+                                'region': region,
+                                'status': 'started',
+                                'message': f'[TAB {tab_index + 1}] Начало парсинга: "{label}"',
+                            }
+                            phrase_log_entries[job] = phrase_log
+                            log_parsing_debug(phrase_log)
+                        else:
                             self.logger.warning(
-                                f"  [TAB {tab_index + 1}] ↻ попытка {attempt}/{PHRASE_MAX_ATTEMPTS} для '{phrase}'"
+                                f"  [TAB {tab_index + 1}] ↻ попытка {attempt}/{PHRASE_MAX_ATTEMPTS} для '{label}'"
                             )
+
+                        value = await fetch_phrase(page, job, tab_index, attempt)
+
+                        if value is None and attempt < PHRASE_MAX_ATTEMPTS:
+                            # Фразу забирает любая свободная вкладка, а эта перезагружается
+                            queue.put_nowait((item, attempt + 1))
+                            tab_stat["retries"] += 1
+                            async with stats_lock:
+                                stats["requeued"] += 1
                             try:
                                 await page.reload(wait_until="domcontentloaded", timeout=WORDSTAT_LOAD_TIMEOUT_MS)
                             except Exception as reload_exc:
                                 self.logger.debug(
                                     f"  [TAB {tab_index + 1}] Ошибка reload: {reload_exc}"
                                 )
-                            await asyncio.sleep(RELOAD_DELAY_SECONDS)
-
-                        self.waiters.pop(phrase, None)
-                        self.results.pop(phrase, None)
-                        self.result_status.pop(phrase, None)
-
-                        url = (
-                            "https://wordstat.yandex.ru/"
-                            f"?words={quote(phrase)}&region={self.region_id}&lr={self.region_id}"
-                        )
-                        try:
-                            await page.goto(url, wait_until="domcontentloaded", timeout=WORDSTAT_LOAD_TIMEOUT_MS)
-                        except Exception as nav_exc:
-                            self.logger.warning(
-                                f"  [TAB {tab_index + 1}] Навигация не удалась для '{phrase}': {nav_exc}"
-                            )
-                            if attempt >= PHRASE_MAX_ATTEMPTS:
-                                break
-                            await asyncio.sleep(RELOAD_DELAY_SECONDS)
+                            # Паузу перед следующей навигацией задаёт self.rate
                             continue
 
-                        future: asyncio.Future[int] = loop.create_future()
-                        self.waiters[phrase] = future
-
-                        try:
-                            input_field = await page.wait_for_selector(
-                                "input[name='text'], input[placeholder], .b-form-input__input",
-                                timeout=1500,
+                        elapsed_phrase = time.time() - phrase_started.pop(job, busy_started)
+                        phrase_log = phrase_log_entries.pop(job, {
+                            'account': self.account_name,
+                            'tab': tab_index + 1,
+                            'phrase': phrase,
+                            'region': region,
+                        })
+                        existing_value = self.results.get(job)
+                        final_value = int(existing_value if existing_value is not None else value or 0)
+                        tab_stat["done"] += 1
+
+                        if value is not None:
+                            self.results[job] = final_value
+                            self.result_status[job] = "OK"
+                            tab_stat["ok"] += 1
+                            async with stats_lock:
+                                stats["processed"] += 1
+                            self.logger.info(
+                                f"  [TAB {tab_index + 1}] ✅ '{label}' = {final_value} за {elapsed_phrase:.2f}s"
                             )
-                            try:
-                                await input_field.fill(phrase)
-                                await input_field.press("Enter")
-                            except Exception:
-                                pass
-                        except Exception:
-                            # Если поле не найдено — Wordstat уже обработал words в URL
-                            pass
-
-                        try:
-                            value = await asyncio.wait_for(future, timeout=API_MAX_WAIT_SECONDS)
-                            success = True
-                            break
-                        except asyncio.TimeoutError:
+                            phrase_log.update({
+                                'timestamp': datetime.now().isoformat(),
+                                'tab': tab_index + 1,
+                                'status': 'success',
+                                'message': f'Фраза собрана: {final_value}',
+                                'ws': final_value,
+                                'attempts': attempt,
+                                'elapsed': round(elapsed_phrase, 3),
+                            })
+                            log_parsing_debug(phrase_log)
+                        else:
+                            self.results[job] = final_value
+                            self.result_status[job] = "NO_DATA"
+                            tab_stat["no_data"] += 1
+                            async with stats_lock:
+                                stats["processed"] += 1
+                                stats["timeouts"] += 1
                             self.logger.warning(
-                                f"  [TAB {tab_index + 1}] ⏱ '{phrase}' нет ответа за {API_MAX_WAIT_SECONDS:.1f}s (попытка {attempt})"
+                                f"  [TAB {tab_index + 1}] ⚠️ '{label}' не получена, ставим {final_value} (за {elapsed_phrase:.2f}s)"
                             )
-                        except Exception as wait_exc:
-                            self.logger.error(
-                                f"  [TAB {tab_index + 1}] ❌ Ошибка ожидания для '{phrase}' (попытка {attempt}): {wait_exc}"
-                            )
-                            async with stats_lock:
-                                stats["errors"] += 1
-                        finally:
-                            stored_future = self.waiters.get(phrase)
-                            if stored_future is future:
-                                self.waiters.pop(phrase, None)
-                            if not future.done():
-                                future.cancel()
-
-                        if attempt < PHRASE_MAX_ATTEMPTS:
-                            await asyncio.sleep(RELOAD_DELAY_SECONDS)
-
-                    elapsed_phrase = time.time() - phrase_started
-                    existing_value = self.results.get(phrase)
-                    final_value = int(existing_value if existing_value is not None else value or 0)
-
-                    if success:
-                        self.results[phrase] = final_value
-                        self.result_status[phrase] = "OK"
-                        async with stats_lock:
-                            stats["processed"] += 1
-                        self.logger.info(
-                            f"  [TAB {tab_index + 1}] ✅ '{phrase}' = {final_value} за {elapsed_phrase:.2f}s"
-                        )
-                        phrase_log.update({
-                            'timestamp': datetime.now().isoformat(),
-                            'status': 'success',
-                            'message': f'Фраза собрана: {final_value}',
-                            'ws': final_value,
-                            'elapsed': round(elapsed_phrase, 3),
-                        })
-                        log_parsing_debug(phrase_log)
-                    else:
-                        self.results[phrase] = final_value
-                        self.result_status[phrase] = "NO_DATA"
-                        async with stats_lock:
-                            stats["processed"] += 1
-                            stats["timeouts"] += 1
-                        self.logger.warning(
-                            f"  [TAB {tab_index + 1}] ⚠️ '{phrase}' не получена, ставим {final_value} (за {elapsed_phrase:.2f}s)"
-                        )
-                        phrase_log.update({
-                            'timestamp': datetime.now().isoformat(),
-                            'status': 'no_data',
-                            'message': f'После {PHRASE_MAX_ATTEMPTS} попыток результат не получен',
-                            'ws': final_value,
-                            'elapsed': round(elapsed_phrase, 3),
-                        })
-                        log_parsing_debug(phrase_log)
-            # Распределяем фразы по вкладкам
-            tab_phrases_list = []
-            for i in range(len(working_pages)):
-                start_idx = i * len(self.phrases) // len(working_pages)
-                end_idx = (i + 1) * len(self.phrases) // len(working_pages)
-                tab_phrases_list.append(self.phrases[start_idx:end_idx])
-            
-            # Запускаем парсинг на всех вкладках параллельно
+                            phrase_log.update({
+                                'timestamp': datetime.now().isoformat(),
+                                'tab': tab_index + 1,
+                                'status': 'no_data',
+                                'message': f'После {PHRASE_MAX_ATTEMPTS} попыток результат не получен',
+                                'ws': final_value,
+                                'attempts': attempt,
+                                'elapsed': round(elapsed_phrase, 3),
+                            })
+                            log_parsing_debug(phrase_log)
+
+                        if coordinator is not None and not coordinator.report(
+                            self.account_name, item, final_value, self.result_status[job]
+                        ):
+                            if not retired.is_set():
+                                self.logger.warning(
+                                    f"[{self.account_name}] ⚠️ Профиль выведен из общего пула "
+                                    f"(капча/бан?) — его фразы достанутся другим профилям"
+                                )
+                            retired.set()
+                    finally:
+                        tab_stat["busy"] += time.time() - busy_started
+                        queue.task_done()
+
+            async def feed_from_coordinator():
+                """Подкачивать порции из общего координатора, пока есть работа."""
+                refill_at = len(working_pages)
+                while not retired.is_set():
+                    if queue.qsize() >= refill_at:
+                        await asyncio.sleep(API_POLL_INTERVAL)
+                        continue
+                    batch = coordinator.lease(self.account_name, refill_at)
+                    if batch is None:
+                        return
+                    if not batch:
+                        # Свободных фраз нет, но другие профили ещё работают —
+                        # их хвосты могут вернуться в пул
+                        await asyncio.sleep(API_POLL_INTERVAL * 5)
+                        continue
+                    for item in batch:
+                        queue.put_nowait((item, 1))
+
+            # Все вкладки разбирают общую очередь; повторы возвращаются в неё же
             parse_tasks = [
-                parse_tab(page, phrases, i)
-                for i, (page, phrases) in enumerate(zip(working_pages, tab_phrases_list))
+                asyncio.create_task(parse_tab(page, i))
+                for i, page in enumerate(working_pages)
             ]
-            await asyncio.gather(*parse_tasks)
+            try:
+                if coordinator is not None:
+                    await feed_from_coordinator()
+                await queue.join()
+            finally:
+                for task in parse_tasks:
+                    task.cancel()
+                await asyncio.gather(*parse_tasks, return_exceptions=True)
             self.waiters.clear()
+            await asyncio.to_thread(self.rate.save)
+            await asyncio.to_thread(related_phrases.flush)
 
             await save_cookies_to_db(self.account_name, context, self.logger)
-            
-            # Закрываем браузер
-            await context.close()
+
+            if pooled is not None:
+                # Контекст остаётся жить: снимаем обработчики этого запуска
+                for page, handler in response_handlers.items():
+                    page.remove_listener("response", handler)
+                await context.unroute("**/wordstat/api/**", _enforce_region)
+                pooled.pages = working_pages
+
+            # Закрываем браузер (или возвращаем контекст с вкладками в пул)
+            await self._close_context(context, pooled)
             
             # Статистика
             elapsed = time.time() - start_time
@@ -806,6 +1146,23 @@ class TurboParser:
             self.logger.info(f"[Parser] Таймаутов: {timeouts_total}")
             self.logger.info(f"[Parser] Ошибок: {errors_total}")
             self.logger.info(f"[Parser] Результатов найдено: {len(self.results)}")
+            self.logger.info(f"[Parser] Повторов через очередь: {stats['requeued']}")
+            if self.http_replay:
+                self.logger.info(f"[Parser] Собрано прямыми запросами: {http_stats.get('ok', 0)}")
+            if network_stats is not None:
+                self.logger.info(f"[Parser] Сеть: {network_stats.summary()}")
+            self.logger.info(
+                f"[Parser] Темп: пауза {self.rate.delay:.2f}s "
+                f"(≈{60.0 / self.rate.delay:.0f} навигаций/мин), сохранён для следующего запуска"
+            )
+            for tab_stat in tab_stats:
+                busy = tab_stat["busy"]
+                tab_speed = tab_stat["done"] / busy if busy > 0 else 0
+                self.logger.info(
+                    f"[Parser]   Вкладка {tab_stat['tab']}: фраз {tab_stat['done']} "
+                    f"(OK {tab_stat['ok']}, без данных {tab_stat['no_data']}, повторов {tab_stat['retries']}), "
+                    f"занята {busy:.1f}s, {tab_speed:.2f} фраз/сек"
+                )
             self.logger.info("[Parser] ═════════════════════════════════════════════════════")
             
             self.logger.info("=" * 70)
@@ -815,11 +1172,27 @@ class TurboParser:
             self.logger.info(f"Скорость: {speed:.1f} фраз/сек")
             self.logger.info("=" * 70)
             
-            result = WordstatResult(self.results)
+            # Раскладываем пары по регионам; плоский словарь — по основному региону
+            by_region: Dict[int, Dict[str, Any]] = {region: {} for region in self.regions or [self.region_id]}
+            region_statuses: Dict[int, Dict[str, str]] = {region: {} for region in by_region}
+            for (phrase, region), value in self.results.items():
+                by_region.setdefault(region, {})[phrase] = value
+            for (phrase, region), status in self.result_status.items():
+                region_statuses.setdefault(region, {})[phrase] = status
+            primary_statuses = region_statuses.get(self.region_id, {})
+
+            result = WordstatResult(by_region.get(self.region_id, {}))
             result.meta = {
-                "statuses": dict(self.result_status),
-                "no_data": [phrase for phrase, status in self.result_status.items() if status == "NO_DATA"],
+                "statuses": dict(primary_statuses),
+                "no_data": [phrase for phrase, status in primary_statuses.items() if status == "NO_DATA"],
+                "regions": by_region,
+                "region_statuses": region_statuses,
+                "tabs": [dict(tab_stat) for tab_stat in tab_stats],
+                "rate": self.rate.snapshot(),
+                "network": network_stats.as_dict() if network_stats is not None else None,
             }
+            if self.http_replay:
+                result.meta["http"] = http_stats
             return result
 
 
@@ -831,6 +1204,12 @@ async def turbo_parser_10tabs(
     headless: bool = False,
     proxy_uri: Optional[str] = None,
     region_id: int = 225,
+    coordinator: Optional[Any] = None,
+    use_cache: bool = True,
+    force_refresh: bool = False,
+    http_replay: bool = False,
+    pool: Optional[Any] = None,
+    regions: Optional[Sequence[int]] = None,
 ) -> WordstatResult:
     """
     Главная функция парсера для обратной совместимости
@@ -841,19 +1220,81 @@ async def turbo_parser_10tabs(
         phrases: коллекция фраз
         headless: флаг headless-режима
         proxy_uri: URI прокси
-        
+        region_id: регион Wordstat (lr)
+        coordinator: общий PhraseCoordinator для распределения фраз между профилями
+        use_cache: брать свежие значения из кеша частотностей и сохранять новые
+        force_refresh: игнорировать кеш и собрать все фразы заново
+        http_replay: собирать прямыми запросами к API, браузер — только для сессии
+        pool: BrowserPool текущего event loop — переиспользовать контекст и вкладки
+        regions: собрать фразы сразу в нескольких регионах за один запуск
+            браузера; основным (плоский результат) становится первый
+
     Returns:
-        словарь «фраза → частотность»
+        словарь «фраза → частотность»; по всем регионам — в ``meta["regions"]``
+        и ``meta["region_statuses"]``
     """
-    parser = TurboParser(
-        account_name=account_name,
-        profile_path=profile_path,
-        phrases=list(phrases),
-        headless=headless,
-        proxy_uri=proxy_uri
-    )
-    parser.region_id = region_id
-    return await parser.run()
+    phrases = list(phrases)
+    regions = list(dict.fromkeys(int(region) for region in regions)) if regions else [region_id]
+    region_id = regions[0]
+    cached: Dict[int, Dict[str, int]] = {}
+    jobs: List[Any] = phrases
+    # С координатором фразы уже отфильтрованы по кешу тем, кто его создал
+    if use_cache and coordinator is None:
+        jobs = []
+        for region in regions:
+            region_phrases = phrases
+            try:
+                cached[region], region_phrases = frequency_cache.split_cached(
+                    phrases, mode="ws", region=region, force_refresh=force_refresh
+                )
+            except Exception as exc:
+                logging.warning(f"[{account_name}] Кеш частотностей недоступен: {exc}")
+            jobs.extend((phrase, region) for phrase in region_phrases)
+        cached_total = sum(len(values) for values in cached.values())
+        if cached_total:
+            logging.info(f"[{account_name}] Из кеша: {cached_total} значений, к сбору: {len(jobs)}")
+
+    if jobs or coordinator is not None:
+        parser = TurboParser(
+            account_name=account_name,
+            profile_path=profile_path,
+            phrases=jobs,
+            headless=headless,
+            proxy_uri=proxy_uri,
+            coordinator=coordinator,
+            http_replay=http_replay,
+            pool=pool,
+            regions=regions,
+        )
+        parser.region_id = region_id
+        result = await parser.run()
+    else:
+        result = WordstatResult()
+    if not isinstance(result, WordstatResult):
+        result = WordstatResult(result)
+
+    statuses = result.meta.setdefault("statuses", {})
+    by_region = result.meta.setdefault("regions", {})
+    region_statuses = result.meta.setdefault("region_statuses", {})
+    for region in regions:
+        values = by_region.setdefault(region, {})
+        region_status = region_statuses.setdefault(region, {})
+        if use_cache:
+            fetched = {phrase: value for phrase, value in values.items() if region_status.get(phrase) == "OK"}
+            try:
+                await asyncio.to_thread(frequency_cache.store, fetched, mode="ws", region=region)
+            except Exception as exc:
+                logging.warning(f"[{account_name}] Не удалось обновить кеш частотностей: {exc}")
+
+        for phrase, value in cached.get(region, {}).items():
+            values[phrase] = value
+            region_status[phrase] = "OK"
+            if region == region_id:
+                result[phrase] = value
+                statuses[phrase] = "OK"
+    result.meta["cached"] = list(cached.get(region_id, {}))
+    result.meta.setdefault("no_data", [])
+    return result
 
 
 def main():
@@ -865,6 +1306,7 @@ def main():
     parser.add_argument("--proxy", help="Proxy URI", default=None)
     parser.add_argument("--region", type=int, default=225, help="Wordstat region id (lr)")
     parser.add_argument("--headless", action="store_true", help="Run in headless mode")
+    parser.add_argument("--http", action="store_true", help="Query Wordstat API directly, browser only for session")
     
     args = parser.parse_args()
     
@@ -882,7 +1324,8 @@ def main():
         profile_path=pathlib.Path(args.profile_path),
         phrases=phrases,
         headless=args.headless,
-        proxy_uri=args.proxy
+        proxy_uri=args.proxy,
+        http_replay=args.http,
     )
     parser.region_id = args.region
     
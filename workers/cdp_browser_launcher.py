@@ -48,6 +48,7 @@ class CDPBrowserLauncher:
                 use_cdp=True,
                 cdp_port=int(descriptor.get("port", 0)),
                 profile_override=descriptor.get("profile"),
+                block_resources=True,
             )
         except Exception as exc:
             print(f"[{descriptor['name']}] ERROR: {exc}")
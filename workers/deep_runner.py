@@ -1,18 +1,485 @@
-﻿from __future__ import annotations
+"""Глубокий сбор: расширение семян по уровням через колонки Wordstat.
 
+Фронтир хранится в SQLite (``deep_frontier``) и дедуплицируется по
+нормализованной фразе (services.phrase_tools.normalize_phrases), поэтому фраза,
+найденная на нескольких уровнях, запрашивается один раз. Уровень
+обрабатывается порциями: фразы, колонки которых уже сохранены
+(services.related_phrases), расширяются сразу, остальные запрашиваются всеми
+аккаунтами параллельно (общий PhraseCoordinator, вкладки turbo-парсера) в
+пределах бюджета уровня. Между порциями прогон можно поставить на паузу или
+остановить; остановленный прогон продолжается с того же места по ``run_id``.
+
+Правила — ``config/deep_rules.yaml``.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+import threading
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
 
-# from ...collector.parser import deep_run
-def deep_run(*args, **kwargs):
-    """Заглушка для deep_run"""
-    pass
+try:
+    import yaml  # type: ignore
+except ImportError:  # pragma: no cover - правила по умолчанию
+    yaml = None  # type: ignore
+
+try:
+    from ..core.db import ensure_schema, get_db_connection
+    from ..services import frequency_cache, related_phrases
+    from ..services.phrase_coordinator import STATUS_OK, PhraseCoordinator
+    from ..services.phrase_tools import NormalizationOptions, normalize_phrases, tokenize
+except ImportError:
+    from core.db import ensure_schema, get_db_connection
+    from services import frequency_cache, related_phrases
+    from services.phrase_coordinator import STATUS_OK, PhraseCoordinator
+    from services.phrase_tools import NormalizationOptions, normalize_phrases, tokenize
 
 RESULTS_DIR = Path('results')
 RESULTS_DIR.mkdir(exist_ok=True)
 
-CONFIG_PATH = Path('collector') / 'accounts.yaml'
+RULES_PATH = Path(__file__).resolve().parent.parent / 'config' / 'deep_rules.yaml'
+BATCH_SIZE = 200  # Фраз в одной порции запросов: между порциями — пауза/стоп
+SERVICE_ACCOUNTS = ("demo_account", "wordstat_main")
+
+Fetcher = Callable[[List[str], int], Mapping[str, Optional[int]]]
+
+
+@dataclass
+class DeepRules:
+    """Правила расширения (config/deep_rules.yaml)."""
+
+    depth_levels: int = 2
+    min_freq_leftcol: int = 5
+    min_freq_rightcol: int = 10
+    topN_suggest: int = 20
+    dedupe_norm: bool = True
+    pass_strategy: str = "freq_or_contains_core"
+    pass_min_freq: int = 10
+    pass_keep_percent: int = 30
+    budget_per_level: int = 0
+    stop_words: List[str] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "DeepRules":
+        target = Path(path) if path else RULES_PATH
+        if yaml is None or not target.exists():
+            return cls()
+        data: Dict[str, Any] = yaml.safe_load(target.read_text(encoding='utf-8-sig')) or {}
+        passing = data.get('pass_to_next_level') or {}
+        return cls(
+            depth_levels=int(data.get('depth_levels', 2)),
+            min_freq_leftcol=int(data.get('min_freq_leftcol', 5)),
+            min_freq_rightcol=int(data.get('min_freq_rightcol', 10)),
+            topN_suggest=int(data.get('topN_suggest', 20)),
+            dedupe_norm=bool(data.get('dedupe_norm', True)),
+            pass_strategy=str(passing.get('strategy', 'freq_or_contains_core')),
+            pass_min_freq=int(passing.get('min_freq', 10)),
+            pass_keep_percent=int(passing.get('keep_percent', 30)),
+            budget_per_level=int(data.get('budget_per_level', 0) or 0),
+            # Слова с битой кодировкой не совпадут ни с чем — отбрасываем
+            stop_words=[
+                str(word).strip().lower()
+                for word in data.get('stop_words') or []
+                if str(word).strip() and '\ufffd' not in str(word)
+            ],
+        )
+
+
+def _now() -> str:
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _default_accounts() -> List[Dict[str, Any]]:
+    """Аккаунты из БД с профилем — как во вкладке парсинга."""
+    try:
+        from ..services.accounts import list_accounts
+    except ImportError:
+        from services.accounts import list_accounts
+
+    base_dir = Path(__file__).resolve().parent.parent
+    accounts: List[Dict[str, Any]] = []
+    for account in list_accounts():
+        profile = getattr(account, 'profile_path', '') or ''
+        if account.name in SERVICE_ACCOUNTS or not profile:
+            continue
+        path = Path(profile)
+        if not path.is_absolute():
+            path = base_dir / path
+        proxy = getattr(account, 'proxy', None)
+        accounts.append({
+            'email': account.name,
+            'profile_path': str(path.resolve()),
+            'proxy': proxy.strip() if isinstance(proxy, str) else proxy,
+        })
+    return accounts
+
+
+class DeepRunner:
+    """Прогон глубокого сбора по уровням с фронтиром в SQLite."""
+
+    def __init__(
+        self,
+        run_id: int,
+        *,
+        accounts: Optional[Sequence[Mapping[str, Any]]] = None,
+        fetch: Optional[Fetcher] = None,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        """
+        Args:
+            run_id: прогон из ``create_run`` (новый или остановленный ранее)
+            accounts: профили ``{"email", "profile_path", "proxy"}``; по
+                умолчанию — все аккаунты из БД
+            fetch: ``fetch(phrases, region) -> {фраза: частотность | None}``;
+                по умолчанию — turbo-парсер на всех аккаунтах сразу
+        """
+        self.run_id = int(run_id)
+        self.accounts = list(accounts) if accounts is not None else None
+        self.fetch = fetch or self._fetch_with_parsers
+        self.log = log
+        self._normalizer = NormalizationOptions()
+        self._resume = threading.Event()
+        self._resume.set()
+        self._stop = threading.Event()
+
+        run = self._load_run()
+        self.region = int(run['region'])
+        self.rules = DeepRules(**run['rules'])
+        self.budget_used: Dict[str, int] = run['budget_used']
+
+    # ---------------------------------------------------------------- control
+
+    def pause(self) -> None:
+        self._resume.clear()
+
+    def resume(self) -> None:
+        self._resume.set()
+
+    def stop(self) -> None:
+        """Остановить после текущей порции; прогон можно продолжить позже."""
+        self._stop.set()
+        self._resume.set()
+
+    def _should_stop(self) -> bool:
+        self._resume.wait()
+        return self._stop.is_set()
+
+    # ------------------------------------------------------------------ state
+
+    def _load_run(self) -> Dict[str, Any]:
+        with get_db_connection() as conn:
+            row = conn.execute('SELECT * FROM deep_runs WHERE id = ?', (self.run_id,)).fetchone()
+        if row is None:
+            raise ValueError(f'Deep run #{self.run_id} not found')
+        run = dict(row)
+        run['rules'] = json.loads(run.get('rules') or '{}')
+        run['budget_used'] = json.loads(run.get('budget_used') or '{}')
+        return run
+
+    def _update_run(self, **values: Any) -> None:
+        values['updated_at'] = _now()
+        columns = ', '.join(f'{name} = ?' for name in values)
+        with get_db_connection() as conn:
+            conn.execute(f'UPDATE deep_runs SET {columns} WHERE id = ?', (*values.values(), self.run_id))
+
+    def _queued(self, depth: int) -> List[Dict[str, Any]]:
+        with get_db_connection() as conn:
+            rows = conn.execute(
+                "SELECT phrase_norm, phrase, root, freq FROM deep_frontier "
+                "WHERE run_id = ? AND depth = ? AND status = 'queued' ORDER BY rowid",
+                (self.run_id, depth),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _set_status(self, norms: Sequence[str], status: str) -> None:
+        if not norms:
+            return
+        now = _now()
+        with get_db_connection() as conn:
+            conn.executemany(
+                'UPDATE deep_frontier SET status = ?, updated_at = ? WHERE run_id = ? AND phrase_norm = ?',
+                ((status, now, self.run_id, norm) for norm in norms),
+            )
+
+    def _set_freqs(self, freqs: Mapping[str, int]) -> None:
+        if not freqs:
+            return
+        with get_db_connection() as conn:
+            conn.executemany(
+                'UPDATE deep_frontier SET freq = ? WHERE run_id = ? AND phrase_norm = ?',
+                ((int(value), self.run_id, norm) for norm, value in freqs.items()),
+            )
+
+    # -------------------------------------------------------------- expansion
+
+    def _norm(self, phrase: str) -> str:
+        if self.rules.dedupe_norm:
+            normalized = normalize_phrases([phrase], self._normalizer)
+            return normalized[0] if normalized else ''
+        return phrase.strip()
+
+    def _children(self, parent: Dict[str, Any], entries: List[Dict[str, Any]], depth: int) -> List[tuple]:
+        """Строки фронтира для детей родителя с учётом порогов и pass_to_next_level."""
+        rules = self.rules
+        stop_words = set(rules.stop_words)
+        core = set(tokenize(parent['root'] or parent['phrase']))
+        thresholds = {'left': rules.min_freq_leftcol, 'right': rules.min_freq_rightcol}
+
+        candidates: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            freq = int(entry['freq'] or 0)
+            if freq < thresholds.get(entry['kind'], 0):
+                continue
+            norm = self._norm(entry['phrase'])
+            tokens = set(tokenize(norm))
+            if not norm or norm == parent['phrase_norm'] or tokens & stop_words:
+                continue
+            current = candidates.get(norm)
+            if current is None or freq > current['freq']:
+                candidates[norm] = {
+                    'phrase': norm if rules.dedupe_norm else entry['phrase'].strip(),
+                    'freq': freq,
+                    'source': entry['kind'],
+                    'core': bool(core) and core <= tokens,
+                }
+
+        # Кого расширять дальше: ядро семени проходит всегда, по частотности —
+        # только лучшие keep_percent процентов
+        expandable: set = set()
+        if depth + 1 < rules.depth_levels:
+            strategy = rules.pass_strategy
+            if strategy in ('freq_or_contains_core', 'contains_core'):
+                expandable.update(norm for norm, item in candidates.items() if item['core'])
+            if strategy in ('freq_or_contains_core', 'freq'):
+                by_freq = sorted(
+                    (norm for norm, item in candidates.items()
+                     if item['freq'] >= rules.pass_min_freq and norm not in expandable),
+                    key=lambda norm: -candidates[norm]['freq'],
+                )
+                keep = len(by_freq) if strategy == 'freq' else -(-len(by_freq) * rules.pass_keep_percent // 100)
+                expandable.update(by_freq[:keep])
+
+        now = _now()
+        return [
+            (
+                self.run_id, norm, item['phrase'], depth + 1, parent['phrase'], parent['root'],
+                item['source'], item['freq'], 'queued' if norm in expandable else 'leaf', now,
+            )
+            for norm, item in candidates.items()
+        ]
+
+    def _expand(self, parents: List[Dict[str, Any]], depth: int) -> List[str]:
+        """Развернуть родителей с сохранёнными колонками. Возвращает развёрнутых."""
+        known = related_phrases.lookup(
+            [parent['phrase'] for parent in parents],
+            self.region,
+            top_n=self.rules.topN_suggest,
+        )
+        rows: List[tuple] = []
+        expanded: List[str] = []
+        for parent in parents:
+            entries = known.get(parent['phrase'])
+            if entries is None:
+                continue
+            rows.extend(self._children(parent, entries, depth))
+            expanded.append(parent['phrase_norm'])
+        if rows:
+            with get_db_connection() as conn:
+                # Фраза, уже встреченная на любом уровне, повторно не добавляется
+                conn.executemany(
+                    'INSERT OR IGNORE INTO deep_frontier '
+                    '(run_id, phrase_norm, phrase, depth, parent, root, source, freq, status, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    rows,
+                )
+        self._set_status(expanded, 'expanded')
+        return expanded
+
+    # ------------------------------------------------------------------ fetch
+
+    def _fetch_with_parsers(self, phrases: List[str], region: int) -> Dict[str, Optional[int]]:
+        try:
+            from ..services import browser_pool
+        except ImportError:
+            from services import browser_pool
+
+        # Общий loop пула: контексты аккаунтов живут между порциями
+        return browser_pool.run_shared(self._fetch_async(phrases, region, browser_pool))
+
+    async def _fetch_async(self, phrases: List[str], region: int, browser_pool: Any) -> Dict[str, Optional[int]]:
+        try:
+            from turbo_parser_improved import turbo_parser_10tabs  # type: ignore
+        except ImportError:
+            from ..turbo_parser_improved import turbo_parser_10tabs  # type: ignore
+
+        if self.accounts is None:
+            self.accounts = _default_accounts()
+        if not self.accounts:
+            raise RuntimeError('Нет аккаунтов с профилем для глубокого сбора')
+
+        coordinator = PhraseCoordinator(phrases)
+        outcomes = await asyncio.gather(
+            *(
+                turbo_parser_10tabs(
+                    account['email'],
+                    Path(account['profile_path']),
+                    phrases,
+                    proxy_uri=account.get('proxy'),
+                    region_id=region,
+                    coordinator=coordinator,
+                    pool=browser_pool.get_pool(),
+                )
+                for account in self.accounts
+            ),
+            return_exceptions=True,
+        )
+        for account, outcome in zip(self.accounts, outcomes):
+            if isinstance(outcome, Exception):
+                self.log(f"[deep] {account['email']}: ошибка парсера {outcome}")
+        return {
+            phrase: coordinator.results.get(phrase) if coordinator.statuses.get(phrase) == STATUS_OK else None
+            for phrase in phrases
+        }
+
+    # -------------------------------------------------------------------- run
+
+    def run(self) -> Optional[Path]:
+        """
+        Пройти оставшиеся уровни.
+
+        Returns:
+            путь к CSV с результатом или None, если прогон остановлен
+        """
+        run = self._load_run()
+        self._update_run(status='running')
+        for depth in range(int(run['current_depth']), self.rules.depth_levels):
+            self._update_run(current_depth=depth)
+            if not self._run_level(depth):
+                self._update_run(status='paused', budget_used=json.dumps(self.budget_used))
+                self.log(f'[deep] Прогон #{self.run_id} остановлен на уровне {depth}')
+                return None
+        output = self.export()
+        self._update_run(status='done', current_depth=self.rules.depth_levels, output_path=str(output))
+        self.log(f'[deep] Прогон #{self.run_id} завершён: {output}')
+        return output
+
+    def _run_level(self, depth: int) -> bool:
+        budget = self.rules.budget_per_level
+        key = str(depth)
+        while True:
+            if self._should_stop():
+                return False
+            queued = self._queued(depth)
+            if not queued:
+                break
+            # Колонки, скачанные раньше (этим или другим парсером), бюджет не тратят
+            free = set(self._expand(queued, depth))
+            need = [row for row in queued if row['phrase_norm'] not in free]
+            if free:
+                self.log(f'[deep] Уровень {depth}: из сохранённых колонок {len(free)} фраз')
+            if not need:
+                continue
+
+            left = budget - self.budget_used.get(key, 0) if budget else len(need)
+            if left <= 0:
+                self._set_status([row['phrase_norm'] for row in need], 'skipped')
+                self.log(f'[deep] Уровень {depth}: бюджет исчерпан, пропущено {len(need)} фраз')
+                break
+
+            batch = need[:min(BATCH_SIZE, left)]
+            phrases = [row['phrase'] for row in batch]
+            self.log(f'[deep] Уровень {depth}: запрашиваю {len(phrases)} фраз (ещё в очереди {len(need) - len(batch)})')
+            values = self.fetch(phrases, self.region)
+            self.budget_used[key] = self.budget_used.get(key, 0) + len(batch)
+            self._update_run(budget_used=json.dumps(self.budget_used))
+
+            self._set_freqs({
+                row['phrase_norm']: values[row['phrase']]
+                for row in batch
+                if row['freq'] is None and values.get(row['phrase']) is not None
+            })
+            expanded = set(self._expand(batch, depth))
+            rest = [row for row in batch if row['phrase_norm'] not in expanded]
+            # Ответ без колонок — развёрнута без детей, без ответа — ошибка
+            self._set_status(
+                [row['phrase_norm'] for row in rest if values.get(row['phrase']) is not None],
+                'expanded',
+            )
+            self._set_status(
+                [row['phrase_norm'] for row in rest if values.get(row['phrase']) is None],
+                'failed',
+            )
+        return True
+
+    def export(self, path: Optional[Path] = None) -> Path:
+        """Выгрузить все найденные фразы прогона в CSV."""
+        out_path = Path(path) if path else RESULTS_DIR / f"deep_{self.run_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        with get_db_connection() as conn:
+            rows = conn.execute(
+                'SELECT phrase, freq, depth, source, parent, root, status FROM deep_frontier '
+                'WHERE run_id = ? ORDER BY depth, COALESCE(freq, 0) DESC',
+                (self.run_id,),
+            ).fetchall()
+        with out_path.open('w', encoding='utf-8-sig', newline='') as fh:
+            writer = csv.writer(fh, delimiter=';')
+            writer.writerow(['phrase', 'freq', 'depth', 'source', 'parent', 'root', 'status'])
+            for row in rows:
+                writer.writerow([row['phrase'], row['freq'] if row['freq'] is not None else '', row['depth'],
+                                 row['source'], row['parent'] or '', row['root'] or '', row['status']])
+        return out_path
+
+
+def create_run(
+    seeds: Sequence[str],
+    *,
+    region: int = 225,
+    rules: Optional[DeepRules] = None,
+    seeds_file: Optional[str] = None,
+) -> int:
+    """Создать прогон: семена — уровень 0 фронтира. Возвращает id прогона."""
+    ensure_schema()
+    rules = rules or DeepRules.load()
+    normalizer = NormalizationOptions()
+    seen: Dict[str, str] = {}
+    for seed in seeds:
+        cleaned = normalizer.apply(seed) if rules.dedupe_norm else seed.strip()
+        if cleaned and cleaned not in seen:
+            seen[cleaned] = cleaned if rules.dedupe_norm else seed.strip()
+
+    try:
+        cached = frequency_cache.lookup(list(seen.values()), mode='ws', region=region)
+    except Exception:
+        cached = {}
+
+    now = _now()
+    with get_db_connection() as conn:
+        cursor = conn.execute(
+            'INSERT INTO deep_runs (seeds_file, region, status, rules, budget_used, created_at, updated_at) '
+            "VALUES (?, ?, 'running', ?, '{}', ?, ?)",
+            (seeds_file, int(region), json.dumps(asdict(rules), ensure_ascii=False), now, now),
+        )
+        run_id = int(cursor.lastrowid)
+        conn.executemany(
+            'INSERT OR IGNORE INTO deep_frontier '
+            '(run_id, phrase_norm, phrase, depth, root, source, freq, status, updated_at) '
+            "VALUES (?, ?, ?, 0, ?, 'seed', ?, 'queued', ?)",
+            ((run_id, norm, phrase, phrase, cached.get(phrase), now) for norm, phrase in seen.items()),
+        )
+    return run_id
+
+
+def latest_paused_run() -> Optional[int]:
+    """Последний остановленный прогон, который можно продолжить."""
+    ensure_schema()
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT id FROM deep_runs WHERE status != 'done' ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+    return int(row[0]) if row is not None else None
 
 
 def run_deep_task(
@@ -24,25 +491,39 @@ def run_deep_task(
     region: Optional[int] = None,
     *,
     timestamp: str | None = None,
+    run_id: Optional[int] = None,
+    accounts: Optional[Sequence[Mapping[str, Any]]] = None,
+    rules_path: Optional[Path] = None,
 ) -> Path:
-    seeds_path = Path(seeds_file).expanduser().resolve()
-    if not seeds_path.exists():
-        raise FileNotFoundError(seeds_path)
-    seeds = [line.strip() for line in seeds_path.read_text(encoding='utf-8').splitlines() if line.strip()]
-    if not seeds:
-        raise ValueError('Seeds file is empty')
-
-    stamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
-    out_path = RESULTS_DIR / f'deep_{stamp}.csv'
-
-    deep_run(
-        seeds=seeds,
-        cfg_path=str(CONFIG_PATH.resolve()),
-        depth=depth,
-        min_shows=min_shows,
-        expand_min=expand_min,
-        topk=topk,
-        lr=region,
-        out_csv=str(out_path),
-    )
-    return out_path
+    """
+    Глубокий сбор от семян из файла.
+
+    ``depth``, ``min_shows``, ``expand_min`` и ``topk`` перекрывают
+    ``depth_levels``, пороги колонок, ``pass_to_next_level.min_freq`` и
+    ``topN_suggest`` из правил. С ``run_id`` продолжается ранее
+    остановленный прогон (параметры берутся из него).
+    """
+    if run_id is None:
+        seeds_path = Path(seeds_file).expanduser().resolve()
+        if not seeds_path.exists():
+            raise FileNotFoundError(seeds_path)
+        seeds = [line.strip() for line in seeds_path.read_text(encoding='utf-8').splitlines() if line.strip()]
+        if not seeds:
+            raise ValueError('Seeds file is empty')
+
+        rules = DeepRules.load(rules_path)
+        rules.depth_levels = int(depth)
+        rules.min_freq_leftcol = rules.min_freq_rightcol = int(min_shows)
+        rules.pass_min_freq = int(expand_min)
+        rules.topN_suggest = int(topk)
+        run_id = create_run(seeds, region=region or 225, rules=rules, seeds_file=str(seeds_path))
+
+    runner = DeepRunner(run_id, accounts=accounts)
+    output = runner.run()
+    if output is None:
+        raise RuntimeError(f'Deep run #{run_id} stopped before completion')
+    if timestamp:
+        stamped = RESULTS_DIR / f'deep_{timestamp}.csv'
+        output.replace(stamped)
+        output = stamped
+    return output
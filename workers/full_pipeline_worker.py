@@ -95,7 +95,8 @@ class FullPipelineWorkerThread(QThread):
         self.log_message.emit("💰 Этап 2/3: Прогноз бюджета (Direct)...")
         self.progress_signal.emit(0, len(freq_results), "Direct")
         
-        forecast_results = await forecast_batch_direct(
+        # Прогнозы сохраняются в таблицу forecasts, объединение читает их оттуда
+        await forecast_batch_direct(
             freq_results,
             chunk_size=100,
             region=self.region
@@ -103,7 +104,7 @@ class FullPipelineWorkerThread(QThread):
         
         # ШАГ 3: Объединение данных
         self.log_message.emit("🔗 Этап 3/3: Объединение и группировка...")
-        merged = await merge_freq_and_forecast(freq_results, forecast_results)
+        merged = await asyncio.to_thread(merge_freq_and_forecast, self.region)
         
         # ШАГ 4: Кластеризация
         clustered = await self._cluster_phrases(merged)
@@ -19,23 +19,32 @@ from playwright.async_api import async_playwright, Page, Browser, BrowserContext
 try:
     from ..utils.proxy import proxy_to_playwright
     from ..utils.text_fix import WORDSTAT_FETCH_NORMALIZER_SCRIPT, fix_mojibake
-    from ..core.db import SessionLocal
+    from ..core.db import SessionLocal, upsert_freq_results
     from ..core.models import Account
     from ..services.proxy_manager import ProxyManager, proxy_preflight, Proxy
+    from ..services import rate_control, related_phrases
+    from ..services.network_policy import PolicyStats, install_blocklist
     from .visual_browser_manager import VisualBrowserManager, BrowserStatus
     from .auto_auth_handler import AutoAuthHandler
 except ImportError:
     from utils.proxy import proxy_to_playwright
     from utils.text_fix import WORDSTAT_FETCH_NORMALIZER_SCRIPT, fix_mojibake
-    from core.db import SessionLocal
+    from core.db import SessionLocal, upsert_freq_results
     from core.models import Account
     from services.proxy_manager import ProxyManager, proxy_preflight, Proxy
+    from services import rate_control, related_phrases
+    from services.network_policy import PolicyStats, install_blocklist
     from .visual_browser_manager import VisualBrowserManager, BrowserStatus
     from .auto_auth_handler import AutoAuthHandler
 
 
 def _wire_logging(page: Page) -> None:
-    page.on("requestfailed", lambda r: print(f"[TURBO][NET] FAIL {r.url} {r.failure}"))
+    def on_failed(request) -> None:
+        # Запросы, оборванные сетевой политикой, — не сбой
+        if "ERR_BLOCKED_BY_CLIENT" not in (request.failure or ""):
+            print(f"[TURBO][NET] FAIL {request.url} {request.failure}")
+
+    page.on("requestfailed", on_failed)
     page.on("console", lambda m: print(f"[TURBO][CONSOLE] {m.type}: {m.text}"))
 
 
@@ -47,6 +56,7 @@ def _ensure_wired(page: Page) -> None:
 
 
 _WORDSTAT_ENCODINGS: tuple[str, ...] = ("utf-8", "windows-1251", "cp1251", "latin-1")
+RESPONSE_WAIT_SECONDS = 5.0  # Сколько ждать ответа API на одну фразу
 
 
 async def _parse_wordstat_json(response) -> Optional[dict]:
@@ -85,50 +95,8 @@ async def _parse_wordstat_json(response) -> Optional[dict]:
     return None
 
 
-def _normalize_wordstat_payload(data: Dict[str, Any]) -> None:
-    """Преобразует tableData → items/related, чтобы код дальше не ломался."""
-    if not isinstance(data, dict):
-        return
-    table = data.get("table")
-    if not isinstance(table, dict):
-        return
-    table_data = table.get("tableData")
-    if not isinstance(table_data, dict):
-        return
-
-    def _norm(entries: Optional[List[Any]]) -> List[Dict[str, Any]]:
-        normalized: List[Dict[str, Any]] = []
-        for item in entries or []:
-            phrase: str = ""
-            count: Any = 0
-            if isinstance(item, dict):
-                phrase = (
-                    item.get("text")
-                    or item.get("phrase")
-                    or item.get("key")
-                    or item.get("title")
-                    or ""
-                )
-                count = item.get("value", item.get("count", item.get("freq", 0)))
-            elif isinstance(item, (list, tuple)) and item:
-                phrase = str(item[0] or "")
-                count = item[1] if len(item) > 1 else 0
-            elif isinstance(item, str):
-                phrase = item
-                count = 0
-            try:
-                value = int(str(count).replace(" ", ""))
-            except Exception:
-                value = 0
-            phrase = phrase.strip()
-            if phrase:
-                normalized.append({"phrase": phrase, "count": value})
-        return normalized
-
-    if not table.get("items"):
-        table["items"] = _norm(table_data.get("popular"))
-    if not table.get("related"):
-        table["related"] = _norm(table_data.get("associations") or table_data.get("similar"))
+# Преобразует tableData → items/related, чтобы код дальше не ломался
+_normalize_wordstat_payload = related_phrases.normalize_payload
 
 
 def _extract_phrase_from_request(response) -> Optional[str]:
@@ -151,33 +119,6 @@ def _extract_phrase_from_request(response) -> Optional[str]:
         return None
 
 
-class AIMDController:
-    """AIMD регулятор скорости для избежания банов"""
-
-    def __init__(self):
-        self.delay_ms = 50
-        self.min_delay = 30
-        self.max_delay = 300
-        self.success_count = 0
-        self.error_count = 0
-
-    def on_success(self) -> None:
-        """При успехе уменьшаем задержку"""
-        self.success_count += 1
-        if self.success_count >= 10:
-            self.delay_ms = max(self.min_delay, self.delay_ms - 10)
-            self.success_count = 0
-
-    def on_error(self) -> None:
-        """При ошибке увеличиваем задержку"""
-        self.error_count += 1
-        self.delay_ms = min(self.max_delay, self.delay_ms * 1.5)
-
-    def get_delay(self) -> float:
-        """Текущая задержка в секундах"""
-        return self.delay_ms / 1000.0
-
-
 class TurboWordstatParser:
     """Турбо парсер Wordstat для KeySet"""
 
@@ -189,7 +130,13 @@ class TurboWordstatParser:
         self.context: Optional[BrowserContext] = None
         self.pages: List[Page] = []
         self.results: Dict[str, Any] = {}
-        self.aimd = AIMDController()
+        self.region = 225
+        # Фраза → future, который резолвит handle_response (как waiters в TurboParser)
+        self.waiters: Dict[str, asyncio.Future] = {}
+        self._response_tasks: set[asyncio.Task] = set()
+        # Темп общий с другими парсерами этого аккаунта (services.rate_control);
+        # в init_browser уточняется по фактическому прокси
+        self.rate = rate_control.get_controller(getattr(account, "name", None), getattr(account, "proxy", None))
         self.num_tabs = 10
         self.num_browsers = 1
         self.visual_manager = None
@@ -198,6 +145,7 @@ class TurboWordstatParser:
         self.proxy_manager = ProxyManager.instance()
         self._proxy_item: Optional[Proxy] = None
         self._preflight_info: Optional[dict] = None
+        self.network_stats: Optional[PolicyStats] = None
 
         if self.account:
             self._load_auth_data()
@@ -257,6 +205,11 @@ class TurboWordstatParser:
                     password=parsed.get("password"),
                 )
 
+        self.rate = rate_control.get_controller(
+            getattr(self.account, "name", None),
+            proxy_obj.server if proxy_obj else None,
+        )
+
         preflight = proxy_preflight(proxy_obj) if proxy_obj else {"ok": True, "ip": None, "error": None}
         if not preflight.get("ok", False):
             raise RuntimeError(f"Proxy preflight failed: {preflight.get('error')}")
@@ -287,6 +240,8 @@ class TurboWordstatParser:
             launch_kwargs["args"].append(f"--host-resolver-rules=MAP * ~NOTFOUND , EXCLUDE {host}")
 
         context = await self.playwright.chromium.launch_persistent_context(**launch_kwargs)
+        # Блокирует сам Chrome (CDP): route в контексте отключил бы HTTP-кэш
+        self.network_stats = await install_blocklist(context)
         await context.add_init_script(script=WORDSTAT_FETCH_NORMALIZER_SCRIPT)
         for existing_page in context.pages:
             await existing_page.add_init_script(script=WORDSTAT_FETCH_NORMALIZER_SCRIPT)
@@ -349,6 +304,9 @@ class TurboWordstatParser:
     async def handle_response(self, response, tab_id: int) -> None:
         if "wordstat/api" not in response.url:
             return
+        if response.status == 429:
+            self.rate.on_throttled()
+            return
 
         data = await _parse_wordstat_json(response)
         if not data:
@@ -378,38 +336,65 @@ class TurboWordstatParser:
         if frequency is None:
             return
 
-        self.results[phrase] = {
+        # Левая и правая колонки — бесплатный материал для расширения
+        related_phrases.record(phrase, self.region, data)
+
+        record = {
             "query": phrase,
             "frequency": frequency,
+            "region": self.region,
             "timestamp": datetime.utcnow().isoformat(),
             "tab": tab_id,
         }
+        self.results[phrase] = record
+        waiter = self.waiters.pop(phrase, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(record)
 
     async def process_tab_worker(self, page: Page, phrases: List[str], tab_id: int) -> List[Dict[str, Any]]:
         _ensure_wired(page)
         results = []
-        page.on("response", lambda response: asyncio.create_task(self.handle_response(response, tab_id)))
-        for phrase in phrases:
-            try:
-                await page.fill("input.textinput__control", phrase)
-                await page.keyboard.press("Enter")
-                await self.wait_wordstat_ready(page)
-                captured = False
-                wait_delay = max(self.aimd.get_delay(), 0.05)
-                for _ in range(30):
-                    if phrase in self.results:
-                        results.append(self.results[phrase])
-                        captured = True
-                        break
-                    await asyncio.sleep(wait_delay)
-                if captured:
-                    self.aimd.on_success()
-                else:
-                    print(f"[TURBO] Tab {tab_id}: не получили ответ для «{phrase}»")
-                    self.aimd.on_error()
-            except Exception as exc:
-                print(f"[TURBO] Tab {tab_id}: ошибка {exc}")
-                self.aimd.on_error()
+        loop = asyncio.get_running_loop()
+
+        def on_response(response) -> None:
+            task = asyncio.create_task(self.handle_response(response, tab_id))
+            self._response_tasks.add(task)
+            task.add_done_callback(self._response_tasks.discard)
+
+        # Один слушатель на вкладку на всё время работы воркера, снимается в finally
+        page.on("response", on_response)
+        try:
+            for phrase in phrases:
+                key = phrase.strip()
+                if key in self.results:
+                    results.append(self.results[key])
+                    continue
+                future: asyncio.Future = loop.create_future()
+                self.waiters[key] = future
+                try:
+                    await self.rate.wait()
+                    await page.fill("input.textinput__control", phrase)
+                    await page.keyboard.press("Enter")
+                    record = await asyncio.wait_for(future, timeout=RESPONSE_WAIT_SECONDS)
+                    results.append(record)
+                    self.rate.on_success()
+                except asyncio.TimeoutError:
+                    if "showcaptcha" in (page.url or ""):
+                        print(f"[TURBO] Tab {tab_id}: капча на «{phrase}»")
+                        self.rate.on_captcha()
+                    else:
+                        print(f"[TURBO] Tab {tab_id}: не получили ответ для «{phrase}»")
+                        self.rate.on_timeout()
+                except Exception as exc:
+                    print(f"[TURBO] Tab {tab_id}: ошибка {exc}")
+                    self.rate.on_error()
+                finally:
+                    if self.waiters.get(key) is future:
+                        del self.waiters[key]
+                    if not future.done():
+                        future.cancel()
+        finally:
+            page.remove_listener("response", on_response)
         return results
 
     async def parse_batch(self, queries: List[str], region: int = 225) -> List[Dict[str, Any]]:
@@ -418,6 +403,7 @@ class TurboWordstatParser:
         self.total_processed = 0
         self.total_errors = 0
         self.start_time = time.time()
+        self.region = region
         await self.init_browser()
         await self.setup_tabs()
         buckets = [queries[i::len(self.pages)] for i in range(len(self.pages))]
@@ -425,29 +411,25 @@ class TurboWordstatParser:
         for idx, page in enumerate(self.pages):
             tasks.append(self.process_tab_worker(page, buckets[idx], idx))
         results_nested = await asyncio.gather(*tasks)
+        await asyncio.to_thread(self.rate.save)
+        await asyncio.to_thread(related_phrases.flush)
         flat_results = [item for bucket in results_nested for item in bucket]
         return flat_results
 
     async def save_to_db(self, results: List[Dict[str, Any]]) -> None:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        for row in results:
-            cursor.execute(
-                """
-                INSERT OR REPLACE INTO freq_results
-                (mask, region, freq_total, freq_exact, status, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)""",
-                (
-                    row["query"],
-                    row.get("region", 225),
-                    row["frequency"],
-                    row["frequency"],
-                    "ok",
-                    row["timestamp"],
-                ),
-            )
-        conn.commit()
-        conn.close()
+        """Одна транзакция на весь пакет (executemany + upsert по mask/region)."""
+        rows = [
+            {
+                "mask": row["query"],
+                "region": row.get("region", 225),
+                "freq_total": row["frequency"],
+                "freq_exact": row["frequency"],
+                "status": "ok",
+                "error": None,
+            }
+            for row in results
+        ]
+        await asyncio.to_thread(upsert_freq_results, rows)
 
     async def close(self) -> None:
         try:
@@ -468,6 +450,8 @@ class TurboWordstatParser:
             self.browser = None
             self.playwright = None
             self.pages = []
+            if self.network_stats is not None:
+                print(f"[TURBO] Сеть: {self.network_stats.summary()}")
             print("[TURBO] Persistent сессия закрыта")
 
 